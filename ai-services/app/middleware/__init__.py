@@ -0,0 +1 @@
+# Middleware Package
\ No newline at end of file
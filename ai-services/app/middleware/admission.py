@@ -0,0 +1,305 @@
+"""
+Admission control: bounds in-flight requests per route class and sheds
+load with 429/503 and Retry-After once the wait queue is full or too slow
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app.services.retry import deadline, remaining
+from app.utils.config import get_settings
+from app.utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Buckets (seconds) for time spent queued and being served
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Path prefix of each route class; requests elsewhere are not limited
+ROUTE_CLASSES = (
+    ("/api/analysis", "analysis"),
+    ("/api/transcription", "transcription"),
+)
+
+# Reads are cheap and must stay available while work is being shed
+UNLIMITED_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class Rejected(Exception):
+    """A request was shed; carries the status and Retry-After to send"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AIMDLimit:
+    """
+    Concurrency limit adapted to observed latency: grows by one per
+    limit's worth of fast completions while the limit is in use, and
+    shrinks by backoff when a request is slower than the target or shed.
+    Decreases are applied at most once per target interval, so a single
+    burst of slow requests counts as one congestion signal.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        backoff: float = 0.9,
+        clock=time.monotonic,
+    ):
+        self.value = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.clock = clock
+        self._last_decrease = -math.inf
+
+    @property
+    def limit(self) -> int:
+        return int(self.value)
+
+    def on_sample(self, latency: float, in_flight: int) -> None:
+        if latency > self.latency_target:
+            self.on_overload()
+        elif in_flight >= self.limit / 2:
+            self.value = min(self.max_limit, self.value + 1 / self.value)
+
+    def on_overload(self) -> None:
+        now = self.clock()
+        if now - self._last_decrease < self.latency_target:
+            return
+        self._last_decrease = now
+        self.value = max(self.min_limit, self.value * self.backoff)
+
+
+class RouteLimiter:
+    """
+    In-flight limit with a bounded FIFO wait queue for one route class.
+    A full queue rejects immediately with 429; a request that cannot be
+    admitted within queue_timeout (or its deadline) gets 503.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        queue_size: int,
+        queue_timeout: float,
+        adaptive: Optional[AIMDLimit] = None,
+    ):
+        self.name = name
+        self.fixed_limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.adaptive = adaptive
+        self.in_flight = 0
+        self._queue: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.service_seconds = Histogram(LATENCY_BUCKETS)
+        self.queue_seconds = Histogram(LATENCY_BUCKETS)
+
+    @property
+    def limit(self) -> int:
+        return self.adaptive.limit if self.adaptive else self.fixed_limit
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead should have drained"""
+        per_request = self.service_seconds.mean or 1.0
+        ahead = len(self._queue) + 1
+        return max(1, math.ceil(ahead * per_request / max(self.limit, 1)))
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns the time spent queued"""
+        if self.in_flight < self.limit and not self._queue:
+            self.in_flight += 1
+            self.admitted += 1
+            self.queue_seconds.observe(0.0)
+            return 0.0
+
+        if len(self._queue) >= self.queue_size:
+            self.rejected_queue_full += 1
+            self._overloaded()
+            raise Rejected(
+                429, f"Too many {self.name} requests queued",
+                self.retry_after(),
+            )
+
+        timeout = self.queue_timeout
+        left = remaining()
+        if left is not None:
+            timeout = min(timeout, left)
+        waiter = asyncio.get_running_loop().create_future()
+        self._queue.append(waiter)
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self.rejected_timeout += 1
+            self._overloaded()
+            raise Rejected(
+                503, f"Timed out waiting for {self.name} capacity",
+                self.retry_after(),
+            )
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        waited = time.monotonic() - start
+        self.admitted += 1
+        self.queue_seconds.observe(waited)
+        return waited
+
+    def release(self, service_time: float) -> None:
+        self.in_flight -= 1
+        self.service_seconds.observe(service_time)
+        if self.adaptive is not None:
+            self.adaptive.on_sample(service_time, self.in_flight + 1)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._queue and self.in_flight < self.limit:
+            waiter = self._queue.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        if waiter.done() and not waiter.cancelled():
+            # Admitted just as the wait ended: give the slot back
+            self.in_flight -= 1
+            self._wake()
+        else:
+            waiter.cancel()
+            try:
+                self._queue.remove(waiter)
+            except ValueError:
+                pass
+
+    def _overloaded(self) -> None:
+        if self.adaptive is not None:
+            self.adaptive.on_overload()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "adaptive": self.adaptive is not None,
+            "in_flight": self.in_flight,
+            "queued": len(self._queue),
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "service_seconds_histogram": self.service_seconds.snapshot(),
+            "queue_seconds_histogram": self.queue_seconds.snapshot(),
+        }
+
+
+_limiters: Dict[str, RouteLimiter] = {}
+
+
+def get_route_limiter(name: str) -> RouteLimiter:
+    """Get the process-wide limiter for a route class"""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        settings = get_settings()
+        adaptive = None
+        if settings.admission_adaptive:
+            adaptive = AIMDLimit(
+                settings.max_concurrent_requests,
+                settings.admission_min_limit,
+                settings.max_concurrent_requests,
+                settings.admission_latency_target,
+            )
+        limiter = RouteLimiter(
+            name,
+            settings.max_concurrent_requests,
+            settings.admission_queue_size,
+            settings.admission_queue_timeout,
+            adaptive,
+        )
+        _limiters[name] = limiter
+    return limiter
+
+
+def admission_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: limiter.stats() for name, limiter in _limiters.items()}
+
+
+def reset_admission() -> None:
+    _limiters.clear()
+
+
+def route_class(scope: Dict[str, Any]) -> Optional[str]:
+    if scope["type"] != "http" or scope["method"] in UNLIMITED_METHODS:
+        return None
+    path = scope["path"]
+    for prefix, name in ROUTE_CLASSES:
+        if path == prefix or path.startswith(prefix + "/"):
+            return name
+    return None
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware that admits requests to each route class through its
+    RouteLimiter. Admitted requests run under a REQUEST_TIMEOUT deadline
+    that includes their time in the queue, so retries further down stop
+    when the client would have given up anyway.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        name = route_class(scope)
+        if name is None or not get_settings().admission_control_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = get_route_limiter(name)
+        with deadline(get_settings().request_timeout):
+            try:
+                await limiter.acquire()
+            except Rejected as e:
+                logger.debug(
+                    f"Shedding {scope['method']} {scope['path']}: "
+                    f"{e.detail} (in flight {limiter.in_flight}, "
+                    f"limit {limiter.limit})"
+                )
+                await send_rejection(send, e)
+                return
+
+            start = time.monotonic()
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                limiter.release(time.monotonic() - start)
+
+
+async def send_rejection(send, rejection: Rejected) -> None:
+    body = json.dumps({"detail": rejection.detail}).encode()
+    headers: Tuple[Tuple[bytes, bytes], ...] = (
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        (b"retry-after", str(rejection.retry_after).encode()),
+    )
+    await send({
+        "type": "http.response.start",
+        "status": rejection.status_code,
+        "headers": list(headers),
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,89 @@
+"""
+Per-route request latency and in-flight metrics
+"""
+
+import time
+from typing import Any, Dict, Tuple
+
+from starlette.routing import Match
+
+from app.utils.metrics import DURATION_BUCKETS, REGISTRY
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "echoscribe_http_request_seconds",
+    "HTTP request duration by route template, method and status",
+    DURATION_BUCKETS,
+    ("route", "method", "status"),
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "echoscribe_http_requests_in_flight",
+    "HTTP requests being served, by route template",
+    ("route",),
+)
+
+# Label for requests that match no route, so scans cannot add series
+UNMATCHED = "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording each HTTP request's duration and the number
+    in flight, labelled by route template (/status/{job_id}, not the
+    job's path) so series stay bounded
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+        self._routes: Dict[Tuple[str, str], str] = {}
+        # Resolved label children, so the hot path skips labels()
+        self._series: Dict[Any, Any] = {}
+
+    def route_for(self, scope: Dict[str, Any]) -> str:
+        key = (scope["method"], scope["path"])
+        route = self._routes.get(key)
+        if route is not None:
+            return route
+        route = UNMATCHED
+        params = False
+        for candidate in getattr(scope.get("app"), "routes", ()):
+            match, child_scope = candidate.matches(scope)
+            if match == Match.FULL:
+                route = getattr(candidate, "path", UNMATCHED)
+                params = bool(child_scope.get("path_params"))
+                break
+            if match == Match.PARTIAL and route == UNMATCHED:
+                route = getattr(candidate, "path", UNMATCHED)
+        # Only fixed paths are remembered; job ids would grow the cache
+        if not params and len(self._routes) < 1024:
+            self._routes[key] = route
+        return route
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self.route_for(scope)
+        in_flight = self._series.get(route)
+        if in_flight is None:
+            in_flight = self._series[route] = REQUESTS_IN_FLIGHT.labels(route)
+        status = "500"
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            key = (route, scope["method"], status)
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = REQUEST_SECONDS.labels(*key)
+            series.observe(elapsed)
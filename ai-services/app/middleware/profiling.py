@@ -0,0 +1,111 @@
+"""
+Per-request profiling: a cProfile dump and a span timeline for requests
+that ask for it or are sampled
+"""
+
+import asyncio
+import cProfile
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from typing import Any, Optional
+
+from app.utils.config import get_settings
+from app.utils.profiling import record_timeline
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+
+def profile_dir() -> str:
+    return os.path.join(get_settings().debug_output_dir, "profiles")
+
+
+def _write_profile(path: str, profiler: Optional[cProfile.Profile],
+                   timeline_json: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if profiler is not None:
+        profiler.dump_stats(path + ".pstats")
+    with open(path + ".trace.json", "w") as f:
+        f.write(timeline_json)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles a request when it carries an X-Profile
+    header equal to PROFILING_TOKEN (any value in development when none is
+    set) or is picked at PROFILING_SAMPLE_RATE. Writes <id>.pstats and
+    <id>.trace.json under DEBUG_OUTPUT_DIR/profiles and returns the id in
+    X-Profile-Id.
+
+    cProfile follows the thread, not the task, so the dump also counts
+    other requests the event loop ran meanwhile; one request is profiled
+    at a time and others proceed unprofiled. Only installed when
+    ENABLE_PROFILING is set, so it costs nothing otherwise.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+        self._active = False
+
+    def wants_profile(self, scope) -> bool:
+        settings = get_settings()
+        for name, value in scope.get("headers", ()):
+            if name == PROFILE_HEADER:
+                return settings.profiling_token_matches(
+                    value.decode("latin-1")
+                )
+        rate = settings.profiling_sample_rate
+        return rate > 0 and random.random() < rate
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or self._active \
+                or not self.wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", scope["path"]).strip("-")
+        profile_id = (f"{time.strftime('%Y%m%d-%H%M%S')}-"
+                      f"{scope['method'].lower()}-{slug or 'root'}-"
+                      f"{uuid.uuid4().hex[:8]}")
+
+        async def send_with_id(message) -> None:
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message.get("headers", ())) + [
+                    (PROFILE_ID_HEADER, profile_id.encode())
+                ]
+            await send(message)
+
+        self._active = True
+        profiler: Optional[cProfile.Profile] = cProfile.Profile()
+        try:
+            with record_timeline(f"{scope['method']} {scope['path']}") \
+                    as timeline:
+                start = time.perf_counter()
+                try:
+                    profiler.enable()
+                except ValueError:  # another profiler is already running
+                    profiler = None
+                try:
+                    await self.app(scope, receive, send_with_id)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+                    timeline.add("request", start, time.perf_counter())
+        finally:
+            self._active = False
+
+        path = os.path.join(profile_dir(), profile_id)
+        try:
+            await asyncio.to_thread(
+                _write_profile, path, profiler, timeline.dumps()
+            )
+            logger.info(f"Wrote request profile {path}")
+        except OSError as e:
+            logger.warning(f"Could not write profile {path}: {str(e)}")
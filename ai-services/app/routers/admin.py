@@ -0,0 +1,85 @@
+"""
+Admin router for on-demand profiling of the running process
+"""
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import asyncio
+import logging
+import os
+import time
+
+from app.utils.config import get_settings, Settings
+from app.utils.profiling import StackSampler
+
+logger = logging.getLogger(__name__)
+
+
+def require_admin_token(
+    x_profile_token: Optional[str] = Header(None),
+    settings: Settings = Depends(get_settings)
+) -> None:
+    """Check X-Profile-Token against PROFILING_TOKEN"""
+    if not settings.profiling_token_matches(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin_token)])
+
+# Only one stack sample runs at a time
+_sampling = asyncio.Lock()
+
+
+def _save_collapsed(settings: Settings, text: str) -> str:
+    directory = os.path.join(settings.debug_output_dir, "profiles")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(
+        directory, f"{time.strftime('%Y%m%d-%H%M%S')}-process.collapsed"
+    )
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+
+@router.post("/profile")
+async def profile_process(
+    seconds: float = Query(10.0, gt=0),
+    interval: float = Query(0.01, ge=0.001, le=1.0),
+    format: str = Query("json", pattern="^(json|collapsed)$"),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Sample every thread's stack for `seconds` and report the hottest
+    frames, or the collapsed stacks for a flame graph. With
+    SAVE_DEBUG_FILES the collapsed stacks are also written under
+    DEBUG_OUTPUT_DIR/profiles.
+    """
+    if seconds > settings.profiling_max_seconds:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be at most {settings.profiling_max_seconds}"
+        )
+    if _sampling.locked():
+        raise HTTPException(
+            status_code=409, detail="A profile is already being captured"
+        )
+
+    async with _sampling:
+        logger.info(f"Sampling process stacks for {seconds}s")
+        sampler = StackSampler(interval)
+        await asyncio.to_thread(sampler.run, seconds)
+
+    collapsed = sampler.collapsed()
+    path = None
+    if settings.save_debug_files:
+        path = await asyncio.to_thread(_save_collapsed, settings, collapsed)
+    if format == "collapsed":
+        return PlainTextResponse(collapsed)
+    return {
+        "seconds": seconds,
+        "interval": interval,
+        "samples": sampler.samples,
+        "top": sampler.top(),
+        "file": path,
+    }
@@ -4,9 +4,22 @@ Analysis router for AI-powered meeting analysis
 
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 import logging
+import math
 
+from app.services.analysis_service import (
+    ACTION_ITEMS,
+    PROMPT_VERSION,
+    SENTIMENT,
+    SUMMARY,
+    AnalysisService,
+    get_analysis_service,
+)
+from app.services.batching import batcher_stats
+from app.services.cache import ResultCache, get_result_cache, make_cache_key
+from app.services.errors import CircuitOpenError, DeadlineExceeded
+from app.services.retry import deadline
 from app.utils.config import get_settings, Settings
 
 logger = logging.getLogger(__name__)
@@ -19,6 +32,7 @@ class AnalysisRequest(BaseModel):
     text: str
     meeting_id: Optional[str] = None
     analysis_type: str = "summary"  # summary, sentiment, action_items
+    analysis_types: Optional[List[str]] = None  # run several in one pass
 
 
 class AnalysisResponse(BaseModel):
@@ -35,6 +49,7 @@ class SentimentAnalysisResponse(BaseModel):
     sentiment_score: float
     emotions: dict
     confidence_score: float
+    segments: Optional[List[dict]] = None
 
 
 class ActionItemsResponse(BaseModel):
@@ -44,8 +59,95 @@ class ActionItemsResponse(BaseModel):
     deadlines: List[Optional[str]]
 
 
+async def run_analysis(
+    request: AnalysisRequest,
+    types: List[str],
+    settings: Settings,
+    cache: ResultCache,
+    service: AnalysisService
+) -> Dict[str, dict]:
+    """
+    Run the analysis under one REQUEST_TIMEOUT deadline, so retries of a
+    slow chunk cannot outlive the request
+    """
+    with deadline(settings.request_timeout):
+        return await analyze_cached(request, types, settings, cache, service)
+
+
+def analysis_error(error: Exception, failure: str) -> HTTPException:
+    """
+    Map an analysis failure to its HTTP error: bad input is a 400, an open
+    circuit a 503 with Retry-After, a missed deadline a 504
+    """
+    if isinstance(error, ValueError):
+        return HTTPException(status_code=400, detail=str(error))
+    if isinstance(error, CircuitOpenError):
+        return HTTPException(
+            status_code=503,
+            detail=str(error),
+            headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))},
+        )
+    if isinstance(error, DeadlineExceeded):
+        return HTTPException(status_code=504, detail=str(error))
+    logger.error(f"{failure}: {str(error)}")
+    return HTTPException(status_code=500, detail=f"{failure}: {str(error)}")
+
+
+async def analyze_cached(
+    request: AnalysisRequest,
+    types: List[str],
+    settings: Settings,
+    cache: ResultCache,
+    service: AnalysisService
+) -> Dict[str, dict]:
+    """
+    Serve each analysis type from the cache and compute all misses
+    together in one fused pass over the transcript
+    """
+    if not settings.enable_result_caching:
+        return await service.analyze(request.text, types)
+    
+    keys = {
+        analysis_type: make_cache_key(
+            settings.cache_prefix,
+            request.text,
+            analysis_type,
+            service.model_for(analysis_type),
+            PROMPT_VERSION
+        )
+        for analysis_type in types
+    }
+    
+    if len(types) == 1:
+        # Single type: let concurrent identical requests share one computation
+        analysis_type = types[0]
+        
+        async def compute():
+            results = await service.analyze(request.text, types)
+            return results[analysis_type]
+        
+        return {analysis_type: await cache.get_or_compute(keys[analysis_type], compute)}
+    
+    results = {}
+    missing = []
+    for analysis_type in types:
+        cached = await cache.get(keys[analysis_type])
+        if cached is None:
+            missing.append(analysis_type)
+        else:
+            results[analysis_type] = cached
+    
+    if missing:
+        computed = await service.analyze(request.text, missing)
+        for analysis_type in missing:
+            await cache.set(keys[analysis_type], computed[analysis_type])
+            results[analysis_type] = computed[analysis_type]
+    
+    return {analysis_type: results[analysis_type] for analysis_type in types}
+
+
 @router.get("/health")
-async def analysis_health():
+async def analysis_health(cache: ResultCache = Depends(get_result_cache)):
     """Health check for analysis service"""
     return {
         "service": "analysis",
@@ -55,74 +157,74 @@ async def analysis_health():
             "/sentiment",
             "/action-items",
             "/summary"
-        ]
+        ],
+        "cache": cache.stats(),
+        "batching": batcher_stats()
     }
 
 
 @router.post("/analyze", response_model=AnalysisResponse)
 async def analyze_meeting(
     request: AnalysisRequest,
-    settings: Settings = Depends(get_settings)
+    settings: Settings = Depends(get_settings),
+    cache: ResultCache = Depends(get_result_cache),
+    service: AnalysisService = Depends(get_analysis_service)
 ):
     """
-    General analysis endpoint that routes to specific analysis types
+    Run one or more analysis types over a transcript in a single pass
+
+    Preprocessing and chunking are shared, and summary and action items
+    are answered by one combined model call per chunk.
     """
     try:
-        logger.info(f"Analyzing meeting: {request.meeting_id}, type: {request.analysis_type}")
+        types = list(dict.fromkeys(request.analysis_types or [request.analysis_type]))
+        logger.info(f"Analyzing meeting: {request.meeting_id}, types: {types}")
+        
+        results = await run_analysis(request, types, settings, cache, service)
         
-        # Placeholder implementation - will be implemented in later tasks
-        result = {
-            "message": "Analysis service initialized",
-            "text_length": len(request.text),
-            "analysis_type": request.analysis_type,
-            "status": "placeholder"
-        }
+        if len(types) == 1:
+            result = results[types[0]]
+        else:
+            result = results
         
+        sentiment = results.get(SENTIMENT)
         return AnalysisResponse(
             meeting_id=request.meeting_id,
-            analysis_type=request.analysis_type,
+            analysis_type=",".join(types),
             result=result,
-            confidence_score=0.95
+            confidence_score=sentiment["confidence_score"] if sentiment else None
         )
         
     except Exception as e:
-        logger.error(f"Analysis failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+        raise analysis_error(e, "Analysis failed")
 
 
 @router.post("/sentiment", response_model=SentimentAnalysisResponse)
 async def analyze_sentiment(
     request: AnalysisRequest,
-    settings: Settings = Depends(get_settings)
+    settings: Settings = Depends(get_settings),
+    cache: ResultCache = Depends(get_result_cache),
+    service: AnalysisService = Depends(get_analysis_service)
 ):
     """
-    Analyze sentiment of meeting transcript
+    Analyze sentiment of meeting transcript, segment by segment
     """
     try:
         logger.info(f"Analyzing sentiment for meeting: {request.meeting_id}")
         
-        # Placeholder implementation - will be implemented in later tasks
-        return SentimentAnalysisResponse(
-            overall_sentiment="positive",
-            sentiment_score=0.75,
-            emotions={
-                "joy": 0.4,
-                "trust": 0.35,
-                "anticipation": 0.2,
-                "surprise": 0.05
-            },
-            confidence_score=0.88
-        )
+        results = await run_analysis(request, [SENTIMENT], settings, cache, service)
+        return SentimentAnalysisResponse(**results[SENTIMENT])
         
     except Exception as e:
-        logger.error(f"Sentiment analysis failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Sentiment analysis failed: {str(e)}")
+        raise analysis_error(e, "Sentiment analysis failed")
 
 
 @router.post("/action-items", response_model=ActionItemsResponse)
 async def extract_action_items(
     request: AnalysisRequest,
-    settings: Settings = Depends(get_settings)
+    settings: Settings = Depends(get_settings),
+    cache: ResultCache = Depends(get_result_cache),
+    service: AnalysisService = Depends(get_analysis_service)
 ):
     """
     Extract action items from meeting transcript
@@ -130,35 +232,19 @@ async def extract_action_items(
     try:
         logger.info(f"Extracting action items for meeting: {request.meeting_id}")
         
-        # Placeholder implementation - will be implemented in later tasks
-        return ActionItemsResponse(
-            action_items=[
-                {
-                    "id": 1,
-                    "description": "Follow up on project timeline",
-                    "priority": "high",
-                    "category": "project_management"
-                },
-                {
-                    "id": 2,
-                    "description": "Schedule next team meeting",
-                    "priority": "medium",
-                    "category": "scheduling"
-                }
-            ],
-            assignees=["john.doe", "jane.smith"],
-            deadlines=["2024-01-15", None]
-        )
+        results = await run_analysis(request, [ACTION_ITEMS], settings, cache, service)
+        return ActionItemsResponse(**results[ACTION_ITEMS])
         
     except Exception as e:
-        logger.error(f"Action items extraction failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Action items extraction failed: {str(e)}")
+        raise analysis_error(e, "Action items extraction failed")
 
 
 @router.post("/summary")
 async def generate_summary(
     request: AnalysisRequest,
-    settings: Settings = Depends(get_settings)
+    settings: Settings = Depends(get_settings),
+    cache: ResultCache = Depends(get_result_cache),
+    service: AnalysisService = Depends(get_analysis_service)
 ):
     """
     Generate meeting summary
@@ -166,20 +252,9 @@ async def generate_summary(
     try:
         logger.info(f"Generating summary for meeting: {request.meeting_id}")
         
-        # Placeholder implementation - will be implemented in later tasks
-        return {
-            "meeting_id": request.meeting_id,
-            "summary": "This is a placeholder summary. The meeting covered project updates and next steps.",
-            "key_points": [
-                "Project is on track",
-                "Next milestone due in 2 weeks",
-                "Team needs additional resources"
-            ],
-            "participants_mentioned": ["john.doe", "jane.smith"],
-            "duration_analyzed": "45 minutes",
-            "confidence_score": 0.92
-        }
+        results = await run_analysis(request, [SUMMARY], settings, cache, service)
+        # meeting_id is not part of the cache key, so attach it per request
+        return {"meeting_id": request.meeting_id, **results[SUMMARY]}
         
     except Exception as e:
-        logger.error(f"Summary generation failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Summary generation failed: {str(e)}")
\ No newline at end of file
+        raise analysis_error(e, "Summary generation failed")
@@ -2,12 +2,30 @@
 Transcription router for audio processing and speech-to-text
 """
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
+from fastapi import (
+    APIRouter, HTTPException, Depends, Header, Request, WebSocket,
+    WebSocketDisconnect
+)
 from pydantic import BaseModel
 from typing import Optional, List
+import json
 import logging
+import os
 
+from app.services.job_queue import Job, JobQueue, get_job_queue
+from app.services.offload import run_cpu
+from app.services.streaming import StreamingSession, streaming_stats
+from app.services.transcription_engine import (
+    TranscriptionEngine, get_transcription_engine
+)
+from app.services.transcription_jobs import TRANSCRIPTION_JOB
+from app.utils.audio import decode_audio_file
 from app.utils.config import get_settings, Settings
+from app.utils.upload import (
+    MULTIPART_OVERHEAD_BYTES, AudioSpool, AudioUploadError, AudioUrlRejected,
+    check_audio_url, ingest_multipart
+)
+from app.utils.vad import SpeechIndex, VoiceActivityDetector
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +48,7 @@ class TranscriptionResponse(BaseModel):
     language: str
     duration: Optional[float] = None
     segments: Optional[List[dict]] = None
+    speakers: Optional[List[str]] = None
 
 
 class TranscriptionStatus(BaseModel):
@@ -38,10 +57,32 @@ class TranscriptionStatus(BaseModel):
     status: str  # pending, processing, completed, failed
     progress: Optional[float] = None
     estimated_completion: Optional[str] = None
+    result: Optional[TranscriptionResponse] = None
+    error: Optional[str] = None
+
+
+class SpeechRegionsResponse(BaseModel):
+    """Response model for detected speech regions"""
+    duration: float
+    speech_seconds: float
+    speech_ratio: float
+    regions: List[dict]
+
+
+def job_status(job: Job) -> TranscriptionStatus:
+    """Build the public status view of a queued transcription job"""
+    return TranscriptionStatus(
+        job_id=job.id,
+        status=job.status,
+        progress=job.progress,
+        estimated_completion=job.estimated_completion,
+        result=TranscriptionResponse(**job.result) if job.result else None,
+        error=job.error
+    )
 
 
 @router.get("/health")
-async def transcription_health():
+async def transcription_health(settings: Settings = Depends(get_settings)):
     """Health check for transcription service"""
     return {
         "service": "transcription",
@@ -49,132 +90,310 @@ async def transcription_health():
         "available_endpoints": [
             "/transcribe",
             "/transcribe-file",
-            "/status/{job_id}"
+            "/speech-regions",
+            "/status/{job_id}",
+            "/stream (WebSocket)"
         ],
-        "supported_formats": ["mp3", "wav", "m4a", "webm"]
+        "supported_formats": settings.supported_audio_formats_list,
+        "streaming": streaming_stats()
     }
 
 
-@router.post("/transcribe", response_model=TranscriptionResponse)
+@router.post("/transcribe", response_model=TranscriptionStatus, status_code=202)
 async def transcribe_audio(
     request: TranscriptionRequest,
-    settings: Settings = Depends(get_settings)
+    idempotency_key: Optional[str] = Header(None),
+    settings: Settings = Depends(get_settings),
+    queue: JobQueue = Depends(get_job_queue)
 ):
     """
-    Transcribe audio from URL or file
+    Queue transcription of audio from a URL and return the job id
     """
     try:
         logger.info(f"Transcribing audio for meeting: {request.meeting_id}")
         
         if not request.audio_url:
             raise HTTPException(status_code=400, detail="Audio URL is required")
+        await check_audio_url(
+            request.audio_url, settings.audio_url_allowed_hosts_list
+        )
         
-        # Placeholder implementation - will be implemented in later tasks
-        return TranscriptionResponse(
-            meeting_id=request.meeting_id,
-            transcript="This is a placeholder transcript. The actual transcription will be implemented using OpenAI Whisper.",
-            confidence_score=0.95,
-            language=request.language,
-            duration=1800.0,  # 30 minutes
-            segments=[
-                {
-                    "id": 0,
-                    "start": 0.0,
-                    "end": 5.0,
-                    "text": "Welcome everyone to today's meeting.",
-                    "confidence": 0.98
-                },
-                {
-                    "id": 1,
-                    "start": 5.0,
-                    "end": 12.0,
-                    "text": "Let's start by reviewing the agenda.",
-                    "confidence": 0.96
-                }
-            ]
+        job = await queue.submit(
+            TRANSCRIPTION_JOB,
+            {
+                "audio_url": request.audio_url,
+                "meeting_id": request.meeting_id,
+                "language": request.language
+            },
+            idempotency_key=idempotency_key
         )
+        return job_status(job)
         
+    except AudioUrlRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Transcription failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
 
 
-@router.post("/transcribe-file", response_model=TranscriptionResponse)
+# The body is parsed by hand, so describe it for the OpenAPI docs
+UPLOAD_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "multipart/form-data": {
+            "schema": {
+                "type": "object",
+                "required": ["file"],
+                "properties": {
+                    "file": {"type": "string", "format": "binary"},
+                    "meeting_id": {"type": "string"},
+                    "language": {"type": "string"}
+                }
+            }
+        }
+    }
+}
+
+
+@router.post(
+    "/transcribe-file",
+    response_model=TranscriptionStatus,
+    status_code=202,
+    openapi_extra={"requestBody": UPLOAD_REQUEST_BODY}
+)
 async def transcribe_file(
-    file: UploadFile = File(...),
+    request: Request,
     meeting_id: Optional[str] = None,
-    language: str = "en",
-    settings: Settings = Depends(get_settings)
+    language: Optional[str] = None,
+    idempotency_key: Optional[str] = Header(None),
+    settings: Settings = Depends(get_settings),
+    queue: JobQueue = Depends(get_job_queue)
 ):
     """
-    Transcribe uploaded audio file
+    Queue transcription of an uploaded audio file and return the job id
+
+    The multipart body is streamed straight into the job spool as it
+    arrives. The size limit and the container type (sniffed from the file's
+    magic bytes, not its declared content type) are enforced while reading,
+    so a bad upload is rejected without buffering it.
     """
     try:
-        logger.info(f"Transcribing uploaded file: {file.filename}")
-        
-        # Validate file type
-        allowed_types = ["audio/mpeg", "audio/wav", "audio/mp4", "audio/webm"]
-        if file.content_type not in allowed_types:
+        content_length = int(request.headers.get("content-length") or 0)
+        if content_length > settings.max_audio_size_bytes + MULTIPART_OVERHEAD_BYTES:
             raise HTTPException(
-                status_code=400, 
-                detail=f"Unsupported file type: {file.content_type}"
+                status_code=413,
+                detail=f"File size exceeds {settings.max_audio_size} limit"
             )
         
-        # Validate file size (max 25MB for OpenAI Whisper)
-        max_size = 25 * 1024 * 1024  # 25MB
-        if file.size and file.size > max_size:
-            raise HTTPException(
-                status_code=400,
-                detail="File size exceeds 25MB limit"
-            )
+        spool = AudioSpool(
+            settings.job_spool_dir,
+            settings.max_audio_size_bytes,
+            settings.supported_audio_formats_list
+        )
+        upload = await ingest_multipart(
+            request.headers.get("content-type", ""), request.stream(), spool
+        )
+        logger.info(
+            f"Transcribing uploaded file: {upload.filename} "
+            f"({upload.format}, {upload.size} bytes)"
+        )
         
-        # Placeholder implementation - will be implemented in later tasks
-        return TranscriptionResponse(
-            meeting_id=meeting_id,
-            transcript=f"This is a placeholder transcript for file: {file.filename}. The actual transcription will be implemented using OpenAI Whisper.",
-            confidence_score=0.93,
-            language=language,
-            duration=1200.0,  # 20 minutes
-            segments=[
+        try:
+            job = await queue.submit(
+                TRANSCRIPTION_JOB,
                 {
-                    "id": 0,
-                    "start": 0.0,
-                    "end": 8.0,
-                    "text": f"Transcription of {file.filename} would appear here.",
-                    "confidence": 0.95
-                }
-            ]
-        )
+                    "audio_path": upload.path,
+                    "meeting_id": meeting_id or upload.fields.get("meeting_id"),
+                    "language": language or upload.fields.get("language") or "en"
+                },
+                idempotency_key=idempotency_key
+            )
+        except BaseException:
+            os.unlink(upload.path)
+            raise
+        # A retried submission gets the first job, which has its own spool file
+        if job.payload.get("audio_path") != upload.path:
+            os.unlink(upload.path)
+        return job_status(job)
         
+    except AudioUploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"File transcription failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"File transcription failed: {str(e)}")
 
 
+def detect_speech(path: str, settings: Settings) -> SpeechIndex:
+    """Decode a spooled upload and index where speech is"""
+    samples, sample_rate = decode_audio_file(path, settings.audio_sample_rate)
+    detector = VoiceActivityDetector(
+        sample_rate,
+        frame_length=settings.audio_chunk_size,
+        floor_db=settings.audio_silence_threshold_db
+    )
+    return detector.detect(samples)
+
+
+@router.post(
+    "/speech-regions",
+    response_model=SpeechRegionsResponse,
+    openapi_extra={"requestBody": UPLOAD_REQUEST_BODY}
+)
+async def speech_regions(
+    request: Request,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Detect where speech is in an uploaded audio file
+
+    Returns the speech intervals (seconds) of the whole recording, or only
+    those overlapping [start, end) when a range is given; speech_ratio is
+    the share of that range that is speech.
+    """
+    try:
+        if start is not None and end is not None and end <= start:
+            raise HTTPException(status_code=400, detail="end must be after start")
+        
+        content_length = int(request.headers.get("content-length") or 0)
+        if content_length > settings.max_audio_size_bytes + MULTIPART_OVERHEAD_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File size exceeds {settings.max_audio_size} limit"
+            )
+        
+        spool = AudioSpool(
+            settings.job_spool_dir,
+            settings.max_audio_size_bytes,
+            settings.supported_audio_formats_list
+        )
+        upload = await ingest_multipart(
+            request.headers.get("content-type", ""), request.stream(), spool
+        )
+        try:
+            index = await run_cpu(detect_speech, upload.path, settings)
+        finally:
+            os.unlink(upload.path)
+        
+        window_start = start if start is not None else 0.0
+        window_end = min(end if end is not None else index.duration,
+                         index.duration)
+        if window_start > 0 or window_end < index.duration:
+            index = index.between(window_start, window_end)
+        window = max(window_end - window_start, 0.0)
+        return SpeechRegionsResponse(
+            duration=index.duration,
+            speech_seconds=round(index.speech_seconds, 3),
+            speech_ratio=round(index.speech_seconds / window, 4) if window else 0.0,
+            regions=index.to_list()
+        )
+        
+    except AudioUploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Speech detection failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Speech detection failed: {str(e)}")
+
+
 @router.get("/status/{job_id}", response_model=TranscriptionStatus)
 async def get_transcription_status(
     job_id: str,
-    settings: Settings = Depends(get_settings)
+    queue: JobQueue = Depends(get_job_queue)
 ):
     """
-    Get transcription job status
+    Get transcription job status, including the result once completed
     """
     try:
         logger.info(f"Getting status for transcription job: {job_id}")
         
-        # Placeholder implementation - will be implemented in later tasks
-        return TranscriptionStatus(
-            job_id=job_id,
-            status="completed",
-            progress=100.0,
-            estimated_completion=None
-        )
+        job = await queue.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+        
+        return job_status(job)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Status check failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Status check failed: {str(e)}")
 
 
+@router.websocket("/stream")
+async def stream_transcription(
+    websocket: WebSocket,
+    language: str = "en",
+    meeting_id: Optional[str] = None,
+    encoding: str = "pcm16",
+    settings: Settings = Depends(get_settings),
+    engine: TranscriptionEngine = Depends(get_transcription_engine)
+):
+    """
+    Transcribe live audio and push partial and final segments as they are ready
+
+    The client sends binary messages of mono 16-bit little-endian PCM at
+    the configured sample rate and a text message {"type": "end"} when the
+    meeting is over. The server replies with "ready", then "partial" and
+    "final" messages per utterance, and "done" with session statistics.
+    """
+    await websocket.accept()
+    if encoding != "pcm16":
+        await websocket.send_json({
+            "type": "error",
+            "detail": f"Unsupported stream encoding: {encoding}"
+        })
+        await websocket.close(code=1003)
+        return
+    
+    logger.info(f"Streaming transcription started for meeting: {meeting_id}")
+    session = StreamingSession(
+        engine.backend,
+        websocket.send_json,
+        sample_rate=settings.audio_sample_rate,
+        language=language,
+        settings=settings
+    )
+    session.start()
+    await websocket.send_json({
+        "type": "ready",
+        "sample_rate": settings.audio_sample_rate,
+        "encoding": encoding
+    })
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                logger.info(f"Stream client disconnected: {meeting_id}")
+                return
+            if message.get("bytes"):
+                await session.feed(message["bytes"])
+            elif message.get("text"):
+                control = json.loads(message["text"])
+                if control.get("type") == "end":
+                    break
+        
+        await session.finish()
+        await websocket.send_json({"type": "done", "stats": session.stats()})
+        await websocket.close()
+        logger.info(f"Streaming transcription finished: {session.stats()}")
+        
+    except WebSocketDisconnect:
+        logger.info(f"Stream client disconnected: {meeting_id}")
+    except Exception as e:
+        logger.error(f"Streaming transcription failed: {str(e)}")
+        await websocket.close(code=1011)
+    finally:
+        await session.close()
+
+
 @router.get("/models")
 async def get_available_models(settings: Settings = Depends(get_settings)):
     """
@@ -187,7 +406,7 @@ async def get_available_models(settings: Settings = Depends(get_settings)):
                 "name": "Whisper v1",
                 "description": "OpenAI Whisper model for speech recognition",
                 "languages": ["en", "es", "fr", "de", "it", "pt", "ru", "ja", "ko", "zh"],
-                "max_file_size": "25MB"
+                "max_file_size": settings.max_audio_size
             }
         ],
         "default_model": "whisper-1"
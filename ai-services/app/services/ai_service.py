@@ -4,20 +4,17 @@ Base AI service class for common functionality
 
 import logging
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
-import asyncio
+from typing import Any, Dict, List, Optional
 import time
 
+from app.services.batching import BatchFunction, get_batcher
+from app.services.errors import AIServiceError  # noqa: F401
+from app.services.retry import deadline, get_upstream
 from app.utils.config import get_settings
 
 logger = logging.getLogger(__name__)
 
 
-class AIServiceError(Exception):
-    """Custom exception for AI service errors"""
-    pass
-
-
 class BaseAIService(ABC):
     """Base class for AI services"""
     
@@ -26,38 +23,49 @@ class BaseAIService(ABC):
         self.logger = logging.getLogger(self.__class__.__name__)
     
     async def process_with_retry(
-        self, 
-        func, 
-        *args, 
-        max_retries: int = 3, 
+        self,
+        func,
+        *args,
+        max_retries: int = 3,
         delay: float = 1.0,
+        upstream: Optional[str] = None,
         **kwargs
     ) -> Any:
         """
-        Process function with retry logic
+        Call func through the upstream's retry engine: transient failures
+        are retried with full-jitter backoff within the upstream's retry
+        budget and circuit breaker, and no attempt runs past the caller's
+        deadline (REQUEST_TIMEOUT when the caller has not set one)
         """
-        last_exception = None
-        
-        for attempt in range(max_retries):
-            try:
-                start_time = time.time()
-                result = await func(*args, **kwargs)
-                processing_time = time.time() - start_time
-                
-                self.logger.info(f"Processing completed in {processing_time:.2f}s")
-                return result
-                
-            except Exception as e:
-                last_exception = e
-                self.logger.warning(
-                    f"Attempt {attempt + 1}/{max_retries} failed: {str(e)}"
-                )
-                
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(delay * (2 ** attempt))  # Exponential backoff
-        
-        self.logger.error(f"All {max_retries} attempts failed")
-        raise AIServiceError(f"Service failed after {max_retries} attempts: {str(last_exception)}")
+        target = get_upstream(upstream or self.__class__.__name__)
+        start_time = time.time()
+        with deadline(self.settings.request_timeout):
+            result = await target.call(
+                func,
+                *args,
+                max_attempts=max_retries,
+                base_delay=delay,
+                max_delay=self.settings.retry_max_delay,
+                **kwargs
+            )
+        processing_time = time.time() - start_time
+        self.logger.info(f"Processing completed in {processing_time:.2f}s")
+        return result
+    
+    async def run_batched(
+        self,
+        model: str,
+        items: List[Any],
+        run_batch: BatchFunction,
+        default_batch_size: Optional[int] = None
+    ) -> List[Any]:
+        """
+        Run items through the model's shared micro-batcher, so concurrent
+        requests are coalesced into one batched call
+        """
+        max_size, max_wait_ms = self.settings.batch_limits(model, default_batch_size)
+        batcher = get_batcher(model, run_batch, max_size, max_wait_ms)
+        return await batcher.submit(items)
     
     @abstractmethod
     async def process(self, *args, **kwargs) -> Any:
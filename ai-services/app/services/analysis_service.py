@@ -0,0 +1,300 @@
+"""
+Fused transcript analysis: summary, sentiment and action items in one pass
+"""
+
+import asyncio
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.ai_service import BaseAIService
+from app.services.cache import ResultCache, get_result_cache, make_cache_key
+from app.services.llm_backend import KEYS_MARKER, LLMBackend, get_llm_backend
+from app.services.sentiment_service import (
+    SentimentService,
+    get_sentiment_service,
+)
+from app.utils.text import (
+    TOKENS_PER_WORD,
+    chunk_sentences,
+    estimate_tokens,
+    split_sentences,
+)
+
+SUMMARY = "summary"
+SENTIMENT = "sentiment"
+ACTION_ITEMS = "action_items"
+ANALYSIS_TYPES = (SUMMARY, SENTIMENT, ACTION_ITEMS)
+LLM_TYPES = (SUMMARY, ACTION_ITEMS)
+
+# Bump when prompts or result shapes change so stale cache entries miss
+PROMPT_VERSION = "v3"
+
+SYSTEM_PROMPT = (
+    "You analyze business meeting transcripts. "
+    "Answer only with a single JSON object."
+)
+
+INSTRUCTIONS = {
+    SUMMARY: (
+        '"summary": a concise summary of the discussion; "key_points": a '
+        'list of the main points; "participants_mentioned": a list of the '
+        'people named'
+    ),
+    ACTION_ITEMS: (
+        '"action_items": a list of objects with "description", "assignee", '
+        '"deadline" (ISO date or null) and "priority" (high, medium or low) '
+        'for every task agreed in the meeting'
+    ),
+}
+
+REDUCE_INSTRUCTION = (
+    '"summary": one summary of the whole meeting, between {min_words} and '
+    '{max_words} words, combining the partial summaries below'
+)
+
+RESULT_KEYS = {
+    SUMMARY: ["summary", "key_points", "participants_mentioned"],
+    ACTION_ITEMS: ["action_items"],
+}
+
+
+@dataclass
+class PreparedTranscript:
+    """Transcript split once and shared by every analysis type"""
+    text: str
+    sentences: List[str]
+    chunks: List[str]
+
+
+class AnalysisService(BaseAIService):
+    """
+    Runs any combination of analysis types over one transcript. The text is
+    segmented and chunked once, and every LLM-backed type is answered by a
+    single combined prompt per chunk.
+    """
+
+    def __init__(
+        self,
+        llm: Optional[LLMBackend] = None,
+        sentiment: Optional[SentimentService] = None,
+        cache: Optional[ResultCache] = None,
+    ):
+        super().__init__()
+        self.llm = llm or get_llm_backend()
+        self.sentiment = sentiment or get_sentiment_service()
+        if cache is None and self.settings.enable_result_caching:
+            cache = get_result_cache()
+        self.cache = cache
+        self.chunk_tokens = self.settings.analysis_chunk_tokens
+
+    def model_for(self, analysis_type: str) -> str:
+        """Model whose output an analysis type depends on"""
+        if analysis_type == SENTIMENT:
+            return self.sentiment.model_name
+        return self.settings.openai_model
+
+    def prepare(self, text: str) -> PreparedTranscript:
+        sentences = split_sentences(text)
+        return PreparedTranscript(
+            text=text,
+            sentences=sentences,
+            chunks=chunk_sentences(sentences, self.chunk_tokens),
+        )
+
+    def build_prompt(self, chunk: str, types: List[str]) -> str:
+        keys = [key for t in types for key in RESULT_KEYS[t]]
+        instructions = "\n".join(f"- {INSTRUCTIONS[t]}" for t in types)
+        return (
+            f"Analyze this meeting transcript excerpt.\n{instructions}\n\n"
+            f"Transcript:\n{chunk}\n\n{KEYS_MARKER} {', '.join(keys)}"
+        )
+
+    def build_reduce_prompt(self, summaries: str) -> str:
+        instruction = REDUCE_INSTRUCTION.format(
+            min_words=int(self.settings.summary_min_length / TOKENS_PER_WORD),
+            max_words=int(self.settings.summary_max_length / TOKENS_PER_WORD),
+        )
+        return (
+            f"Merge these partial meeting summaries.\n- {instruction}\n\n"
+            f"Transcript:\n{summaries}\n\n{KEYS_MARKER} summary"
+        )
+
+    async def process(self, text: str, types: List[str]) -> Dict[str, Any]:
+        return await self.analyze(text, types)
+
+    async def analyze(
+        self, text: str, types: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Return {analysis_type: result} for each requested type"""
+        self.validate_input(text, min_length=1)
+        unknown = set(types) - set(ANALYSIS_TYPES)
+        if unknown:
+            raise ValueError(
+                f"Unsupported analysis types: {', '.join(sorted(unknown))}"
+            )
+
+        prepared = self.prepare(text)
+        llm_types = [t for t in LLM_TYPES if t in types]
+
+        work = []
+        if llm_types:
+            work.append(self._run_llm(prepared, llm_types))
+        if SENTIMENT in types:
+            work.append(self.sentiment.analyze_segments(prepared.sentences))
+        outputs = await asyncio.gather(*work)
+
+        results: Dict[str, Dict[str, Any]] = {}
+        if llm_types:
+            partials = outputs[0]
+            if SUMMARY in llm_types:
+                results[SUMMARY] = await self.merge_summaries(partials)
+            if ACTION_ITEMS in llm_types:
+                results[ACTION_ITEMS] = self.merge_action_items(partials)
+        if SENTIMENT in types:
+            results[SENTIMENT] = outputs[-1]
+        return results
+
+    async def _complete(
+        self, prompt: str, max_tokens: int
+    ) -> Dict[str, Any]:
+        """
+        One chat completion, cached by prompt so a retried request only
+        repeats the chunks that did not complete
+        """
+        async def compute() -> Dict[str, Any]:
+            return await self.process_with_retry(
+                self.llm.complete_json,
+                SYSTEM_PROMPT,
+                prompt,
+                max_tokens,
+                max_retries=self.settings.openai_max_retries,
+                delay=self.settings.openai_retry_delay,
+                upstream=self.llm.name,
+            )
+
+        if self.cache is None:
+            return await compute()
+        key = make_cache_key(
+            self.settings.cache_prefix,
+            f"{max_tokens}\0{prompt}",
+            "partial",
+            self.settings.openai_model,
+            PROMPT_VERSION,
+        )
+        return await self.cache.get_or_compute(key, compute)
+
+    async def _complete_all(
+        self, prompts: List[str], max_tokens: int
+    ) -> List[Dict[str, Any]]:
+        """Run prompts concurrently, letting every one finish before raising"""
+        semaphore = asyncio.Semaphore(self.settings.max_concurrent_requests)
+
+        async def run(prompt: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._complete(prompt, max_tokens)
+
+        outputs = await asyncio.gather(
+            *(run(p) for p in prompts), return_exceptions=True
+        )
+        failures = [o for o in outputs if isinstance(o, BaseException)]
+        if failures:
+            self.logger.error(
+                f"{len(failures)}/{len(prompts)} completions failed"
+            )
+            raise failures[0]
+        return outputs
+
+    async def _run_llm(
+        self, prepared: PreparedTranscript, types: List[str]
+    ) -> List[Dict[str, Any]]:
+        self.logger.info(
+            f"Running {', '.join(types)} over {len(prepared.chunks)} chunks"
+        )
+        return await self._complete_all(
+            [self.build_prompt(c, types) for c in prepared.chunks],
+            self.settings.openai_max_tokens,
+        )
+
+    async def reduce_summaries(self, summaries: List[str]) -> Tuple[str, int]:
+        """
+        Merge partial summaries level by level until one summary fits
+        summary_max_length. Each level packs summaries into groups that fit
+        the chunk budget and merges the groups concurrently, so latency grows
+        with the number of levels rather than the number of chunks.
+        """
+        limit = self.settings.summary_max_length
+        levels = 0
+        while len(summaries) > 1 or estimate_tokens(summaries[0]) > limit:
+            groups = chunk_sentences(summaries, self.chunk_tokens)
+            if len(summaries) > 1 and len(groups) >= len(summaries):
+                # Summaries too long to pack; merge in pairs to guarantee
+                # progress
+                groups = [" ".join(summaries[i:i + 2])
+                          for i in range(0, len(summaries), 2)]
+            outputs = await self._complete_all(
+                [self.build_reduce_prompt(g) for g in groups], limit
+            )
+            summaries = [str(o.get("summary", "")).strip() for o in outputs]
+            levels += 1
+            if len(groups) == 1:
+                break
+
+        words = summaries[0].split()
+        max_words = int(limit / TOKENS_PER_WORD)
+        if len(words) > max_words:
+            # Final merge overshot the budget; cut on a word boundary
+            return " ".join(words[:max_words]), levels
+        return summaries[0], levels
+
+    async def merge_summaries(
+        self, partials: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        participants = set()
+        key_points: List[str] = []
+        for partial in partials:
+            participants.update(partial.get("participants_mentioned") or [])
+            key_points.extend(partial.get("key_points") or [])
+
+        summaries = [str(p["summary"]).strip() for p in partials
+                     if p.get("summary")]
+        summary, levels = await self.reduce_summaries(summaries) \
+            if summaries else ("", 0)
+        return {
+            "summary": summary,
+            "key_points": key_points,
+            "participants_mentioned": sorted(participants),
+            "chunks_analyzed": len(partials),
+            "reduce_levels": levels,
+        }
+
+    def merge_action_items(
+        self, partials: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        items: List[Dict[str, Any]] = []
+        seen = set()
+        for partial in partials:
+            for item in partial.get("action_items") or []:
+                description = str(item.get("description", "")).strip()
+                if not description or description.lower() in seen:
+                    continue
+                seen.add(description.lower())
+                items.append({
+                    "id": len(items) + 1,
+                    "description": description,
+                    "assignee": item.get("assignee"),
+                    "deadline": item.get("deadline"),
+                    "priority": item.get("priority", "medium"),
+                })
+        return {
+            "action_items": items,
+            "assignees": sorted({i["assignee"] for i in items
+                                 if i["assignee"]}),
+            "deadlines": [i["deadline"] for i in items],
+        }
+
+
+@lru_cache()
+def get_analysis_service() -> AnalysisService:
+    """Get the shared analysis service"""
+    return AnalysisService()
@@ -0,0 +1,165 @@
+"""
+Dynamic cross-request micro-batching for model-backed services
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+BatchFunction = Callable[[List[Any]], Awaitable[List[Any]]]
+
+
+class MicroBatcher:
+    """
+    Collects items submitted by concurrent callers and runs them through
+    one batched call once max_batch_size items are waiting or the oldest
+    has waited max_wait_ms, then scatters results back to each caller.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run_batch: BatchFunction,
+        max_batch_size: int,
+        max_wait_ms: float,
+    ):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._pending: Deque[Tuple[Any, asyncio.Future, float]] = deque()
+        self._ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.batch_sizes = Histogram()
+        self.queue_depths = Histogram()
+        self.batches = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._ready = asyncio.Event()
+            self._pending.clear()
+            self._task = loop.create_task(
+                self._dispatch(), name=f"batcher-{self.name}"
+            )
+
+    async def submit(self, items: List[Any]) -> List[Any]:
+        """Queue items for batching and wait for their results"""
+        if not items:
+            return []
+        self._ensure_running()
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        futures = []
+        for item in items:
+            future = loop.create_future()
+            self._pending.append((item, future, now))
+            futures.append(future)
+        self._ready.set()
+        return list(await asyncio.gather(*futures))
+
+    async def _dispatch(self) -> None:
+        while True:
+            await self._ready.wait()
+            if not self._pending:
+                self._ready.clear()
+                continue
+
+            # Linger for more work unless the batch is already full
+            deadline = self._pending[0][2] + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._ready.clear()
+                try:
+                    await asyncio.wait_for(self._ready.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            self.queue_depths.observe(len(self._pending))
+            size = min(len(self._pending), self.max_batch_size)
+            batch = [self._pending.popleft() for _ in range(size)]
+            if not self._pending:
+                self._ready.clear()
+            await self._run(batch)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future, float]]):
+        live = [(item, future) for item, future, _ in batch
+                if not future.done()]
+        if not live:
+            return
+        self.batches += 1
+        self.batch_sizes.observe(len(live))
+        try:
+            results = await self.run_batch([item for item, _ in live])
+            if len(results) != len(live):
+                raise ValueError(
+                    f"Batch function returned {len(results)} results "
+                    f"for {len(live)} items"
+                )
+        except Exception as e:
+            logger.error(f"Batch {self.name} failed: {str(e)}")
+            for _, future in live:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(live, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_depth": self.queue_depth,
+            "batches": self.batches,
+            "mean_batch_size": round(self.batch_sizes.mean, 2),
+            "batch_size_histogram": self.batch_sizes.snapshot(),
+            "queue_depth_histogram": self.queue_depths.snapshot(),
+        }
+
+
+_batchers: Dict[str, MicroBatcher] = {}
+
+
+def get_batcher(
+    name: str,
+    run_batch: BatchFunction,
+    max_batch_size: int,
+    max_wait_ms: float,
+) -> MicroBatcher:
+    """Get the process-wide batcher for a model, creating it on first use"""
+    batcher = _batchers.get(name)
+    if batcher is None:
+        batcher = MicroBatcher(name, run_batch, max_batch_size, max_wait_ms)
+        _batchers[name] = batcher
+    return batcher
+
+
+def batcher_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: batcher.stats() for name, batcher in _batchers.items()}
+
+
+async def close_batchers() -> None:
+    for batcher in _batchers.values():
+        await batcher.close()
+    _batchers.clear()
@@ -0,0 +1,181 @@
+"""
+Two-tier result cache: bounded in-process LRU in front of optional Redis
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from functools import lru_cache, partial
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.utils.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(
+    prefix: str,
+    text: str,
+    analysis_type: str,
+    model: str,
+    prompt_version: str,
+) -> str:
+    """Content-addressed key for an analysis result"""
+    digest = hashlib.sha256()
+    for part in (analysis_type, model, prompt_version, text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return f"{prefix}analysis:{analysis_type}:{digest.hexdigest()}"
+
+
+class ResultCache:
+    """
+    LRU cache with TTL eviction, optionally backed by a shared Redis tier.
+
+    The local tier answers without any I/O; the remote tier is consulted on
+    a local miss and refills the local tier. Redis errors are logged and
+    treated as misses so a cache outage never fails a request.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: int,
+        redis: Optional[Any] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis = redis
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.remote_errors = 0
+
+    def get_local(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set_local(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.get_local(key)
+        if value is not None:
+            self.local_hits += 1
+            return value
+
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(key)
+            except Exception as e:
+                self.remote_errors += 1
+                logger.warning(f"Redis cache read failed: {str(e)}")
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self.set_local(key, value)
+                self.remote_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        self.set_local(key, value)
+        if self.redis is not None:
+            try:
+                await self.redis.set(key, json.dumps(value), ex=self.ttl)
+            except Exception as e:
+                self.remote_errors += 1
+                logger.warning(f"Redis cache write failed: {str(e)}")
+
+    async def get_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Return the cached value or compute and store it. Concurrent callers
+        for the same key share a single computation, which runs as its own
+        task: a caller that is cancelled stops waiting without failing the
+        others.
+        """
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(partial(self._computed, key))
+        return await asyncio.shield(task)
+
+    async def _compute(
+        self, key: str, compute: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        value = await compute()
+        await self.set(key, value)
+        return value
+
+    def _computed(self, key: str, task: asyncio.Future) -> None:
+        del self._inflight[key]
+        # Mark retrieved so a failure nobody waited for is not logged
+        if not task.cancelled():
+            task.exception()
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.local_hits + self.remote_hits + self.misses
+        hits = self.local_hits + self.remote_hits
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "local_hits": self.local_hits,
+            "remote_hits": self.remote_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "remote_errors": self.remote_errors,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "remote_enabled": self.redis is not None,
+        }
+
+
+def _connect_redis(url: str) -> Optional[Any]:
+    try:
+        import redis.asyncio as aioredis
+    except ImportError:
+        logger.warning("redis package not installed; using local cache only")
+        return None
+    return aioredis.from_url(url)
+
+
+@lru_cache()
+def get_result_cache() -> ResultCache:
+    """Get the process-wide analysis result cache"""
+    settings = get_settings()
+    redis = _connect_redis(settings.redis_url) if settings.redis_url \
+        else None
+    return ResultCache(
+        max_entries=settings.cache_max_entries,
+        ttl=settings.cache_ttl,
+        redis=redis,
+    )
@@ -0,0 +1,299 @@
+"""
+Speaker diarization on CPU: labels transcript segments with who spoke
+"""
+
+import asyncio
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.ai_service import BaseAIService
+from app.services.offload import run_cpu
+from app.utils.config import Settings
+from app.utils.metrics import time_stage
+from app.utils.vad import SpeechIndex, VoiceActivityDetector
+
+# MFCC analysis frames: 32ms every 10ms at 16kHz
+N_FFT = 512
+HOP_LENGTH = 160
+N_MELS = 40
+N_MFCC = 20
+# Sinusoidal liftering evens out the cepstral coefficients so speaker
+# differences in the higher ones are not swamped by c1 and c2
+LIFTER = 22
+# Speech shorter than this is too little to tell speakers apart
+MIN_WINDOW_SECONDS = 0.5
+
+
+def mfcc_frames(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """MFCCs of every analysis frame, shape (frames, N_MFCC)"""
+    import librosa
+
+    if len(samples) < N_FFT:
+        samples = np.pad(samples, (0, N_FFT - len(samples)))
+    mfcc = librosa.feature.mfcc(
+        y=np.asarray(samples, dtype=np.float32),
+        sr=sample_rate,
+        n_mfcc=N_MFCC,
+        n_fft=N_FFT,
+        hop_length=HOP_LENGTH,
+        n_mels=N_MELS,
+        lifter=LIFTER,
+        center=False,
+    )
+    return mfcc.T
+
+
+def embed_windows(
+    samples: np.ndarray,
+    sample_rate: int,
+    starts: np.ndarray,
+    ends: np.ndarray,
+) -> np.ndarray:
+    """
+    Embed each window [starts[i], ends[i]) (seconds from the start of
+    samples) as the mean and standard deviation of its MFCCs, leaving out
+    c0 so loudness does not separate speakers. Runs in the CPU pool, so it
+    only sees one block of audio at a time.
+    """
+    frames = mfcc_frames(samples, sample_rate).astype(np.float64)
+    # Window sums come from prefix sums, one subtraction per window
+    zero = np.zeros((1, frames.shape[1]))
+    sums = np.concatenate((zero, np.cumsum(frames, axis=0)))
+    squares = np.concatenate((zero, np.cumsum(frames ** 2, axis=0)))
+
+    # Frame k is centred at k * HOP_LENGTH + N_FFT / 2 samples
+    centre = N_FFT / 2
+    lo = np.ceil((starts * sample_rate - centre) / HOP_LENGTH)
+    hi = np.floor((ends * sample_rate - centre) / HOP_LENGTH) + 1
+    lo = np.clip(lo.astype(np.int64), 0, len(frames) - 1)
+    hi = np.clip(hi.astype(np.int64), lo + 1, len(frames))
+
+    count = (hi - lo)[:, None]
+    mean = (sums[hi] - sums[lo]) / count
+    var = (squares[hi] - squares[lo]) / count - mean ** 2
+    std = np.sqrt(np.maximum(var, 0.0))
+    return np.hstack((mean[:, 1:], std[:, 1:])).astype(np.float32)
+
+
+def speech_index(
+    samples: np.ndarray, sample_rate: int, settings: Settings
+) -> SpeechIndex:
+    """Where the speech is in a whole recording"""
+    detector = VoiceActivityDetector(
+        sample_rate,
+        frame_length=settings.audio_chunk_size,
+        floor_db=settings.audio_silence_threshold_db,
+    )
+    return detector.detect(samples)
+
+
+def speech_windows(
+    index: SpeechIndex, window: float, hop: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Start and end times of analysis windows tiling every speech interval.
+    Intervals shorter than a window get a single window of their own; the
+    last window of an interval is aligned to its end.
+    """
+    lengths = index.ends - index.starts
+    keep = lengths >= MIN_WINDOW_SECONDS
+    starts, lengths = index.starts[keep], lengths[keep]
+    counts = np.ceil(np.maximum(lengths - window, 0.0) / hop).astype(int) + 1
+    interval = np.repeat(np.arange(len(starts)), counts)
+    step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts,
+                                               counts)
+    interval_ends = starts[interval] + lengths[interval]
+    window_starts = np.minimum(starts[interval] + step * hop,
+                               np.maximum(interval_ends - window,
+                                          starts[interval]))
+    window_ends = np.minimum(window_starts + window, interval_ends)
+    return window_starts, window_ends
+
+
+def cluster_embeddings(
+    embeddings: np.ndarray,
+    threshold: float,
+    max_speakers: int,
+    max_windows: int,
+) -> np.ndarray:
+    """
+    Speaker label per embedding. Average-linkage agglomerative clustering
+    on cosine distance runs over at most max_windows evenly spaced
+    windows, so memory stays bounded however long the meeting is; every
+    window is then assigned to the nearest cluster centroid.
+    """
+    from scipy.cluster.hierarchy import fcluster, linkage
+
+    if len(embeddings) < 2:
+        return np.zeros(len(embeddings), dtype=np.int64)
+
+    # Not centred on the recording's mean: with a single speaker that
+    # would leave only noise to compare and split them into many
+    embeddings = embeddings / (
+        np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-8
+    )
+
+    sample = np.unique(
+        np.linspace(0, len(embeddings) - 1, min(len(embeddings), max_windows))
+        .astype(np.int64)
+    )
+    tree = linkage(embeddings[sample], method="average", metric="cosine")
+    labels = fcluster(tree, t=threshold, criterion="distance")
+    if labels.max() > max_speakers:
+        labels = fcluster(tree, t=max_speakers, criterion="maxclust")
+
+    # Centroids from a one-hot matrix product rather than a loop
+    onehot = np.eye(labels.max())[labels - 1]
+    centroids = onehot.T @ embeddings[sample]
+    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-8
+    return np.argmax(embeddings @ centroids.T, axis=1)
+
+
+@dataclass
+class Diarization:
+    """Speaker label for each analysis window of a recording"""
+    starts: np.ndarray
+    ends: np.ndarray
+    labels: np.ndarray
+    speakers: List[str]
+
+    def speaker_for(
+        self, starts: np.ndarray, ends: np.ndarray
+    ) -> List[Optional[str]]:
+        """
+        Majority speaker over the windows centred inside each [start, end);
+        spans containing no window centre take the nearest window's speaker
+        """
+        if not self.speakers:
+            return [None] * len(starts)
+        centres = (self.starts + self.ends) / 2
+        order = np.argsort(centres, kind="stable")
+        centres, labels = centres[order], self.labels[order]
+
+        votes = np.zeros((len(labels) + 1, len(self.speakers)))
+        votes[1:] = np.cumsum(np.eye(len(self.speakers))[labels], axis=0)
+        lo = np.searchsorted(centres, starts, side="left")
+        hi = np.searchsorted(centres, ends, side="right")
+        majority = np.argmax(votes[hi] - votes[lo], axis=1)
+
+        middle = (np.asarray(starts) + np.asarray(ends)) / 2
+        after = np.minimum(np.searchsorted(centres, middle), len(centres) - 1)
+        before = np.maximum(after - 1, 0)
+        closer = np.abs(centres[before] - middle) \
+            <= np.abs(centres[after] - middle)
+        nearest = np.where(closer, before, after)
+        chosen = np.where(hi > lo, majority, labels[nearest])
+        return [self.speakers[i] for i in chosen]
+
+    def apply(self, segments: List[Dict[str, Any]]) -> None:
+        """Set the speaker of each transcript segment in place"""
+        if not segments:
+            return
+        speakers = self.speaker_for(
+            np.array([s["start"] for s in segments], dtype=np.float64),
+            np.array([s["end"] for s in segments], dtype=np.float64),
+        )
+        for segment, speaker in zip(segments, speakers):
+            segment["speaker"] = speaker
+
+
+class DiarizationService(BaseAIService):
+    """
+    Finds who spoke when. Speech windows are embedded in blocks of
+    diarization_block_seconds, spread over the CPU pool with a bounded
+    number of blocks in flight, then clustered into speakers.
+    """
+
+    async def process(self, *args, **kwargs) -> Diarization:
+        return await self.diarize(*args, **kwargs)
+
+    async def embed(
+        self,
+        samples: np.ndarray,
+        sample_rate: int,
+        starts: np.ndarray,
+        ends: np.ndarray,
+    ) -> np.ndarray:
+        """Embeddings for all windows, computed block by block in parallel"""
+        # Enough to keep every pool process busy, while only a few blocks
+        # at a time are copied into shared memory
+        in_flight = asyncio.Semaphore(2 * max(1, self.settings.cpu_limit))
+        block = self.settings.diarization_block_seconds
+        edges = np.searchsorted(
+            starts, np.arange(0.0, starts[-1] + block, block), side="left"
+        )
+        edges = np.unique(np.append(edges, len(starts)))
+
+        async def run(lo: int, hi: int) -> np.ndarray:
+            first = int(starts[lo] * sample_rate)
+            last = int(np.ceil(ends[lo:hi].max() * sample_rate)) + N_FFT
+            async with in_flight:
+                return await run_cpu(
+                    embed_windows,
+                    samples[first:last],
+                    sample_rate,
+                    starts[lo:hi] - first / sample_rate,
+                    ends[lo:hi] - first / sample_rate,
+                )
+
+        blocks = await asyncio.gather(
+            *(run(lo, hi) for lo, hi in zip(edges[:-1], edges[1:]))
+        )
+        return np.vstack(blocks)
+
+    async def diarize(
+        self, samples: np.ndarray, sample_rate: int
+    ) -> Diarization:
+        """Label the speech in mono audio by speaker"""
+        index = await run_cpu(
+            speech_index, samples, sample_rate, self.settings
+        )
+        starts, ends = speech_windows(
+            index,
+            self.settings.diarization_window_seconds,
+            self.settings.diarization_hop_seconds,
+        )
+        if len(starts) == 0:
+            return Diarization(starts, ends, np.zeros(0, dtype=np.int64), [])
+
+        embeddings = await self.embed(samples, sample_rate, starts, ends)
+        labels = await run_cpu(
+            cluster_embeddings,
+            embeddings,
+            self.settings.diarization_threshold,
+            self.settings.diarization_max_speakers,
+            self.settings.diarization_max_windows,
+        )
+
+        # Number speakers in order of first appearance
+        found, first = np.unique(labels, return_index=True)
+        order = found[np.argsort(first)]
+        renumber = np.zeros(labels.max() + 1, dtype=np.int64)
+        renumber[order] = np.arange(len(order))
+        speakers = [f"SPEAKER_{i + 1}" for i in range(len(order))]
+        self.logger.info(
+            f"Found {len(speakers)} speakers in {len(starts)} windows of "
+            f"{index.speech_seconds:.1f}s of speech"
+        )
+        return Diarization(starts, ends, renumber[labels], speakers)
+
+    async def label_segments(
+        self,
+        samples: np.ndarray,
+        sample_rate: int,
+        segments: List[Dict[str, Any]],
+    ) -> List[str]:
+        """Add a speaker to each segment and return the speakers found"""
+        with time_stage("diarization"):
+            diarization = await self.diarize(samples, sample_rate)
+        diarization.apply(segments)
+        return diarization.speakers
+
+
+@lru_cache()
+def get_diarization_service() -> DiarizationService:
+    """Get the shared diarization service"""
+    return DiarizationService()
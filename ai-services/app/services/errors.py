@@ -0,0 +1,30 @@
+"""
+Exceptions raised by the AI services
+"""
+
+from typing import Optional
+
+
+class AIServiceError(Exception):
+    """Custom exception for AI service errors"""
+    pass
+
+
+class CircuitOpenError(AIServiceError):
+    """The upstream is failing and calls are being short-circuited"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(AIServiceError):
+    """The caller's deadline passed, or would pass before the next attempt"""
+
+
+class RetryableError(Exception):
+    """Raised by backends to mark a failure as transient"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
@@ -0,0 +1,271 @@
+"""
+Process-wide pooled HTTP client shared by every upstream call
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from app.services.upstream_replay import (
+    Cassette,
+    RecordingTransport,
+    ReplayTransport,
+)
+from app.utils.config import get_settings
+from app.utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Buckets (requests) for how many calls were in flight to a host
+IN_FLIGHT_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class PooledTransport(httpx.AsyncBaseTransport):
+    """
+    Keep-alive connection pool that caps concurrent requests per host and
+    counts how often a request reuses a pooled connection instead of
+    opening a new one. New connections are detected through httpcore's
+    trace hook, which reports a TCP connect only when one happens.
+    """
+
+    def __init__(
+        self,
+        per_host_limit: int,
+        limits: httpx.Limits,
+        http2: bool = False,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.per_host_limit = per_host_limit
+        self._transport = transport or httpx.AsyncHTTPTransport(
+            limits=limits, http2=http2
+        )
+        self._hosts: Dict[str, asyncio.Semaphore] = {}
+        self._host_in_flight: Dict[str, int] = {}
+        self.requests = 0
+        self.connections_opened = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.in_flight_per_host = Histogram(IN_FLIGHT_BUCKETS)
+
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._hosts.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host_limit)
+            self._hosts[host] = semaphore
+        return semaphore
+
+    async def handle_async_request(
+        self, request: httpx.Request
+    ) -> httpx.Response:
+        host = request.url.host
+        semaphore = self._host_limit(host)
+        self.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        outer_trace = request.extensions.get("trace")
+
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            if event == "connection.connect_tcp.complete":
+                self.connections_opened += 1
+            if outer_trace is not None:
+                await outer_trace(event, info)
+
+        request.extensions = {**request.extensions, "trace": trace}
+        self.requests += 1
+        self.in_flight += 1
+        self._host_in_flight[host] = self._host_in_flight.get(host, 0) + 1
+        self.in_flight_per_host.observe(self._host_in_flight[host])
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self._release(host)
+            raise
+
+        # Hold the host slot until the body has been read or closed
+        response.stream = _ReleasingStream(response.stream, self, host)
+        return response
+
+    def _release(self, host: str) -> None:
+        self.in_flight -= 1
+        self._host_in_flight[host] -= 1
+        self._hosts[host].release()
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+    def pool_state(self) -> Dict[str, int]:
+        """Connections currently open in the pool, by state"""
+        # Look through a record/replay wrapper to the network transport
+        network = getattr(self._transport, "_transport", self._transport)
+        pool = getattr(network, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for c in connections if c.is_idle())
+        return {
+            "open": len(connections),
+            "idle": idle,
+            "active": len(connections) - idle,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        reused = max(self.requests - self.connections_opened, 0)
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": reused,
+            "reuse_ratio": (
+                round(reused / self.requests, 4) if self.requests else 0.0
+            ),
+            "in_flight": self.in_flight,
+            "waiting_for_host_slot": self.waiting,
+            "per_host_limit": self.per_host_limit,
+            "pool": self.pool_state(),
+            "in_flight_per_host_histogram":
+                self.in_flight_per_host.snapshot(),
+        }
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response stream that frees its host slot once closed"""
+
+    def __init__(
+        self,
+        stream: httpx.AsyncByteStream,
+        transport: PooledTransport,
+        host: str,
+    ):
+        self._stream = stream
+        self._transport = transport
+        self._host = host
+        self._released = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._transport._release(self._host)
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_transport(
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> PooledTransport:
+    """
+    Create the pooled transport from the settings. Each host gets at most
+    max_concurrent_requests requests at once; HTTP/2 is used when
+    HTTP2_ENABLED is set and the h2 package is installed. transport
+    replaces the network transport underneath the pool (for tests).
+    UPSTREAM_REPLAY_MODE=record captures every exchange to
+    UPSTREAM_REPLAY_PATH; replay answers from it with no network.
+    """
+    settings = get_settings()
+    http2 = settings.http2_enabled
+    if http2 and not http2_available():
+        logger.warning("HTTP2_ENABLED is set but h2 is not installed; "
+                       "using HTTP/1.1")
+        http2 = False
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+    mode = settings.upstream_replay_mode
+    if mode != "off":
+        cassette = Cassette(settings.upstream_replay_path)
+        if mode == "record":
+            transport = RecordingTransport(
+                transport or httpx.AsyncHTTPTransport(
+                    limits=limits, http2=http2
+                ),
+                cassette,
+            )
+            logger.info(f"Recording upstream exchanges to {cassette.path}")
+        else:
+            count = cassette.load()
+            transport = ReplayTransport(
+                cassette, settings.upstream_replay_latency_scale
+            )
+            logger.info(
+                f"Replaying {count} upstream exchanges from "
+                f"{cassette.path} at {transport.latency_scale}x latency"
+            )
+    return PooledTransport(
+        settings.max_concurrent_requests, limits, http2, transport
+    )
+
+
+_client: Optional[httpx.AsyncClient] = None
+_pool: Optional[PooledTransport] = None
+_openai_clients: Dict[Tuple[str, float], Any] = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the process-wide client. The app lifespan creates it at startup
+    and closes it at shutdown; other callers get one created on first use.
+    """
+    global _client, _pool
+    if _client is None or _client.is_closed:
+        settings = get_settings()
+        _pool = build_transport()
+        _client = httpx.AsyncClient(
+            transport=_pool, timeout=settings.request_timeout
+        )
+        logger.info(
+            f"Opened shared HTTP client (per-host limit "
+            f"{_pool.per_host_limit}, max connections "
+            f"{settings.http_max_connections})"
+        )
+    return _client
+
+
+def openai_client(api_key: str, timeout: float) -> Any:
+    """AsyncOpenAI client that sends its requests over the shared pool"""
+    from openai import AsyncOpenAI
+
+    http_client = get_http_client()
+    client = _openai_clients.get((api_key, timeout))
+    if client is None or client._client is not http_client:
+        client = AsyncOpenAI(
+            api_key=api_key,
+            timeout=timeout,
+            max_retries=0,
+            http_client=http_client,
+        )
+        _openai_clients[(api_key, timeout)] = client
+    return client
+
+
+def http_client_stats() -> Dict[str, Any]:
+    if _client is None or _client.is_closed or _pool is None:
+        return {"open": False}
+    stats = {"open": True, **_pool.stats()}
+    if isinstance(_pool._transport, (RecordingTransport, ReplayTransport)):
+        stats["replay"] = _pool._transport.stats()
+    return stats
+
+
+async def close_http_client() -> None:
+    global _client, _pool
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _pool = None
+    _openai_clients.clear()
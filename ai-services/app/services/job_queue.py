@@ -0,0 +1,380 @@
+"""
+Persistent job queue and async worker pool for long-running AI tasks
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.utils.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+PROCESSING = "processing"
+COMPLETED = "completed"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    chunks_done INTEGER NOT NULL DEFAULT 0,
+    chunks_total INTEGER NOT NULL DEFAULT 0,
+    idempotency_key TEXT UNIQUE,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_chunks (
+    job_id TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (job_id, chunk_index)
+);
+"""
+
+
+@dataclass
+class Job:
+    """A queued unit of work and its progress"""
+    id: str
+    kind: str
+    status: str
+    payload: Dict[str, Any]
+    result: Optional[Dict[str, Any]]
+    error: Optional[str]
+    attempts: int
+    chunks_done: int
+    chunks_total: int
+    created_at: float
+    started_at: Optional[float]
+    updated_at: float
+
+    @property
+    def progress(self) -> float:
+        """Percentage of work completed"""
+        if self.status == COMPLETED:
+            return 100.0
+        if not self.chunks_total:
+            return 0.0
+        return round(100.0 * self.chunks_done / self.chunks_total, 1)
+
+    @property
+    def estimated_completion(self) -> Optional[str]:
+        """Projected finish time from the observed per-chunk rate"""
+        if self.status != PROCESSING or not self.chunks_done \
+                or not self.started_at:
+            return None
+        elapsed = time.time() - self.started_at
+        remaining = self.chunks_total - self.chunks_done
+        eta = time.time() + elapsed / self.chunks_done * remaining
+        return datetime.utcfromtimestamp(eta).isoformat()
+
+
+class JobStore:
+    """SQLite-backed job storage shared by every worker on the host"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def _row_to_job(self, row: tuple) -> Job:
+        return Job(
+            id=row[0],
+            kind=row[1],
+            status=row[2],
+            payload=json.loads(row[3]),
+            result=json.loads(row[4]) if row[4] else None,
+            error=row[5],
+            attempts=row[6],
+            chunks_done=row[7],
+            chunks_total=row[8],
+            created_at=row[9],
+            started_at=row[10],
+            updated_at=row[11],
+        )
+
+    _COLUMNS = (
+        "id, kind, status, payload, result, error, attempts, chunks_done, "
+        "chunks_total, created_at, started_at, updated_at"
+    )
+
+    def create(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+    ) -> Job:
+        """Insert a pending job, or return the one sharing idempotency_key"""
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        # One statement, so two workers submitting the same key at once
+        # cannot both pass a lookup and then collide on the insert
+        inserted = self._execute(
+            "INSERT INTO jobs (id, kind, status, payload, idempotency_key, "
+            "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(idempotency_key) DO NOTHING",
+            (job_id, kind, PENDING, json.dumps(payload), idempotency_key,
+             now, now),
+        ).rowcount
+        if not inserted:
+            existing = self._execute(
+                f"SELECT {self._COLUMNS} FROM jobs WHERE idempotency_key = ?",
+                (idempotency_key,),
+            ).fetchone()
+            return self._row_to_job(existing)
+
+        # Built locally: a worker may already have claimed the row
+        return Job(
+            id=job_id, kind=kind, status=PENDING, payload=payload,
+            result=None, error=None, attempts=0, chunks_done=0,
+            chunks_total=0, created_at=now, started_at=None, updated_at=now,
+        )
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self._execute(
+            f"SELECT {self._COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def claim(self) -> Optional[Job]:
+        """Atomically move the oldest pending job to processing"""
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, "
+                "started_at = COALESCE(started_at, ?), updated_at = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE status = ? "
+                "ORDER BY created_at LIMIT 1) "
+                f"RETURNING {self._COLUMNS}",
+                (PROCESSING, time.time(), time.time(), PENDING),
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def update_progress(self, job_id: str, done: int, total: int) -> None:
+        # Concurrent chunk callbacks may land out of order; never go backwards
+        self._execute(
+            "UPDATE jobs SET chunks_done = MAX(chunks_done, ?), "
+            "chunks_total = ?, "
+            "updated_at = ? WHERE id = ?",
+            (done, total, time.time(), job_id),
+        )
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, "
+            "chunks_done = chunks_total, updated_at = ? WHERE id = ?",
+            (COMPLETED, json.dumps(result), time.time(), job_id),
+        )
+        self._execute("DELETE FROM job_chunks WHERE job_id = ?", (job_id,))
+
+    def fail(self, job_id: str, error: str, retry: bool) -> None:
+        self._execute(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ? "
+            "WHERE id = ?",
+            (PENDING if retry else FAILED, error, time.time(), job_id),
+        )
+
+    def heartbeat(self, job_id: str) -> None:
+        self._execute(
+            "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = ?",
+            (time.time(), job_id, PROCESSING),
+        )
+
+    def requeue_interrupted(self, stale_after: float) -> int:
+        """Return processing jobs abandoned by a dead worker to pending"""
+        cursor = self._execute(
+            "UPDATE jobs SET status = ?, updated_at = ? "
+            "WHERE status = ? AND updated_at <= ?",
+            (PENDING, time.time(), PROCESSING, time.time() - stale_after),
+        )
+        return cursor.rowcount
+
+    def save_chunk(
+        self, job_id: str, chunk_index: int, result: Dict[str, Any]
+    ) -> None:
+        self._execute(
+            "INSERT OR REPLACE INTO job_chunks (job_id, chunk_index, result) "
+            "VALUES (?, ?, ?)",
+            (job_id, chunk_index, json.dumps(result)),
+        )
+
+    def load_chunks(self, job_id: str) -> Dict[int, Dict[str, Any]]:
+        rows = self._execute(
+            "SELECT chunk_index, result FROM job_chunks WHERE job_id = ?",
+            (job_id,),
+        ).fetchall()
+        return {index: json.loads(result) for index, result in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+JobHandler = Callable[[Job, "JobQueue"], Awaitable[Dict[str, Any]]]
+
+
+class JobQueue:
+    """Dispatches persisted jobs to a pool of asyncio workers"""
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int,
+        max_attempts: int = 3,
+        poll_interval: float = 1.0,
+        stale_after: float = 60.0,
+    ):
+        self.store = store
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._handlers: Dict[str, JobHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """Register the coroutine that runs jobs of the given kind"""
+        self._handlers[kind] = handler
+
+    async def submit(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        idempotency_key: Optional[str] = None,
+    ) -> Job:
+        """Persist a job and wake an idle worker"""
+        job = await asyncio.to_thread(
+            self.store.create, kind, payload, idempotency_key
+        )
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def report_progress(self, job: Job, done: int, total: int) -> None:
+        await asyncio.to_thread(
+            self.store.update_progress, job.id, done, total
+        )
+
+    async def recover(self, stale_after: Optional[float] = None) -> int:
+        """Requeue jobs whose worker stopped sending heartbeats"""
+        if stale_after is None:
+            stale_after = self.stale_after
+        recovered = await asyncio.to_thread(
+            self.store.requeue_interrupted, stale_after
+        )
+        if recovered:
+            logger.info(f"Requeued {recovered} interrupted jobs")
+        return recovered
+
+    async def start(self) -> None:
+        """Recover interrupted jobs and start the worker pool"""
+        await self.recover()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} job workers")
+
+    async def stop(self) -> None:
+        """Cancel workers; in-flight jobs are requeued on next start"""
+        # wait_for() can swallow a cancellation that races its timeout on
+        # Python < 3.12, so workers also check a flag before each claim
+        self._stopping = True
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, worker_id: int) -> None:
+        while not self._stopping:
+            job = await asyncio.to_thread(self.store.claim)
+            if job is None:
+                if worker_id == 0:
+                    await self.recover()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), timeout=self.poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job, worker_id)
+
+    async def _run(self, job: Job, worker_id: int) -> None:
+        handler = self._handlers.get(job.kind)
+        logger.info(
+            f"Worker {worker_id} running job {job.id} ({job.kind}, "
+            f"attempt {job.attempts}/{self.max_attempts})"
+        )
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for {job.kind}")
+            result = await handler(job, self)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            retry = handler is not None and job.attempts < self.max_attempts
+            logger.error(f"Job {job.id} failed: {str(e)}")
+            await asyncio.to_thread(self.store.fail, job.id, str(e), retry)
+            if retry:
+                self._wakeup.set()
+            return
+        finally:
+            heartbeat.cancel()
+
+        await asyncio.to_thread(self.store.complete, job.id, result)
+        logger.info(f"Job {job.id} completed")
+
+    async def _heartbeat(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(self.stale_after / 3)
+            await asyncio.to_thread(self.store.heartbeat, job.id)
+
+
+@lru_cache()
+def get_job_queue() -> JobQueue:
+    """Get the process-wide job queue"""
+    settings = get_settings()
+    return JobQueue(
+        JobStore(settings.job_store_path),
+        workers=settings.job_workers,
+        max_attempts=settings.job_max_attempts,
+        poll_interval=settings.job_poll_interval,
+        stale_after=settings.job_stale_after,
+    )
@@ -0,0 +1,170 @@
+"""
+Chat-completion backends used by the analysis services
+"""
+
+import json
+import logging
+import re
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from app.services.http_client import openai_client
+from app.services.rate_limiter import (
+    RateLimiter,
+    estimate_request_tokens,
+    get_rate_limiter,
+)
+from app.services.simulation import UpstreamSimulator
+from app.utils.config import get_settings
+from app.utils.text import split_sentences
+
+logger = logging.getLogger(__name__)
+
+# Prompts end with this marker so every backend knows which keys to return
+KEYS_MARKER = "Respond with a JSON object containing exactly these keys:"
+
+ACTION_CUES = re.compile(
+    r"\b(will|need to|needs to|should|todo|action item|follow up|let's)\b",
+    re.IGNORECASE,
+)
+
+
+class LLMBackend(ABC):
+    """Chat model that answers a prompt with a JSON object"""
+
+    name: str = "base"
+
+    @abstractmethod
+    async def complete_json(
+        self, system: str, prompt: str, max_tokens: int
+    ) -> Dict[str, Any]:
+        pass
+
+
+def parse_json_object(content: str) -> Dict[str, Any]:
+    """Extract the outermost JSON object from a model reply"""
+    start, end = content.find("{"), content.rfind("}")
+    if start == -1 or end <= start:
+        raise ValueError("Model reply did not contain a JSON object")
+    return json.loads(content[start:end + 1])
+
+
+class OpenAIChatBackend(LLMBackend):
+    """
+    OpenAI chat completions backend. With a rate limiter, each request
+    waits for one request and its estimated tokens of quota first.
+    """
+
+    name = "openai"
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        temperature: float,
+        timeout: float,
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.temperature = temperature
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+
+    async def complete_json(
+        self, system: str, prompt: str, max_tokens: int
+    ) -> Dict[str, Any]:
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(
+                requests=1,
+                tokens=estimate_request_tokens((system, prompt), max_tokens),
+            )
+        client = openai_client(self.api_key, self.timeout)
+        response = await client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens=max_tokens,
+            temperature=self.temperature,
+        )
+        return parse_json_object(response.choices[0].message.content or "")
+
+
+class FakeLLMBackend(LLMBackend):
+    """
+    Offline backend for tests, benchmarks and MOCK_OPENAI. Builds
+    extractive answers from the transcript in the prompt and counts calls.
+    Latency and transient failures follow an UpstreamSimulator.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        latency_sigma: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.simulator = UpstreamSimulator(
+            latency, latency_sigma, error_rate, seed
+        )
+        self.calls = 0
+        self.prompts: List[str] = []
+
+    async def complete_json(
+        self, system: str, prompt: str, max_tokens: int
+    ) -> Dict[str, Any]:
+        self.calls += 1
+        self.prompts.append(prompt)
+        await self.simulator("chat completion")
+
+        body, _, keys_line = prompt.rpartition(KEYS_MARKER)
+        keys = [k.strip() for k in keys_line.split(",") if k.strip()]
+        transcript = body.split("Transcript:", 1)[-1].strip()
+        sentences = split_sentences(transcript)
+        words = max_tokens * 3 // 4
+
+        answer: Dict[str, Any] = {}
+        if "summary" in keys:
+            summary_words = " ".join(sentences[:3]).split()[:words]
+            answer["summary"] = " ".join(summary_words)
+            answer["key_points"] = sentences[:3]
+            answer["participants_mentioned"] = sorted({
+                w.strip(",.") for w in transcript.split()
+                if w.istitle() and w.strip(",.").isalpha() and len(w) > 3
+            })[:5]
+        if "action_items" in keys:
+            answer["action_items"] = [
+                {"description": s, "assignee": None, "deadline": None,
+                 "priority": "medium"}
+                for s in sentences if ACTION_CUES.search(s)
+            ]
+        return answer
+
+
+@lru_cache()
+def get_llm_backend() -> LLMBackend:
+    """Get the shared chat backend for the configured provider"""
+    settings = get_settings()
+    if settings.mock_openai:
+        return FakeLLMBackend(
+            latency=settings.mock_latency,
+            latency_sigma=settings.mock_latency_sigma,
+            error_rate=settings.mock_error_rate,
+            seed=settings.mock_seed,
+        )
+    return OpenAIChatBackend(
+        api_key=settings.openai_api_key,
+        model=settings.openai_model,
+        temperature=settings.openai_temperature,
+        timeout=settings.openai_timeout,
+        rate_limiter=get_rate_limiter(
+            OpenAIChatBackend.name,
+            settings.openai_rpm_limit,
+            settings.openai_tpm_limit,
+        ),
+    )
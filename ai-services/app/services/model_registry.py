@@ -0,0 +1,404 @@
+"""
+Registry of locally loaded classification models with LRU eviction
+"""
+
+import asyncio
+import gc
+import json
+import logging
+import os
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List
+
+import numpy as np
+
+from app.utils.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class SequenceClassifier(ABC):
+    """A loaded text classification model"""
+
+    name: str
+    labels: List[str]
+
+    @abstractmethod
+    def predict(self, texts: List[str]) -> np.ndarray:
+        """
+        Run one forward pass over a padded batch and return an array of
+        shape (len(texts), len(labels)) with class probabilities.
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Release resources held outside Python references. Weights are freed
+        once the registry and any in-flight callers drop the model.
+        """
+        pass
+
+
+class TransformersClassifier(SequenceClassifier):
+    """Hugging Face transformers model running on CPU"""
+
+    def __init__(
+        self,
+        name: str,
+        cache_dir: str,
+        token: Any = None,
+        max_length: int = 512,
+    ):
+        import torch
+        from transformers import (
+            AutoModelForSequenceClassification,
+            AutoTokenizer,
+        )
+
+        self.name = name
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(
+            name, cache_dir=cache_dir, token=token
+        )
+        self.model = AutoModelForSequenceClassification.from_pretrained(
+            name, cache_dir=cache_dir, token=token
+        )
+        self.model.eval()
+        self._torch = torch
+
+        id2label = self.model.config.id2label
+        self.labels = [id2label[i].lower() for i in range(len(id2label))]
+
+    def predict(self, texts: List[str]) -> np.ndarray:
+        torch = self._torch
+        with torch.inference_mode():
+            inputs = self.tokenizer(
+                texts,
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="pt",
+            )
+            logits = self.model(**inputs).logits
+            return torch.softmax(logits, dim=-1).numpy()
+
+
+def onnx_export_dir(name: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, "onnx", name.replace("/", "--"))
+
+
+def export_onnx(
+    name: str,
+    cache_dir: str,
+    token: Any = None,
+    quantize: bool = True,
+) -> str:
+    """
+    Export a transformers classifier to ONNX under cache_dir/onnx, with
+    its tokenizer and labels, and optionally quantize its weights to int8
+    (dynamic quantization: activations are quantized per batch at run
+    time, so no calibration data is needed). Returns the path of the
+    model file; later calls find it in the cache. Files are written
+    under a temporary name and renamed, so workers exporting at the same
+    time never read a partial file.
+    """
+    directory = onnx_export_dir(name, cache_dir)
+    fp32_path = os.path.join(directory, "model.onnx")
+    target = os.path.join(directory, "model.int8.onnx") if quantize \
+        else fp32_path
+    if os.path.exists(target):
+        return target
+    os.makedirs(directory, exist_ok=True)
+    partial = f".{os.getpid()}.partial"
+
+    if not os.path.exists(fp32_path):
+        import torch
+        from transformers import (
+            AutoModelForSequenceClassification,
+            AutoTokenizer,
+        )
+
+        start_time = time.time()
+        tokenizer = AutoTokenizer.from_pretrained(
+            name, cache_dir=cache_dir, token=token
+        )
+        model = AutoModelForSequenceClassification.from_pretrained(
+            name, cache_dir=cache_dir, token=token
+        )
+        model.eval()
+        sample = tokenizer(["Export sample."], return_tensors="pt")
+        input_names = list(sample.keys())
+
+        class Logits(torch.nn.Module):
+            # Fixed positional inputs, whatever order the model takes
+            def __init__(self):
+                super().__init__()
+                self.model = model
+
+            def forward(self, *inputs):
+                return self.model(**dict(zip(input_names, inputs))).logits
+
+        axes = {key: {0: "batch", 1: "sequence"} for key in input_names}
+        with torch.no_grad():
+            torch.onnx.export(
+                Logits(),
+                tuple(sample[key] for key in input_names),
+                fp32_path + partial,
+                input_names=input_names,
+                output_names=["logits"],
+                dynamic_axes={**axes, "logits": {0: "batch"}},
+                opset_version=14,
+            )
+        tokenizer.save_pretrained(directory)
+        id2label = model.config.id2label
+        with open(os.path.join(directory, "labels.json"), "w") as f:
+            json.dump([id2label[i].lower() for i in range(len(id2label))], f)
+        os.replace(fp32_path + partial, fp32_path)
+        logger.info(
+            f"Exported {name} to ONNX in {time.time() - start_time:.2f}s"
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(fp32_path, target + partial,
+                         weight_type=QuantType.QInt8)
+        os.replace(target + partial, target)
+        logger.info(f"Quantized {name} to int8")
+    return target
+
+
+class OnnxClassifier(SequenceClassifier):
+    """
+    Transformers model exported to ONNX, optionally int8-quantized, and
+    run with ONNX Runtime on CPU. Only the first load ever needs torch.
+
+    The inference session is created on first use in each process: its
+    thread pool would not survive a fork, so a pre-fork parent loading
+    the model must not start one.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        cache_dir: str,
+        token: Any = None,
+        max_length: int = 512,
+        quantize: bool = True,
+    ):
+        from transformers import AutoTokenizer
+
+        self.name = name
+        self.max_length = max_length
+        self.path = export_onnx(name, cache_dir, token, quantize)
+        directory = os.path.dirname(self.path)
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        with open(os.path.join(directory, "labels.json")) as f:
+            self.labels = json.load(f)
+        self._session: Any = None
+        self._session_pid = 0
+
+    def session(self) -> Any:
+        if self._session is None or self._session_pid != os.getpid():
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = \
+                ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            threads = get_settings().onnx_threads
+            if threads:
+                options.intra_op_num_threads = threads
+            self._session = ort.InferenceSession(
+                self.path, options, providers=["CPUExecutionProvider"]
+            )
+            self._inputs = {i.name for i in self._session.get_inputs()}
+            self._session_pid = os.getpid()
+        return self._session
+
+    def predict(self, texts: List[str]) -> np.ndarray:
+        session = self.session()
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np",
+        )
+        feed = {key: value.astype(np.int64)
+                for key, value in encoded.items() if key in self._inputs}
+        logits = session.run(["logits"], feed)[0]
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def close(self) -> None:
+        self._session = None
+
+
+class LexiconClassifier(SequenceClassifier):
+    """
+    Word-list sentiment classifier used when MOCK_HUGGINGFACE is set, so the
+    service, batching and caching paths run without downloading a model.
+    """
+
+    POSITIVE = {
+        "good", "great", "excellent", "happy", "glad", "agree", "thanks",
+        "love", "success", "progress", "done", "ahead", "win", "nice",
+    }
+    NEGATIVE = {
+        "bad", "blocked", "late", "delay", "delayed", "problem", "issue",
+        "angry", "fail", "failed", "risk", "concern", "worried", "behind",
+    }
+
+    def __init__(self, name: str = "lexicon", latency: float = 0.0):
+        self.name = name
+        self.labels = ["negative", "neutral", "positive"]
+        self.latency = latency
+        self.batch_sizes: List[int] = []
+
+    def predict(self, texts: List[str]) -> np.ndarray:
+        self.batch_sizes.append(len(texts))
+        if self.latency:
+            time.sleep(self.latency)
+        scores = np.zeros((len(texts), 3), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r"[a-z']+", text.lower())
+            scores[row, 0] = sum(w in self.NEGATIVE for w in words)
+            scores[row, 2] = sum(w in self.POSITIVE for w in words)
+            scores[row, 1] = 0.5
+        exp = np.exp(scores * 2.0)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def load_classifier(name: str) -> SequenceClassifier:
+    """Load a classifier for the configured backend"""
+    settings = get_settings()
+    if settings.mock_huggingface:
+        return LexiconClassifier(name, latency=settings.mock_model_latency)
+
+    token = settings.huggingface_api_key if settings.hf_use_auth_token \
+        else None
+    backend = settings.model_backend_for(name)
+    if backend == "torch":
+        return TransformersClassifier(
+            name, cache_dir=settings.hf_cache_dir, token=token
+        )
+    return OnnxClassifier(
+        name, cache_dir=settings.hf_cache_dir, token=token,
+        quantize=backend == "onnx-int8",
+    )
+
+
+class ModelRegistry:
+    """
+    Keeps at most `capacity` models resident, evicting the least recently
+    used. Loads run in a thread so the event loop keeps serving requests,
+    and concurrent requests for the same model share one load.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        loader: Callable[[str], SequenceClassifier] = load_classifier,
+        load_timeout: float = 120.0,
+    ):
+        self.capacity = max(1, capacity)
+        self.loader = loader
+        self.load_timeout = load_timeout
+        self._models: "OrderedDict[str, SequenceClassifier]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._models
+
+    async def get(self, name: str) -> SequenceClassifier:
+        """Return a resident model, loading it on first use"""
+        model = self._models.get(name)
+        if model is not None:
+            self._models.move_to_end(name)
+            self.hits += 1
+            return model
+
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            model = self._models.get(name)
+            if model is not None:
+                self.hits += 1
+                return model
+
+            start_time = time.time()
+            model = await asyncio.wait_for(
+                asyncio.to_thread(self.loader, name),
+                timeout=self.load_timeout,
+            )
+            self.loads += 1
+            logger.info(
+                f"Loaded model {name} in {time.time() - start_time:.2f}s"
+            )
+
+            self._models[name] = model
+            while len(self._models) > self.capacity:
+                evicted, _ = next(iter(self._models.items()))
+                self.evict(evicted)
+            return model
+
+    async def preload(self, names: Iterable[str]) -> None:
+        for name in names:
+            await self.get(name)
+
+    def load_now(self, name: str) -> SequenceClassifier:
+        """
+        Load a model synchronously, outside any event loop. Used by the
+        pre-fork server to load weights once before forking its workers.
+        """
+        model = self._models.get(name)
+        if model is None:
+            start_time = time.time()
+            model = self.loader(name)
+            self.loads += 1
+            logger.info(
+                f"Loaded model {name} in {time.time() - start_time:.2f}s"
+            )
+            self._models[name] = model
+            while len(self._models) > self.capacity:
+                self.evict(next(iter(self._models)))
+        return model
+
+    def evict(self, name: str) -> None:
+        model = self._models.pop(name, None)
+        if model is None:
+            return
+        model.close()
+        self.evictions += 1
+        gc.collect()
+        logger.info(f"Evicted model {name}")
+
+    def clear(self) -> None:
+        """Free every resident model"""
+        for name in list(self._models):
+            self.evict(name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "resident": list(self._models),
+            "loads": self.loads,
+            "hits": self.hits,
+            "evictions": self.evictions,
+        }
+
+
+@lru_cache()
+def get_model_registry() -> ModelRegistry:
+    """Get the process-wide model registry"""
+    settings = get_settings()
+    return ModelRegistry(
+        capacity=settings.model_cache_size,
+        load_timeout=settings.model_load_timeout,
+    )
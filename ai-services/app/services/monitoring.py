@@ -0,0 +1,233 @@
+"""
+Prometheus metrics on METRICS_PORT: service stats collectors, event-loop
+lag sampling and a minimal scrape endpoint
+"""
+
+import asyncio
+import logging
+import time
+from typing import Iterator, Optional, Tuple
+
+from app.middleware.admission import admission_stats
+from app.services.cache import get_result_cache
+from app.services.http_client import http_client_stats
+from app.services.model_registry import get_model_registry
+from app.services.offload import offload_stats
+from app.services.rate_limiter import rate_limiter_stats
+from app.services.retry import upstream_stats
+from app.utils.config import get_settings
+from app.utils.metrics import REGISTRY, Samples
+
+logger = logging.getLogger(__name__)
+
+# Buckets (seconds) for how late the event loop ran a scheduled callback
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    "echoscribe_event_loop_lag_seconds",
+    "How late the event loop woke a sleeping task",
+    LAG_BUCKETS,
+)
+EVENT_LOOP_LAG_LAST = REGISTRY.gauge(
+    "echoscribe_event_loop_lag_last_seconds",
+    "Event loop lag at the most recent sample",
+)
+
+Family = Tuple[str, str, str, Samples]
+
+
+def collect_service_stats() -> Iterator[Family]:
+    """
+    Cache, retry, model, connection pool, offload pool, admission and
+    rate-limit stats
+    """
+    cache = get_result_cache().stats()
+    yield ("echoscribe_cache_hits_total", "counter",
+           "Analysis cache hits by tier",
+           [({"tier": "local"}, cache["local_hits"]),
+            ({"tier": "remote"}, cache["remote_hits"])])
+    yield ("echoscribe_cache_misses_total", "counter",
+           "Analysis cache misses", [({}, cache["misses"])])
+    yield ("echoscribe_cache_hit_ratio", "gauge",
+           "Share of analysis cache lookups that hit",
+           [({}, cache["hit_ratio"])])
+    yield ("echoscribe_cache_entries", "gauge",
+           "Entries in the local analysis cache", [({}, cache["entries"])])
+
+    upstreams = upstream_stats()
+    for key, kind, help in (
+        ("calls", "counter", "Calls to each upstream"),
+        ("attempts", "counter", "Attempts, including retries"),
+        ("retries", "counter", "Retries after a transient failure"),
+        ("failures", "counter", "Calls that failed after retrying"),
+        ("short_circuited", "counter", "Calls refused by an open circuit"),
+        ("budget_exhausted", "counter",
+         "Retries refused by the retry budget"),
+        ("deadline_exceeded", "counter", "Calls stopped at the deadline"),
+    ):
+        yield (f"echoscribe_upstream_{key}_total", kind, help,
+               [({"upstream": name}, stats[key])
+                for name, stats in upstreams.items()])
+    yield ("echoscribe_upstream_circuit_open", "gauge",
+           "1 while the upstream's circuit is open or half open",
+           [({"upstream": name}, float(stats["circuit"] != "closed"))
+            for name, stats in upstreams.items()])
+
+    models = get_model_registry().stats()
+    yield ("echoscribe_models_resident", "gauge",
+           "Models loaded in this process",
+           [({}, len(models["resident"]))])
+    yield ("echoscribe_model_resident", "gauge",
+           "1 for each resident model",
+           [({"model": name}, 1.0) for name in models["resident"]])
+    yield ("echoscribe_model_loads_total", "counter", "Model loads",
+           [({}, models["loads"])])
+    yield ("echoscribe_model_evictions_total", "counter",
+           "Models evicted from the registry", [({}, models["evictions"])])
+
+    pool = http_client_stats()
+    if pool.get("open"):
+        yield ("echoscribe_http_client_requests_total", "counter",
+               "Upstream HTTP requests", [({}, pool["requests"])])
+        yield ("echoscribe_http_client_connections_opened_total",
+               "counter", "Upstream connections opened",
+               [({}, pool["connections_opened"])])
+        yield ("echoscribe_http_client_in_flight", "gauge",
+               "Upstream HTTP requests in flight", [({}, pool["in_flight"])])
+
+    pools = offload_stats()
+    for key, kind, help in (
+        ("workers", "gauge", "Workers in each offload pool"),
+        ("in_flight", "gauge", "Offloaded calls running or queued"),
+        ("queued", "gauge", "Offloaded calls waiting for a free worker"),
+        ("submitted", "counter", "Calls offloaded to each pool"),
+        ("failed", "counter", "Offloaded calls that raised"),
+    ):
+        suffix = "_total" if kind == "counter" else ""
+        yield (f"echoscribe_pool_{key}{suffix}", kind, help,
+               [({"pool": name}, stats[key])
+                for name, stats in pools.items()])
+
+    classes = admission_stats()
+    for key, kind, help in (
+        ("limit", "gauge", "Admission concurrency limit"),
+        ("queued", "gauge", "Requests waiting for admission"),
+        ("rejected_queue_full", "counter", "Requests shed at a full queue"),
+        ("rejected_timeout", "counter", "Requests shed after waiting"),
+    ):
+        suffix = "_total" if kind == "counter" else ""
+        yield (f"echoscribe_admission_{key}{suffix}", kind, help,
+               [({"route_class": name}, stats[key])
+                for name, stats in classes.items()])
+
+    limiters = rate_limiter_stats()
+    yield ("echoscribe_rate_limit_delayed_total", "counter",
+           "Upstream calls that waited for quota",
+           [({"upstream": name}, stats["delayed"])
+            for name, stats in limiters.items()])
+    yield ("echoscribe_rate_limit_waiting", "gauge",
+           "Upstream calls waiting for quota",
+           [({"upstream": name}, stats["waiting"])
+            for name, stats in limiters.items()])
+
+
+REGISTRY.register_collector(collect_service_stats)
+
+
+async def sample_loop_lag(interval: float) -> None:
+    """Sleep for interval and record how much later than that we woke"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(time.perf_counter() - start - interval, 0.0)
+        EVENT_LOOP_LAG.labels().observe(lag)
+        EVENT_LOOP_LAG_LAST.labels().set(lag)
+
+
+async def _serve_scrape(reader, writer) -> None:
+    try:
+        request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+        target = request.split(b" ", 2)[1] if b" " in request else b""
+        if target.split(b"?")[0] == b"/metrics":
+            status = b"200 OK"
+            body = REGISTRY.render().encode()
+        else:
+            status = b"404 Not Found"
+            body = b"Not Found\n"
+        writer.write(
+            b"HTTP/1.1 " + status + b"\r\n"
+            b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+            b"Connection: close\r\n\r\n" + body
+        )
+        await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+            asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+class Monitoring:
+    """Scrape endpoint and loop-lag sampler for one process"""
+
+    def __init__(self):
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.lag_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        settings = get_settings()
+        self.lag_task = asyncio.create_task(
+            sample_loop_lag(settings.metrics_lag_interval)
+        )
+        # Metrics are per process, so each of WORKERS workers takes the
+        # first free port of METRICS_PORT, METRICS_PORT + 1, ... and the
+        # scrape config lists them all (sum() across them in queries)
+        if settings.metrics_port == 0:
+            ports = [0]
+        else:
+            ports = [settings.metrics_port + slot
+                     for slot in range(max(settings.workers, 1))]
+        for port in ports:
+            try:
+                self.server = await asyncio.start_server(
+                    _serve_scrape, settings.metrics_host, port
+                )
+                break
+            except OSError as e:
+                error = e
+        else:
+            logger.warning(
+                f"Metrics ports {ports[0]}-{ports[-1]} unavailable, not "
+                f"serving metrics from this process: {str(error)}"
+            )
+            return
+        port = self.server.sockets[0].getsockname()[1]
+        logger.info(f"Serving metrics on {settings.metrics_host}:"
+                    f"{port}/metrics")
+
+    async def stop(self) -> None:
+        if self.lag_task is not None:
+            self.lag_task.cancel()
+            try:
+                await self.lag_task
+            except asyncio.CancelledError:
+                pass
+            self.lag_task = None
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+
+
+_monitoring = Monitoring()
+
+
+async def start_monitoring() -> None:
+    """Start exporting metrics when ENABLE_METRICS is set"""
+    if get_settings().enable_metrics:
+        await _monitoring.start()
+
+
+async def stop_monitoring() -> None:
+    await _monitoring.stop()
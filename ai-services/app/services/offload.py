@@ -0,0 +1,372 @@
+"""
+Execution layer for blocking work: CPU-bound audio stages run in a process
+pool, blocking I/O in a thread pool, and both report their queue depth
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+import numpy as np
+
+from app.utils.config import get_settings
+from app.utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Arrays at least this large cross the process boundary through shared
+# memory; smaller ones are cheaper to pickle
+SHARE_MIN_BYTES = 256 * 1024
+
+# Buckets (seconds) for time waiting for a worker and time running
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+RUN_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0)
+
+POOL_WAIT_SECONDS = REGISTRY.histogram(
+    "echoscribe_pool_wait_seconds",
+    "Time offloaded calls waited for a free worker",
+    WAIT_BUCKETS,
+    ("pool",),
+)
+POOL_RUN_SECONDS = REGISTRY.histogram(
+    "echoscribe_pool_run_seconds",
+    "Time offloaded calls ran in a worker",
+    RUN_BUCKETS,
+    ("pool",),
+)
+
+# CPU workers yield the CPU to the serving process, so request handling
+# and health checks are not queued behind them
+CPU_WORKER_NICENESS = 10
+
+# Imported once by the fork server, so each worker starts with them
+CPU_WORKER_PRELOAD = [
+    "app.services.offload", "app.utils.audio", "app.utils.preprocess",
+    "app.utils.vad",
+]
+
+
+class PoolStats:
+    """Queue depth and wait/run time of one pool, updated from any thread"""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.in_flight = 0
+        self.submitted = 0
+        self.failed = 0
+        self.wait_seconds = POOL_WAIT_SECONDS.labels(name)
+        self.run_seconds = POOL_RUN_SECONDS.labels(name)
+        self._lock = threading.Lock()
+
+    def enter(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.submitted += 1
+
+    def exit(self, failed: bool = False) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.failed += failed
+
+    @property
+    def queued(self) -> int:
+        """Calls waiting for a free worker"""
+        return max(0, self.in_flight - self.workers)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "submitted": self.submitted,
+            "failed": self.failed,
+            "wait_seconds_histogram": self.wait_seconds.snapshot(),
+            "run_seconds_histogram": self.run_seconds.snapshot(),
+        }
+
+
+class InstrumentedThreadPool(ThreadPoolExecutor):
+    """
+    Thread pool for blocking I/O. Installed as the event loop's default
+    executor, so asyncio.to_thread and run_in_executor(None, ...) calls
+    are counted too.
+    """
+
+    def __init__(self, workers: int, name: str = "io"):
+        super().__init__(max_workers=workers, thread_name_prefix=name)
+        self.pool_stats = PoolStats(name, workers)
+
+    def submit(self, fn, /, *args, **kwargs):
+        stats = self.pool_stats
+        submitted = time.perf_counter()
+
+        def call():
+            started = time.perf_counter()
+            stats.wait_seconds.observe(started - submitted)
+            failed = True
+            try:
+                result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                stats.run_seconds.observe(time.perf_counter() - started)
+                stats.exit(failed)
+
+        stats.enter()
+        try:
+            return super().submit(call)
+        except BaseException:
+            stats.exit(failed=True)
+            raise
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    """Picklable handle to an array in a named shared memory block"""
+
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+def share(array: np.ndarray) -> Tuple[SharedArray, SharedMemory]:
+    """Copy an array into a new shared memory block"""
+    block = SharedMemory(create=True, size=max(array.nbytes, 1))
+    view = np.ndarray(array.shape, array.dtype, buffer=block.buf)
+    view[...] = array
+    return SharedArray(block.name, array.shape, array.dtype.str), block
+
+
+def _pack(value: Any, blocks: List[SharedMemory]) -> Any:
+    """
+    Replace large arrays (also inside tuples, lists and dicts) with
+    handles
+    """
+    if isinstance(value, np.ndarray) and value.nbytes >= SHARE_MIN_BYTES:
+        handle, block = share(value)
+        blocks.append(block)
+        return handle
+    if isinstance(value, (tuple, list)):
+        return type(value)(_pack(item, blocks) for item in value)
+    if isinstance(value, dict):
+        return {key: _pack(item, blocks) for key, item in value.items()}
+    return value
+
+
+def _unpack(value: Any, blocks: List[SharedMemory], copy: bool) -> Any:
+    """
+    Replace handles with arrays: views of the shared block, or copies
+    when the block is about to be released
+    """
+    if isinstance(value, SharedArray):
+        block = SharedMemory(name=value.name)
+        blocks.append(block)
+        view = np.ndarray(value.shape, np.dtype(value.dtype),
+                          buffer=block.buf)
+        return view.copy() if copy else view
+    if isinstance(value, (tuple, list)):
+        return type(value)(_unpack(item, blocks, copy) for item in value)
+    if isinstance(value, dict):
+        return {key: _unpack(item, blocks, copy)
+                for key, item in value.items()}
+    return value
+
+
+def _release(blocks: List[SharedMemory], unlink: bool) -> None:
+    for block in blocks:
+        try:
+            block.close()
+        except BufferError:
+            # A view is still referenced; the mapping goes with it
+            pass
+        if unlink:
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _call_in_worker(
+    fn: Callable, args: tuple, kwargs: Dict[str, Any]
+) -> Tuple[float, Any]:
+    """
+    Runs in a pool process: reads shared arguments in place, and writes a
+    large result to a new shared block that the caller releases
+    """
+    started = time.time()
+    inputs: List[SharedMemory] = []
+    args, kwargs = _unpack((args, kwargs), inputs, copy=False)
+    outputs: List[SharedMemory] = []
+    try:
+        result = _pack(fn(*args, **kwargs), outputs)
+    except BaseException:
+        _release(outputs, unlink=True)
+        raise
+    finally:
+        # Only a small result sliced from an input still refers to it,
+        # and keeps that mapping open until it has been pickled
+        del args, kwargs
+        _release(inputs, unlink=False)
+    _release(outputs, unlink=False)
+    return started, result
+
+
+def _lower_priority() -> None:
+    try:
+        os.nice(CPU_WORKER_NICENESS)
+    except OSError:
+        pass
+
+
+class CpuPool:
+    """
+    Process pool for CPU-bound stages, so numpy, librosa and scipy work
+    never holds the serving process's GIL or event loop. Workers are
+    started by a fork server (forking the threaded serving process could
+    copy a lock held by another thread) and run at lower priority. Large
+    arrays in the arguments and result are passed through shared memory
+    instead of being pickled through a pipe.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.pool_stats = PoolStats("cpu", workers)
+        self._executor: Optional[Executor] = None
+        self._running: Set[asyncio.Future] = set()
+
+    def executor(self) -> Executor:
+        if self._executor is None:
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(CPU_WORKER_PRELOAD)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_lower_priority,
+            )
+            logger.info(f"Started CPU pool with {self.workers} processes")
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        # A cancelled caller stops waiting, but the call runs on to the
+        # end so its shared memory is always released
+        task = asyncio.ensure_future(self._run(fn, args, kwargs))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+        return await asyncio.shield(task)
+
+    async def _run(
+        self, fn: Callable[..., T], args: tuple, kwargs: Dict[str, Any]
+    ) -> T:
+        stats = self.pool_stats
+        blocks: List[SharedMemory] = []
+        outputs: List[SharedMemory] = []
+        stats.enter()
+        failed = True
+        try:
+            # Copying a long recording takes long enough to stall the
+            # loop, so it happens on a thread
+            packed_args, packed_kwargs = await asyncio.to_thread(
+                _pack, (args, kwargs), blocks
+            )
+            executor = self.executor()
+            submitted = time.time()
+            try:
+                started, result = await asyncio.get_running_loop() \
+                    .run_in_executor(executor, _call_in_worker, fn,
+                                     packed_args, packed_kwargs)
+            except BrokenProcessPool:
+                # A worker died (killed, or out of memory) and took the
+                # pool with it; the next call starts a new one
+                if self._executor is executor:
+                    logger.error("A CPU pool process died; restarting")
+                    self._executor = None
+                    executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            stats.wait_seconds.observe(max(started - submitted, 0.0))
+            stats.run_seconds.observe(time.time() - started)
+            result = await asyncio.to_thread(_unpack, result, outputs, True)
+            failed = False
+            return result
+        finally:
+            stats.exit(failed)
+            _release(outputs, unlink=True)
+            _release(blocks, unlink=True)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+_cpu_pool: Optional[CpuPool] = None
+_io_pool: Optional[InstrumentedThreadPool] = None
+
+
+def get_cpu_pool() -> CpuPool:
+    """Get the process-wide CPU pool, sized by CPU_LIMIT"""
+    global _cpu_pool
+    if _cpu_pool is None:
+        _cpu_pool = CpuPool(max(1, get_settings().cpu_limit))
+    return _cpu_pool
+
+
+async def run_cpu(fn: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run a CPU-bound function (importable at module level) off the event
+    loop: in the process pool, or a thread when ENABLE_PROCESS_POOL is off
+    """
+    if not get_settings().enable_process_pool:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return await get_cpu_pool().run(fn, *args, **kwargs)
+
+
+def install_io_pool(
+    loop: asyncio.AbstractEventLoop,
+) -> InstrumentedThreadPool:
+    """Make an instrumented thread pool the loop's default executor"""
+    global _io_pool
+    # IO_THREADS=0 keeps asyncio's own default size
+    workers = get_settings().io_threads \
+        or min(32, (os.cpu_count() or 1) + 4)
+    _io_pool = InstrumentedThreadPool(workers)
+    loop.set_default_executor(_io_pool)
+    return _io_pool
+
+
+def offload_stats() -> Dict[str, Dict[str, Any]]:
+    pools = {}
+    if _cpu_pool is not None:
+        pools["cpu"] = _cpu_pool.pool_stats.stats()
+    if _io_pool is not None:
+        pools["io"] = _io_pool.pool_stats.stats()
+    return pools
+
+
+def close_offload() -> None:
+    """Stop the CPU pool; the loop shuts its default executor down itself"""
+    global _cpu_pool, _io_pool
+    if _cpu_pool is not None:
+        _cpu_pool.close()
+    _cpu_pool = None
+    _io_pool = None
@@ -0,0 +1,307 @@
+"""
+Token-bucket rate limiting of upstream requests and tokens, shared by every
+worker process through Redis or a local state file
+"""
+
+import asyncio
+import fcntl
+import logging
+import math
+import os
+import struct
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.utils.config import get_settings
+from app.utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Buckets (seconds) for how long a call waited for quota
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+REQUESTS = "requests"
+TOKENS = "tokens"
+
+
+@dataclass(frozen=True)
+class Bucket:
+    """A per-minute quota; holds at most burst_seconds worth of it"""
+
+    name: str
+    per_minute: float
+    burst_seconds: float = 60.0
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60.0
+
+    @property
+    def capacity(self) -> float:
+        return self.rate * self.burst_seconds
+
+
+def reserve_levels(
+    buckets: Sequence[Bucket],
+    levels: List[Tuple[float, float]],
+    costs: Dict[str, float],
+    now: float,
+) -> float:
+    """
+    Refill each (level, updated) pair in place up to now and take the
+    costs from it. Levels may go negative: the debt is the queue of
+    callers ahead, and the returned wait is how long until the deepest
+    bucket is paid off. Negative costs hand quota back.
+    """
+    wait = 0.0
+    for i, bucket in enumerate(buckets):
+        level, updated = levels[i]
+        if math.isnan(level):
+            level, updated = bucket.capacity, now
+        level = min(
+            bucket.capacity,
+            level + max(now - updated, 0.0) * bucket.rate,
+        )
+        level -= costs.get(bucket.name, 0.0)
+        levels[i] = (min(level, bucket.capacity), now)
+        if level < 0:
+            wait = max(wait, -level / bucket.rate)
+    return wait
+
+
+class LocalBucketStore:
+    """Bucket state for a single process"""
+
+    kind = "local"
+
+    def __init__(self, buckets: Sequence[Bucket]):
+        self.buckets = list(buckets)
+        self._levels = [(math.nan, 0.0)] * len(self.buckets)
+
+    async def reserve(self, costs: Dict[str, float]) -> float:
+        return reserve_levels(self.buckets, self._levels, costs, time.time())
+
+
+class FileBucketStore:
+    """
+    Bucket state in a small file shared by the worker processes on one
+    host. Every reservation is one read-modify-write under an exclusive
+    flock, which takes microseconds, so it runs inline.
+    """
+
+    kind = "file"
+
+    def __init__(self, buckets: Sequence[Bucket], path: str):
+        self.buckets = list(buckets)
+        self.path = path
+        self._format = "<" + "dd" * len(self.buckets)
+        self._size = struct.calcsize(self._format)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    async def reserve(self, costs: Dict[str, float]) -> float:
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            raw = os.pread(self._fd, self._size, 0)
+            if len(raw) == self._size:
+                values = struct.unpack(self._format, raw)
+                levels = list(zip(values[::2], values[1::2]))
+            else:
+                levels = [(math.nan, 0.0)] * len(self.buckets)
+            wait = reserve_levels(self.buckets, levels, costs, time.time())
+            flat = [value for pair in levels for value in pair]
+            os.pwrite(self._fd, struct.pack(self._format, *flat), 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return wait
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+# KEYS: one hash per bucket; ARGV: rate, capacity, cost per bucket.
+# Uses the Redis clock so workers on different hosts agree on time.
+RESERVE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 3 - 2])
+    local capacity = tonumber(ARGV[i * 3 - 1])
+    local cost = tonumber(ARGV[i * 3])
+    local state = redis.call('HMGET', key, 'level', 'updated')
+    local level = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    level = math.min(capacity, level + math.max(now - updated, 0) * rate)
+    level = level - cost
+    level = math.min(level, capacity)
+    redis.call('HSET', key, 'level', tostring(level), 'updated',
+               tostring(now))
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 60)
+    if level < 0 then
+        wait = math.max(wait, -level / rate)
+    end
+end
+return tostring(wait)
+"""
+
+
+class RedisBucketStore:
+    """Bucket state in Redis, updated atomically by a Lua script"""
+
+    kind = "redis"
+
+    def __init__(self, buckets: Sequence[Bucket], redis: Any, prefix: str):
+        self.buckets = list(buckets)
+        self.keys = [f"{prefix}{bucket.name}" for bucket in self.buckets]
+        self._script = redis.register_script(RESERVE_SCRIPT)
+
+    async def reserve(self, costs: Dict[str, float]) -> float:
+        args: List[float] = []
+        for bucket in self.buckets:
+            args += [bucket.rate, bucket.capacity,
+                     costs.get(bucket.name, 0.0)]
+        wait = await self._script(keys=self.keys, args=args)
+        return float(wait.decode() if isinstance(wait, bytes) else wait)
+
+
+class RateLimiter:
+    """
+    Admits calls in arrival order once every bucket can cover their cost.
+    A call reserves its cost up front, driving the bucket into debt when
+    callers are already queued, and sleeps until its share has refilled,
+    so callers are served first come first served across workers and
+    never fail for lack of quota. A call abandoned while it waits (for
+    example at its deadline) hands its reservation back.
+    """
+
+    def __init__(self, name: str, store: Any):
+        self.name = name
+        self.store = store
+        self.calls = 0
+        self.delayed = 0
+        self.waiting = 0
+        self.admitted: Dict[str, float] = {
+            bucket.name: 0.0 for bucket in store.buckets
+        }
+        self.wait_seconds = Histogram(WAIT_BUCKETS)
+
+    async def acquire(self, **costs: float) -> float:
+        """Wait until the costs fit the quota; returns the wait in seconds"""
+        self.calls += 1
+        wait = await self.store.reserve(costs)
+        self.wait_seconds.observe(wait)
+        if wait > 0:
+            self.delayed += 1
+            self.waiting += 1
+            try:
+                await asyncio.sleep(wait)
+            except BaseException:
+                await asyncio.shield(
+                    self.store.reserve({k: -v for k, v in costs.items()})
+                )
+                raise
+            finally:
+                self.waiting -= 1
+        for bucket, cost in costs.items():
+            if bucket in self.admitted:
+                self.admitted[bucket] += cost
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "store": self.store.kind,
+            "limits_per_minute": {
+                bucket.name: bucket.per_minute
+                for bucket in self.store.buckets
+            },
+            "calls": self.calls,
+            "delayed": self.delayed,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "wait_seconds_histogram": self.wait_seconds.snapshot(),
+        }
+
+
+def estimate_request_tokens(texts: Sequence[str], max_tokens: int) -> int:
+    """
+    Tokens OpenAI counts against the per-minute limit when a request is
+    made: about one per four characters of input plus max_tokens
+    """
+    return sum(len(text) for text in texts) // 4 + max_tokens
+
+
+def build_store(name: str, buckets: Sequence[Bucket]) -> Any:
+    """
+    Pick where bucket state lives: Redis when REDIS_URL is set, a state
+    file when several workers share the host, otherwise this process
+    """
+    settings = get_settings()
+    kind = settings.rate_limit_store
+    if kind == "auto":
+        if settings.redis_url:
+            kind = "redis"
+        elif settings.workers > 1:
+            kind = "file"
+        else:
+            kind = "local"
+    if kind == "redis":
+        from app.services.cache import _connect_redis
+
+        redis = _connect_redis(settings.redis_url) if settings.redis_url \
+            else None
+        if redis is not None:
+            prefix = f"{settings.cache_prefix}ratelimit:{name}:"
+            return RedisBucketStore(buckets, redis, prefix)
+        logger.warning(f"Redis unavailable for the {name} rate limiter; "
+                       f"sharing limits through a file instead")
+        kind = "file"
+    if kind == "file":
+        path = os.path.join(settings.rate_limit_dir, f"{name}.state")
+        return FileBucketStore(buckets, path)
+    return LocalBucketStore(buckets)
+
+
+_limiters: Dict[str, Optional[RateLimiter]] = {}
+
+
+def get_rate_limiter(
+    name: str,
+    requests_per_minute: int,
+    tokens_per_minute: int = 0,
+) -> Optional[RateLimiter]:
+    """
+    Get the process-wide limiter for an upstream, or None when it has no
+    limits configured
+    """
+    if name not in _limiters:
+        settings = get_settings()
+        burst = settings.rate_limit_burst_seconds
+        buckets = [
+            Bucket(bucket, limit, burst)
+            for bucket, limit in ((REQUESTS, requests_per_minute),
+                                  (TOKENS, tokens_per_minute))
+            if limit > 0
+        ]
+        _limiters[name] = (
+            RateLimiter(name, build_store(name, buckets)) if buckets
+            else None
+        )
+    return _limiters[name]
+
+
+def rate_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    return {
+        name: limiter.stats()
+        for name, limiter in _limiters.items() if limiter is not None
+    }
+
+
+def reset_rate_limiters() -> None:
+    for limiter in _limiters.values():
+        if limiter is not None and hasattr(limiter.store, "close"):
+            limiter.store.close()
+    _limiters.clear()
@@ -0,0 +1,177 @@
+"""
+Readiness for traffic: warm-up before the first request, and backing off
+while the service is saturated
+"""
+
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.middleware.admission import admission_stats
+from app.services.http_client import openai_client
+from app.services.model_registry import get_model_registry
+from app.services.offload import get_cpu_pool, run_cpu
+from app.utils.audio import decode_audio, encode_audio, encode_wav
+from app.utils.config import get_settings
+from app.utils.startup import startup_profile
+from app.utils.vad import VoiceActivityDetector
+
+logger = logging.getLogger(__name__)
+
+# Synthetic inputs: enough to run every code path once, nothing more
+WARMUP_SENTENCES = [
+    "The launch is on track and the team is happy with the progress.",
+    "The vendor contract is late and that is a risk.",
+    "Let's meet again on Friday.",
+]
+WARMUP_AUDIO_RATE = 44100  # not the target rate, so resampling runs too
+
+# Seconds allowed for pre-opening an upstream connection
+UPSTREAM_CONNECT_TIMEOUT = 10.0
+
+
+def exercise_audio() -> None:
+    """
+    Decode, resample, detect speech in and re-encode a second of noise,
+    importing the audio libraries and filling their caches
+    """
+    settings = get_settings()
+    rng = np.random.default_rng(0)
+    noise = rng.normal(0, 0.1, WARMUP_AUDIO_RATE).astype(np.float32)
+    samples, rate = decode_audio(
+        encode_wav(noise, WARMUP_AUDIO_RATE), settings.audio_sample_rate
+    )
+    VoiceActivityDetector(
+        rate,
+        frame_length=settings.audio_chunk_size,
+        floor_db=settings.audio_silence_threshold_db,
+    ).detect(samples)
+    encode_audio(samples, rate, settings.transcription_upload_format)
+
+
+class Readiness:
+    """
+    Whether this process should be sent traffic. It is not ready until
+    warm-up has finished, and stops being ready while the wait queue of
+    any route class is at least queue_fraction full, so a load balancer
+    sends new requests elsewhere until it drains. Warm-up steps that fail
+    are logged and reported but do not block readiness: the work they
+    would have done happens on first use instead.
+    """
+
+    def __init__(self, queue_fraction: float):
+        self.queue_fraction = queue_fraction
+        self.warmed_up = False
+        self.ready_after: Optional[float] = None
+        self.steps: Dict[str, float] = {}
+        self.failures: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def _step(
+        self, name: str, run: Callable[[], Awaitable[Any]]
+    ) -> None:
+        start = time.perf_counter()
+        try:
+            await run()
+        except Exception as e:
+            self.failures[name] = str(e) or type(e).__name__
+            logger.warning(f"Warm-up step {name} failed: {e}")
+        self.steps[name] = round(time.perf_counter() - start, 4)
+
+    async def warm_up(self, models: Iterable[str] = ()) -> None:
+        """
+        Load and run each model on synthetic input, exercise the audio
+        pipeline, and open upstream connections and worker pools
+        """
+        settings = get_settings()
+        start = time.perf_counter()
+        registry = get_model_registry()
+
+        for name in models:
+            async def run_model(name: str = name) -> None:
+                model = await registry.get(name)
+                await asyncio.to_thread(model.predict, WARMUP_SENTENCES)
+            await self._step(f"model:{name}", run_model)
+
+        await self._step("audio", lambda: asyncio.to_thread(exercise_audio))
+
+        if settings.openai_api_key and not settings.mock_openai:
+            async def connect_openai() -> None:
+                # Opens (and keeps) a pooled connection to the API host
+                client = openai_client(
+                    settings.openai_api_key, UPSTREAM_CONNECT_TIMEOUT
+                )
+                await asyncio.wait_for(
+                    client.models.list(), UPSTREAM_CONNECT_TIMEOUT
+                )
+            await self._step("upstream:openai", connect_openai)
+
+        if settings.enable_process_pool:
+            # Starts every worker process and imports the audio libraries
+            # in each
+            workers = get_cpu_pool().workers
+            await self._step(
+                "cpu_pool",
+                lambda: asyncio.gather(
+                    *(run_cpu(exercise_audio) for _ in range(workers))
+                ),
+            )
+
+        startup_profile.mark("warmup", start)
+        self.mark_warmed_up()
+
+    def mark_warmed_up(self) -> None:
+        self.warmed_up = True
+        self.ready_after = round(
+            time.perf_counter() - startup_profile.started, 4
+        )
+        logger.info(
+            f"Ready for traffic {self.ready_after:.2f}s after import"
+        )
+
+    def start_warm_up(self, models: Iterable[str] = ()) -> asyncio.Task:
+        """Warm up in the background, so liveness answers meanwhile"""
+        self._task = asyncio.create_task(self.warm_up(list(models)))
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def saturated(self) -> List[str]:
+        """Route classes whose admission queue is too full"""
+        return [
+            name for name, stats in admission_stats().items()
+            if stats["queue_size"]
+            and stats["queued"] >= self.queue_fraction * stats["queue_size"]
+        ]
+
+    def check(self) -> Dict[str, Any]:
+        reasons = []
+        if not self.warmed_up:
+            reasons.append("warming up")
+        reasons.extend(f"{name} saturated" for name in self.saturated())
+        return {"ready": not reasons, "reasons": reasons}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "warmed_up": self.warmed_up,
+            "ready_after_seconds": self.ready_after,
+            "warmup_seconds": dict(self.steps),
+            "warmup_failures": dict(self.failures),
+        }
+
+
+@lru_cache()
+def get_readiness() -> Readiness:
+    """Get the process-wide readiness state"""
+    return Readiness(get_settings().readiness_queue_fraction)
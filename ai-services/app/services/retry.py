@@ -0,0 +1,400 @@
+"""
+Retries for upstream AI calls: error classification, full-jitter backoff,
+Retry-After, per-upstream retry budgets, circuit breakers and deadlines
+"""
+
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+import httpx
+
+from app.services.errors import (
+    AIServiceError,
+    CircuitOpenError,
+    DeadlineExceeded,
+    RetryableError,
+)
+from app.utils.config import get_settings
+from app.utils.metrics import SIZE_BUCKETS, Histogram, time_stage
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: timeouts, conflicts, rate limits, server errors
+RETRYABLE_STATUS = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+# Monotonic time by which the current request must finish
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[float]:
+    """
+    Bound everything awaited inside the block, including tasks it starts,
+    to finish within seconds. Nested deadlines only ever tighten.
+    """
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        at = min(at, current)
+    _deadline.set(at)
+    try:
+        yield at
+    finally:
+        # Not Token.reset: an abandoned coroutine may be closed from
+        # another context
+        _deadline.set(current)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None without one"""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def status_code_of(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        response = getattr(exc, "response", None)
+        status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """
+    Transient failures only: network errors, timeouts and retryable
+    statuses. Client errors, validation failures and anything unknown
+    fail straight away.
+    """
+    if isinstance(exc, RetryableError):
+        return True
+    status = status_code_of(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError,
+                        httpx.TransportError)):
+        return True
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(exc, openai.APIConnectionError)
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Delay the upstream asked for, from Retry-After(-Ms) if present"""
+    if isinstance(exc, RetryableError) and exc.retry_after is not None:
+        return exc.retry_after
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+def full_jitter(attempt: int, base: float, cap: float) -> float:
+    """Uniform delay up to the capped exponential backoff for attempt"""
+    return random.uniform(0.0, min(cap, base * 2 ** attempt))
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a share of calls. Every call deposits
+    ratio tokens and a retry spends one; min_per_second tokens trickle in
+    regardless, so a quiet upstream can still be retried.
+    """
+
+    def __init__(
+        self,
+        ratio: float,
+        min_per_second: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = max(10.0, min_per_second * 10)
+        self.clock = clock
+        self.balance = self.capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.balance = min(
+            self.capacity,
+            self.balance + (now - self._updated) * self.min_per_second,
+        )
+        self._updated = now
+
+    def record_call(self) -> None:
+        self._refill()
+        self.balance = min(self.capacity, self.balance + self.ratio)
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self.balance < 1.0:
+            return False
+        self.balance -= 1.0
+        return True
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive transient failures, fails
+    calls fast for reset_timeout seconds, then lets one probe through;
+    the probe's outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN:
+            if self.clock() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN \
+                or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+            self._probing = False
+
+    def release(self) -> None:
+        """
+        The attempt ended without telling whether the upstream is healthy
+        (it was cancelled); let the next call probe instead
+        """
+        self._probing = False
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a probe through"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(self.reset_timeout - (self.clock() - self.opened_at), 0.0)
+
+
+class Upstream:
+    """Retry budget, circuit breaker and counters for one upstream"""
+
+    def __init__(
+        self,
+        name: str,
+        budget: RetryBudget,
+        breaker: CircuitBreaker,
+    ):
+        self.name = name
+        self.budget = budget
+        self.breaker = breaker
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+        self.budget_exhausted = 0
+        self.short_circuited = 0
+        self.deadline_exceeded = 0
+        self.attempts_per_call = Histogram(SIZE_BUCKETS)
+
+    async def call(
+        self,
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+        max_attempts: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 20.0,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Await func(*args, **kwargs), retrying transient failures with
+        full-jitter backoff (or the upstream's Retry-After) while the
+        retry budget, the circuit breaker and the caller's deadline allow.
+        Every attempt is cut off at the deadline. Gives up with an
+        AIServiceError chained to the last failure.
+        """
+        self.calls += 1
+        self.budget.record_call()
+        attempt = 0
+        try:
+            while True:
+                self._check_deadline(None)
+                if not self.breaker.allow():
+                    self.short_circuited += 1
+                    retry_in = self.breaker.retry_in()
+                    raise CircuitOpenError(
+                        f"{self.name} circuit is open; retry in "
+                        f"{retry_in:.1f}s",
+                        retry_in,
+                    )
+                probing = self.breaker.state == CircuitBreaker.HALF_OPEN
+
+                attempt += 1
+                self.attempts += 1
+                try:
+                    left = remaining()
+                    with time_stage("upstream"):
+                        if left is None:
+                            result = await func(*args, **kwargs)
+                        else:
+                            result = await asyncio.wait_for(
+                                func(*args, **kwargs), left
+                            )
+                except Exception as e:
+                    if not is_retryable(e):
+                        if status_code_of(e) is not None:
+                            # The upstream answered, so it is healthy
+                            self.breaker.record_success()
+                        elif probing:
+                            # Failed before reaching the upstream, so
+                            # it says nothing about its health
+                            self.breaker.release()
+                        self.failures += 1
+                        raise AIServiceError(
+                            f"{self.name} call failed: {str(e)}"
+                        ) from e
+                    self.breaker.record_failure()
+                    self._check_deadline(e)
+                    if attempt >= max_attempts:
+                        self.failures += 1
+                        raise AIServiceError(
+                            f"{self.name} failed after {attempt} attempts: "
+                            f"{str(e)}"
+                        ) from e
+                    if not self.budget.try_spend():
+                        self.budget_exhausted += 1
+                        self.failures += 1
+                        raise AIServiceError(
+                            f"{self.name} retry budget exhausted: {str(e)}"
+                        ) from e
+
+                    delay = retry_after(e)
+                    if delay is None:
+                        delay = full_jitter(attempt - 1, base_delay, max_delay)
+                    left = remaining()
+                    if left is not None and delay >= left:
+                        self.deadline_exceeded += 1
+                        raise DeadlineExceeded(
+                            f"{self.name} retry in {delay:.2f}s would pass "
+                            f"the deadline: {str(e)}"
+                        ) from e
+                    logger.warning(
+                        f"{self.name} attempt {attempt}/{max_attempts} "
+                        f"failed, retrying in {delay:.2f}s: {str(e)}"
+                    )
+                    self.retries += 1
+                    await asyncio.sleep(delay)
+                except BaseException:
+                    # Cancelled mid-attempt: no outcome to record, but a
+                    # half-open probe must not stay claimed for good
+                    if probing:
+                        self.breaker.release()
+                    raise
+                else:
+                    self.breaker.record_success()
+                    return result
+        finally:
+            self.attempts_per_call.observe(attempt)
+
+    def _check_deadline(self, cause: Optional[BaseException]) -> None:
+        left = remaining()
+        if left is not None and left <= 0:
+            self.deadline_exceeded += 1
+            raise DeadlineExceeded(
+                f"{self.name} deadline passed"
+            ) from cause
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "amplification": (
+                round(self.attempts / self.calls, 3) if self.calls else 0.0
+            ),
+            "failures": self.failures,
+            "budget_exhausted": self.budget_exhausted,
+            "short_circuited": self.short_circuited,
+            "deadline_exceeded": self.deadline_exceeded,
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.times_opened,
+            "attempts_histogram": self.attempts_per_call.snapshot(),
+        }
+
+
+_upstreams: Dict[str, Upstream] = {}
+
+
+def get_upstream(name: str) -> Upstream:
+    """Get the process-wide retry state for an upstream"""
+    upstream = _upstreams.get(name)
+    if upstream is None:
+        settings = get_settings()
+        upstream = Upstream(
+            name,
+            RetryBudget(
+                settings.retry_budget_ratio,
+                settings.retry_budget_min_per_second,
+            ),
+            CircuitBreaker(
+                settings.circuit_failure_threshold,
+                settings.circuit_reset_timeout,
+            ),
+        )
+        _upstreams[name] = upstream
+    return upstream
+
+
+def upstream_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: up.stats() for name, up in _upstreams.items()}
+
+
+def reset_upstreams() -> None:
+    _upstreams.clear()
@@ -0,0 +1,123 @@
+"""
+Per-segment sentiment analysis on locally loaded models
+"""
+
+import asyncio
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.ai_service import BaseAIService
+from app.services.model_registry import (
+    ModelRegistry,
+    SequenceClassifier,
+    get_model_registry,
+)
+from app.utils.metrics import time_stage
+from app.utils.text import split_sentences
+
+
+def predict_batched(
+    model: SequenceClassifier, texts: List[str], batch_size: int
+) -> np.ndarray:
+    """
+    Run the model over texts in padded batches. Texts are sorted by length
+    first so each batch pads to a similar length, then results are put
+    back in input order.
+    """
+    probs = np.zeros((len(texts), len(model.labels)), dtype=np.float32)
+    order = np.argsort([len(t) for t in texts], kind="stable")
+    for offset in range(0, len(texts), batch_size):
+        indices = order[offset:offset + batch_size]
+        probs[indices] = model.predict([texts[i] for i in indices])
+    return probs
+
+
+class SentimentService(BaseAIService):
+    """Sentiment analysis over transcript segments"""
+
+    def __init__(
+        self,
+        registry: Optional[ModelRegistry] = None,
+        model_name: Optional[str] = None,
+        batch_size: Optional[int] = None,
+    ):
+        super().__init__()
+        self.registry = registry or get_model_registry()
+        self.model_name = model_name or self.settings.hf_sentiment_model
+        self.batch_size = batch_size or self.settings.sentiment_batch_size
+
+    async def process(self, text: str) -> Dict[str, Any]:
+        return await self.analyze(text)
+
+    async def classify(self, texts: List[str]) -> np.ndarray:
+        """
+        Return class probabilities for each text, in input order. Segments
+        from concurrent requests share forward passes via the micro-batcher.
+        """
+        rows = await self.run_batched(
+            self.model_name, texts, self._predict, self.batch_size
+        )
+        return np.vstack(rows)
+
+    async def _predict(self, texts: List[str]) -> List[np.ndarray]:
+        model = await self.registry.get(self.model_name)
+        with time_stage("inference"):
+            probs = await asyncio.to_thread(
+                predict_batched, model, texts, self.batch_size
+            )
+        return list(probs)
+
+    async def analyze(self, text: str) -> Dict[str, Any]:
+        """Classify each segment and aggregate an overall sentiment"""
+        self.validate_input(text, min_length=1)
+        return await self.analyze_segments(split_sentences(text))
+
+    async def analyze_segments(self, segments: List[str]) -> Dict[str, Any]:
+        """Classify pre-split segments and aggregate an overall sentiment"""
+        model = await self.registry.get(self.model_name)
+        probs = await self.classify(segments)
+        return self.aggregate(model.labels, segments, probs)
+
+    def aggregate(
+        self, labels: List[str], segments: List[str], probs: np.ndarray
+    ) -> Dict[str, Any]:
+        confidence = probs.max(axis=1)
+        # Low-confidence segments are noise for the overall verdict unless
+        # nothing clears the threshold
+        confident = confidence >= self.settings.sentiment_threshold
+        mask = confident if confident.any() else np.ones_like(confident)
+        weights = np.array([len(s) for s in segments], dtype=np.float32)
+        weights = weights * mask
+        overall = (probs * weights[:, None]).sum(axis=0) / weights.sum()
+
+        if "positive" in labels and "negative" in labels:
+            score = (overall[labels.index("positive")]
+                     - overall[labels.index("negative")] + 1) / 2
+        else:
+            score = overall.max()
+
+        return {
+            "overall_sentiment": labels[int(overall.argmax())],
+            "sentiment_score": round(float(score), 4),
+            "emotions": {
+                label: round(float(p), 4) for label, p in zip(labels, overall)
+            },
+            "confidence_score": round(float(confidence[mask].mean()), 4),
+            "segments": [
+                {
+                    "id": i,
+                    "text": segment,
+                    "sentiment": labels[int(row.argmax())],
+                    "confidence": round(float(row.max()), 4),
+                }
+                for i, (segment, row) in enumerate(zip(segments, probs))
+            ],
+        }
+
+
+@lru_cache()
+def get_sentiment_service() -> SentimentService:
+    """Get the shared sentiment service"""
+    return SentimentService()
@@ -0,0 +1,45 @@
+"""
+Latency and failure model for the offline (mock) upstream backends
+"""
+
+import asyncio
+import math
+import random
+from typing import Optional
+
+from app.services.errors import RetryableError
+
+
+class UpstreamSimulator:
+    """
+    Delays each call by a log-normally distributed latency (median
+    `latency` seconds, spread `sigma`, so a few calls land far in the
+    tail as real upstreams do) and fails a share `error_rate` of calls
+    with a transient error. A seed makes a run reproducible.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        sigma: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+
+    def sample_latency(self) -> float:
+        if self.latency <= 0:
+            return 0.0
+        if self.sigma <= 0:
+            return self.latency
+        return self.latency * math.exp(self.rng.gauss(0.0, self.sigma))
+
+    async def __call__(self, what: str = "upstream call") -> None:
+        delay = self.sample_latency()
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise RetryableError(f"Simulated {what} failure")
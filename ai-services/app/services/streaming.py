@@ -0,0 +1,324 @@
+"""
+Live transcription of a PCM audio stream with incremental results
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.services.transcription_engine import (
+    AudioChunk,
+    TranscriptionBackend,
+)
+from app.utils.audio import frame_rms
+from app.utils.config import Settings, get_settings
+from app.utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Endpointing frame length in seconds
+FRAME_SECONDS = 0.03
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+time_to_first_segment = Histogram(LATENCY_BUCKETS)
+end_of_speech_to_final = Histogram(LATENCY_BUCKETS)
+
+SendMessage = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+@dataclass
+class Utterance:
+    """A span of speech queued for transcription"""
+    index: int
+    start: float  # seconds from the start of the stream
+    samples: np.ndarray
+    final: bool
+    # Loop time when the last voiced frame arrived
+    speech_ended_at: float
+
+
+def pcm16_to_float(data: bytes) -> np.ndarray:
+    """Convert little-endian 16-bit PCM bytes to float32 samples"""
+    return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+
+
+class StreamingSession:
+    """
+    Turns a live PCM stream into utterances and transcribes them in order.
+
+    Incoming audio is endpointed by frame energy: an utterance ends after
+    stream_silence_ms of silence or when it reaches
+    stream_max_utterance_seconds. While an utterance is open, a partial
+    transcription of it is queued every stream_partial_interval seconds.
+
+    Finished utterances wait in a bounded queue. When the queue is full,
+    feed() blocks on finals so the caller stops reading from the client,
+    and partials are dropped because a newer one will follow.
+    """
+
+    def __init__(
+        self,
+        backend: TranscriptionBackend,
+        send: SendMessage,
+        sample_rate: int,
+        language: str = "en",
+        settings: Optional[Settings] = None,
+    ):
+        self.backend = backend
+        self.send = send
+        self.sample_rate = sample_rate
+        self.language = language
+        self.settings = settings or get_settings()
+
+        self.frame_length = max(1, int(FRAME_SECONDS * sample_rate))
+        self.silence_frames = max(1, int(
+            self.settings.stream_silence_ms / 1000 / FRAME_SECONDS
+        ))
+        self.partial_samples = int(
+            self.settings.stream_partial_interval * sample_rate
+        )
+        self.max_utterance_samples = int(
+            self.settings.stream_max_utterance_seconds * sample_rate
+        )
+
+        self._queue: "asyncio.Queue[Optional[Utterance]]" = asyncio.Queue(
+            maxsize=self.settings.stream_max_pending
+        )
+        self._worker: Optional[asyncio.Task] = None
+        self._leftover = b""
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._position = 0  # samples endpointed so far
+        self._frames: List[np.ndarray] = []
+        self._utterance_start: Optional[int] = None
+        self._utterance_samples = 0
+        self._silent_run = 0
+        self._last_partial_at = 0
+        self._last_voice_time = 0.0
+        self._finalized = -1
+        self._disconnected = False
+
+        self.started_at: Optional[float] = None
+        self.first_segment_latency: Optional[float] = None
+        self.final_latencies: List[float] = []
+        self.utterances = 0
+        self.partials_sent = 0
+        self.partials_dropped = 0
+
+    def start(self) -> None:
+        self._worker = asyncio.create_task(self._run())
+
+    async def feed(self, data: bytes) -> None:
+        """Add a frame of PCM16 audio, waiting if the queue is full"""
+        loop = asyncio.get_running_loop()
+        if self.started_at is None:
+            self.started_at = loop.time()
+
+        data = self._leftover + data
+        usable = len(data) - len(data) % 2
+        self._leftover = data[usable:]
+        samples = np.concatenate(
+            [self._remainder, pcm16_to_float(data[:usable])]
+        )
+
+        n_frames = len(samples) // self.frame_length
+        self._remainder = samples[n_frames * self.frame_length:]
+        if n_frames == 0:
+            return
+        frames = samples[:n_frames * self.frame_length]
+        voiced = frame_rms(frames, self.frame_length) \
+            >= self.settings.stream_energy_threshold
+
+        for i, is_voiced in enumerate(voiced):
+            frame = frames[i * self.frame_length:(i + 1) * self.frame_length]
+            await self._endpoint(frame, bool(is_voiced), loop.time())
+
+    async def _endpoint(
+        self, frame: np.ndarray, voiced: bool, now: float
+    ) -> None:
+        position = self._position
+        self._position += len(frame)
+
+        if self._utterance_start is None:
+            if not voiced:
+                return
+            self._utterance_start = position
+            self._last_partial_at = 0
+
+        self._frames.append(frame)
+        self._utterance_samples += len(frame)
+        if voiced:
+            self._silent_run = 0
+            self._last_voice_time = now
+        else:
+            self._silent_run += 1
+
+        if self._silent_run >= self.silence_frames \
+                or self._utterance_samples >= self.max_utterance_samples:
+            await self._close_utterance()
+        elif self._utterance_samples - self._last_partial_at \
+                >= self.partial_samples:
+            self._last_partial_at = self._utterance_samples
+            self._offer_partial()
+
+    def _current(self, final: bool) -> Utterance:
+        return Utterance(
+            index=self.utterances,
+            start=self._utterance_start / self.sample_rate,
+            samples=np.concatenate(self._frames),
+            final=final,
+            speech_ended_at=self._last_voice_time,
+        )
+
+    def _offer_partial(self) -> None:
+        try:
+            self._queue.put_nowait(self._current(final=False))
+        except asyncio.QueueFull:
+            self.partials_dropped += 1
+
+    async def _close_utterance(self) -> None:
+        if self._utterance_start is None:
+            return
+        utterance = self._current(final=True)
+        self._finalized = utterance.index
+        self.utterances += 1
+        self._frames = []
+        self._utterance_start = None
+        self._utterance_samples = 0
+        self._silent_run = 0
+        # Blocks while the worker is behind, which applies backpressure
+        await self._queue.put(utterance)
+
+    async def finish(self) -> None:
+        """Flush the open utterance and wait for every result to be sent"""
+        if self._remainder.size:
+            voiced = frame_rms(self._remainder, len(self._remainder))
+            loop = asyncio.get_running_loop()
+            await self._endpoint(
+                self._remainder,
+                bool(voiced[0] >= self.settings.stream_energy_threshold),
+                loop.time(),
+            )
+            self._remainder = np.zeros(0, dtype=np.float32)
+        await self._close_utterance()
+        await self._queue.put(None)
+        if self._worker is not None:
+            await self._worker
+
+    async def close(self) -> None:
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            utterance = await self._queue.get()
+            if utterance is None:
+                return
+            if self._disconnected:
+                # Keep draining so a blocked feed() can return
+                continue
+            if not utterance.final and utterance.index <= self._finalized:
+                # The final for this utterance is already queued
+                self.partials_dropped += 1
+                continue
+
+            chunk = AudioChunk(
+                index=utterance.index,
+                start=utterance.start,
+                end=utterance.start
+                + len(utterance.samples) / self.sample_rate,
+                keep_start=utterance.start,
+                keep_end=utterance.start
+                + len(utterance.samples) / self.sample_rate,
+                samples=utterance.samples,
+                sample_rate=self.sample_rate,
+            )
+            try:
+                result = await self.backend.transcribe(chunk, self.language)
+            except Exception as e:
+                logger.warning(
+                    f"Stream utterance {utterance.index} failed: {str(e)}"
+                )
+                await self._deliver({
+                    "type": "error",
+                    "utterance": utterance.index,
+                    "detail": str(e),
+                })
+                continue
+
+            if not await self._deliver(
+                self._message(utterance, chunk, result)
+            ):
+                continue
+            now = loop.time()
+            if result.get("text") and self.first_segment_latency is None:
+                self.first_segment_latency = now - self.started_at
+                time_to_first_segment.observe(self.first_segment_latency)
+            if utterance.final:
+                latency = now - utterance.speech_ended_at
+                self.final_latencies.append(latency)
+                end_of_speech_to_final.observe(latency)
+            else:
+                self.partials_sent += 1
+
+    async def _deliver(self, message: Dict[str, Any]) -> bool:
+        try:
+            await self.send(message)
+            return True
+        except Exception as e:
+            logger.info(f"Stream client went away: {str(e)}")
+            self._disconnected = True
+            return False
+
+    def _message(
+        self,
+        utterance: Utterance,
+        chunk: AudioChunk,
+        result: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        segments = [
+            {
+                "start": round(chunk.start + float(s["start"]), 3),
+                "end": round(chunk.start + float(s["end"]), 3),
+                "text": s["text"],
+                "confidence": s.get("confidence"),
+            }
+            for s in result.get("segments", [])
+        ]
+        return {
+            "type": "final" if utterance.final else "partial",
+            "utterance": utterance.index,
+            "start": round(chunk.start, 3),
+            "end": round(chunk.end, 3),
+            "text": result.get("text", ""),
+            "segments": segments,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = self.final_latencies
+        return {
+            "utterances": self.utterances,
+            "partials_sent": self.partials_sent,
+            "partials_dropped": self.partials_dropped,
+            "audio_seconds": round(self._position / self.sample_rate, 3),
+            "time_to_first_segment": self.first_segment_latency,
+            "mean_end_of_speech_to_final": (
+                sum(latencies) / len(latencies) if latencies else None
+            ),
+        }
+
+
+def streaming_stats() -> Dict[str, Any]:
+    """Latency distributions across all streaming sessions"""
+    return {
+        "time_to_first_segment": time_to_first_segment.snapshot(),
+        "end_of_speech_to_final": end_of_speech_to_final.snapshot(),
+    }
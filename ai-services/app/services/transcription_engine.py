@@ -0,0 +1,470 @@
+"""
+Chunked, parallel transcription engine for long recordings
+"""
+
+import asyncio
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.ai_service import BaseAIService
+from app.services.errors import RetryableError
+from app.services.http_client import openai_client
+from app.services.offload import run_cpu
+from app.services.rate_limiter import RateLimiter, get_rate_limiter
+from app.services.simulation import UpstreamSimulator
+from app.utils.audio import encode_audio, frame_rms
+from app.utils.config import Settings, get_settings
+from app.utils.metrics import time_stage
+from app.utils.preprocess import TimeMap, condense_silence
+
+logger = logging.getLogger(__name__)
+
+# Frame length (seconds) used when searching for silence near a chunk cut
+SILENCE_FRAME_SECONDS = 0.05
+# Longest word run compared when removing text repeated across a cut
+MAX_OVERLAP_WORDS = 8
+
+# Awaited with (chunk index, chunk result, chunks done, chunks total)
+ChunkCallback = Callable[[int, Dict[str, Any], int, int], Awaitable[None]]
+
+
+@dataclass
+class AudioChunk:
+    """A slice of decoded audio with its position in the recording"""
+    index: int
+    start: float
+    end: float
+    # Region this chunk is authoritative for; the rest is overlap context
+    keep_start: float
+    keep_end: float
+    samples: np.ndarray
+    sample_rate: int
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class TranscriptionBackend(ABC):
+    """Speech-to-text provider that transcribes a single chunk"""
+
+    name: str = "base"
+
+    @abstractmethod
+    async def transcribe(
+        self, chunk: AudioChunk, language: str
+    ) -> Dict[str, Any]:
+        """
+        Transcribe a chunk and return {"text", "segments", "language"}.
+        Segment start/end are relative to the start of the chunk.
+        """
+        pass
+
+
+class WhisperBackend(TranscriptionBackend):
+    """OpenAI Whisper transcription backend"""
+
+    name = "whisper"
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        timeout: float,
+        encoding: str = "wav",
+        rate_limiter: Optional[RateLimiter] = None,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.encoding = encoding
+        self.rate_limiter = rate_limiter
+
+    async def transcribe(
+        self, chunk: AudioChunk, language: str
+    ) -> Dict[str, Any]:
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(requests=1)
+        payload = await run_cpu(
+            encode_audio, chunk.samples, chunk.sample_rate, self.encoding
+        )
+        client = openai_client(self.api_key, self.timeout)
+        response = await client.audio.transcriptions.create(
+            model=self.model,
+            file=(f"chunk-{chunk.index}.{self.encoding}", payload),
+            language=language,
+            response_format="verbose_json",
+        )
+        data = response.model_dump() if hasattr(response, "model_dump") \
+            else dict(response)
+
+        segments = [
+            {
+                "start": float(segment["start"]),
+                "end": float(segment["end"]),
+                "text": segment["text"].strip(),
+                "confidence": float(
+                    math.exp(segment.get("avg_logprob", 0.0))
+                ),
+            }
+            for segment in data.get("segments") or []
+        ]
+        return {
+            "text": data.get("text", "").strip(),
+            "segments": segments,
+            "language": data.get("language", language),
+        }
+
+
+class FakeTranscriptionBackend(TranscriptionBackend):
+    """
+    Offline backend for tests and benchmarks.
+
+    Emits one word per second of recording time ("w0", "w1", ...) so that
+    overlapping chunks produce identical text for identical audio, which
+    lets callers check stitching without a network.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        fail_first: int = 0,
+        latency_sigma: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.simulator = UpstreamSimulator(
+            latency, latency_sigma, error_rate, seed
+        )
+        self.fail_first = fail_first
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def transcribe(
+        self, chunk: AudioChunk, language: str
+    ) -> Dict[str, Any]:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await self.simulator("transcription")
+            if self.calls <= self.fail_first:
+                raise RetryableError("Simulated transcription failure")
+
+            segments = []
+            first = math.floor(chunk.start)
+            for second in range(first, math.ceil(chunk.end)):
+                start = max(float(second), chunk.start)
+                end = min(float(second + 1), chunk.end)
+                # Whisper drops words that are mostly cut off at the edges
+                if end - start < 0.5:
+                    continue
+                segments.append({
+                    "start": start - chunk.start,
+                    "end": end - chunk.start,
+                    "text": f"w{second}",
+                    "confidence": 0.99,
+                })
+            return {
+                "text": " ".join(s["text"] for s in segments),
+                "segments": segments,
+                "language": language,
+            }
+        finally:
+            self.in_flight -= 1
+
+
+def plan_chunks(
+    samples: np.ndarray,
+    sample_rate: int,
+    chunk_seconds: float,
+    overlap_seconds: float,
+    search_seconds: float,
+) -> List[Tuple[float, float]]:
+    """
+    Choose cut points near every chunk_seconds boundary, snapped to the
+    quietest frame within +/- search_seconds, and return the authoritative
+    (start, end) spans between consecutive cuts.
+    """
+    duration = len(samples) / sample_rate
+    if duration <= chunk_seconds + overlap_seconds:
+        return [(0.0, duration)]
+
+    frame_length = max(1, int(SILENCE_FRAME_SECONDS * sample_rate))
+    energy = frame_rms(samples, frame_length)
+    frame_seconds = frame_length / sample_rate
+
+    cuts = [0.0]
+    while duration - cuts[-1] > chunk_seconds + overlap_seconds:
+        target = cuts[-1] + chunk_seconds
+        lo = int(max(cuts[-1] + chunk_seconds / 2, target - search_seconds)
+                 / frame_seconds)
+        hi = int(min(duration, target + search_seconds) / frame_seconds)
+        hi = min(hi, len(energy))
+        if hi <= lo:
+            cuts.append(target)
+            continue
+        quietest = lo + int(np.argmin(energy[lo:hi]))
+        cuts.append((quietest + 0.5) * frame_seconds)
+    cuts.append(duration)
+
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def split_audio(
+    samples: np.ndarray,
+    sample_rate: int,
+    chunk_seconds: float,
+    overlap_seconds: float,
+    search_seconds: float,
+) -> List[AudioChunk]:
+    """Split audio into silence-aligned chunks padded by overlap context"""
+    duration = len(samples) / sample_rate
+    spans = plan_chunks(
+        samples, sample_rate, chunk_seconds, overlap_seconds, search_seconds
+    )
+
+    chunks = []
+    for index, (keep_start, keep_end) in enumerate(spans):
+        start = max(0.0, keep_start - overlap_seconds)
+        end = min(duration, keep_end + overlap_seconds)
+        chunks.append(AudioChunk(
+            index=index,
+            start=start,
+            end=end,
+            keep_start=keep_start,
+            keep_end=keep_end,
+            # Slicing a contiguous array is a view, not a copy
+            samples=samples[int(start * sample_rate):int(end * sample_rate)],
+            sample_rate=sample_rate,
+        ))
+    return chunks
+
+
+def _dedupe_overlap(previous: List[str], current: List[str]) -> int:
+    """Return how many leading words of current repeat previous's tail"""
+    limit = min(len(previous), len(current), MAX_OVERLAP_WORDS)
+    normalize = str.lower
+    for size in range(limit, 0, -1):
+        tail = [normalize(w) for w in previous[-size:]]
+        head = [normalize(w) for w in current[:size]]
+        if tail == head:
+            return size
+    return 0
+
+
+def stitch_results(
+    chunks: List[AudioChunk], results: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Merge per-chunk results into one transcript with global timestamps.
+
+    A segment belongs to the chunk whose authoritative span contains its
+    midpoint; anything else is overlap context and is dropped. Words that
+    still repeat across a cut (a segment straddling it) are removed.
+    """
+    segments: List[Dict[str, Any]] = []
+    confidences: List[float] = []
+
+    for chunk, result in zip(chunks, results):
+        first_in_chunk = True
+        for segment in result.get("segments", []):
+            start = chunk.start + float(segment["start"])
+            end = chunk.start + float(segment["end"])
+            midpoint = (start + end) / 2
+            is_last = chunk.index == len(chunks) - 1
+            if midpoint < chunk.keep_start:
+                continue
+            if midpoint >= chunk.keep_end and not is_last:
+                continue
+
+            words = segment["text"].split()
+            if segments and first_in_chunk:
+                repeated = _dedupe_overlap(
+                    segments[-1]["text"].split(), words
+                )
+                words = words[repeated:]
+            first_in_chunk = False
+            if not words:
+                continue
+
+            segments.append({
+                "id": len(segments),
+                "start": round(max(start, 0.0), 3),
+                "end": round(end, 3),
+                "text": " ".join(words),
+                "confidence": segment.get("confidence"),
+            })
+            if segment.get("confidence") is not None:
+                confidences.append(float(segment["confidence"]))
+
+    language = next(
+        (r.get("language") for r in results if r.get("language")), None
+    )
+    return {
+        "transcript": " ".join(s["text"] for s in segments),
+        "segments": segments,
+        "language": language,
+        "confidence_score": float(np.mean(confidences)) if confidences
+        else 0.0,
+    }
+
+
+def trim_silence(
+    samples: np.ndarray, sample_rate: int, settings: Settings
+) -> Tuple[np.ndarray, TimeMap]:
+    """Drop silence that would otherwise be uploaded and billed"""
+    return condense_silence(
+        samples,
+        sample_rate,
+        threshold_db=settings.audio_silence_threshold_db,
+        min_silence=settings.audio_min_silence,
+        padding=settings.audio_silence_padding,
+        frame_length=settings.audio_chunk_size,
+    )
+
+
+class TranscriptionEngine(BaseAIService):
+    """Splits recordings into chunks and transcribes them concurrently"""
+
+    def __init__(
+        self,
+        backend: TranscriptionBackend,
+        max_concurrency: Optional[int] = None,
+    ):
+        super().__init__()
+        self.backend = backend
+        self.max_concurrency = (
+            max_concurrency or self.settings.max_concurrent_requests
+        )
+
+    async def process(self, *args, **kwargs) -> Dict[str, Any]:
+        return await self.transcribe(*args, **kwargs)
+
+    async def transcribe(
+        self,
+        samples: np.ndarray,
+        sample_rate: int,
+        language: str = "en",
+        completed: Optional[Dict[int, Dict[str, Any]]] = None,
+        on_chunk: Optional[ChunkCallback] = None,
+    ) -> Dict[str, Any]:
+        """
+        Transcribe decoded mono audio and return a stitched result.
+
+        Silence is cut out first when audio_trim_silence is set, and
+        segment timestamps are mapped back to the original recording.
+        Chunk boundaries are deterministic for the same audio and settings,
+        so results in completed (keyed by chunk index) from an earlier
+        attempt are reused instead of being transcribed again. on_chunk is
+        awaited with (index, result, done, total) as each chunk finishes.
+        """
+        duration = len(samples) / sample_rate
+        if self.settings.audio_trim_silence:
+            with time_stage("preprocess"):
+                samples, time_map = await run_cpu(
+                    trim_silence, samples, sample_rate, self.settings
+                )
+        else:
+            time_map = TimeMap.identity(duration)
+        if samples.size == 0:
+            self.logger.info(f"No speech found in {duration:.1f}s of audio")
+            return {
+                "transcript": "",
+                "segments": [],
+                "language": language,
+                "confidence_score": 0.0,
+                "duration": duration,
+                "speech_duration": 0.0,
+                "chunks": 0,
+            }
+
+        chunks = split_audio(
+            samples,
+            sample_rate,
+            chunk_seconds=self.settings.transcription_chunk_seconds,
+            overlap_seconds=self.settings.transcription_chunk_overlap,
+            search_seconds=self.settings.transcription_silence_search,
+        )
+        completed = dict(completed or {})
+        self.logger.info(
+            f"Transcribing {time_map.compact_duration:.1f}s of speech from "
+            f"{duration:.1f}s of audio in {len(chunks)} chunks "
+            f"({len(completed)} already done, "
+            f"concurrency={self.max_concurrency}, "
+            f"backend={self.backend.name})"
+        )
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        start_time = time.time()
+
+        async def attempt(chunk: AudioChunk) -> Dict[str, Any]:
+            # Held per attempt, so a chunk backing off between retries
+            # leaves its slot to one that can call the upstream
+            async with semaphore:
+                return await self.backend.transcribe(chunk, language)
+
+        async def run(chunk: AudioChunk) -> Dict[str, Any]:
+            if chunk.index in completed:
+                return completed[chunk.index]
+            result = await self.process_with_retry(
+                attempt,
+                chunk,
+                max_retries=self.settings.openai_max_retries,
+                delay=self.settings.openai_retry_delay,
+                upstream=self.backend.name,
+            )
+            completed[chunk.index] = result
+            if on_chunk is not None:
+                await on_chunk(
+                    chunk.index, result, len(completed), len(chunks)
+                )
+            return result
+
+        results = await asyncio.gather(*(run(chunk) for chunk in chunks))
+        stitched = stitch_results(chunks, results)
+        time_map.apply(stitched["segments"])
+        stitched["duration"] = duration
+        stitched["speech_duration"] = time_map.compact_duration
+        stitched["language"] = stitched["language"] or language
+        stitched["chunks"] = len(chunks)
+
+        self.logger.info(
+            f"Transcribed {len(chunks)} chunks in "
+            f"{time.time() - start_time:.2f}s"
+        )
+        return stitched
+
+
+@lru_cache()
+def get_transcription_engine() -> TranscriptionEngine:
+    """Get the shared transcription engine for the configured backend"""
+    settings = get_settings()
+    if settings.mock_openai:
+        backend: TranscriptionBackend = FakeTranscriptionBackend(
+            latency=settings.mock_latency,
+            latency_sigma=settings.mock_latency_sigma,
+            error_rate=settings.mock_error_rate,
+            seed=settings.mock_seed,
+        )
+    else:
+        backend = WhisperBackend(
+            api_key=settings.openai_api_key,
+            model=settings.openai_whisper_model,
+            timeout=settings.openai_timeout,
+            encoding=settings.transcription_upload_format,
+            rate_limiter=get_rate_limiter(
+                WhisperBackend.name, settings.whisper_rpm_limit
+            ),
+        )
+    return TranscriptionEngine(backend)
@@ -0,0 +1,124 @@
+"""
+Queue handlers that run transcription jobs in the background
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict
+
+from app.services.diarization import get_diarization_service
+from app.services.http_client import get_http_client
+from app.services.job_queue import Job, JobQueue
+from app.services.offload import run_cpu
+from app.services.transcription_engine import get_transcription_engine
+from app.utils.audio import decode_audio_file
+from app.utils.config import get_settings
+from app.utils.metrics import time_stage
+from app.utils.upload import AudioSpool, AudioUrlRejected, check_audio_url
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPTION_JOB = "transcription"
+MAX_AUDIO_REDIRECTS = 5
+
+
+async def _download_audio(url: str) -> str:
+    """
+    Stream a remote recording into the spool, enforcing upload limits.
+    Redirects are followed by hand, so every hop is checked like the
+    submitted URL.
+    """
+    settings = get_settings()
+    spool = AudioSpool(
+        settings.job_spool_dir,
+        settings.max_audio_size_bytes,
+        settings.supported_audio_formats_list,
+    )
+    client = get_http_client()
+    for _ in range(MAX_AUDIO_REDIRECTS + 1):
+        await check_audio_url(url, settings.audio_url_allowed_hosts_list)
+        async with client.stream(
+            "GET", url, timeout=settings.request_timeout,
+            follow_redirects=False,
+        ) as response:
+            if response.is_redirect:
+                url = str(response.url.join(response.headers["location"]))
+                continue
+            response.raise_for_status()
+            ingested = await spool.consume(response.aiter_bytes())
+        return ingested.path
+    raise AudioUrlRejected(
+        f"audio_url redirected more than {MAX_AUDIO_REDIRECTS} times"
+    )
+
+
+def _discard_spool(payload: Dict[str, Any]) -> None:
+    path = payload.get("audio_path")
+    if path and os.path.exists(path):
+        os.unlink(path)
+
+
+async def run_transcription_job(job: Job, queue: JobQueue) -> Dict[str, Any]:
+    """
+    Transcribe the job's audio, checkpointing every finished chunk so a
+    retried or recovered job only transcribes what is still missing.
+    """
+    settings = get_settings()
+    engine = get_transcription_engine()
+    payload = job.payload
+
+    try:
+        if payload.get("audio_path"):
+            with time_stage("decode"):
+                samples, sample_rate = await run_cpu(
+                    decode_audio_file,
+                    payload["audio_path"],
+                    settings.audio_sample_rate,
+                )
+        else:
+            path = await _download_audio(payload["audio_url"])
+            try:
+                with time_stage("decode"):
+                    samples, sample_rate = await run_cpu(
+                        decode_audio_file, path, settings.audio_sample_rate
+                    )
+            finally:
+                os.unlink(path)
+        completed = await asyncio.to_thread(queue.store.load_chunks, job.id)
+
+        async def on_chunk(
+            index: int, result: Dict[str, Any], done: int, total: int
+        ) -> None:
+            await asyncio.to_thread(
+                queue.store.save_chunk, job.id, index, result
+            )
+            await queue.report_progress(job, done, total)
+
+        result = await engine.transcribe(
+            samples,
+            sample_rate,
+            payload.get("language", "en"),
+            completed=completed,
+            on_chunk=on_chunk,
+        )
+        speakers = None
+        if settings.enable_diarization and result["segments"]:
+            speakers = await get_diarization_service().label_segments(
+                samples, sample_rate, result["segments"]
+            )
+    except Exception:
+        if job.attempts >= queue.max_attempts:
+            _discard_spool(payload)
+        raise
+
+    _discard_spool(payload)
+    return {
+        "meeting_id": payload.get("meeting_id"),
+        "transcript": result["transcript"],
+        "confidence_score": result["confidence_score"],
+        "language": result["language"],
+        "duration": result["duration"],
+        "segments": result["segments"],
+        "speakers": speakers,
+    }
@@ -0,0 +1,241 @@
+"""
+Record upstream HTTP exchanges and replay them offline with their
+original timing
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Response headers that describe the connection rather than the body.
+# Bodies are stored as sent, so content-encoding is kept.
+DROPPED_HEADERS = {
+    "content-length", "transfer-encoding", "connection", "keep-alive",
+    "set-cookie",
+}
+
+
+def _normalized_body(request: httpx.Request) -> bytes:
+    body = request.content
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        try:
+            return json.dumps(
+                json.loads(body), sort_keys=True, separators=(",", ":")
+            ).encode()
+        except ValueError:
+            return body
+    if "boundary=" in content_type:
+        # Multipart boundaries are random per request
+        boundary = content_type.split("boundary=", 1)[1].split(";")[0]
+        return body.replace(boundary.strip('"').encode(), b"BOUNDARY")
+    return body
+
+
+def fingerprint(request: httpx.Request) -> str:
+    """
+    Identify a request by method, URL and body, ignoring headers (API keys,
+    SDK retry counters) and the random parts of the encoding
+    """
+    digest = hashlib.sha256()
+    url = request.url
+    query = "&".join(sorted(url.query.decode().split("&")))
+    for part in (request.method, url.host, url.path, query):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    digest.update(_normalized_body(request))
+    return digest.hexdigest()
+
+
+class Cassette:
+    """
+    Recorded exchanges in a JSON-lines file, one per line in the order
+    they completed. Identical requests recorded several times (retries,
+    repeated prompts) are replayed in that order, then from the start.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._records: Dict[str, List[Dict[str, Any]]] = {}
+        self._next: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> int:
+        self._records.clear()
+        self._next.clear()
+        count = 0
+        with open(self.path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self._records.setdefault(
+                        record["fingerprint"], []
+                    ).append(record)
+                    count += 1
+        return count
+
+    def next_for(self, key: str) -> Optional[Dict[str, Any]]:
+        records = self._records.get(key)
+        if not records:
+            return None
+        index = self._next.get(key, 0)
+        self._next[key] = (index + 1) % len(records)
+        return records[index]
+
+    def append(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(line)
+
+
+def _encode_body(content: bytes) -> Dict[str, str]:
+    try:
+        return {"body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_base64": base64.b64encode(content).decode()}
+
+
+def _decode_body(record: Dict[str, Any]) -> bytes:
+    if "body_base64" in record:
+        return base64.b64decode(record["body_base64"])
+    return record.get("body", "").encode("utf-8")
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """
+    Pass requests to the network and append each exchange, with the time
+    to response headers and to the end of the body, to a cassette. Bodies
+    are read in full before being handed on.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport,
+                 cassette: Cassette):
+        self._transport = transport
+        self.cassette = cassette
+        self.recorded = 0
+
+    async def handle_async_request(
+        self, request: httpx.Request
+    ) -> httpx.Response:
+        await request.aread()
+        start = time.perf_counter()
+        response = await self._transport.handle_async_request(request)
+        headers_at = time.perf_counter() - start
+        try:
+            content = b"".join([chunk async for chunk in response.stream])
+        finally:
+            await response.aclose()
+        total = time.perf_counter() - start
+
+        headers = [(k, v) for k, v in response.headers.items()
+                   if k.lower() not in DROPPED_HEADERS]
+        record = {
+            "fingerprint": fingerprint(request),
+            "method": request.method,
+            "url": str(request.url.copy_with(query=None)),
+            "status": response.status_code,
+            "headers": headers,
+            "headers_seconds": round(headers_at, 6),
+            "total_seconds": round(total, 6),
+            **_encode_body(content),
+        }
+        await asyncio.to_thread(self.cassette.append, record)
+        self.recorded += 1
+        # An unread stream, so the pool sees the body closed and frees
+        # its host slot (content= would mark it read already)
+        return httpx.Response(
+            response.status_code,
+            headers=headers,
+            stream=httpx.ByteStream(content),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": "record", "path": self.cassette.path,
+                "recorded": self.recorded}
+
+
+class _DelayedStream(httpx.AsyncByteStream):
+    """Body that arrives after the recorded transfer time"""
+
+    def __init__(self, content: bytes, delay: float):
+        self._content = content
+        self._delay = delay
+
+    async def __aiter__(self):
+        if self._delay > 0:
+            await asyncio.sleep(self._delay)
+        yield self._content
+
+    async def aclose(self) -> None:
+        pass
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Answer requests from a cassette with no network, waiting the recorded
+    time to headers and then to the end of the body, scaled by
+    latency_scale (0 replays instantly). A request with no recording gets
+    a 404 so it fails fast instead of being retried.
+    """
+
+    def __init__(self, cassette: Cassette, latency_scale: float = 1.0):
+        self.cassette = cassette
+        self.latency_scale = latency_scale
+        self.hits = 0
+        self.misses = 0
+
+    async def handle_async_request(
+        self, request: httpx.Request
+    ) -> httpx.Response:
+        await request.aread()
+        record = self.cassette.next_for(fingerprint(request))
+        if record is None:
+            self.misses += 1
+            logger.warning(
+                f"No recorded response for {request.method} "
+                f"{request.url.copy_with(query=None)}"
+            )
+            body = json.dumps({"error": {
+                "message": "No recorded response for this request",
+                "type": "replay_miss",
+            }}).encode()
+            return httpx.Response(
+                404,
+                headers={"content-type": "application/json"},
+                stream=httpx.ByteStream(body),
+            )
+
+        self.hits += 1
+        headers_at = record["headers_seconds"] * self.latency_scale
+        transfer = (record["total_seconds"] - record["headers_seconds"]) \
+            * self.latency_scale
+        if headers_at > 0:
+            await asyncio.sleep(headers_at)
+        return httpx.Response(
+            record["status"],
+            headers=record["headers"],
+            stream=_DelayedStream(_decode_body(record), transfer),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": "replay", "path": self.cassette.path,
+                "hits": self.hits, "misses": self.misses,
+                "latency_scale": self.latency_scale}
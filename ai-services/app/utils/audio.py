@@ -0,0 +1,117 @@
+"""
+Audio decoding and encoding helpers shared by the transcription services
+"""
+
+import io
+import logging
+import mmap
+import os
+import tempfile
+from typing import Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def to_mono(
+    samples: np.ndarray, source_rate: int, sample_rate: int
+) -> Tuple[np.ndarray, int]:
+    """Downmix (frames, channels) audio and resample it to sample_rate"""
+    if samples.ndim == 2:
+        # A matrix-vector product downmixes several times faster than
+        # mean(axis=1) over interleaved frames
+        channels = samples.shape[1]
+        samples = samples @ np.full(channels, 1 / channels, samples.dtype)
+    if source_rate != sample_rate:
+        import librosa
+
+        samples = librosa.resample(
+            samples, orig_sr=source_rate, target_sr=sample_rate
+        )
+    return np.ascontiguousarray(samples, dtype=np.float32), sample_rate
+
+
+def decode_audio(data: bytes, sample_rate: int) -> Tuple[np.ndarray, int]:
+    """Decode an audio container into mono float32 samples at sample_rate"""
+    import soundfile as sf
+
+    try:
+        samples, source_rate = sf.read(
+            io.BytesIO(data), dtype="float32", always_2d=True
+        )
+    except (RuntimeError, sf.LibsndfileError):
+        # libsndfile cannot parse every container (m4a/webm); fall back to
+        # librosa, which needs a real path for its audioread backends
+        with tempfile.NamedTemporaryFile(delete=False) as tmp:
+            tmp.write(data)
+            path = tmp.name
+        try:
+            return decode_audio_file(path, sample_rate)
+        finally:
+            os.unlink(path)
+
+    return to_mono(samples, source_rate, sample_rate)
+
+
+def decode_audio_file(path: str, sample_rate: int) -> Tuple[np.ndarray, int]:
+    """
+    Decode an audio file on disk without reading it into memory first;
+    libsndfile pulls pages from a read-only memory map as it decodes
+    """
+    import soundfile as sf
+
+    try:
+        with open(path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            samples, source_rate = sf.read(
+                view, dtype="float32", always_2d=True
+            )
+    except (RuntimeError, sf.LibsndfileError):
+        import librosa
+
+        samples, source_rate = librosa.load(path, sr=None, mono=True)
+
+    return to_mono(samples, source_rate, sample_rate)
+
+
+# Frames handed to the encoder per write call
+ENCODE_BLOCK_FRAMES = 65536
+
+# soundfile (format, subtype) for each upload encoding
+ENCODINGS = {
+    "wav": ("WAV", "PCM_16"),
+    "flac": ("FLAC", "PCM_16"),
+    "ogg": ("OGG", "VORBIS"),
+}
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    """Encode mono float32 samples as 16-bit PCM WAV bytes"""
+    return encode_audio(samples, sample_rate, "wav")
+
+
+def encode_audio(
+    samples: np.ndarray, sample_rate: int, encoding: str
+) -> bytes:
+    """Encode mono float32 samples as wav, flac or ogg (Vorbis) bytes"""
+    import soundfile as sf
+
+    container, subtype = ENCODINGS[encoding]
+    buffer = io.BytesIO()
+    with sf.SoundFile(
+        buffer, "w", sample_rate, 1, format=container, subtype=subtype
+    ) as f:
+        # libsndfile's Vorbis encoder crashes on very large single writes
+        for start in range(0, len(samples), ENCODE_BLOCK_FRAMES):
+            f.write(samples[start:start + ENCODE_BLOCK_FRAMES])
+    return buffer.getvalue()
+
+
+def frame_rms(samples: np.ndarray, frame_length: int) -> np.ndarray:
+    """Compute RMS energy over non-overlapping frames"""
+    n_frames = len(samples) // frame_length
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:n_frames * frame_length].reshape(n_frames, frame_length)
+    return np.sqrt(np.mean(np.square(frames), axis=1))
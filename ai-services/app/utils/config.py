@@ -4,11 +4,15 @@ Configuration management for AI services
 
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+import hmac
 import os
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from dataclasses import dataclass
 
+# Inference backends for local transformers models
+MODEL_BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
 
 @dataclass
 class ValidationResult:
@@ -71,19 +75,98 @@ class Settings(BaseSettings):
     max_concurrent_requests: int = 10
     request_timeout: int = 300
     memory_limit: int = 2048
-    cpu_limit: int = 2
+    cpu_limit: int = 2  # processes in the CPU-bound work pool
+    enable_process_pool: bool = True  # else CPU-bound stages use threads
+    io_threads: int = 0  # blocking I/O threads; 0 uses asyncio's default
+    
+    # Admission Control Configuration (per route class, limit is
+    # MAX_CONCURRENT_REQUESTS)
+    admission_control_enabled: bool = True
+    admission_queue_size: int = 50
+    admission_queue_timeout: float = 10.0
+    admission_adaptive: bool = False
+    admission_latency_target: float = 30.0
+    admission_min_limit: int = 1
+    
+    # HTTP Client Configuration (per-host limit is MAX_CONCURRENT_REQUESTS)
+    http_max_connections: int = 100
+    http_max_keepalive: int = 20
+    http_keepalive_expiry: float = 30.0
+    upstream_replay_mode: str = "off"  # off, record or replay
+    upstream_replay_path: str = "./jobs/upstream.jsonl"
+    upstream_replay_latency_scale: float = 1.0  # 0 replays instantly
+    http2_enabled: bool = False
+    
+    # Retry Configuration (attempts and base delay are OPENAI_MAX_RETRIES
+    # and OPENAI_RETRY_DELAY)
+    retry_max_delay: float = 20.0
+    retry_budget_ratio: float = 0.2
+    retry_budget_min_per_second: float = 1.0
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 30.0
+    
+    # Rate Limit Configuration (per minute, 0 disables; shared by workers)
+    openai_rpm_limit: int = 0
+    openai_tpm_limit: int = 0
+    whisper_rpm_limit: int = 0
+    rate_limit_burst_seconds: float = 10.0
+    rate_limit_store: str = "auto"  # auto, local, file or redis
+    rate_limit_dir: str = "./jobs/ratelimit"
+    
+    # Job Queue Configuration
+    job_workers: int = 2
+    job_max_attempts: int = 3
+    job_poll_interval: float = 1.0
+    job_stale_after: float = 60.0
+    job_store_path: str = "./jobs/jobs.db"
+    job_spool_dir: str = "./jobs/spool"
     
     # Model Configuration
     model_cache_size: int = 3
     model_load_timeout: int = 120
     enable_model_preload: bool = False
+    enable_warmup: bool = True  # exercise models and pools before ready
     cleanup_models_on_shutdown: bool = True
+    sentiment_batch_size: int = 32
+    model_backend: str = "torch"  # torch, onnx or onnx-int8
+    model_backend_overrides: str = ""  # model=backend,...
+    onnx_threads: int = 0  # intra-op threads per session; 0 uses every core
+    
+    # Micro-batching Configuration
+    batch_max_size: int = 32
+    batch_max_wait_ms: float = 5.0
+    batch_overrides: str = ""  # model=max_size:max_wait_ms,...
     
     # Audio Processing Configuration
     max_audio_size: str = "50MB"
     supported_audio_formats: str = "mp3,wav,mp4,webm,ogg,flac,m4a"
+    audio_url_allowed_hosts: str = ""  # host,...; empty allows public hosts
     audio_sample_rate: int = 16000
     audio_chunk_size: int = 1024
+    transcription_chunk_seconds: int = 300
+    transcription_chunk_overlap: float = 2.0
+    transcription_silence_search: float = 10.0
+    transcription_upload_format: str = "flac"  # wav, flac or ogg
+    audio_trim_silence: bool = True
+    audio_silence_threshold_db: float = -40.0  # frame RMS in dBFS
+    audio_min_silence: float = 1.0  # shorter internal pauses are kept
+    audio_silence_padding: float = 0.25  # seconds kept around speech
+    
+    # Streaming Transcription Configuration
+    stream_energy_threshold: float = 0.01  # frame RMS counted as speech
+    stream_silence_ms: int = 600  # trailing silence that ends an utterance
+    stream_partial_interval: float = 1.0  # seconds of speech between partials
+    stream_max_utterance_seconds: float = 15.0
+    stream_max_pending: int = 4  # utterances queued before reads pause
+    
+    # Speaker Diarization Configuration
+    enable_diarization: bool = True
+    diarization_window_seconds: float = 1.5
+    diarization_hop_seconds: float = 0.75
+    diarization_threshold: float = 0.3  # cosine distance between speakers
+    diarization_max_speakers: int = 8
+    diarization_max_windows: int = 2000  # clustered; the rest are assigned
+    diarization_block_seconds: float = 60.0  # audio per worker task
     
     # Analysis Configuration
     sentiment_threshold: float = 0.7
@@ -91,24 +174,37 @@ class Settings(BaseSettings):
     summary_min_length: int = 100
     action_item_confidence: float = 0.8
     keyword_extraction_limit: int = 20
+    analysis_chunk_tokens: int = 3000
     
     # Cache Configuration
     redis_url: Optional[str] = None
     cache_ttl: int = 3600
     cache_prefix: str = "ai_services:"
     enable_result_caching: bool = True
+    cache_max_entries: int = 1024
     
     # Monitoring Configuration
     sentry_dsn: Optional[str] = None
     sentry_environment: Optional[str] = None
     enable_metrics: bool = False
-    metrics_port: int = 8002
+    metrics_port: int = 8002  # first of WORKERS ports, one per worker
+    metrics_host: str = "0.0.0.0"
+    metrics_lag_interval: float = 0.1  # seconds between loop-lag samples
     health_check_interval: int = 30
+    readiness_queue_fraction: float = 0.5  # admission queue share = busy
     
     # Development Configuration
     mock_openai: bool = False
     mock_huggingface: bool = False
+    mock_latency: float = 0.0  # median seconds per mocked upstream call
+    mock_latency_sigma: float = 0.0  # log-normal spread of that latency
+    mock_error_rate: float = 0.0  # share of mocked calls that fail
+    mock_seed: Optional[int] = None
+    mock_model_latency: float = 0.0  # seconds per mocked model batch
     enable_profiling: bool = False
+    profiling_sample_rate: float = 0.0  # share of requests profiled
+    profiling_token: Optional[str] = None  # required X-Profile value
+    profiling_max_seconds: float = 60.0  # longest admin stack sample
     save_debug_files: bool = False
     debug_output_dir: str = "./debug"
     
@@ -116,6 +212,8 @@ class Settings(BaseSettings):
         env_file = ".env"
         env_file_encoding = "utf-8"
         case_sensitive = False
+        # MODEL_* settings are ours, not pydantic's model_ methods
+        protected_namespaces = ('settings_',)
         
     @property
     def cors_origins_list(self) -> List[str]:
@@ -127,6 +225,56 @@ class Settings(BaseSettings):
         """Convert supported audio formats string to list"""
         return [fmt.strip() for fmt in self.supported_audio_formats.split(',')]
     
+    @property
+    def audio_url_allowed_hosts_list(self) -> List[str]:
+        """Hosts audio_url may point at; empty allows any public host"""
+        return [host.strip().lower()
+                for host in self.audio_url_allowed_hosts.split(',')
+                if host.strip()]
+    
+    @property
+    def batch_overrides_map(self) -> Dict[str, Tuple[int, float]]:
+        """Parse per-model micro-batching overrides"""
+        overrides = {}
+        for entry in self.batch_overrides.split(','):
+            if not entry.strip():
+                continue
+            model, limits = entry.strip().rsplit('=', 1)
+            size, wait_ms = limits.split(':')
+            overrides[model.strip()] = (int(size), float(wait_ms))
+        return overrides
+    
+    def batch_limits(self, model: str, default_size: Optional[int] = None) -> Tuple[int, float]:
+        """Max batch size and max wait (ms) for a model's micro-batcher"""
+        default = (default_size or self.batch_max_size, self.batch_max_wait_ms)
+        return self.batch_overrides_map.get(model, default)
+    
+    @property
+    def model_backend_overrides_map(self) -> Dict[str, str]:
+        """Parse per-model inference backend overrides"""
+        overrides = {}
+        for entry in self.model_backend_overrides.split(','):
+            if not entry.strip():
+                continue
+            model, backend = entry.strip().rsplit('=', 1)
+            overrides[model.strip()] = backend.strip()
+        return overrides
+    
+    def model_backend_for(self, model: str) -> str:
+        """Inference backend for a model: torch, onnx or onnx-int8"""
+        return self.model_backend_overrides_map.get(model, self.model_backend)
+    
+    def profiling_token_matches(self, token: Optional[str]) -> bool:
+        """
+        Whether a request may profile: it must present PROFILING_TOKEN, and
+        without one configured only development is left open
+        """
+        if not self.profiling_token:
+            return self.environment == 'development'
+        return token is not None and hmac.compare_digest(
+            token.encode(), self.profiling_token.encode()
+        )
+    
     @property
     def max_audio_size_bytes(self) -> int:
         """Convert max audio size string to bytes"""
@@ -206,6 +354,17 @@ def validate_environment() -> ValidationResult:
         elif config.get('validator') and not config['validator'](config['value']):
             result.warnings.append(config['error_msg'])
     
+    # A malformed override would otherwise only fail once a request
+    # reaches the batcher or loads a model
+    try:
+        batch_overrides = settings.batch_overrides_map
+    except ValueError:
+        batch_overrides = None
+    try:
+        backend_overrides = settings.model_backend_overrides_map
+    except ValueError:
+        backend_overrides = None
+    
     # Validate configuration values
     validation_checks = [
         (settings.environment in ['development', 'staging', 'production'], 
@@ -214,6 +373,10 @@ def validate_environment() -> ValidationResult:
          'PORT must be between 1 and 65535'),
         (settings.workers >= 1, 
          'WORKERS must be at least 1'),
+        (settings.job_workers >= 0,
+         'JOB_WORKERS must be zero or more'),
+        (settings.job_max_attempts >= 1,
+         'JOB_MAX_ATTEMPTS must be at least 1'),
         (0.0 <= settings.openai_temperature <= 2.0, 
          'OPENAI_TEMPERATURE must be between 0.0 and 2.0'),
         (settings.openai_max_tokens > 0, 
@@ -224,6 +387,83 @@ def validate_environment() -> ValidationResult:
          'SENTIMENT_THRESHOLD must be between 0.0 and 1.0'),
         (settings.summary_min_length < settings.summary_max_length, 
          'SUMMARY_MIN_LENGTH must be less than SUMMARY_MAX_LENGTH'),
+        (2 * settings.summary_max_length <= settings.analysis_chunk_tokens,
+         'ANALYSIS_CHUNK_TOKENS must be at least twice SUMMARY_MAX_LENGTH'),
+        (settings.transcription_upload_format in ('wav', 'flac', 'ogg'),
+         'TRANSCRIPTION_UPLOAD_FORMAT must be wav, flac or ogg'),
+        (settings.http_max_connections >= settings.max_concurrent_requests,
+         'HTTP_MAX_CONNECTIONS must be at least MAX_CONCURRENT_REQUESTS'),
+        (settings.retry_budget_ratio >= 0,
+         'RETRY_BUDGET_RATIO must not be negative'),
+        (settings.circuit_failure_threshold >= 1,
+         'CIRCUIT_FAILURE_THRESHOLD must be at least 1'),
+        (min(settings.openai_rpm_limit, settings.openai_tpm_limit,
+             settings.whisper_rpm_limit) >= 0,
+         'Rate limits must not be negative'),
+        (settings.rate_limit_burst_seconds > 0,
+         'RATE_LIMIT_BURST_SECONDS must be greater than 0'),
+        (settings.rate_limit_store in ('auto', 'local', 'file', 'redis'),
+         'RATE_LIMIT_STORE must be auto, local, file or redis'),
+        (settings.admission_queue_size >= 0,
+         'ADMISSION_QUEUE_SIZE must not be negative'),
+        (settings.admission_queue_timeout > 0,
+         'ADMISSION_QUEUE_TIMEOUT must be greater than 0'),
+        (1 <= settings.admission_min_limit
+         <= settings.max_concurrent_requests,
+         'ADMISSION_MIN_LIMIT must be between 1 and MAX_CONCURRENT_REQUESTS'),
+        (settings.metrics_lag_interval > 0,
+         'METRICS_LAG_INTERVAL must be greater than 0'),
+        (settings.mock_latency >= 0 and settings.mock_latency_sigma >= 0
+         and settings.mock_model_latency >= 0,
+         'MOCK_LATENCY, MOCK_LATENCY_SIGMA and MOCK_MODEL_LATENCY must not '
+         'be negative'),
+        (0 <= settings.mock_error_rate <= 1,
+         'MOCK_ERROR_RATE must be between 0 and 1'),
+        (settings.upstream_replay_mode in ('off', 'record', 'replay'),
+         'UPSTREAM_REPLAY_MODE must be off, record or replay'),
+        (settings.upstream_replay_latency_scale >= 0,
+         'UPSTREAM_REPLAY_LATENCY_SCALE must not be negative'),
+        (backend_overrides is not None,
+         'MODEL_BACKEND_OVERRIDES must be model=backend,...'),
+        (all(backend in MODEL_BACKENDS for backend in
+             [settings.model_backend, *(backend_overrides or {}).values()]),
+         'MODEL_BACKEND and MODEL_BACKEND_OVERRIDES must use torch, onnx '
+         'or onnx-int8'),
+        (batch_overrides is not None
+         and all(size >= 1 and wait_ms >= 0
+                 for size, wait_ms in batch_overrides.values()),
+         'BATCH_OVERRIDES must be model=max_size:max_wait_ms,... with '
+         'max_size at least 1 and max_wait_ms not negative'),
+        (settings.onnx_threads >= 0,
+         'ONNX_THREADS must not be negative'),
+        (settings.cpu_limit >= 1,
+         'CPU_LIMIT must be at least 1'),
+        (settings.io_threads >= 0,
+         'IO_THREADS must not be negative'),
+        (0 < settings.readiness_queue_fraction <= 1,
+         'READINESS_QUEUE_FRACTION must be greater than 0 and at most 1'),
+        (0 <= settings.profiling_sample_rate <= 1,
+         'PROFILING_SAMPLE_RATE must be between 0 and 1'),
+        (settings.profiling_max_seconds > 0,
+         'PROFILING_MAX_SECONDS must be greater than 0'),
+        (not settings.enable_profiling or bool(settings.profiling_token)
+         or settings.environment == 'development',
+         'PROFILING_TOKEN must be set when ENABLE_PROFILING is on outside '
+         'development'),
+        (settings.stream_max_pending >= 1,
+         'STREAM_MAX_PENDING must be at least 1'),
+        (0 < settings.diarization_hop_seconds
+         <= settings.diarization_window_seconds,
+         'DIARIZATION_HOP_SECONDS must be positive and at most '
+         'DIARIZATION_WINDOW_SECONDS'),
+        (settings.diarization_max_speakers >= 1,
+         'DIARIZATION_MAX_SPEAKERS must be at least 1'),
+        (settings.diarization_max_windows >= 2,
+         'DIARIZATION_MAX_WINDOWS must be at least 2'),
+        (settings.transcription_chunk_seconds
+         > 2 * settings.transcription_chunk_overlap,
+         'TRANSCRIPTION_CHUNK_SECONDS must be more than twice '
+         'TRANSCRIPTION_CHUNK_OVERLAP'),
     ]
     
     for check, error_msg in validation_checks:
@@ -261,19 +501,23 @@ def validate_environment() -> ValidationResult:
     return result
 
 
+def validation_error_message(result: ValidationResult) -> str:
+    """One-line summary of a failed validation"""
+    error_msg = "Environment validation failed"
+    if result.errors:
+        error_msg += f": {'; '.join(result.errors)}"
+    if result.missing_required:
+        missing = [var.split(':')[0] for var in result.missing_required]
+        error_msg += f". Missing required variables: {', '.join(missing)}"
+    return error_msg
+
+
 def validate_required_settings() -> Settings:
     """Validate environment and return settings or raise exception"""
     result = validate_environment()
     
     if not result.success:
-        error_msg = "Environment validation failed"
-        if result.errors:
-            error_msg += f": {'; '.join(result.errors)}"
-        if result.missing_required:
-            missing = [var.split(':')[0] for var in result.missing_required]
-            error_msg += f". Missing required variables: {', '.join(missing)}"
-        
-        raise ValueError(error_msg)
+        raise ValueError(validation_error_message(result))
     
     return get_settings()
 
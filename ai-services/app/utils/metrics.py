@@ -0,0 +1,272 @@
+"""
+Lightweight in-process metrics primitives
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+)
+
+from app.utils.profiling import current_timeline
+
+# Bucket upper bounds for small-integer distributions (queue depth, batch size)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, safe to observe from any thread"""
+
+    def __init__(self, buckets: Sequence[float] = SIZE_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self._count if self._count else 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cumulative counts per upper bound, Prometheus style"""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            running += bucket_count
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = count
+        return {"buckets": cumulative, "sum": total, "count": count}
+
+
+class Counter:
+    """Monotonic count, safe to increment from any thread"""
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """Value that goes up and down; updated from the event loop"""
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+# (labels, value) pairs of one metric, as reported by a collector
+Samples = List[Tuple[Dict[str, str], float]]
+
+
+class MetricFamily:
+    """A named metric with one child per combination of label values"""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        kind: str,
+        labelnames: Sequence[str],
+        factory: Callable[[], Any],
+    ):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: str) -> Any:
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} takes labels {self.labelnames}"
+                )
+            child = self._children.setdefault(values, self._factory())
+        return child
+
+    def children(self) -> List[Tuple[Dict[str, str], Any]]:
+        return [
+            (dict(zip(self.labelnames, values)), child)
+            for values, child in list(self._children.items())
+        ]
+
+
+def _escape(value: Any) -> str:
+    return (
+        str(value).replace("\\", "\\\\").replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Metric families recorded in process plus collectors that read
+    existing stats at scrape time, rendered in the Prometheus text format
+    """
+
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._collectors: List[
+            Callable[[], Iterable[Tuple[str, str, str, Samples]]]
+        ] = []
+
+    def _family(self, name, help, kind, labelnames, factory) -> MetricFamily:
+        family = self._families.get(name)
+        if family is None:
+            family = MetricFamily(name, help, kind, labelnames, factory)
+            self._families[name] = family
+        return family
+
+    def counter(
+        self, name: str, help: str, labelnames: Sequence[str] = ()
+    ) -> MetricFamily:
+        return self._family(name, help, "counter", labelnames, Counter)
+
+    def gauge(
+        self, name: str, help: str, labelnames: Sequence[str] = ()
+    ) -> MetricFamily:
+        return self._family(name, help, "gauge", labelnames, Gauge)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        buckets: Sequence[float],
+        labelnames: Sequence[str] = (),
+    ) -> MetricFamily:
+        return self._family(
+            name, help, "histogram", labelnames, lambda: Histogram(buckets)
+        )
+
+    def register_collector(
+        self, collector: Callable[[], Iterable[Tuple[str, str, str, Samples]]]
+    ) -> None:
+        """collector() yields (name, kind, help, samples) when scraped"""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in list(self._families.values()):
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for labels, child in family.children():
+                if family.kind == "histogram":
+                    snapshot = child.snapshot()
+                    for bound, count in snapshot["buckets"].items():
+                        bucket_labels = {**labels, "le": bound}
+                        lines.append(
+                            f"{family.name}_bucket"
+                            f"{_format_labels(bucket_labels)} {count}"
+                        )
+                    lines.append(
+                        f"{family.name}_sum{_format_labels(labels)} "
+                        f"{_format_value(snapshot['sum'])}"
+                    )
+                    lines.append(
+                        f"{family.name}_count{_format_labels(labels)} "
+                        f"{snapshot['count']}"
+                    )
+                else:
+                    lines.append(
+                        f"{family.name}{_format_labels(labels)} "
+                        f"{_format_value(child.value)}"
+                    )
+        for collector in list(self._collectors):
+            for name, kind, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(
+                        f"{name}{_format_labels(labels)} "
+                        f"{_format_value(value)}"
+                    )
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Buckets (seconds) for request and pipeline stage durations
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+    60.0, 120.0,
+)
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "echoscribe_stage_seconds",
+    "Time spent in each processing stage",
+    DURATION_BUCKETS,
+    ("stage",),
+)
+
+
+@contextmanager
+def time_stage(stage: str) -> Iterator[None]:
+    """
+    Record the wall time of the block, including awaits, under stage, and
+    as a span when the current request is being profiled
+    """
+    histogram = STAGE_SECONDS.labels(stage)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        histogram.observe(end - start)
+        timeline = current_timeline()
+        if timeline is not None:
+            timeline.add(stage, start, end)
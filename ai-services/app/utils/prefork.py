@@ -0,0 +1,151 @@
+"""
+Pre-fork serving: load models once in a parent process, then fork workers
+that share the loaded weights copy-on-write
+"""
+
+import gc
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.utils.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before replacing a worker that died
+RESPAWN_DELAY = 1.0
+
+
+def reseed_after_fork() -> None:
+    """
+    Give a forked worker its own random state. The standard library's
+    global generator is reseeded by Python itself; NumPy's and torch's
+    global generators would otherwise repeat the parent's sequence in
+    every worker.
+    """
+    random.seed()
+    if "numpy" in sys.modules:
+        import numpy as np
+
+        np.random.seed(int.from_bytes(os.urandom(4), "little"))
+    if "torch" in sys.modules:
+        import torch
+
+        torch.manual_seed(int.from_bytes(os.urandom(8), "little") >> 1)
+
+
+def limit_threads(workers: int) -> None:
+    """
+    Split the CPUs between workers, so N workers don't each start an
+    intra-op thread pool as wide as the machine
+    """
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    if "torch" in sys.modules:
+        import torch
+
+        torch.set_num_threads(threads)
+    # Read when each worker creates its ONNX Runtime sessions
+    settings = get_settings()
+    if not settings.onnx_threads:
+        settings.onnx_threads = threads
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Listening socket created in the parent and inherited by workers"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class PreforkServer:
+    """
+    Forks `workers` children that each run serve(sock), restarts any that
+    die, and passes SIGTERM/SIGINT on to them for a graceful shutdown.
+
+    Everything loaded before run() is shared with the workers until one of
+    them writes to it. The parent must not start threads, event loops or
+    network clients before forking: only the forking thread survives in a
+    child, and a connection or lock held at fork time would be shared by
+    every worker. Model weights live in tensor or array buffers that
+    inference only reads, so they stay shared; gc.freeze() keeps the
+    collector from writing to (and so copying) the pages of every other
+    object the parent created.
+    """
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        workers: int,
+        serve: Callable[[socket.socket], Any],
+    ):
+        self.sock = sock
+        self.workers = workers
+        self.serve = serve
+        self.children: Dict[int, int] = {}  # pid -> worker number
+        self.stopping = False
+        self.respawns = 0
+
+    def spawn(self, number: int) -> int:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                limit_threads(self.workers)
+                self.serve(self.sock)
+            except BaseException:
+                logger.exception(f"Worker {number} failed")
+                code = 1
+            finally:
+                # Skip the parent's atexit handlers and buffered output
+                os._exit(code)
+        self.children[pid] = number
+        logger.info(f"Started worker {number} (pid {pid})")
+        return pid
+
+    def stop(self, signum: int, frame: Optional[Any] = None) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        os.register_at_fork(after_in_child=reseed_after_fork)
+        gc.collect()
+        gc.freeze()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for number in range(self.workers):
+            self.spawn(number)
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            number = self.children.pop(pid, None)
+            if number is None or self.stopping:
+                continue
+            logger.warning(
+                f"Worker {number} (pid {pid}) exited with status "
+                f"{os.waitstatus_to_exitcode(status)}; restarting"
+            )
+            time.sleep(RESPAWN_DELAY)
+            self.respawns += 1
+            if not self.stopping:
+                self.spawn(number)
+        self.sock.close()
+        logger.info("All workers stopped")
@@ -0,0 +1,115 @@
+"""
+Silence removal before transcription, with a map back to original time
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.utils.vad import VoiceActivityDetector
+
+
+@dataclass
+class TimeMap:
+    """
+    Maps timestamps in condensed audio back to the original recording.
+    Span i covers condensed [compact_starts[i], compact_starts[i] +
+    lengths[i]) and original [original_starts[i], ...) of equal length.
+    """
+    compact_starts: np.ndarray
+    original_starts: np.ndarray
+    lengths: np.ndarray
+    original_duration: float
+
+    @classmethod
+    def identity(cls, duration: float) -> "TimeMap":
+        return cls(
+            np.zeros(1), np.zeros(1), np.array([duration]), duration
+        )
+
+    @property
+    def compact_duration(self) -> float:
+        return float(self.lengths.sum())
+
+    @property
+    def removed_seconds(self) -> float:
+        return self.original_duration - self.compact_duration
+
+    def to_original(self, times: Any, end: bool = False) -> np.ndarray:
+        """
+        Map condensed times to original times. A time on a boundary
+        between spans maps to the later span for starts and to the earlier
+        span for ends, so no segment stretches across removed silence.
+        """
+        times = np.asarray(times, dtype=np.float64)
+        side = "left" if end else "right"
+        index = np.searchsorted(self.compact_starts, times, side=side) - 1
+        index = np.clip(index, 0, len(self.compact_starts) - 1)
+        return self.original_starts[index] \
+            + (times - self.compact_starts[index])
+
+    def apply(self, segments: List[Dict[str, Any]]) -> None:
+        """Rewrite segment start/end in place to original time"""
+        if not segments:
+            return
+        starts = self.to_original([s["start"] for s in segments])
+        ends = self.to_original([s["end"] for s in segments], end=True)
+        for segment, start, end in zip(segments, starts, ends):
+            segment["start"] = round(float(start), 3)
+            segment["end"] = round(float(max(end, start)), 3)
+
+
+def speech_spans(
+    samples: np.ndarray,
+    sample_rate: int,
+    threshold_db: float,
+    min_silence: float,
+    padding: float,
+    frame_length: int = 1024,
+) -> List[Tuple[int, int]]:
+    """
+    Return (start, end) sample ranges to keep. Speech comes from the voice
+    activity detector, with frames quieter than threshold_db (dBFS) never
+    counted as speech. Leading and trailing silence and internal gaps of
+    at least min_silence seconds are dropped, apart from padding seconds
+    kept next to speech.
+    """
+    detector = VoiceActivityDetector(
+        sample_rate, frame_length=frame_length, floor_db=threshold_db
+    )
+    index = detector.detect(samples).padded(padding).merged(min_silence)
+    return index.sample_spans(sample_rate)
+
+
+def condense_silence(
+    samples: np.ndarray,
+    sample_rate: int,
+    threshold_db: float = -40.0,
+    min_silence: float = 1.0,
+    padding: float = 0.25,
+    frame_length: int = 1024,
+) -> Tuple[np.ndarray, TimeMap]:
+    """Cut silence out of mono audio and return it with its time map"""
+    duration = len(samples) / sample_rate
+    spans = speech_spans(
+        samples, sample_rate, threshold_db, min_silence, padding,
+        frame_length,
+    )
+    if not spans:
+        empty = np.zeros(0, dtype=np.float32)
+        return empty, TimeMap(np.zeros(0), np.zeros(0), np.zeros(0), duration)
+
+    if spans == [(0, len(samples))]:
+        return samples, TimeMap.identity(duration)
+
+    bounds = np.array(spans, dtype=np.int64)
+    lengths = bounds[:, 1] - bounds[:, 0]
+    compact_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    condensed = np.concatenate([samples[s:e] for s, e in spans])
+    return condensed, TimeMap(
+        compact_starts=compact_starts / sample_rate,
+        original_starts=bounds[:, 0] / sample_rate,
+        lengths=lengths / sample_rate,
+        original_duration=duration,
+    )
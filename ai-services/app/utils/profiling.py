@@ -0,0 +1,146 @@
+"""
+Profiling helpers: per-request span timelines and a whole-process
+statistical stack sampler
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+# The timeline of the request being profiled in this context, if any
+_timeline: ContextVar[Optional["Timeline"]] = ContextVar(
+    "timeline", default=None
+)
+
+
+class Timeline:
+    """
+    Spans recorded while one request is profiled, tagged with the asyncio
+    task (or thread) that ran them so overlapping work stays apart
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.origin = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, end: float) -> None:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:  # called from a worker thread
+            task = None
+        where = task.get_name() if task is not None else \
+            threading.current_thread().name
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "where": where,
+                "start": start - self.origin,
+                "duration": end - start,
+            })
+
+    def to_trace(self) -> Dict[str, Any]:
+        """Chrome trace-event JSON, for chrome://tracing or Perfetto"""
+        tids: Dict[str, int] = {}
+        events = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": 0,
+                   "args": {"name": self.name}}]
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            if span["where"] not in tids:
+                tids[span["where"]] = len(tids) + 1
+                events.append({"name": "thread_name", "ph": "M", "pid": 1,
+                               "tid": tids[span["where"]],
+                               "args": {"name": span["where"]}})
+            events.append({
+                "name": span["name"], "ph": "X", "pid": 1,
+                "tid": tids[span["where"]],
+                "ts": round(span["start"] * 1e6, 1),
+                "dur": round(span["duration"] * 1e6, 1),
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dumps(self) -> str:
+        return json.dumps(self.to_trace())
+
+
+def current_timeline() -> Optional[Timeline]:
+    return _timeline.get()
+
+
+@contextmanager
+def record_timeline(name: str) -> Iterator[Timeline]:
+    """Record spans from this context (and tasks it starts) in a timeline"""
+    timeline = Timeline(name)
+    previous = _timeline.get()
+    _timeline.set(timeline)
+    try:
+        yield timeline
+    finally:
+        _timeline.set(previous)
+
+
+def _frame_stack(frame) -> str:
+    names = [
+        f"{summary.name} ({summary.filename.rsplit('/', 1)[-1]}:"
+        f"{summary.lineno})"
+        for summary in traceback.extract_stack(frame)
+    ]
+    return ";".join(names)
+
+
+class StackSampler:
+    """
+    Statistical profiler: samples every thread's Python stack each
+    interval and counts identical stacks. Output is in collapsed-stack
+    form ("outer;inner count"), the input format of flamegraph tools.
+    Samples land where threads give up the GIL, so code that holds it
+    (a handler blocking the loop) shows up, while an idle loop shows as
+    select().
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter = Counter()
+
+    def sample(self) -> None:
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            thread = names.get(ident, str(ident))
+            self.stacks[f"{thread};{_frame_stack(frame)}"] += 1
+        self.samples += 1
+
+    def run(self, seconds: float) -> None:
+        """Sample for seconds; blocks, so run it off the event loop"""
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            self.sample()
+            time.sleep(self.interval)
+
+    def collapsed(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Innermost frames by share of samples, the hottest code first"""
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [
+            {"frame": frame, "samples": count, "share": count / total}
+            for frame, count in leaves.most_common(limit)
+        ]
@@ -0,0 +1,51 @@
+"""
+Startup timing: how long each phase of bringing a process up took
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Imported first by main.py, so this is close to when its imports began
+_started = time.perf_counter()
+
+
+class StartupProfile:
+    """Named phases of startup and their wall time, in order"""
+
+    def __init__(self, started: float):
+        self.started = started
+        self.phases: Dict[str, float] = {}
+        self.ready_after: float = 0.0
+
+    def mark(self, name: str, since: float) -> None:
+        self.phases[name] = round(time.perf_counter() - since, 4)
+
+    def forked(self) -> None:
+        """Time the rest of startup from now, in a freshly forked worker"""
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name, start)
+
+    def ready(self) -> None:
+        self.ready_after = round(time.perf_counter() - self.started, 4)
+        summary = ", ".join(f"{name} {seconds * 1000:.0f}ms"
+                            for name, seconds in self.phases.items())
+        logger.info(f"Ready {self.ready_after:.2f}s after import "
+                    f"({summary})")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"phases": dict(self.phases),
+                "ready_after_seconds": self.ready_after}
+
+
+startup_profile = StartupProfile(_started)
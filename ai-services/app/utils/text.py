@@ -0,0 +1,54 @@
+"""
+Transcript text preprocessing shared by the analysis services
+"""
+
+import re
+from typing import List
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# Rough tokens-per-word ratio for English with BPE tokenizers
+TOKENS_PER_WORD = 4 / 3
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split a transcript into sentence-level segments"""
+    return [s.strip() for s in SENTENCE_BOUNDARY.split(text) if s.strip()]
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the model token count of text without a tokenizer"""
+    return int(len(text.split()) * TOKENS_PER_WORD) + 1
+
+
+def chunk_sentences(sentences: List[str], max_tokens: int) -> List[str]:
+    """
+    Greedily pack whole sentences into chunks of at most max_tokens
+    estimated tokens. A single sentence longer than the budget is split on
+    word boundaries.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    for sentence in sentences:
+        tokens = estimate_tokens(sentence)
+        if tokens > max_tokens:
+            words = sentence.split()
+            step = max(1, int(max_tokens / TOKENS_PER_WORD))
+            pieces = [" ".join(words[i:i + step])
+                      for i in range(0, len(words), step)]
+        else:
+            pieces = [sentence]
+
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
@@ -0,0 +1,284 @@
+"""
+Streaming audio ingestion with incremental size and format enforcement
+"""
+
+import asyncio
+import ipaddress
+import logging
+import os
+import socket
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import aiofiles
+from multipart.multipart import MultipartParser, parse_options_header
+
+logger = logging.getLogger(__name__)
+
+# Bytes held in memory before they are written to the spool file
+WRITE_BUFFER_BYTES = 1024 * 1024
+# Bytes needed to identify every supported container
+SNIFF_BYTES = 12
+# Largest non-file form field accepted alongside the upload
+MAX_FIELD_BYTES = 1024
+# Allowance for multipart headers and fields when checking Content-Length
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class AudioUploadError(ValueError):
+    """Upload rejected before or while its bytes arrived"""
+    status_code = 400
+
+
+class UploadTooLarge(AudioUploadError):
+    status_code = 413
+
+
+class UnsupportedAudioFormat(AudioUploadError):
+    status_code = 415
+
+
+class AudioUrlRejected(AudioUploadError):
+    """audio_url is not http(s), or its host is internal or not allowed"""
+
+
+async def check_audio_url(url: str, allowed_hosts: List[str]) -> None:
+    """
+    Refuse to fetch audio from anywhere but an http(s) URL on an allowed
+    host, or without an allow-list, a host that only resolves to public
+    addresses (not loopback, private, link-local or other reserved ranges)
+    """
+    try:
+        parsed = urlsplit(url)
+        port = parsed.port
+    except ValueError:
+        raise AudioUrlRejected("audio_url is not a valid URL")
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise AudioUrlRejected("audio_url must be an http or https URL")
+    host = parsed.hostname.lower()
+    if allowed_hosts:
+        if host not in allowed_hosts:
+            raise AudioUrlRejected(f"audio_url host {host} is not allowed")
+        return
+
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            host, port or (443 if parsed.scheme == "https" else 80),
+            type=socket.SOCK_STREAM,
+        )
+    except socket.gaierror:
+        raise AudioUrlRejected(f"audio_url host {host} does not resolve")
+    for *_, sockaddr in infos:
+        if not ipaddress.ip_address(sockaddr[0]).is_global:
+            raise AudioUrlRejected(
+                f"audio_url host {host} is not a public address"
+            )
+
+
+def sniff_audio_format(head: bytes) -> Optional[str]:
+    """Identify an audio container from its leading magic bytes"""
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if head[4:8] == b"ftyp":
+        return "m4a" if head[8:11] == b"M4A" else "mp4"
+    if head[:3] == b"ID3":
+        return "mp3"
+    # Bare MPEG audio frame sync: 11 set bits, layer bits not reserved
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0 \
+            and head[1] & 0x06:
+        return "mp3"
+    return None
+
+
+@dataclass
+class IngestedAudio:
+    """Audio body spooled to disk; decode it with decode_audio_file"""
+    path: str
+    size: int
+    format: str
+    filename: Optional[str] = None
+    fields: Dict[str, str] = field(default_factory=dict)
+
+
+class AudioSpool:
+    """
+    Writes an audio body to the spool directory as it arrives. The size
+    limit and container check run on every write, so an oversized or
+    non-audio body is rejected after at most one buffer of data.
+    """
+
+    def __init__(
+        self, spool_dir: str, max_bytes: int, allowed_formats: List[str]
+    ):
+        self.spool_dir = spool_dir
+        self.max_bytes = max_bytes
+        self.allowed_formats = allowed_formats
+        self.path = os.path.join(spool_dir, f"{uuid.uuid4().hex}.audio")
+        self.size = 0
+        self.format: Optional[str] = None
+        self._head = b""
+        self._buffer = bytearray()
+        self._file = None
+
+    async def open(self) -> "AudioSpool":
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._file = await aiofiles.open(self.path, "wb")
+        return self
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(
+                f"File size exceeds {self.max_bytes} byte limit"
+            )
+        if self.format is None and len(self._head) < SNIFF_BYTES:
+            self._head += data[:SNIFF_BYTES - len(self._head)]
+            if len(self._head) >= SNIFF_BYTES:
+                self._check_format()
+        self._buffer += data
+
+    def _check_format(self) -> None:
+        detected = sniff_audio_format(self._head)
+        if detected is None or detected not in self.allowed_formats:
+            raise UnsupportedAudioFormat(
+                f"Unsupported audio format: {detected or 'unknown'}"
+            )
+        self.format = detected
+
+    async def flush(self, force: bool = False) -> None:
+        if self._buffer and (force or len(self._buffer) >= WRITE_BUFFER_BYTES):
+            await self._file.write(bytes(self._buffer))
+            self._buffer.clear()
+
+    async def finish(self, filename: Optional[str] = None) -> IngestedAudio:
+        if self.format is None:
+            if not self._head:
+                raise AudioUploadError("Audio file is empty")
+            self._check_format()
+        await self.flush(force=True)
+        await self._file.close()
+        return IngestedAudio(
+            path=self.path,
+            size=self.size,
+            format=self.format,
+            filename=filename,
+        )
+
+    async def abort(self) -> None:
+        if self._file is not None:
+            await self._file.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def consume(self, chunks: AsyncIterator[bytes]) -> IngestedAudio:
+        """Spool a raw body, aborting on the first violation"""
+        await self.open()
+        try:
+            async for chunk in chunks:
+                self.write(chunk)
+                await self.flush()
+            return await self.finish()
+        except BaseException:
+            await self.abort()
+            raise
+
+
+async def ingest_multipart(
+    content_type: str,
+    chunks: AsyncIterator[bytes],
+    spool: AudioSpool,
+    file_field: str = "file",
+) -> IngestedAudio:
+    """
+    Parse a multipart/form-data body incrementally, streaming the file part
+    into spool and keeping small text fields in memory
+    """
+    mime, params = parse_options_header(content_type)
+    boundary = params.get(b"boundary")
+    if mime != b"multipart/form-data" or not boundary:
+        raise AudioUploadError("Expected a multipart/form-data upload")
+
+    fields: Dict[str, str] = {}
+    state = {"name": None, "header": b"", "value": b""}
+    headers: Dict[bytes, bytes] = {}
+    field_value = bytearray()
+    found = {"file": False, "filename": None}
+
+    def on_part_begin() -> None:
+        headers.clear()
+        field_value.clear()
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        state["header"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        state["value"] += data[start:end]
+
+    def on_header_end() -> None:
+        headers[state["header"].lower()] = state["value"]
+        state["header"], state["value"] = b"", b""
+
+    def on_headers_finished() -> None:
+        _, options = parse_options_header(
+            headers.get(b"content-disposition", b"")
+        )
+        state["name"] = options.get(b"name", b"").decode("latin-1")
+        if state["name"] == file_field:
+            if found["file"]:
+                raise AudioUploadError("Only one audio file is accepted")
+            filename = options.get(b"filename")
+            found["file"] = True
+            found["filename"] = filename.decode("utf-8", "replace") \
+                if filename is not None else None
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        if state["name"] == file_field:
+            spool.write(data[start:end])
+        else:
+            field_value.extend(data[start:end])
+            if len(field_value) > MAX_FIELD_BYTES:
+                raise AudioUploadError(
+                    f"Form field {state['name']} is too large"
+                )
+
+    def on_part_end() -> None:
+        if state["name"] != file_field:
+            fields[state["name"]] = field_value.decode("utf-8", "replace")
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+    })
+
+    await spool.open()
+    try:
+        async for chunk in chunks:
+            parser.write(chunk)
+            await spool.flush()
+        parser.finalize()
+        if not found["file"]:
+            raise AudioUploadError(f"Missing form field: {file_field}")
+        ingested = await spool.finish(found["filename"])
+    except BaseException:
+        await spool.abort()
+        raise
+
+    ingested.fields = fields
+    logger.info(
+        f"Ingested {ingested.size} byte {ingested.format} upload "
+        f"to {ingested.path}"
+    )
+    return ingested
@@ -0,0 +1,231 @@
+"""
+Frame-level voice activity detection and an array-backed speech index
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Frames analysed per block; bounds the spectrum buffer to a few MB
+BLOCK_FRAMES = 2048
+# Floor applied to frame energy before taking logs (about -100 dBFS)
+ENERGY_EPSILON = 1e-10
+
+
+def runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end (exclusive) indices of every run of True in mask"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def hysteresis(score: np.ndarray, on: float, off: float) -> np.ndarray:
+    """
+    Two-threshold decision without a Python loop: frames at or above on
+    switch speech on, frames below off switch it off, and frames in
+    between keep the last decision
+    """
+    state = np.full(score.shape, -1, dtype=np.int8)
+    state[score >= on] = 1
+    state[score < off] = 0
+    decided = np.where(state >= 0, np.arange(len(state)), 0)
+    np.maximum.accumulate(decided, out=decided)
+    return state[decided] == 1
+
+
+@dataclass
+class SpeechIndex:
+    """
+    Sorted, non-overlapping speech intervals in seconds. Point and range
+    queries are binary searches over the interval arrays.
+    """
+    starts: np.ndarray
+    ends: np.ndarray
+    duration: float
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def speech_seconds(self) -> float:
+        return float(np.sum(self.ends - self.starts))
+
+    @property
+    def speech_ratio(self) -> float:
+        return self.speech_seconds / self.duration if self.duration else 0.0
+
+    def contains(self, times: Any) -> np.ndarray:
+        """Whether each time falls inside a speech interval"""
+        times = np.asarray(times, dtype=np.float64)
+        index = np.searchsorted(self.starts, times, side="right") - 1
+        inside = index >= 0
+        index = np.clip(index, 0, max(len(self.starts) - 1, 0))
+        if not len(self.starts):
+            return np.zeros(times.shape, dtype=bool)
+        return inside & (times < self.ends[index])
+
+    def between(self, start: float, end: float) -> "SpeechIndex":
+        """Intervals overlapping [start, end), clipped to it"""
+        lo = np.searchsorted(self.ends, start, side="right")
+        hi = np.searchsorted(self.starts, end, side="left")
+        return SpeechIndex(
+            np.maximum(self.starts[lo:hi], start),
+            np.minimum(self.ends[lo:hi], end),
+            self.duration,
+        )
+
+    def padded(self, padding: float) -> "SpeechIndex":
+        """Widen every interval by padding seconds and merge overlaps"""
+        widened = SpeechIndex(
+            np.maximum(self.starts - padding, 0.0),
+            np.minimum(self.ends + padding, self.duration),
+            self.duration,
+        )
+        return widened.merged(0.0)
+
+    def merged(self, min_gap: float) -> "SpeechIndex":
+        """Close gaps shorter than min_gap seconds"""
+        if len(self.starts) < 2:
+            return self
+        split = self.starts[1:] - self.ends[:-1] >= min_gap
+        return SpeechIndex(
+            self.starts[np.concatenate(([True], split))],
+            self.ends[np.concatenate((split, [True]))],
+            self.duration,
+        )
+
+    def sample_spans(self, sample_rate: int) -> List[Tuple[int, int]]:
+        starts = np.round(self.starts * sample_rate).astype(np.int64)
+        ends = np.round(self.ends * sample_rate).astype(np.int64)
+        return list(zip(starts.tolist(), ends.tolist()))
+
+    def to_list(self) -> List[Dict[str, float]]:
+        return [
+            {"start": round(float(s), 3), "end": round(float(e), 3)}
+            for s, e in zip(self.starts, self.ends)
+        ]
+
+
+class VoiceActivityDetector:
+    """
+    Energy and spectral-flux voice activity detector.
+
+    Frames of frame_length samples (hop of half a frame) are strided views
+    of the input, so framing copies nothing; features are computed a block
+    of frames at a time. A frame's score is its energy above the noise
+    floor in units of margin_db, plus its spectral flux weighted by how
+    loud it is, so soft onsets with changing spectra are caught while
+    steady background noise is not. Hysteresis, a minimum speech length
+    and a hangover turn scores into intervals.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        frame_length: int = 1024,
+        floor_db: float = -40.0,
+        margin_db: float = 10.0,
+        on_score: float = 1.0,
+        off_score: float = 0.5,
+        min_speech: float = 0.1,
+        hangover: float = 0.2,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_length = frame_length
+        self.hop = max(1, frame_length // 2)
+        self.floor_db = floor_db
+        self.margin_db = margin_db
+        self.on_score = on_score
+        self.off_score = off_score
+        self.min_speech = min_speech
+        self.hangover = hangover
+        self.window = np.hanning(frame_length).astype(np.float32)
+
+    def frames(self, samples: np.ndarray) -> np.ndarray:
+        """Overlapping frames as a strided view of the samples"""
+        samples = np.asarray(samples, dtype=np.float32)
+        if len(samples) < self.frame_length:
+            samples = np.pad(samples, (0, self.frame_length - len(samples)))
+        return sliding_window_view(samples, self.frame_length)[::self.hop]
+
+    def energy_db(self, frames: np.ndarray) -> np.ndarray:
+        """Mean power of each frame in dBFS"""
+        energy = np.empty(len(frames), dtype=np.float32)
+        for start in range(0, len(frames), BLOCK_FRAMES):
+            block = frames[start:start + BLOCK_FRAMES]
+            energy[start:start + len(block)] = np.einsum(
+                "ij,ij->i", block, block
+            ) / self.frame_length
+        return 10 * np.log10(np.maximum(energy, ENERGY_EPSILON))
+
+    def spectral_flux(
+        self, frames: np.ndarray, index: np.ndarray
+    ) -> np.ndarray:
+        """
+        Normalised spectral flux of the frames at index: the magnitude
+        increase over the previous frame as a share of the frame's total
+        """
+        from scipy import fft
+
+        flux = np.empty(len(index), dtype=np.float32)
+        for start in range(0, len(index), BLOCK_FRAMES):
+            current = index[start:start + BLOCK_FRAMES]
+            both = np.concatenate((current, np.maximum(current - 1, 0)))
+            magnitude = np.abs(fft.rfft(frames[both] * self.window, axis=1))
+            magnitude, prior = np.split(magnitude, 2)
+            rise = np.maximum(magnitude - prior, 0).sum(axis=1)
+            flux[start:start + len(current)] = rise / (
+                magnitude.sum(axis=1) + ENERGY_EPSILON
+            )
+        return flux
+
+    def noise_floor(self, energy_db: np.ndarray) -> float:
+        low, high = np.percentile(energy_db, [10, 90])
+        # Without a clear quiet/loud split there is no silence to learn
+        # the floor from, so fall back to the absolute floor
+        if high - low >= 2 * self.margin_db:
+            return float(low)
+        return float(min(low, self.floor_db))
+
+    def detect(self, samples: np.ndarray) -> SpeechIndex:
+        duration = len(samples) / self.sample_rate
+        if len(samples) == 0:
+            return SpeechIndex(np.zeros(0), np.zeros(0), duration)
+
+        frames = self.frames(samples)
+        energy_db = self.energy_db(frames)
+        loudness = (energy_db - self.noise_floor(energy_db)) / self.margin_db
+        # Flux only decides frames that are above the floor but not loud
+        # enough to switch speech on by themselves, so only those frames
+        # (usually a small share) are transformed
+        score = loudness.copy()
+        undecided = np.flatnonzero((loudness > 0) & (loudness < self.on_score))
+        score[undecided] += self.spectral_flux(frames, undecided) \
+            * loudness[undecided]
+        speech = hysteresis(score, self.on_score, self.off_score)
+        speech &= energy_db > self.floor_db
+
+        hop_seconds = self.hop / self.sample_rate
+        frame_seconds = self.frame_length / self.sample_rate
+        starts, ends = runs(speech)
+        # Speech is flagged as soon as it enters a frame, so a run of
+        # frames starting at i means speech began within the hop before
+        # i * hop + frame_length, and one ending at j means it stopped
+        # within the hop before j * hop; take the middle of each. Runs
+        # touching either end of the recording reach that end.
+        start_times = np.where(
+            starts == 0, 0.0,
+            starts * hop_seconds + frame_seconds - hop_seconds / 2,
+        )
+        end_times = np.where(
+            ends == len(speech), duration, ends * hop_seconds - hop_seconds / 2
+        )
+        end_times = np.maximum(end_times, start_times)
+        index = SpeechIndex(
+            np.clip(start_times, 0.0, duration),
+            np.clip(end_times, 0.0, duration),
+            duration,
+        ).merged(self.hangover)
+        keep = index.ends - index.starts >= self.min_speech
+        return SpeechIndex(index.starts[keep], index.ends[keep], duration)
@@ -0,0 +1,106 @@
+"""
+Store benchmark results as a baseline and flag regressions against it
+
+Results map a benchmark name to its metrics. Metrics ending in _ms and
+error_rate are better lower; rps is better higher. Anything else is
+reported but not compared.
+"""
+
+import json
+import os
+import platform
+import sys
+from typing import Dict, List
+
+Results = Dict[str, Dict[str, float]]
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+# Error rates may rise by this much (absolute) before it counts
+ERROR_RATE_SLACK = 0.01
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def save_baseline(path: str, results: Results, config: Dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({
+            "machine": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+            },
+            "config": config,
+            "results": results,
+        }, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_baseline(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(
+    results: Results,
+    baseline: Results,
+    threshold: float,
+    min_delta_ms: float = 0.0,
+) -> List[str]:
+    """
+    Describe each metric that got worse by more than threshold (a
+    fraction of the baseline). Latencies must also have grown by at least
+    min_delta_ms, so sub-millisecond jitter on fast paths is not flagged.
+    """
+    regressions = []
+    for name, metrics in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric, value in metrics.items():
+            old = before.get(metric)
+            if old is None:
+                continue
+            if metric.endswith("_ms"):
+                worse = value > old * (1 + threshold) \
+                    and value - old >= min_delta_ms
+            elif metric == "error_rate":
+                worse = value > old + ERROR_RATE_SLACK
+            elif metric == "rps":
+                worse = value < old * (1 - threshold)
+            else:
+                continue
+            if worse:
+                regressions.append(
+                    f"{name} {metric}: {old:.4g} -> {value:.4g}"
+                )
+    return regressions
+
+
+def report(results: Results, path: str, threshold: float,
+           min_delta_ms: float, config: Dict) -> int:
+    """
+    Compare results with the baseline at path and print what regressed;
+    returns the process exit status (1 on regression)
+    """
+    if not os.path.exists(path):
+        print(f"no baseline at {path}; record one with --save-baseline")
+        return 0
+    stored = load_baseline(path)
+    if stored.get("config") != config:
+        print(f"warning: baseline was recorded with {stored.get('config')}",
+              file=sys.stderr)
+    regressions = compare(
+        results, stored["results"], threshold, min_delta_ms
+    )
+    if not regressions:
+        print(f"no regressions beyond {threshold:.0%} against {path}")
+        return 0
+    print(f"{len(regressions)} regressions beyond {threshold:.0%} "
+          f"against {path}:")
+    for line in regressions:
+        print(f"  {line}")
+    return 1
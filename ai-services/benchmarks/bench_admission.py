@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark latency of admitted requests as offered load grows
+
+An in-process app serves POST /api/analysis/work from a simulated backend
+that handles --capacity requests at once, --service seconds each; the
+rest wait for it. Requests arrive open loop (evenly spaced, not waiting
+for earlier replies) at a fraction of the backend's throughput, doubling
+each step. Runs without and with admission control limited to the
+backend's capacity. Reports successful and shed requests and the
+latency percentiles of the successful ones.
+
+Usage: python -m benchmarks.bench_admission [--capacity 4]
+           [--service 0.05] [--seconds 3] [--queue 8] [--queue-timeout 0.5]
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+from app.middleware import admission
+from app.middleware.admission import AdmissionControlMiddleware
+from app.utils.config import get_settings
+
+LOAD_STEPS = (0.75, 1.5, 3.0)
+
+
+def make_app(capacity: int, service: float, admit: bool) -> FastAPI:
+    app = FastAPI()
+    if admit:
+        app.add_middleware(AdmissionControlMiddleware)
+    backend = asyncio.Semaphore(capacity)
+
+    @app.post("/api/analysis/work")
+    async def work():
+        async with backend:
+            await asyncio.sleep(service)
+        return {"ok": True}
+
+    return app
+
+
+async def offer(app: FastAPI, rate: float, seconds: float):
+    latencies = []
+    shed = 0
+
+    async def one(client, at):
+        nonlocal shed
+        await asyncio.sleep(at)
+        start = time.perf_counter()
+        response = await client.post("/api/analysis/work")
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - start)
+        else:
+            shed += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        count = int(rate * seconds)
+        await asyncio.gather(*(one(client, i / rate) for i in range(count)))
+    return np.array(latencies) * 1000, shed
+
+
+async def main(args) -> None:
+    settings = get_settings()
+    settings.max_concurrent_requests = args.capacity
+    settings.admission_queue_size = args.queue
+    settings.admission_queue_timeout = args.queue_timeout
+    throughput = args.capacity / args.service
+
+    print(f"backend: {args.capacity} at once, {args.service * 1000:.0f}ms "
+          f"each ({throughput:.0f} req/s)")
+    print(f"{'offered':>8} {'admission':>10} {'ok':>6} {'shed':>6} "
+          f"{'p50 ms':>8} {'p99 ms':>8}")
+    for step in LOAD_STEPS:
+        rate = throughput * step
+        for admit in (False, True):
+            admission.reset_admission()
+            app = make_app(args.capacity, args.service, admit)
+            ms, shed = await offer(app, rate, args.seconds)
+            p50, p99 = np.percentile(ms, [50, 99])
+            print(f"{rate:>6.0f}/s {'on' if admit else 'off':>10} "
+                  f"{len(ms):>6} {shed:>6} {p50:>8.1f} {p99:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--capacity", type=int, default=4)
+    parser.add_argument("--service", type=float, default=0.05)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--queue", type=int, default=8)
+    parser.add_argument("--queue-timeout", type=float, default=0.5)
+    asyncio.run(main(parser.parse_args()))
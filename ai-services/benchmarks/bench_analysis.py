@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark fused versus per-type transcript analysis
+
+Runs summary, sentiment and action items over a synthetic transcript
+against a fake chat backend with fixed per-call latency, once as three
+separate requests and once as a single fused request, and reports LLM
+calls and wall time for each.
+
+Usage: python -m benchmarks.bench_analysis [--minutes 60] [--latency 0.5]
+"""
+
+import argparse
+import asyncio
+import time
+
+from app.services.analysis_service import (
+    ANALYSIS_TYPES,
+    SUMMARY,
+    AnalysisService,
+)
+from app.services.batching import close_batchers
+from app.services.cache import ResultCache
+from app.services.llm_backend import FakeLLMBackend
+from app.services.model_registry import LexiconClassifier, ModelRegistry
+from app.services.sentiment_service import SentimentService
+
+LINES = [
+    "Sarah said the dashboard work is on track and looks great.",
+    "Mike will follow up with the vendor about the delayed contract.",
+    "The migration is blocked on the security review.",
+    "We need to update the roadmap before the board meeting.",
+    "Thanks everyone, good progress this week.",
+]
+
+# Typical conversational speaking rate
+WORDS_PER_MINUTE = 150
+
+
+def transcript(minutes: int) -> str:
+    words_per_line = len(" ".join(LINES).split()) / len(LINES)
+    lines = int(minutes * WORDS_PER_MINUTE / words_per_line)
+    return " ".join(LINES[i % len(LINES)] for i in range(lines))
+
+
+def make_service(latency: float):
+    llm = FakeLLMBackend(latency=latency)
+    registry = ModelRegistry(capacity=1, loader=LexiconClassifier)
+    service = AnalysisService(
+        llm=llm,
+        sentiment=SentimentService(registry, model_name="lexicon"),
+        cache=ResultCache(max_entries=4096, ttl=3600),
+    )
+    return service, llm
+
+
+async def run(text: str, latency: float, fused: bool):
+    service, llm = make_service(latency)
+
+    start = time.perf_counter()
+    if fused:
+        await service.analyze(text, list(ANALYSIS_TYPES))
+    else:
+        for analysis_type in ANALYSIS_TYPES:
+            await service.analyze(text, [analysis_type])
+    elapsed = time.perf_counter() - start
+
+    await close_batchers()
+    return llm.calls, elapsed, len(service.prepare(text).chunks)
+
+
+async def main(minutes: int, latency: float) -> None:
+    text = transcript(minutes)
+    print(f"transcript: {minutes} min, {len(text.split())} words, "
+          f"llm latency {latency:.2f}s")
+    print(f"{'mode':>9} {'chunks':>7} {'llm calls':>10} {'seconds':>8}")
+    for fused in (False, True):
+        calls, elapsed, chunks = await run(text, latency, fused)
+        mode = "fused" if fused else "separate"
+        print(f"{mode:>9} {chunks:>7} {calls:>10} {elapsed:>8.2f}")
+
+    print("\nmap-reduce summary")
+    print(f"{'minutes':>8} {'chunks':>7} {'llm calls':>10} {'levels':>7} "
+          f"{'seconds':>8}")
+    for scale in (1, 4, 16):
+        service, llm = make_service(latency)
+        text = transcript(minutes * scale)
+        start = time.perf_counter()
+        result = (await service.analyze(text, [SUMMARY]))[SUMMARY]
+        elapsed = time.perf_counter() - start
+        print(f"{minutes * scale:>8} {result['chunks_analyzed']:>7} "
+              f"{llm.calls:>10} {result['reduce_levels']:>7} "
+              f"{elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.minutes, args.latency))
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-call latency with and without the shared pooled client
+
+Runs a local keep-alive HTTPS stub (self-signed certificate made with the
+openssl CLI; --plain uses HTTP) in a separate process and makes the same
+calls two ways: a fresh httpx.AsyncClient per call, which is what each
+upstream call did before, and the shared pooled client. Reports p50/p95
+latency per call, sequential and at a given concurrency, plus the pool's
+connection counters.
+
+Usage: python -m benchmarks.bench_http_client [--calls 300]
+           [--concurrency 8] [--plain]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import ssl
+import subprocess
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+from app.services.http_client import PooledTransport
+from app.utils.config import get_settings
+
+BODY = json.dumps({"choices": [{"message": {"content": "{}"}}]}).encode()
+
+
+def serve(port_queue, certfile) -> None:
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                await reader.readexactly(length)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(BODY)).encode()
+                    + b"\r\n\r\n" + BODY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+    async def main():
+        context = None
+        if certfile:
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain(certfile)
+        server = await asyncio.start_server(
+            handle, "127.0.0.1", 0, ssl=context, backlog=1024
+        )
+        port_queue.put(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def make_certificate(directory: str) -> str:
+    path = os.path.join(directory, "stub.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+         "-keyout", path, "-out", path + ".crt", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    with open(path, "a") as key, open(path + ".crt") as cert:
+        key.write(cert.read())
+    return path
+
+
+async def timed_calls(call, calls: int, concurrency: int) -> np.ndarray:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await call()
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return np.array(latencies) * 1000
+
+
+async def main(calls: int, concurrency: int, plain: bool) -> None:
+    settings = get_settings()
+    with tempfile.TemporaryDirectory() as directory:
+        certfile = None if plain else make_certificate(directory)
+        ports = multiprocessing.Queue()
+        server = multiprocessing.Process(
+            target=serve, args=(ports, certfile), daemon=True
+        )
+        server.start()
+        scheme = "http" if plain else "https"
+        url = f"{scheme}://127.0.0.1:{ports.get()}/v1/chat/completions"
+        verify = False if plain else certfile + ".crt"
+        payload = {"model": "stub", "messages": []}
+
+        async def per_call_client():
+            async with httpx.AsyncClient(verify=verify) as client:
+                return await client.post(url, json=payload)
+
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        )
+        pool = PooledTransport(
+            settings.max_concurrent_requests, limits,
+            transport=httpx.AsyncHTTPTransport(verify=verify, limits=limits),
+        )
+        shared = httpx.AsyncClient(transport=pool)
+
+        async def shared_client():
+            return await shared.post(url, json=payload)
+
+        print(f"{calls} calls to a local {scheme} stub")
+        print(f"{'client':>16} {'concurrency':>12} {'p50 ms':>8} "
+              f"{'p95 ms':>8} {'calls/s':>8}")
+        for level in (1, concurrency):
+            for name, call in (("per-call", per_call_client),
+                               ("shared pooled", shared_client)):
+                await timed_calls(call, 10, level)  # warm up
+                start = time.perf_counter()
+                latencies = await timed_calls(call, calls, level)
+                rate = calls / (time.perf_counter() - start)
+                p50, p95 = np.percentile(latencies, [50, 95])
+                print(f"{name:>16} {level:>12} {p50:>8.2f} {p95:>8.2f} "
+                      f"{rate:>8.0f}")
+        stats = pool.stats()
+        print(f"shared pool: {stats['requests']} requests, "
+              f"{stats['connections_opened']} connections opened, "
+              f"reuse ratio {stats['reuse_ratio']:.3f}")
+        await shared.aclose()
+        server.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--plain", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.concurrency, args.plain))
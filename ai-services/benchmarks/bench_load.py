@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Open-loop load test of the service's HTTP endpoints against a baseline
+
+Starts main:app under uvicorn with MOCK_OPENAI and MOCK_HUGGINGFACE, the
+mocked upstreams taking --latency seconds (log-normal spread --sigma)
+and failing --error-rate of calls, seeded so runs repeat. Each endpoint
+then gets --rate requests a second for --seconds, sent on schedule
+whether or not earlier ones have finished; latency counts from the
+scheduled send time, so a stalled server cannot hide its queueing.
+Analysis requests carry a distinct transcript each so they miss the
+cache. --record sends upstream calls to OpenAI (OPENAI_API_KEY and
+OPENAI_BASE_URL from the environment) and saves every exchange; a later
+run with --replay (and the same OPENAI_BASE_URL) answers the same
+calls from that file at their original timing scaled by
+--replay-scale, with no network, so engine changes face identical
+upstream behavior. Reports throughput, error
+rate and p50/p95/p99 per endpoint and compares them with
+benchmarks/baselines/load.json; exits 1 when an endpoint regressed by
+more than --threshold.
+
+Usage: python -m benchmarks.bench_load [--rate 20] [--seconds 5]
+           [--latency 0.05] [--sigma 0.5] [--error-rate 0.0]
+           [--only summary,health] [--threshold 0.25] [--save-baseline]
+           [--record FILE | --replay FILE]
+           [--replay-scale 1.0]
+"""
+
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import httpx
+import numpy as np
+
+from app.utils.audio import encode_wav
+from benchmarks.baseline import baseline_path, report, save_baseline
+
+TRANSCRIPT = (
+    "Alice opened the planning meeting. Bob will send the budget by "
+    "Friday. Carol needs to review the launch checklist. The demo went "
+    "well but the vendor contract is a risk. "
+) * 6
+
+# Builds the request (httpx keyword arguments) for request number i
+Builder = Callable[[int], Dict]
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    build: Optional[Builder] = None
+
+
+# Numbers every analysis request in the run, so none hits the cache
+_transcripts = itertools.count()
+
+
+def analysis_body(**fields) -> Builder:
+    def build(i: int) -> Dict:
+        n = next(_transcripts)
+        return {"json": {
+            "meeting_id": f"load-{n}",
+            "text": f"Meeting {n}. {TRANSCRIPT}",
+            **fields,
+        }}
+    return build
+
+
+def speech_wav(seconds: float, sample_rate: int = 16000) -> bytes:
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0, 0.001, int(seconds * sample_rate))
+    for start in np.arange(0.5, seconds - 1, 2.0):
+        at = int(start * sample_rate)
+        samples[at:at + sample_rate] += rng.normal(0, 0.2, sample_rate)
+    return encode_wav(samples.astype(np.float32), sample_rate)
+
+
+def upload(wav: bytes) -> Builder:
+    def build(i: int) -> Dict:
+        return {"files": {
+            "file": (f"load-{i}.wav", io.BytesIO(wav), "audio/wav")
+        }}
+    return build
+
+
+def scenarios(wav: bytes) -> Dict[str, Scenario]:
+    return {s.name: s for s in (
+        Scenario("health", "GET", "/health"),
+        Scenario("analysis-health", "GET", "/api/analysis/health"),
+        Scenario("transcription-health", "GET",
+                 "/api/transcription/health"),
+        Scenario("models", "GET", "/api/transcription/models"),
+        Scenario("summary", "POST", "/api/analysis/summary",
+                 analysis_body(analysis_type="summary")),
+        Scenario("sentiment", "POST", "/api/analysis/sentiment",
+                 analysis_body(analysis_type="sentiment")),
+        Scenario("action-items", "POST", "/api/analysis/action-items",
+                 analysis_body(analysis_type="action_items")),
+        Scenario("analyze", "POST", "/api/analysis/analyze",
+                 analysis_body(analysis_types=[
+                     "summary", "sentiment", "action_items"])),
+        Scenario("speech-regions", "POST",
+                 "/api/transcription/speech-regions", upload(wav)),
+        Scenario("transcribe-file", "POST",
+                 "/api/transcription/transcribe-file", upload(wav)),
+        Scenario("status", "GET", "/api/transcription/status/{job_id}"),
+    )}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, workdir: str, port: int, log) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        ENVIRONMENT="benchmark",
+        OPENAI_API_KEY="sk-mock",
+        MOCK_OPENAI="true",
+        MOCK_HUGGINGFACE="true",
+        MOCK_LATENCY=str(args.latency),
+        MOCK_LATENCY_SIGMA=str(args.sigma),
+        MOCK_ERROR_RATE=str(args.error_rate),
+        MOCK_SEED="0",
+        JOB_STORE_PATH=os.path.join(workdir, "jobs.db"),
+        JOB_SPOOL_DIR=os.path.join(workdir, "spool"),
+        RATE_LIMIT_DIR=os.path.join(workdir, "ratelimit"),
+    )
+    if args.record:
+        env.update(
+            OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "sk-mock"),
+            MOCK_OPENAI="false",
+            UPSTREAM_REPLAY_MODE="record",
+            UPSTREAM_REPLAY_PATH=os.path.abspath(args.record),
+        )
+    elif args.replay:
+        env.update(
+            MOCK_OPENAI="false",
+            UPSTREAM_REPLAY_MODE="replay",
+            UPSTREAM_REPLAY_PATH=os.path.abspath(args.replay),
+            UPSTREAM_REPLAY_LATENCY_SCALE=str(args.replay_scale),
+        )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host",
+         "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, server) -> None:
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+async def offer(client, scenario: Scenario, path: str, rate: float,
+                seconds: float) -> Dict[str, float]:
+    latencies = []
+    errors = 0
+
+    async def one(i: int, at: float):
+        nonlocal errors
+        await asyncio.sleep(max(at - time.perf_counter(), 0))
+        kwargs = scenario.build(i) if scenario.build else {}
+        try:
+            response = await client.request(scenario.method, path, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - at)
+        else:
+            errors += 1
+
+    count = int(rate * seconds)
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i, start + i / rate) for i in range(count)))
+    elapsed = time.perf_counter() - start
+    ms = np.array(latencies or [float("nan")]) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "rps": round(len(latencies) / max(elapsed, seconds), 2),
+        "error_rate": round(errors / count, 4),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+    }
+
+
+async def run(args) -> Dict[str, Dict[str, float]]:
+    wav = speech_wav(10.0)
+    selected = scenarios(wav)
+    if args.only:
+        selected = {n: selected[n] for n in args.only.split(",")}
+    port = free_port()
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir, \
+            open(os.path.join(workdir, "server.log"), "wb+") as log:
+        server = start_server(args, workdir, port, log)
+        try:
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}",
+                timeout=60,
+                limits=httpx.Limits(max_connections=None),
+            ) as client:
+                await wait_ready(client, server)
+                job = await client.post(
+                    "/api/transcription/transcribe-file",
+                    **upload(wav)(0),
+                )
+                job_id = job.json()["job_id"]
+
+                print(f"{'endpoint':>22} {'req/s':>7} {'errors':>7} "
+                      f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+                for name, scenario in selected.items():
+                    path = scenario.path.format(job_id=job_id)
+                    await offer(client, scenario, path, args.rate, 0.5)
+                    result = await offer(
+                        client, scenario, path, args.rate, args.seconds
+                    )
+                    results[name] = result
+                    print(f"{name:>22} {result['rps']:>7.1f} "
+                          f"{result['error_rate']:>7.1%} "
+                          f"{result['p50_ms']:>8.1f} "
+                          f"{result['p95_ms']:>8.1f} "
+                          f"{result['p99_ms']:>8.1f}")
+        except RuntimeError:
+            log.seek(0)
+            sys.stderr.write(log.read().decode(errors="replace")[-4000:])
+            raise
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rate", type=float, default=20.0)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--only", help="comma-separated endpoint names")
+    upstream = parser.add_mutually_exclusive_group()
+    upstream.add_argument("--record", help="save upstream exchanges here")
+    upstream.add_argument("--replay", help="recorded upstream exchanges")
+    parser.add_argument("--replay-scale", type=float, default=1.0)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--min-delta-ms", type=float, default=5.0)
+    parser.add_argument("--baseline", default=baseline_path("load"))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    config = {key: getattr(args, key) for key in
+              ("rate", "seconds", "latency", "sigma", "error_rate",
+               "record", "replay", "replay_scale")}
+    results = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        save_baseline(args.baseline, results, config)
+        print(f"saved baseline to {args.baseline}")
+        return
+    sys.exit(report(results, args.baseline, args.threshold,
+                    args.min_delta_ms, config))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-request cost of the metrics instrumentation
+
+Builds the service's routers and admission control with and without
+RequestMetricsMiddleware and drives them directly over ASGI (no client or
+server overhead, so the relative cost is as large as it can appear): a
+cheap health check and a summary answered from the analysis cache, the
+fastest real request path. Also times one histogram observation and a
+full scrape of the registry.
+
+Usage: python -m benchmarks.bench_metrics [--requests 5000] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI
+
+from app.middleware.admission import AdmissionControlMiddleware
+from app.middleware.metrics import RequestMetricsMiddleware
+from app.routers import analysis, transcription
+from app.services import monitoring  # noqa: F401 (registers collectors)
+from app.utils.config import get_settings
+from app.utils.metrics import REGISTRY, STAGE_SECONDS
+
+TRANSCRIPT = (
+    "Alice opened the planning meeting. Bob will send the budget by "
+    "Friday. Carol needs to review the launch checklist. "
+) * 8
+
+
+def make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(AdmissionControlMiddleware)
+    if instrumented:
+        app.add_middleware(RequestMetricsMiddleware)
+    app.include_router(analysis.router, prefix="/api/analysis")
+    app.include_router(transcription.router, prefix="/api/transcription")
+    return app
+
+
+async def call(app, method: str, path: str, body: bytes) -> int:
+    status = 0
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            await asyncio.sleep(3600)
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    headers = [(b"content-type", b"application/json"),
+               (b"content-length", str(len(body)).encode())]
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path,
+        "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": headers, "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    return status
+
+
+async def rate(app, method: str, path: str, body: bytes, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        await call(app, method, path, body)
+    return (time.perf_counter() - start) / n
+
+
+async def main(requests: int, rounds: int) -> None:
+    settings = get_settings()
+    settings.mock_openai = True
+    settings.mock_huggingface = True
+    apps = {False: make_app(False), True: make_app(True)}
+    summary = json.dumps({
+        "meeting_id": "bench", "text": TRANSCRIPT,
+        "analysis_type": "summary",
+    }).encode()
+    paths = (
+        ("health", "GET", "/api/transcription/health", b""),
+        ("cached summary", "POST", "/api/analysis/summary", summary),
+    )
+    for _, method, path, body in paths:
+        for app in apps.values():
+            assert await call(app, method, path, body) == 200  # warm up
+
+    print(f"{'request':>16} {'plain us':>9} {'metrics us':>11} "
+          f"{'overhead':>9} {'peak req/s':>11}")
+    for name, method, path, body in paths:
+        best = {False: float("inf"), True: float("inf")}
+        for _ in range(rounds):
+            for instrumented, app in apps.items():
+                best[instrumented] = min(
+                    best[instrumented],
+                    await rate(app, method, path, body, requests),
+                )
+        overhead = best[True] / best[False] - 1
+        print(f"{name:>16} {best[False] * 1e6:>9.1f} "
+              f"{best[True] * 1e6:>11.1f} {overhead:>9.1%} "
+              f"{1 / best[True]:>11.0f}")
+
+    histogram = STAGE_SECONDS.labels("bench")
+    start = time.perf_counter()
+    for _ in range(100000):
+        histogram.observe(0.01)
+    observe = (time.perf_counter() - start) / 100000
+    start = time.perf_counter()
+    text = REGISTRY.render()
+    scrape = time.perf_counter() - start
+    print(f"histogram observe: {observe * 1e9:.0f} ns; scrape: "
+          f"{scrape * 1000:.2f} ms for {len(text.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.rounds))
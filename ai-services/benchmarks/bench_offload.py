@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Event-loop lag while CPU-bound audio work runs, by where it runs
+
+For each stage, keeps --jobs calls in flight for --seconds, running them
+inline on the event loop, on a thread, or in the CPU process pool, while
+a probe task sleeps 1ms at a time and records how late it wakes.
+Reports the probe's p50/p99/max lag and the calls finished per second.
+The stages are diarization clustering of --windows speech windows, which
+holds the GIL, and silence trimming of --minutes of synthetic meeting
+audio, which is mostly NumPy calls that release it.
+
+Then times a round trip through the process pool for arrays of each of
+--sizes MB, passed through shared memory and pickled through the pool's
+pipe.
+
+Usage: python -m benchmarks.bench_offload [--jobs 4] [--seconds 5]
+           [--windows 2000] [--minutes 10] [--sizes 1,16,64]
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from app.services import offload
+from app.services.diarization import cluster_embeddings
+from app.services.offload import close_offload, get_cpu_pool
+from app.services.readiness import exercise_audio
+from app.services.transcription_engine import trim_silence
+from app.utils.config import get_settings
+from benchmarks.bench_vad import synthetic_meeting
+
+PROBE_INTERVAL = 0.001
+
+
+async def probe(lags: List[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+
+async def saturate(mode: str, fn: Callable, args: tuple, jobs: int,
+                   seconds: float) -> Dict[str, float]:
+    pool = get_cpu_pool()
+
+    async def job() -> None:
+        if mode == "inline":
+            fn(*args)
+            await asyncio.sleep(0)
+        elif mode == "thread":
+            await asyncio.to_thread(fn, *args)
+        else:
+            await pool.run(fn, *args)
+
+    done = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker() -> None:
+        nonlocal done
+        while time.perf_counter() < deadline:
+            await job()
+            done += 1
+
+    lags: List[float] = []
+    stop = asyncio.Event()
+    probing = asyncio.create_task(probe(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(jobs)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probing
+    lags_ms = np.array(lags or [0.0]) * 1000
+    return {
+        "p50_ms": float(np.percentile(lags_ms, 50)),
+        "p99_ms": float(np.percentile(lags_ms, 99)),
+        "max_ms": float(lags_ms.max()),
+        "calls_per_s": done / elapsed,
+    }
+
+
+async def transfer(size_mb: int, shared: bool, repeat: int = 5) -> float:
+    """Median seconds for a pool round trip of a size_mb float32 array"""
+    array = np.random.default_rng(0).random(
+        size_mb * 2 ** 20 // 4, dtype=np.float32
+    )
+    threshold = offload.SHARE_MIN_BYTES
+    offload.SHARE_MIN_BYTES = 0 if shared else array.nbytes + 1
+    try:
+        pool = get_cpu_pool()
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = await pool.run(np.negative, array)
+            times.append(time.perf_counter() - start)
+        assert result[0] == -array[0]
+    finally:
+        offload.SHARE_MIN_BYTES = threshold
+    return float(np.median(times))
+
+
+async def main(args) -> None:
+    settings = get_settings()
+    sample_rate = settings.audio_sample_rate
+    stages = {
+        "cluster": (cluster_embeddings, (
+            np.random.default_rng(0).normal(
+                size=(args.windows, 38)).astype(np.float32),
+            settings.diarization_threshold,
+            settings.diarization_max_speakers,
+            args.windows,
+        )),
+        "trim": (trim_silence, (
+            synthetic_meeting(args.minutes, sample_rate), sample_rate,
+            settings,
+        )),
+    }
+    pool = get_cpu_pool()
+    # Start every worker before measuring
+    await asyncio.gather(*(pool.run(exercise_audio)
+                           for _ in range(pool.workers)))
+    print(f"{args.jobs} calls in flight, {pool.workers} pool processes, "
+          f"{args.seconds:.0f}s per mode")
+    print(f"{'stage':>8} {'mode':>8} {'lag p50 ms':>11} {'p99 ms':>8} "
+          f"{'max ms':>8} {'calls/s':>8}")
+    for stage, (fn, fn_args) in stages.items():
+        for mode in ("inline", "thread", "process"):
+            r = await saturate(mode, fn, fn_args, args.jobs, args.seconds)
+            print(f"{stage:>8} {mode:>8} {r['p50_ms']:>11.2f} "
+                  f"{r['p99_ms']:>8.2f} {r['max_ms']:>8.1f} "
+                  f"{r['calls_per_s']:>8.2f}")
+
+    print(f"\n{'MB':>5} {'shared ms':>10} {'pickled ms':>11}")
+    for size in args.sizes:
+        shared = await transfer(size, shared=True)
+        pickled = await transfer(size, shared=False)
+        print(f"{size:>5} {shared * 1000:>10.1f} {pickled * 1000:>11.1f}")
+    close_offload()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--windows", type=int, default=2000)
+    parser.add_argument("--minutes", type=int, default=10)
+    parser.add_argument("--sizes", default="1,16,64",
+                        type=lambda s: [int(n) for n in s.split(",")])
+    asyncio.run(main(parser.parse_args()))
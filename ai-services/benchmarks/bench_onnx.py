@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Sentiment inference backends: eager torch fp32 vs. ONNX Runtime fp32 and
+dynamically quantized int8
+
+Loads --model (a Hugging Face name or local directory; by default a
+randomly initialised BERT of --layers/--hidden, saved to a temporary
+directory) with each backend, exporting to ONNX in a temporary cache.
+Runs the labelled sentences in benchmarks/fixtures/sentiment.jsonl
+through each and reports accuracy, agreement with torch fp32 and the
+mean/max change in class probabilities; then segments/sec and p50/p95
+latency per forward pass at each --batch-sizes. Exits 1 when int8
+moves probabilities by more than --max-delta on average or, with a real
+--model, agrees with fp32 on fewer than --min-agreement of the fixtures.
+
+A random model is only good for speed and for the probability change;
+accuracy against the labels needs the real --model.
+
+Usage: python -m benchmarks.bench_onnx [--model NAME_OR_DIR]
+           [--batch-sizes 1,8,32] [--repeat 20] [--min-agreement 0.95]
+           [--max-delta 0.02]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.services.model_registry import (
+    OnnxClassifier,
+    SequenceClassifier,
+    TransformersClassifier,
+)
+from benchmarks.bench_prefork import save_model
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures",
+                        "sentiment.jsonl")
+
+
+def load_fixtures() -> Tuple[List[str], List[str]]:
+    with open(FIXTURES) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [row["text"] for row in rows], [row["label"] for row in rows]
+
+
+def load(backend: str, model: str, cache_dir: str) -> SequenceClassifier:
+    if backend == "torch":
+        return TransformersClassifier(model, cache_dir=cache_dir)
+    return OnnxClassifier(model, cache_dir=cache_dir,
+                          quantize=backend == "onnx-int8")
+
+
+def speed(classifier: SequenceClassifier, texts: List[str],
+          batch_size: int, repeat: int) -> Dict[str, float]:
+    batch = (texts * (batch_size // len(texts) + 1))[:batch_size]
+    classifier.predict(batch)  # first pass sets up kernels and buffers
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        classifier.predict(batch)
+        times.append(time.perf_counter() - start)
+    return {
+        "segments_per_s": batch_size / float(np.median(times)),
+        "p50_ms": float(np.percentile(times, 50)) * 1000,
+        "p95_ms": float(np.percentile(times, 95)) * 1000,
+    }
+
+
+def main(args) -> int:
+    texts, labels = load_fixtures()
+    with tempfile.TemporaryDirectory() as workdir:
+        model = args.model
+        if model is None:
+            model = os.path.join(workdir, "model")
+            os.makedirs(model)
+            weights = save_model(model, args.layers, args.hidden)
+            print(f"model: random, {args.layers} layers, hidden "
+                  f"{args.hidden}, {weights:.0f}MB of weights")
+        cache_dir = os.path.join(workdir, "cache")
+
+        probs: Dict[str, np.ndarray] = {}
+        classifiers = {}
+        for backend in ("torch", "onnx", "onnx-int8"):
+            start = time.perf_counter()
+            classifiers[backend] = load(backend, model, cache_dir)
+            loaded = time.perf_counter() - start
+            probs[backend] = classifiers[backend].predict(texts)
+            print(f"{backend}: loaded (and exported) in {loaded:.1f}s")
+        int8 = classifiers["onnx-int8"].path
+        fp32 = classifiers["onnx"].path
+        print(f"onnx file: {os.path.getsize(fp32) / 2 ** 20:.0f}MB fp32, "
+              f"{os.path.getsize(int8) / 2 ** 20:.0f}MB int8")
+
+        label_names = classifiers["torch"].labels
+        reference = probs["torch"].argmax(axis=1)
+        print(f"\n{'backend':>10} {'accuracy':>9} {'agreement':>10} "
+              f"{'mean delta':>11} {'max delta':>10}")
+        deltas = {}
+        for backend, p in probs.items():
+            predicted = p.argmax(axis=1)
+            accuracy = np.mean([label_names[i] == label
+                                for i, label in zip(predicted, labels)])
+            agreement = float(np.mean(predicted == reference))
+            delta = np.abs(p - probs["torch"])
+            deltas[backend] = (agreement, float(delta.mean()))
+            print(f"{backend:>10} {accuracy:>9.3f} {agreement:>10.3f} "
+                  f"{delta.mean():>11.5f} {delta.max():>10.5f}")
+
+        print(f"\n{'backend':>10} {'batch':>6} {'segments/s':>11} "
+              f"{'p50 ms':>8} {'p95 ms':>8}")
+        for batch_size in args.batch_sizes:
+            for backend, classifier in classifiers.items():
+                r = speed(classifier, texts, batch_size, args.repeat)
+                print(f"{backend:>10} {batch_size:>6} "
+                      f"{r['segments_per_s']:>11.1f} {r['p50_ms']:>8.1f} "
+                      f"{r['p95_ms']:>8.1f}")
+
+    agreement, delta = deltas["onnx-int8"]
+    if args.model is None:
+        # A random model's classes are nearly tied, so its argmax flips
+        # on noise; only the probability change is meaningful
+        agreement = 1.0
+    if agreement < args.min_agreement or delta > args.max_delta:
+        print(f"\nint8 is too far from fp32: agreement {agreement:.3f} "
+              f"(min {args.min_agreement}), mean delta {delta:.5f} "
+              f"(max {args.max_delta})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model")
+    parser.add_argument("--layers", type=int, default=6)
+    parser.add_argument("--hidden", type=int, default=768)
+    parser.add_argument("--batch-sizes", default="1,8,32",
+                        type=lambda s: [int(n) for n in s.split(",")])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    parser.add_argument("--max-delta", type=float, default=0.02)
+    sys.exit(main(parser.parse_args()))
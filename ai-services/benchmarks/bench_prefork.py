@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Memory of N serving workers: pre-fork (serve.py) vs. uvicorn --workers
+
+Saves a randomly initialised BERT sentiment classifier (--layers,
+--hidden) to a temporary directory, then for each worker count serves it
+with the pre-fork server, which loads it once and forks, and with
+uvicorn --workers, where every worker loads its own copy. Once every
+worker has run a warm-up forward pass and memory has settled, reports
+per-worker RSS, total RSS and total PSS from /proc/<pid>/smaps_rollup.
+RSS counts shared pages in every process that maps them; PSS splits
+them between those processes, so total PSS is the real footprint.
+
+Usage: python -m benchmarks.bench_prefork [--workers 1,2,4,8]
+           [--modes uvicorn,prefork] [--layers 6] [--hidden 768]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.bench_startup import SERVICE_DIR, free_port, wait_for
+
+WORDS = ["good", "great", "bad", "late", "the", "meeting", "went", "is"]
+
+
+def save_model(path: str, layers: int, hidden: int) -> float:
+    """Write a random classifier and tokenizer; returns weights in MB"""
+    from transformers import (
+        BertConfig,
+        BertForSequenceClassification,
+        BertTokenizerFast,
+    )
+
+    vocab = os.path.join(path, "vocab.txt")
+    with open(vocab, "w") as f:
+        f.write("\n".join(
+            ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS
+        ))
+    BertTokenizerFast(vocab_file=vocab).save_pretrained(path)
+    config = BertConfig(
+        num_hidden_layers=layers, hidden_size=hidden,
+        num_attention_heads=hidden // 64, intermediate_size=4 * hidden,
+        num_labels=3,
+        id2label={0: "negative", 1: "neutral", 2: "positive"},
+        label2id={"negative": 0, "neutral": 1, "positive": 2},
+    )
+    model = BertForSequenceClassification(config)
+    model.save_pretrained(path)
+    return sum(p.numel() * p.element_size()
+               for p in model.parameters()) / 2 ** 20
+
+
+def descendants(pid: int) -> List[int]:
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except OSError:
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    found, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0][:-1].lower()] = int(parts[1])
+    return values
+
+
+def command(mode: str, port: int, workers: int) -> List[str]:
+    if mode == "prefork":
+        return [sys.executable, "serve.py"]
+    return [sys.executable, "-m", "uvicorn", "main:app", "--host",
+            "127.0.0.1", "--port", str(port), "--workers", str(workers),
+            "--log-level", "warning"]
+
+
+def measure(mode: str, workers: int, model_dir: str) -> Dict[str, float]:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(
+            os.environ,
+            ENVIRONMENT="benchmark",
+            HOST="127.0.0.1",
+            PORT=str(port),
+            WORKERS=str(workers),
+            LOG_LEVEL="WARNING",
+            OPENAI_API_KEY="sk-mock",
+            MOCK_OPENAI="true",
+            MOCK_HUGGINGFACE="false",
+            HF_SENTIMENT_MODEL=model_dir,
+            HF_USE_AUTH_TOKEN="false",
+            ENABLE_MODEL_PRELOAD="true",
+            JOB_STORE_PATH=os.path.join(workdir, "jobs.db"),
+            JOB_SPOOL_DIR=os.path.join(workdir, "spool"),
+            RATE_LIMIT_DIR=os.path.join(workdir, "ratelimit"),
+        )
+        start = time.perf_counter()
+        server = subprocess.Popen(
+            command(mode, port, workers), env=env, cwd=SERVICE_DIR,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for(server, f"http://127.0.0.1:{port}/health/ready",
+                     start, timeout=300)
+            # Until every worker has warmed up and memory stops growing
+            previous, steady = 0, 0
+            while steady < 3:
+                time.sleep(1.0)
+                pids = [server.pid] + descendants(server.pid)
+                total = sum(memory_kb(pid)["pss"] for pid in pids)
+                steady = steady + 1 if abs(total - previous) \
+                    < 0.01 * total else 0
+                previous = total
+            parent = memory_kb(server.pid)
+            children = [memory_kb(pid) for pid in descendants(server.pid)]
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+    # A single uvicorn worker serves from the parent process itself
+    workers_kb = children or [parent]
+    everything = [parent] + children
+    return {
+        "worker_rss_mb": max(m["rss"] for m in workers_kb) / 1024,
+        "total_rss_mb": sum(m["rss"] for m in everything) / 1024,
+        "total_pss_mb": sum(m["pss"] for m in everything) / 1024,
+    }
+
+
+def main(args) -> int:
+    with tempfile.TemporaryDirectory() as model_dir:
+        weights = save_model(model_dir, args.layers, args.hidden)
+        print(f"model: {args.layers} layers, hidden {args.hidden}, "
+              f"{weights:.0f}MB of weights")
+        print(f"{'mode':>8} {'workers':>8} {'worker RSS MB':>14} "
+              f"{'total RSS MB':>13} {'total PSS MB':>13}")
+        for workers in args.workers:
+            for mode in args.modes:
+                r = measure(mode, workers, model_dir)
+                print(f"{mode:>8} {workers:>8} {r['worker_rss_mb']:>14.0f} "
+                      f"{r['total_rss_mb']:>13.0f} "
+                      f"{r['total_pss_mb']:>13.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", default="1,2,4,8",
+                        type=lambda s: [int(n) for n in s.split(",")])
+    parser.add_argument("--modes", default="uvicorn,prefork",
+                        type=lambda s: s.split(","))
+    parser.add_argument("--layers", type=int, default=6)
+    parser.add_argument("--hidden", type=int, default=768)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark bytes and transcription time saved by audio preprocessing
+
+Synthesizes a meeting recording as 48kHz stereo: speech bursts separated
+by pauses, long lulls and a silent lead-in and tail over a low noise
+floor. It then compares what is sent upstream with and without the
+preprocessing stage: downmix, resampling, silence removal and compact
+encoding. Transcription time comes from the fake backend with a fixed
+per-chunk latency.
+
+Usage: python -m benchmarks.bench_preprocess [--minutes 60] [--latency 0.5]
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.services.transcription_engine import (
+    FakeTranscriptionBackend,
+    TranscriptionEngine,
+    split_audio,
+)
+from app.utils.audio import encode_audio, to_mono
+from app.utils.config import get_settings
+from app.utils.preprocess import condense_silence
+
+SOURCE_RATE = 48000
+
+
+def synthetic_meeting(minutes: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    total = minutes * 60 * SOURCE_RATE
+    mono = rng.normal(0, 10 ** (-60 / 20), total).astype(np.float32)
+    position = 2 * 60 * SOURCE_RATE  # silent lead-in
+    end = total - 60 * SOURCE_RATE  # silent tail
+    while position < end:
+        length = int(rng.uniform(2, 15) * SOURCE_RATE)
+        burst = rng.normal(0, 0.15, min(length, end - position))
+        mono[position:position + len(burst)] += burst.astype(np.float32)
+        pause = rng.uniform(0.3, 2.0) if rng.random() < 0.85 \
+            else rng.uniform(5, 40)
+        position += length + int(pause * SOURCE_RATE)
+    return np.stack([mono, 0.8 * mono], axis=1)
+
+
+def encoded_bytes(samples, sample_rate, encoding, chunk_seconds) -> int:
+    chunks = split_audio(samples, sample_rate, chunk_seconds, 2.0, 10.0)
+    return sum(len(encode_audio(c.samples, sample_rate, encoding))
+               for c in chunks)
+
+
+async def transcribe_seconds(samples, sample_rate, trim, latency) -> float:
+    settings = get_settings()
+    settings.audio_trim_silence = trim
+    engine = TranscriptionEngine(
+        FakeTranscriptionBackend(latency=latency), max_concurrency=4
+    )
+    start = time.perf_counter()
+    await engine.transcribe(samples, sample_rate)
+    return time.perf_counter() - start
+
+
+async def main(minutes: int, latency: float) -> None:
+    settings = get_settings()
+    sample_rate = settings.audio_sample_rate
+    chunk_seconds = settings.transcription_chunk_seconds
+
+    source = synthetic_meeting(minutes)
+    source_bytes = source.shape[0] * source.shape[1] * 2 + 44
+
+    start = time.perf_counter()
+    mono, _ = to_mono(source, SOURCE_RATE, sample_rate)
+    del source
+    resample_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    condensed, time_map = condense_silence(
+        mono,
+        sample_rate,
+        threshold_db=settings.audio_silence_threshold_db,
+        min_silence=settings.audio_min_silence,
+        padding=settings.audio_silence_padding,
+    )
+    condense_time = time.perf_counter() - start
+
+    print(f"recording: {minutes} min 48kHz stereo; downmix+resample "
+          f"{resample_time:.2f}s, silence removal {condense_time:.2f}s")
+    print(f"speech kept: {time_map.compact_duration / 60:.1f} of "
+          f"{time_map.original_duration / 60:.1f} min "
+          f"({len(time_map.lengths)} spans)")
+    print(f"{'sent upstream':>32} {'MB':>8} {'audio min':>10}")
+    rows = [
+        ("source 48kHz stereo wav", source_bytes, minutes),
+        ("16kHz mono wav", encoded_bytes(
+            mono, sample_rate, "wav", chunk_seconds), minutes),
+    ]
+    for encoding in ("wav", "flac", "ogg"):
+        rows.append((f"16kHz mono, trimmed, {encoding}", encoded_bytes(
+            condensed, sample_rate, encoding, chunk_seconds),
+            time_map.compact_duration / 60))
+    for name, size, audio_minutes in rows:
+        print(f"{name:>32} {size / 2 ** 20:>8.1f} {audio_minutes:>10.1f}")
+
+    untrimmed = await transcribe_seconds(mono, sample_rate, False, latency)
+    trimmed = await transcribe_seconds(mono, sample_rate, True, latency)
+    print(f"transcription wall time ({latency}s/chunk, concurrency 4): "
+          f"{untrimmed:.2f}s untrimmed, {trimmed:.2f}s trimmed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.minutes, args.latency))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark 429s and goodput of several workers sharing one token quota
+
+Starts --workers processes that send bursts of chat calls (random token
+sizes, averaging --load of the quota) at a simulated upstream enforcing a
+tokens-per-minute limit through a shared state file, like OpenAI does per
+organisation. A rejected call gets a 429 and is retried after a second.
+Compares no limiter, a limiter per process with the full quota each (what
+independent workers amount to) and the limiter shared through a file.
+Reports goodput (tokens admitted per second beyond the upstream's initial
+burst, as a share of the quota), 429s and call latency.
+
+Usage: python -m benchmarks.bench_rate_limiter [--workers 4]
+           [--duration 10] [--tpm 600000] [--load 0.9]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.rate_limiter import (
+    TOKENS,
+    Bucket,
+    FileBucketStore,
+    LocalBucketStore,
+    RateLimiter,
+)
+
+BURST_INTERVAL = 2.0
+RETRY_DELAY = 1.0
+BURST_SECONDS = 1.0
+
+
+def run_worker(mode, directory, args, seed, results) -> None:
+    async def main():
+        rng = random.Random(seed)
+        bucket = Bucket(TOKENS, args.tpm, BURST_SECONDS)
+        upstream = FileBucketStore(
+            [bucket], os.path.join(directory, "upstream.state")
+        )
+        limiter = None
+        if mode == "shared":
+            limiter = RateLimiter("bench", FileBucketStore(
+                [bucket], os.path.join(directory, "limiter.state")
+            ))
+        elif mode == "per-process":
+            limiter = RateLimiter("bench", LocalBucketStore([bucket]))
+
+        admitted = 0
+        rejected = 0
+        latencies = []
+
+        async def call(tokens):
+            nonlocal admitted, rejected
+            start = time.monotonic()
+            while True:
+                if limiter is not None:
+                    await limiter.acquire(tokens=tokens)
+                if await upstream.reserve({TOKENS: tokens}) == 0:
+                    break
+                await upstream.reserve({TOKENS: -tokens})
+                rejected += 1
+                await asyncio.sleep(RETRY_DELAY)
+            admitted += tokens
+            latencies.append(time.monotonic() - start)
+
+        # Each worker offers load / workers of the quota in bursts
+        per_burst = (args.tpm / 60 * BURST_INTERVAL * args.load
+                     / args.workers)
+        calls = []
+        offered = 0.0
+        for _ in range(int(args.duration / BURST_INTERVAL)):
+            offered += per_burst
+            while offered > 0:
+                tokens = rng.randint(100, 1500)
+                offered -= tokens
+                calls.append(asyncio.create_task(call(tokens)))
+            await asyncio.sleep(BURST_INTERVAL)
+        await asyncio.gather(*calls)
+        results.put((admitted, rejected, latencies))
+
+    asyncio.run(main())
+
+
+def run(mode: str, args) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        results = multiprocessing.Queue()
+        start = time.monotonic()
+        workers = [
+            multiprocessing.Process(
+                target=run_worker, args=(mode, directory, args, i, results)
+            )
+            for i in range(args.workers)
+        ]
+        for worker in workers:
+            worker.start()
+        outcomes = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - start
+
+    admitted = sum(o[0] for o in outcomes)
+    rejected = sum(o[1] for o in outcomes)
+    ms = np.concatenate([o[2] for o in outcomes]) * 1000
+    p50, p99 = np.percentile(ms, [50, 99])
+    rate = args.tpm / 60
+    goodput = (admitted - rate * BURST_SECONDS) / elapsed / rate
+    print(f"{mode:>12} {goodput:>8.1%} {rejected:>6} {p50:>8.0f} "
+          f"{p99:>8.0f} {elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--tpm", type=int, default=600000)
+    parser.add_argument("--load", type=float, default=0.9)
+    args = parser.parse_args()
+    print(f"{args.workers} workers offering {args.load:.0%} of "
+          f"{args.tpm} tokens/min in bursts every {BURST_INTERVAL}s "
+          f"for {args.duration}s")
+    print(f"{'limiter':>12} {'goodput':>8} {'429s':>6} {'p50 ms':>8} "
+          f"{'p99 ms':>8} {'wall s':>8}")
+    for mode in ("none", "per-process", "shared"):
+        run(mode, args)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark upstream load and caller latency during a simulated outage
+
+Callers arrive at a steady rate against a fake upstream that takes
+--latency seconds per call and fails every call for the middle third of
+the run. Compares the old retry loop (every exception retried with
+doubling delays, no budget, no breaker, no deadline) with the retry
+engine. Reports call amplification (upstream attempts per caller call),
+caller latency percentiles and outcomes.
+
+Usage: python -m benchmarks.bench_retry [--callers 600] [--duration 3]
+           [--latency 0.02] [--timeout 2]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from app.services.errors import AIServiceError, RetryableError
+from app.services.retry import (
+    CircuitBreaker,
+    RetryBudget,
+    Upstream,
+    deadline,
+)
+
+MAX_ATTEMPTS = 3
+BASE_DELAY = 0.1
+
+
+class FakeUpstream:
+    def __init__(self, latency: float, down_from: float, down_until: float):
+        self.latency = latency
+        self.down_from = down_from
+        self.down_until = down_until
+        self.attempts = 0
+
+    async def call(self) -> str:
+        self.attempts += 1
+        await asyncio.sleep(self.latency)
+        if self.down_from <= time.monotonic() < self.down_until:
+            raise RetryableError("503 Service Unavailable")
+        return "ok"
+
+
+async def legacy_retry(func, max_retries: int, delay: float):
+    """The loop process_with_retry used before the retry engine"""
+    last_exception = None
+    for attempt in range(max_retries):
+        try:
+            return await func()
+        except Exception as e:
+            last_exception = e
+            if attempt < max_retries - 1:
+                await asyncio.sleep(delay * (2 ** attempt))
+    raise AIServiceError(str(last_exception))
+
+
+async def run(name: str, args) -> None:
+    start = time.monotonic()
+    third = args.duration / 3
+    upstream = FakeUpstream(args.latency, start + third, start + 2 * third)
+    engine = Upstream(
+        "bench",
+        RetryBudget(0.2, 1.0),
+        CircuitBreaker(5, third / 2),
+    )
+    latencies = []
+    outcomes = {"ok": 0, "failed": 0}
+
+    async def caller(at: float) -> None:
+        await asyncio.sleep(at)
+        began = time.monotonic()
+        try:
+            if name == "legacy":
+                await legacy_retry(upstream.call, MAX_ATTEMPTS, BASE_DELAY)
+            else:
+                with deadline(args.timeout):
+                    await engine.call(
+                        upstream.call,
+                        max_attempts=MAX_ATTEMPTS,
+                        base_delay=BASE_DELAY,
+                    )
+            outcomes["ok"] += 1
+        except AIServiceError:
+            outcomes["failed"] += 1
+        latencies.append(time.monotonic() - began)
+
+    interval = args.duration / args.callers
+    await asyncio.gather(
+        *(caller(i * interval) for i in range(args.callers))
+    )
+    ms = np.array(latencies) * 1000
+    p50, p99 = np.percentile(ms, [50, 99])
+    print(f"{name:>8} {upstream.attempts / args.callers:>14.2f} "
+          f"{p50:>8.1f} {p99:>8.1f} {ms.max():>8.1f} "
+          f"{outcomes['ok']:>6} {outcomes['failed']:>7}")
+
+
+async def main(args) -> None:
+    logging.getLogger("app.services.retry").setLevel(logging.ERROR)
+    print(f"{args.callers} calls over {args.duration}s, upstream down for "
+          f"the middle {args.duration / 3:.1f}s")
+    print(f"{'retry':>8} {'amplification':>14} {'p50 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8} {'ok':>6} {'failed':>7}")
+    for name in ("legacy", "engine"):
+        await run(name, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--callers", type=int, default=600)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-segment sentiment throughput by batch size on CPU
+
+By default loads HF_SENTIMENT_MODEL through the model registry loader.
+--offline builds a randomly initialised model with the same architecture
+and a hashing tokenizer, which gives representative CPU timings without
+downloading weights.
+
+Usage: python -m benchmarks.bench_sentiment [--offline] [--segments 256]
+"""
+
+import argparse
+import time
+from typing import List
+
+import numpy as np
+
+from app.services.model_registry import (
+    TransformersClassifier,
+    load_classifier,
+)
+from app.services.sentiment_service import predict_batched
+from app.utils.config import get_settings
+
+SENTENCES = [
+    "Thanks everyone for joining today.",
+    "The release is blocked on the security review and that worries me.",
+    "Great progress on the dashboard, the charts look excellent.",
+    "Can we move the retro to Thursday?",
+    "I think we are a little behind on the migration but it is manageable "
+    "if we cut the optional reports from this sprint.",
+    "Agreed.",
+]
+
+
+class HashingTokenizer:
+    """Whitespace tokenizer with hashed ids, shaped like a HF tokenizer"""
+
+    def __init__(self, vocab_size: int):
+        self.vocab_size = vocab_size
+
+    def __call__(self, texts: List[str], max_length: int, **kwargs):
+        import torch
+
+        ids = [[hash(w) % (self.vocab_size - 3) + 3 for w in t.split()]
+               [:max_length - 2] for t in texts]
+        width = max(len(row) for row in ids) + 2
+        input_ids = torch.ones((len(ids), width), dtype=torch.long)
+        mask = torch.zeros((len(ids), width), dtype=torch.long)
+        for i, row in enumerate(ids):
+            input_ids[i, :len(row) + 2] = torch.tensor([0] + row + [2])
+            mask[i, :len(row) + 2] = 1
+        return {"input_ids": input_ids, "attention_mask": mask}
+
+
+def offline_classifier() -> TransformersClassifier:
+    import torch
+    from transformers import RobertaConfig, RobertaForSequenceClassification
+
+    config = RobertaConfig(num_labels=3, id2label={
+        0: "negative", 1: "neutral", 2: "positive"
+    })
+    classifier = TransformersClassifier.__new__(TransformersClassifier)
+    classifier.name = "roberta-base (random weights)"
+    classifier.max_length = 512
+    classifier.model = RobertaForSequenceClassification(config).eval()
+    classifier.tokenizer = HashingTokenizer(config.vocab_size)
+    classifier.labels = ["negative", "neutral", "positive"]
+    classifier._torch = torch
+    return classifier
+
+
+def main(offline: bool, segments: int) -> None:
+    settings = get_settings()
+    model = offline_classifier() if offline \
+        else load_classifier(settings.hf_sentiment_model)
+
+    rng = np.random.default_rng(0)
+    texts = [SENTENCES[i] for i in rng.integers(0, len(SENTENCES), segments)]
+    predict_batched(model, texts[:8], 8)  # warm-up
+
+    print(f"model: {model.name}, segments: {segments}")
+    print(f"{'batch':>6} {'seconds':>8} {'segments/s':>11}")
+    for batch_size in (1, 2, 4, 8, 16, 32, 64):
+        start = time.perf_counter()
+        predict_batched(model, texts, batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"{batch_size:>6} {elapsed:>8.2f} {segments / elapsed:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--offline", action="store_true")
+    parser.add_argument("--segments", type=int, default=256)
+    args = parser.parse_args()
+    main(args.offline, args.segments)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks of the audio and analysis stages against a baseline
+
+Times each stage on fixed synthetic input: decoding and resampling a
+48kHz stereo WAV recording, silence removal, voice activity detection,
+chunking and encoding for upload, lexicon sentiment, a fused analysis
+pass with the offline LLM backend, and cache-key hashing. Reports the
+median and best of --repeat runs and compares the medians with
+benchmarks/baselines/stages.json; exits 1 when a stage slowed by more
+than --threshold.
+
+Usage: python -m benchmarks.bench_stages [--minutes 2] [--repeat 7]
+           [--threshold 0.25] [--save-baseline]
+"""
+
+import argparse
+import asyncio
+import io
+import sys
+import time
+from typing import Awaitable, Callable, Dict, Union
+
+import numpy as np
+import soundfile as sf
+
+from app.services.analysis_service import ANALYSIS_TYPES
+from app.services.batching import close_batchers
+from app.services.cache import make_cache_key
+from app.services.model_registry import LexiconClassifier
+from app.services.transcription_engine import split_audio
+from app.utils.audio import decode_audio, encode_audio
+from app.utils.config import get_settings
+from app.utils.preprocess import condense_silence
+from app.utils.text import split_sentences
+from app.utils.vad import VoiceActivityDetector
+from benchmarks.baseline import baseline_path, report, save_baseline
+from benchmarks.bench_analysis import make_service, transcript
+
+SOURCE_RATE = 48000
+
+Stage = Callable[[int], Union[None, Awaitable[None]]]
+
+
+def recording(minutes: float) -> bytes:
+    """Speech-like bursts and pauses over a noise floor, as 48kHz stereo"""
+    rng = np.random.default_rng(0)
+    total = int(minutes * 60 * SOURCE_RATE)
+    mono = rng.normal(0, 10 ** (-60 / 20), total)
+    position = 0
+    while position < total:
+        length = int(rng.uniform(2, 10) * SOURCE_RATE)
+        burst = rng.normal(0, 0.15, min(length, total - position))
+        mono[position:position + len(burst)] += burst
+        position += length + int(rng.uniform(0.5, 4) * SOURCE_RATE)
+    stereo = np.stack([mono, 0.8 * mono], axis=1).astype(np.float32)
+    buffer = io.BytesIO()
+    sf.write(buffer, stereo, SOURCE_RATE, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+async def measure(stage: Stage, repeat: int) -> Dict[str, float]:
+    times = []
+    for i in range(repeat + 1):
+        start = time.perf_counter()
+        result = stage(i)
+        if asyncio.iscoroutine(result):
+            await result
+        if i:  # the first run warms caches and lazy imports
+            times.append(time.perf_counter() - start)
+    return {
+        "p50_ms": round(float(np.median(times)) * 1000, 3),
+        "best_ms": round(min(times) * 1000, 3),
+    }
+
+
+async def main(args) -> int:
+    settings = get_settings()
+    rate = settings.audio_sample_rate
+    wav = recording(args.minutes)
+    samples, _ = decode_audio(wav, rate)
+    text = transcript(int(args.minutes * 5))
+    detector = VoiceActivityDetector(
+        rate, frame_length=settings.audio_chunk_size,
+        floor_db=settings.audio_silence_threshold_db,
+    )
+    classifier = LexiconClassifier()
+    service, _ = make_service(latency=0.0)
+
+    def encode(i: int) -> None:
+        for chunk in split_audio(samples, rate, 60.0, 2.0, 10.0):
+            encode_audio(chunk.samples, rate,
+                         settings.transcription_upload_format)
+
+    async def analyze(i: int) -> None:
+        # A distinct transcript each run, so nothing is served from cache
+        await service.analyze(f"Run {i}. {text}", list(ANALYSIS_TYPES))
+
+    stages: Dict[str, Stage] = {
+        "decode": lambda i: decode_audio(wav, rate),
+        "preprocess": lambda i: condense_silence(
+            samples, rate, settings.audio_silence_threshold_db
+        ),
+        "vad": lambda i: detector.detect(samples),
+        "encode": encode,
+        "sentiment": lambda i: classifier.predict(split_sentences(text)),
+        "analysis": analyze,
+        "cache-key": lambda i: make_cache_key(
+            "bench:", text, "summary", "model", "v1"
+        ),
+    }
+
+    print(f"audio: {args.minutes} min; transcript: "
+          f"{len(text.split())} words")
+    print(f"{'stage':>12} {'median ms':>10} {'best ms':>9}")
+    results = {}
+    for name, stage in stages.items():
+        results[name] = await measure(stage, args.repeat)
+        print(f"{name:>12} {results[name]['p50_ms']:>10.2f} "
+              f"{results[name]['best_ms']:>9.2f}")
+    await close_batchers()
+
+    config = {"minutes": args.minutes, "repeat": args.repeat}
+    if args.save_baseline:
+        save_baseline(args.baseline, results, config)
+        print(f"saved baseline to {args.baseline}")
+        return 0
+    return report(results, args.baseline, args.threshold,
+                  args.min_delta_ms, config)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, default=2.0)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--min-delta-ms", type=float, default=0.5)
+    parser.add_argument("--baseline", default=baseline_path("stages"))
+    parser.add_argument("--save-baseline", action="store_true")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Import time per module and time to the first /health of a fresh process
+
+Runs `python -X importtime -c "import main"` and reports the top-level
+packages and the modules that cost the most to import, then starts the
+service under uvicorn --runs times and measures how long after spawning
+it first answers /health. Heavy ML and audio packages listed in
+HEAVY_MODULES should never appear in the import profile; they load on
+first use.
+
+Usage: python -m benchmarks.bench_startup [--top 15] [--runs 3]
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded lazily by the services that need them, never by `import main`
+HEAVY_MODULES = (
+    "torch", "transformers", "librosa", "scipy", "sklearn", "numba",
+    "soundfile", "openai", "redis",
+)
+
+
+def import_profile() -> List[Tuple[str, int, int, int]]:
+    """(module, depth, self µs, cumulative µs) for each import of main"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=SERVICE_DIR, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative)))
+    return rows
+
+
+def by_package(rows) -> Dict[str, int]:
+    """
+    Cumulative import time of each top-level package, largest first,
+    counting a module only when whatever imported it is outside its package
+    """
+    totals: Dict[str, int] = {}
+    parents: List[str] = []
+    # -X importtime prints children before their parent; reversed, each
+    # module follows the one that imported it
+    for name, depth, _, cumulative in reversed(rows):
+        del parents[depth:]
+        package = name.split(".")[0]
+        if not parents or parents[-1] != package:
+            totals[package] = totals.get(package, 0) + cumulative
+        parents.append(package)
+    totals.pop("main", None)
+    return dict(sorted(totals.items(), key=lambda kv: -kv[1]))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(port: int, workdir: str, **env: str) -> subprocess.Popen:
+    """Start main:app under uvicorn with mocked upstreams"""
+    env = dict(
+        os.environ,
+        ENVIRONMENT="benchmark",
+        OPENAI_API_KEY="sk-mock",
+        MOCK_OPENAI="true",
+        MOCK_HUGGINGFACE="true",
+        JOB_STORE_PATH=os.path.join(workdir, "jobs.db"),
+        JOB_SPOOL_DIR=os.path.join(workdir, "spool"),
+        RATE_LIMIT_DIR=os.path.join(workdir, "ratelimit"),
+        **env,
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host",
+         "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env, cwd=SERVICE_DIR,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_for(server: subprocess.Popen, url: str, start: float,
+             timeout: float = 60.0) -> float:
+    """Seconds from start until url first answers 200"""
+    while time.perf_counter() - start < timeout:
+        if server.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.TransportError:
+            pass
+        time.sleep(0.02)
+    raise RuntimeError(f"{url} did not answer 200 in time")
+
+
+def time_to_health(timeout: float = 60.0) -> float:
+    """Seconds from spawning uvicorn until /health first answers 200"""
+    port = free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        server = spawn_server(port, workdir)
+        try:
+            return wait_for(server, f"http://127.0.0.1:{port}/health",
+                            start, timeout)
+        finally:
+            server.kill()
+            server.wait()
+
+
+def main(args) -> int:
+    rows = import_profile()
+    total = sum(cumulative for _, depth, _, cumulative in rows
+                if depth == 0)
+    print(f"import main: {total / 1000:.0f}ms, {len(rows)} modules")
+
+    print(f"\n{'package':>28} {'cumulative ms':>14}")
+    for package, us in list(by_package(rows).items())[:args.top]:
+        print(f"{package:>28} {us / 1000:>14.1f}")
+
+    print(f"\n{'module':>40} {'self ms':>8}")
+    for name, _, self_us, _ in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        print(f"{name[-40:]:>40} {self_us / 1000:>8.1f}")
+
+    heavy = sorted({name.split(".")[0] for name, *_ in rows}
+                   & set(HEAVY_MODULES))
+    print(f"\nheavy modules imported eagerly: {', '.join(heavy) or 'none'}")
+
+    times = [time_to_health() for _ in range(args.runs)]
+    print("time to first /health: "
+          + ", ".join(f"{t:.2f}s" for t in times))
+    return 1 if heavy else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=3)
+    sys.exit(main(parser.parse_args()))
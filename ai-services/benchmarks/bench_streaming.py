@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark streaming transcription latency
+
+Plays synthetic speech/silence audio into a StreamingSession at real-time
+pace (or faster with --speed) against a fake backend with fixed latency,
+and reports time to first segment and end-of-speech to final-text latency.
+
+Usage: python -m benchmarks.bench_streaming [--utterances 10] [--latency 0.3]
+"""
+
+import argparse
+import asyncio
+
+import numpy as np
+
+from app.services.streaming import StreamingSession
+from app.services.transcription_engine import FakeTranscriptionBackend
+from app.utils.config import get_settings
+
+FRAME_SECONDS = 0.02
+
+
+def synthetic_meeting(utterances: int, sample_rate: int) -> bytes:
+    rng = np.random.default_rng(0)
+    parts = []
+    for _ in range(utterances):
+        speech = int(rng.uniform(1.0, 4.0) * sample_rate)
+        t = np.arange(speech) / sample_rate
+        parts.append(0.3 * np.sin(2 * np.pi * 180 * t))
+        parts.append(np.zeros(int(rng.uniform(0.8, 1.5) * sample_rate)))
+    return (np.concatenate(parts) * 32767).astype("<i2").tobytes()
+
+
+async def main(utterances: int, latency: float, speed: float) -> None:
+    settings = get_settings()
+    sample_rate = settings.audio_sample_rate
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    session = StreamingSession(
+        FakeTranscriptionBackend(latency=latency), send, sample_rate
+    )
+    session.start()
+
+    audio = synthetic_meeting(utterances, sample_rate)
+    step = int(FRAME_SECONDS * sample_rate) * 2
+    for i in range(0, len(audio), step):
+        await session.feed(audio[i:i + step])
+        await asyncio.sleep(FRAME_SECONDS / speed)
+    await session.finish()
+
+    latencies = np.array(session.final_latencies)
+    stats = session.stats()
+    print(f"audio: {stats['audio_seconds']:.1f}s, "
+          f"{stats['utterances']} utterances, backend latency {latency}s, "
+          f"silence timeout {settings.stream_silence_ms}ms")
+    print(f"partials sent/dropped: {stats['partials_sent']}/"
+          f"{stats['partials_dropped']}")
+    print(f"time to first segment: {stats['time_to_first_segment']:.2f}s")
+    print(f"end of speech to final: p50 {np.percentile(latencies, 50):.2f}s "
+          f"p95 {np.percentile(latencies, 95):.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--utterances", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--speed", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.utterances, args.latency, args.speed))
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark wall-clock time of the chunked transcription engine
+
+Uses the offline fake backend with a fixed per-chunk latency, so the
+numbers isolate how chunk count and concurrency interact.
+
+Usage: python -m benchmarks.bench_transcription [--latency 0.5]
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.services.transcription_engine import (
+    FakeTranscriptionBackend,
+    TranscriptionEngine,
+)
+from app.utils.config import get_settings
+
+SAMPLE_RATE = 16000
+
+
+async def run_case(minutes: int, concurrency: int, latency: float) -> tuple:
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0, 0.3, minutes * 60 * SAMPLE_RATE)
+    samples = samples.astype(np.float32)
+
+    backend = FakeTranscriptionBackend(latency=latency)
+    engine = TranscriptionEngine(backend, max_concurrency=concurrency)
+
+    start = time.perf_counter()
+    result = await engine.transcribe(samples, SAMPLE_RATE)
+    return result["chunks"], time.perf_counter() - start
+
+
+async def main(latency: float) -> None:
+    settings = get_settings()
+    settings.transcription_chunk_seconds = 60
+
+    print(f"per-chunk latency: {latency:.2f}s, chunk length: 60s")
+    print(f"{'minutes':>8} {'chunks':>7} {'concurrency':>12} {'wall (s)':>9}")
+    for minutes in (5, 15, 30, 90):
+        for concurrency in (1, 2, 4, 8, 16):
+            chunks, elapsed = await run_case(minutes, concurrency, latency)
+            print(f"{minutes:>8} {chunks:>7} {concurrency:>12} "
+                  f"{elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency))
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark memory used to ingest uploads of increasing size
+
+Feeds a multipart body in 64KB network-sized chunks through the streaming
+ingestion path and, for comparison, through a buffer-everything path like
+UploadFile.read(). Each run happens in a fresh process so its peak RSS can
+be reported.
+
+Usage: python -m benchmarks.bench_upload [--sizes 10,50,200]
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.utils.upload import AudioSpool, ingest_multipart
+
+CHUNK_BYTES = 64 * 1024
+BOUNDARY = b"benchboundary"
+FORMATS = ["wav"]
+
+
+def wav_header(data_bytes: int) -> bytes:
+    header = b"RIFF" + (36 + data_bytes).to_bytes(4, "little") + b"WAVE"
+    header += b"fmt " + (16).to_bytes(4, "little")
+    header += b"\x01\x00\x01\x00" + (16000).to_bytes(4, "little")
+    header += (32000).to_bytes(4, "little") + b"\x02\x00\x10\x00"
+    return header + b"data" + data_bytes.to_bytes(4, "little")
+
+
+async def body(megabytes: int):
+    """Multipart body generated on the fly so the source costs no memory"""
+    data_bytes = megabytes * 1024 * 1024
+    yield (b"--" + BOUNDARY + b"\r\nContent-Disposition: form-data; "
+           b"name=\"file\"; filename=\"a.wav\"\r\n\r\n" + wav_header(data_bytes))
+    block = bytes(CHUNK_BYTES)
+    for _ in range(data_bytes // CHUNK_BYTES):
+        yield block
+    yield b"\r\n--" + BOUNDARY + b"--\r\n"
+
+
+async def streaming(megabytes: int, spool_dir: str) -> None:
+    spool = AudioSpool(spool_dir, 10 ** 12, FORMATS)
+    content_type = "multipart/form-data; boundary=" + BOUNDARY.decode()
+    ingested = await ingest_multipart(content_type, body(megabytes), spool)
+    os.unlink(ingested.path)
+
+
+async def buffered(megabytes: int, spool_dir: str) -> None:
+    data = b"".join([chunk async for chunk in body(megabytes)])
+    path = os.path.join(spool_dir, "buffered.audio")
+    with open(path, "wb") as f:
+        f.write(data)
+    os.unlink(path)
+
+
+def run_one(mode: str, megabytes: int) -> None:
+    ingest = streaming if mode == "streaming" else buffered
+    with tempfile.TemporaryDirectory() as spool_dir:
+        start = time.perf_counter()
+        asyncio.run(ingest(megabytes, spool_dir))
+        elapsed = time.perf_counter() - start
+    # ru_maxrss is reported in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{peak:.1f} {elapsed:.2f}")
+
+
+def main(sizes) -> None:
+    print(f"{'MB':>5} {'mode':>10} {'peak RSS MB':>12} {'seconds':>8}")
+    for megabytes in sizes:
+        for mode in ("buffered", "streaming"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_upload",
+                 "--run", mode, "--sizes", str(megabytes)],
+                capture_output=True, text=True, check=True,
+            ).stdout.split()
+            peak, elapsed = float(output[-2]), float(output[-1])
+            print(f"{megabytes:>5} {mode:>10} {peak:>12.1f} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10,50,200")
+    parser.add_argument("--run", choices=["buffered", "streaming"])
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+    if args.run:
+        run_one(args.run, sizes[0])
+    else:
+        main(sizes)
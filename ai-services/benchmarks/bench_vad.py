@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark voice activity detection speed
+
+Synthesizes a 16kHz meeting recording (speech-like bursts, short pauses
+and long lulls over a low noise floor) and times the detector over it,
+reporting the real-time factor (audio seconds per second of CPU) for each
+frame length, plus the time taken by speech-index queries.
+
+Usage: python -m benchmarks.bench_vad [--minutes 60] [--frames 512,1024,2048]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.utils.config import get_settings
+from app.utils.vad import VoiceActivityDetector
+
+
+def synthetic_meeting(minutes: int, sample_rate: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    total = minutes * 60 * sample_rate
+    samples = rng.normal(0, 10 ** (-60 / 20), total).astype(np.float32)
+    position = 0
+    while position < total:
+        length = min(int(rng.uniform(2, 15) * sample_rate), total - position)
+        t = np.arange(length) / sample_rate
+        pitch = rng.uniform(100, 250)
+        burst = 0.1 * np.sin(2 * np.pi * pitch * t) \
+            * (1 + np.sin(2 * np.pi * 4 * t)) + rng.normal(0, 0.03, length)
+        samples[position:position + length] += burst.astype(np.float32)
+        pause = rng.uniform(0.3, 2.0) if rng.random() < 0.85 \
+            else rng.uniform(5, 40)
+        position += length + int(pause * sample_rate)
+    return samples
+
+
+def main(minutes: int, frame_lengths) -> None:
+    sample_rate = get_settings().audio_sample_rate
+    samples = synthetic_meeting(minutes, sample_rate)
+    seconds = len(samples) / sample_rate
+    print(f"recording: {minutes} min at {sample_rate}Hz")
+    print(f"{'frame':>6} {'seconds':>8} {'x realtime':>11} "
+          f"{'regions':>8} {'speech %':>9}")
+    for frame_length in frame_lengths:
+        detector = VoiceActivityDetector(sample_rate, frame_length)
+        detector.detect(samples[:sample_rate])  # warm up FFT plans
+        start = time.perf_counter()
+        index = detector.detect(samples)
+        elapsed = time.perf_counter() - start
+        print(f"{frame_length:>6} {elapsed:>8.2f} {seconds / elapsed:>11.0f} "
+              f"{len(index):>8} {100 * index.speech_ratio:>9.1f}")
+
+    queries = np.random.default_rng(1).uniform(0, seconds, 100000)
+    start = time.perf_counter()
+    index.contains(queries)
+    elapsed = time.perf_counter() - start
+    print(f"100000 point queries: {elapsed * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=int, default=60)
+    parser.add_argument("--frames", default="512,1024,2048")
+    args = parser.parse_args()
+    main(args.minutes, [int(f) for f in args.frames.split(",")])
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+First-request latency gap with and without warm-up before readiness
+
+For each endpoint, starts a fresh server (mocked upstreams, model
+preload on) with ENABLE_WARMUP off and then on, waits for /health/ready,
+and times the first request against the median of the next --repeat.
+Without warm-up the first request pays for lazy imports, model loading
+and pool start-up; with it, readiness waits for those instead.
+
+Usage: python -m benchmarks.bench_warmup [--repeat 10]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from typing import Callable, Dict
+
+import httpx
+import numpy as np
+
+from app.utils.audio import encode_wav
+from benchmarks.bench_startup import free_port, spawn_server, wait_for
+
+AUDIO_RATE = 44100
+
+
+def upload() -> Dict:
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0, 0.1, 5 * AUDIO_RATE).astype(np.float32)
+    wav = encode_wav(samples, AUDIO_RATE)
+    return {"files": {"file": ("meeting.wav", wav, "audio/wav")}}
+
+
+def sentiment(i: int) -> Dict:
+    # A distinct text each time, so nothing is served from cache
+    return {"json": {
+        "meeting_id": f"warmup-{i}",
+        "text": f"Meeting {i}. The demo went well. The vendor is late.",
+    }}
+
+
+ENDPOINTS: Dict[str, tuple] = {
+    "speech-regions": ("/api/transcription/speech-regions",
+                       lambda i: upload()),
+    "sentiment": ("/api/analysis/sentiment", sentiment),
+}
+
+
+def run(path: str, build: Callable[[int], Dict], warmup: bool,
+        repeat: int) -> Dict[str, float]:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        server = spawn_server(
+            port, workdir,
+            ENABLE_WARMUP=str(warmup).lower(),
+            ENABLE_MODEL_PRELOAD="true",
+        )
+        try:
+            ready = wait_for(server, base + "/health/ready", start)
+            times = []
+            with httpx.Client(base_url=base, timeout=60) as client:
+                for i in range(repeat + 1):
+                    kwargs = build(i)
+                    sent = time.perf_counter()
+                    response = client.post(path, **kwargs)
+                    response.raise_for_status()
+                    times.append(time.perf_counter() - sent)
+        finally:
+            server.kill()
+            server.wait()
+    return {
+        "ready_s": ready,
+        "first_ms": times[0] * 1000,
+        "steady_ms": float(np.median(times[1:])) * 1000,
+    }
+
+
+def main(args) -> int:
+    print(f"{'endpoint':>15} {'warm-up':>8} {'ready s':>8} "
+          f"{'first ms':>9} {'steady ms':>10} {'gap ms':>8}")
+    for name, (path, build) in ENDPOINTS.items():
+        for warmup in (False, True):
+            r = run(path, build, warmup, args.repeat)
+            print(f"{name:>15} {'on' if warmup else 'off':>8} "
+                  f"{r['ready_s']:>8.2f} {r['first_ms']:>9.1f} "
+                  f"{r['steady_ms']:>10.1f} "
+                  f"{r['first_ms'] - r['steady_ms']:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=10)
+    sys.exit(main(parser.parse_args()))
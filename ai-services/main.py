@@ -3,17 +3,37 @@ EchoScribe AI Services
 FastAPI application for AI-powered meeting analysis
 """
 
+# First, so the startup profile's clock starts before the other imports
+from app.utils.startup import startup_profile
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 import os
 from datetime import datetime
 
-from app.routers import analysis, transcription
-from app.utils.config import get_settings, validate_required_settings, validate_environment, get_environment_info
+from app.middleware.admission import AdmissionControlMiddleware, admission_stats
+from app.middleware.metrics import RequestMetricsMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.routers import admin, analysis, transcription
+from app.services.batching import close_batchers
+from app.services.http_client import close_http_client, get_http_client, http_client_stats
+from app.services.job_queue import get_job_queue
+from app.services.model_registry import get_model_registry
+from app.services.monitoring import start_monitoring, stop_monitoring
+from app.services.offload import close_offload, install_io_pool, offload_stats
+from app.services.rate_limiter import rate_limiter_stats
+from app.services.readiness import get_readiness
+from app.services.retry import upstream_stats
+from app.services.transcription_jobs import TRANSCRIPTION_JOB, run_transcription_job
+from app.utils.config import get_settings, validate_environment, validation_error_message, get_environment_info
 from app.utils.logger import setup_logging
 
+startup_profile.mark("imports", startup_profile.started)
+
 # Setup logging
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -23,18 +43,19 @@ async def lifespan(app: FastAPI):
     """Application lifespan events"""
     logger.info("Starting EchoScribe AI Services")
     
-    # Startup - validate environment
+    # Startup - validate environment (once; this also loads the settings)
     try:
-        validation_result = validate_environment()
+        with startup_profile.phase("validation"):
+            validation_result = validate_environment()
         if not validation_result.success:
             logger.error("Environment validation failed during startup")
             logger.error(f"Errors: {validation_result.errors}")
             logger.error(f"Missing required: {validation_result.missing_required}")
             # Don't exit in production, but log the issues
             if os.getenv("ENVIRONMENT", "development") == "development":
-                raise ValueError("Environment validation failed")
+                raise ValueError(validation_error_message(validation_result))
         
-        settings = validate_required_settings()
+        settings = get_settings()
         logger.info(f"Environment: {settings.environment}")
         
         # Log environment information
@@ -46,10 +67,58 @@ async def lifespan(app: FastAPI):
         if os.getenv("ENVIRONMENT", "development") == "development":
             raise
     
+    settings = get_settings()
+    
+    # Blocking calls run on an instrumented thread pool; CPU-bound stages
+    # start the process pool on first use
+    install_io_pool(asyncio.get_running_loop())
+    
+    # One pooled HTTP client per process for every upstream call
+    with startup_profile.phase("http_client"):
+        get_http_client()
+    
+    # Prometheus metrics on METRICS_PORT when ENABLE_METRICS is set
+    with startup_profile.phase("monitoring"):
+        await start_monitoring()
+    
+    # Load models up front so the first request doesn't pay for it. Off by
+    # default: models otherwise load on first use, keeping startup fast
+    model_registry = get_model_registry()
+    preload = [settings.hf_sentiment_model] if settings.enable_model_preload else []
+    readiness = get_readiness()
+    if settings.enable_warmup:
+        # Preload and warm up in the background: /health/live answers at
+        # once, /health/ready only when the first request won't be slow
+        readiness.start_warm_up(preload)
+    else:
+        if preload:
+            try:
+                with startup_profile.phase("model_preload"):
+                    await model_registry.preload(preload)
+            except Exception as e:
+                logger.error(f"Model preload failed: {str(e)}")
+        readiness.mark_warmed_up()
+    
+    # Start background job workers (JOB_WORKERS=0 leaves jobs to worker.py)
+    with startup_profile.phase("job_queue"):
+        job_queue = get_job_queue()
+        job_queue.register(TRANSCRIPTION_JOB, run_transcription_job)
+        await job_queue.start()
+    
+    startup_profile.ready()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down EchoScribe AI Services")
+    await readiness.stop()
+    await job_queue.stop()
+    await close_batchers()
+    close_offload()
+    await close_http_client()
+    await stop_monitoring()
+    if settings.cleanup_models_on_shutdown:
+        model_registry.clear()
 
 # Create FastAPI app
 app = FastAPI(
@@ -59,19 +128,34 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Configure CORS
 settings = get_settings()
+
+# Bound in-flight work per route class and shed the excess
+app.add_middleware(AdmissionControlMiddleware)
+
+# Per-request profiles on demand; not installed at all unless enabled
+if settings.enable_profiling:
+    app.add_middleware(ProfilingMiddleware)
+
+# Configure CORS. Added after admission control so it wraps shed
+# responses too, letting browsers read their status and Retry-After
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins_list,
     allow_credentials=settings.cors_credentials,
     allow_methods=settings.cors_methods.split(','),
     allow_headers=settings.cors_headers.split(','),
+    expose_headers=["Retry-After"],
 )
 
+# Outermost, so shed requests and queueing time are measured too
+app.add_middleware(RequestMetricsMiddleware)
+
 # Include routers
 app.include_router(analysis.router, prefix="/api/analysis", tags=["analysis"])
 app.include_router(transcription.router, prefix="/api/transcription", tags=["transcription"])
+if settings.enable_profiling:
+    app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
 @app.get("/")
 async def root():
@@ -97,7 +181,14 @@ async def health_check():
             "services": {
                 "openai": bool(settings.openai_api_key),
                 "huggingface": bool(settings.huggingface_api_key)
-            }
+            },
+            "http_client": http_client_stats(),
+            "upstreams": upstream_stats(),
+            "rate_limits": rate_limiter_stats(),
+            "admission": admission_stats(),
+            "offload": offload_stats(),
+            "startup": startup_profile.stats(),
+            "readiness": get_readiness().stats()
         }
         
         return health_status
@@ -106,6 +197,26 @@ async def health_check():
         logger.error(f"Health check failed: {str(e)}")
         raise HTTPException(status_code=503, detail="Service unhealthy")
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness probe: the process is up and its event loop is serving"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness probe: 200 once warm-up has finished and while no route class
+    is saturated, 503 with the reasons otherwise
+    """
+    readiness = get_readiness()
+    result = readiness.check()
+    body = {
+        "status": "ready" if result["ready"] else "not_ready",
+        "reasons": result["reasons"],
+        **readiness.stats()
+    }
+    return JSONResponse(body, status_code=200 if result["ready"] else 503)
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -0,0 +1,56 @@
+"""
+EchoScribe AI Services pre-fork server
+Loads models once, then forks WORKERS workers that share their weights
+"""
+
+import logging
+
+import uvicorn
+
+from app.services.model_registry import get_model_registry
+from app.services.readiness import exercise_audio
+from app.utils.config import get_settings
+from app.utils.logger import setup_logging
+from app.utils.prefork import PreforkServer, bind_socket
+from app.utils.startup import startup_profile
+
+# Setup logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Load models, bind the port and serve from forked workers"""
+    settings = get_settings()
+
+    # Workers find the model resident and only warm it up
+    settings.enable_model_preload = True
+    get_model_registry().load_now(settings.hf_sentiment_model)
+
+    # Likewise the audio libraries, which workers would each import on
+    # first use
+    exercise_audio()
+
+    # Imported before forking so the workers share the imported code too
+    from main import app
+
+    sock = bind_socket(settings.host, settings.port)
+    logger.info(
+        f"Serving on {settings.host}:{settings.port} with "
+        f"{settings.workers} pre-forked workers"
+    )
+
+    def serve(sock):
+        startup_profile.forked()
+        config = uvicorn.Config(
+            app,
+            log_level=settings.log_level.lower(),
+            access_log=settings.access_log,
+        )
+        uvicorn.Server(config).run(sockets=[sock])
+
+    PreforkServer(sock, settings.workers, serve).run()
+
+
+if __name__ == "__main__":
+    main()
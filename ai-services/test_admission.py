@@ -0,0 +1,182 @@
+"""
+Tests for admission control and load shedding
+"""
+
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+
+from app.middleware import admission
+from app.middleware.admission import (
+    AdmissionControlMiddleware,
+    AIMDLimit,
+    RouteLimiter,
+)
+from app.services.retry import remaining
+from app.utils.config import get_settings
+
+
+def make_app(release: asyncio.Event) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(AdmissionControlMiddleware)
+
+    @app.post("/api/analysis/work")
+    async def work():
+        await release.wait()
+        return {"deadline_left": remaining()}
+
+    @app.get("/api/analysis/health")
+    async def health():
+        return {"ok": True}
+
+    @app.post("/api/transcription/work")
+    async def transcribe():
+        return {"ok": True}
+
+    return app
+
+
+@pytest_asyncio.fixture
+async def client(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "max_concurrent_requests", 2)
+    monkeypatch.setattr(settings, "admission_queue_size", 1)
+    monkeypatch.setattr(settings, "admission_queue_timeout", 5.0)
+    admission.reset_admission()
+    release = asyncio.Event()
+    transport = httpx.ASGITransport(app=make_app(release))
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        client.release = release
+        yield client
+    admission.reset_admission()
+
+
+async def until(condition) -> None:
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.005)
+    raise AssertionError("condition never held")
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_shed_with_retry_after(client):
+    limiter = admission.get_route_limiter("analysis")
+    running = [
+        asyncio.create_task(client.post("/api/analysis/work"))
+        for _ in range(3)
+    ]
+    await until(lambda: limiter.in_flight == 2 and limiter.stats()["queued"])
+
+    shed = await client.post("/api/analysis/work")
+    assert shed.status_code == 429
+    assert int(shed.headers["retry-after"]) >= 1
+
+    # Reads and other route classes are not held up
+    assert (await client.get("/api/analysis/health")).status_code == 200
+    assert (await client.post("/api/transcription/work")).status_code == 200
+
+    client.release.set()
+    responses = await asyncio.gather(*running)
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    # Admitted requests run under the REQUEST_TIMEOUT deadline
+    assert 0 < responses[0].json()["deadline_left"] \
+        <= get_settings().request_timeout
+
+    stats = admission.admission_stats()["analysis"]
+    assert stats["admitted"] == 3
+    assert stats["rejected_queue_full"] == 1
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_queued_request_times_out_with_503(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "admission_queue_timeout", 0.05)
+    admission.reset_admission()
+    limiter = admission.get_route_limiter("analysis")
+    running = [
+        asyncio.create_task(client.post("/api/analysis/work"))
+        for _ in range(2)
+    ]
+    await until(lambda: limiter.in_flight == 2)
+
+    waited = await client.post("/api/analysis/work")
+    assert waited.status_code == 503
+    assert "retry-after" in waited.headers
+    assert limiter.stats()["queued"] == 0
+
+    client.release.set()
+    await asyncio.gather(*running)
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_shed_responses_carry_cors_headers(monkeypatch):
+    from main import app
+
+    monkeypatch.setattr(get_settings(), "admission_queue_size", 1)
+    admission.reset_admission()
+    limiter = admission.get_route_limiter("analysis")
+    limiter.in_flight = limiter.limit
+    limiter._queue.append(None)  # the queue is full
+    origin = get_settings().cors_origins_list[0]
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            shed = await client.post(
+                "/api/analysis/sentiment", json={}, headers={"Origin": origin}
+            )
+        assert shed.status_code == 429
+        assert shed.headers["access-control-allow-origin"] == origin
+        assert "retry-after" in \
+            shed.headers["access-control-expose-headers"].lower()
+    finally:
+        admission.reset_admission()
+
+
+@pytest.mark.asyncio
+async def test_slot_handed_to_queued_request_in_order():
+    limiter = RouteLimiter("test", 1, queue_size=5, queue_timeout=1.0)
+    await limiter.acquire()
+    order = []
+
+    async def queued(name):
+        await limiter.acquire()
+        order.append(name)
+        limiter.release(0.01)
+
+    tasks = [asyncio.create_task(queued(n)) for n in ("a", "b", "c")]
+    await asyncio.sleep(0.01)
+    tasks[1].cancel()
+    limiter.release(0.01)
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert order == ["a", "c"]
+    assert limiter.in_flight == 0
+
+
+def test_aimd_limit_backs_off_and_recovers():
+    now = [0.0]
+    limit = AIMDLimit(10, 2, 10, latency_target=1.0, clock=lambda: now[0])
+
+    limit.on_sample(5.0, 10)
+    assert limit.limit == 9
+    limit.on_sample(5.0, 9)  # same congestion episode
+    assert limit.limit == 9
+    for _ in range(30):
+        now[0] += 1.1
+        limit.on_overload()
+    assert limit.limit == 2
+
+    for _ in range(50):
+        limit.on_sample(0.1, limit.limit)
+    assert limit.limit == 10
+    limit.on_sample(0.1, 1)  # idle: no growth past what is used
+    assert limit.limit == 10
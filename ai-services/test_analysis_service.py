@@ -0,0 +1,183 @@
+"""
+Tests for the fused single-pass analysis service
+"""
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+
+from app.routers import analysis
+
+from app.services.ai_service import AIServiceError
+from app.services.analysis_service import (
+    ACTION_ITEMS,
+    ANALYSIS_TYPES,
+    SENTIMENT,
+    SUMMARY,
+    AnalysisService,
+    get_analysis_service,
+)
+from app.services.batching import close_batchers
+from app.services.cache import ResultCache, get_result_cache
+from app.services.llm_backend import FakeLLMBackend
+from app.services.model_registry import LexiconClassifier, ModelRegistry
+from app.services.retry import get_upstream, reset_upstreams
+from app.services.sentiment_service import SentimentService
+from app.utils.config import get_settings
+from app.utils.text import chunk_sentences, estimate_tokens
+
+TRANSCRIPT = " ".join(
+    f"Sarah reviewed milestone {i} and the progress looks good. "
+    f"Mike will follow up on the open risk for milestone {i}."
+    for i in range(40)
+)
+
+
+class FlakyLLMBackend(FakeLLMBackend):
+    """Fails the first call whose prompt contains a marker"""
+
+    def __init__(self, marker):
+        super().__init__()
+        self.marker = marker
+
+    async def complete_json(self, system, prompt, max_tokens):
+        if self.marker and self.marker in prompt:
+            self.marker = None
+            raise RuntimeError("upstream timeout")
+        return await super().complete_json(system, prompt, max_tokens)
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def reset_batchers():
+    yield
+    await close_batchers()
+
+
+def make_service(chunk_tokens=200, llm=None):
+    registry = ModelRegistry(capacity=1, loader=LexiconClassifier)
+    sentiment = SentimentService(registry, model_name="lexicon")
+    llm = llm or FakeLLMBackend()
+    service = AnalysisService(
+        llm=llm, sentiment=sentiment, cache=ResultCache(256, ttl=60)
+    )
+    service.chunk_tokens = chunk_tokens
+    return service, llm
+
+
+def map_calls(llm):
+    return sum(p.startswith("Analyze") for p in llm.prompts)
+
+
+def test_chunk_sentences_respects_budget():
+    sentences = ["one two three four."] * 10 + ["word " * 50]
+
+    chunks = chunk_sentences(sentences, max_tokens=20)
+
+    assert all(estimate_tokens(c) <= 21 for c in chunks)
+    assert " ".join(chunks).split() == " ".join(sentences).split()
+
+
+@pytest.mark.asyncio
+async def test_fused_analysis_makes_one_call_per_chunk():
+    service, llm = make_service()
+    chunks = len(service.prepare(TRANSCRIPT).chunks)
+    assert chunks > 1
+
+    results = await service.analyze(TRANSCRIPT, list(ANALYSIS_TYPES))
+
+    assert map_calls(llm) == chunks
+    assert set(results) == set(ANALYSIS_TYPES)
+    assert results[SUMMARY]["chunks_analyzed"] == chunks
+    assert results[SENTIMENT]["overall_sentiment"] in (
+        "positive", "negative", "neutral"
+    )
+
+
+@pytest.mark.asyncio
+async def test_separate_analyses_cost_a_call_per_type():
+    service, llm = make_service()
+    chunks = len(service.prepare(TRANSCRIPT).chunks)
+
+    for analysis_type in (SUMMARY, ACTION_ITEMS):
+        await service.analyze(TRANSCRIPT, [analysis_type])
+
+    assert map_calls(llm) == 2 * chunks
+
+
+@pytest.mark.asyncio
+async def test_action_items_are_deduplicated_across_chunks():
+    service, _ = make_service(chunk_tokens=30)
+    text = "Mike will send the report. " * 6 + "Anna will book the room."
+
+    result = (await service.analyze(text, [ACTION_ITEMS]))[ACTION_ITEMS]
+
+    assert [i["description"] for i in result["action_items"]] == [
+        "Mike will send the report.", "Anna will book the room."
+    ]
+    assert [i["id"] for i in result["action_items"]] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_unknown_analysis_type_is_rejected():
+    service, llm = make_service()
+
+    with pytest.raises(ValueError):
+        await service.analyze(TRANSCRIPT, ["topics"])
+    assert llm.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_long_transcripts_are_reduced_to_summary_budget(monkeypatch):
+    monkeypatch.setattr(get_settings(), "summary_max_length", 40)
+    service, llm = make_service(chunk_tokens=100)
+
+    result = (await service.analyze(TRANSCRIPT, [SUMMARY]))[SUMMARY]
+
+    assert result["chunks_analyzed"] > 4
+    assert result["reduce_levels"] >= 2
+    assert estimate_tokens(result["summary"]) <= 40
+    assert llm.calls == map_calls(llm) + sum(
+        p.startswith("Merge") for p in llm.prompts
+    )
+
+
+@pytest.mark.asyncio
+async def test_retry_only_repeats_failed_chunks(monkeypatch):
+    monkeypatch.setattr(get_settings(), "openai_max_retries", 1)
+    service, llm = make_service(llm=FlakyLLMBackend("milestone 7 "))
+    chunks = len(service.prepare(TRANSCRIPT).chunks)
+
+    with pytest.raises(AIServiceError):
+        await service.analyze(TRANSCRIPT, [SUMMARY])
+    assert map_calls(llm) == chunks - 1
+
+    await service.analyze(TRANSCRIPT, [SUMMARY])
+
+    assert map_calls(llm) == chunks
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/analyze", "/summary", "/action-items"])
+async def test_open_circuit_is_a_503_with_retry_after(path):
+    service, llm = make_service()
+    app = FastAPI()
+    app.include_router(analysis.router)
+    app.dependency_overrides[get_analysis_service] = lambda: service
+    app.dependency_overrides[get_result_cache] = lambda: service.cache
+    transport = httpx.ASGITransport(app=app)
+    reset_upstreams()
+    try:
+        breaker = get_upstream(llm.name).breaker
+        breaker.reset_timeout = 2.5
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+
+        async with httpx.AsyncClient(transport=transport,
+                                     base_url="http://test") as client:
+            response = await client.post(path, json={"text": TRANSCRIPT})
+    finally:
+        reset_upstreams()
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
@@ -0,0 +1,87 @@
+"""
+Tests for silence removal and the condensed-to-original time map
+"""
+
+import numpy as np
+import pytest
+
+from app.services.transcription_engine import (
+    FakeTranscriptionBackend,
+    TranscriptionEngine,
+)
+from app.utils.audio import encode_audio
+from app.utils.config import get_settings
+from app.utils.preprocess import condense_silence
+
+SAMPLE_RATE = 16000
+
+
+def speech_with_silence(pattern):
+    """Noise for speech spans and zeros for silence, (seconds, speech)"""
+    rng = np.random.default_rng(0)
+    parts = [
+        rng.normal(0, 0.2, int(s * SAMPLE_RATE)) if speech
+        else np.zeros(int(s * SAMPLE_RATE))
+        for s, speech in pattern
+    ]
+    return np.concatenate(parts).astype(np.float32)
+
+
+def test_condense_drops_long_silence_and_keeps_pauses():
+    samples = speech_with_silence([
+        (5, False), (10, True), (0.5, False), (10, True),
+        (30, False), (10, True), (5, False),
+    ])
+
+    condensed, time_map = condense_silence(samples, SAMPLE_RATE, padding=0.25)
+
+    # 5s lead, 5s tail and the 30s gap go; the 0.5s pause stays
+    assert len(time_map.lengths) == 2
+    assert time_map.compact_duration == pytest.approx(31.5, abs=0.05)
+    assert len(condensed) / SAMPLE_RATE == pytest.approx(31.5, abs=0.05)
+    assert time_map.original_starts[0] == pytest.approx(4.75, abs=0.02)
+    assert time_map.original_starts[1] == pytest.approx(55.25, abs=0.02)
+
+
+def test_time_map_round_trip():
+    samples = speech_with_silence([(2, True), (20, False), (3, True)])
+    condensed, time_map = condense_silence(samples, SAMPLE_RATE, padding=0)
+
+    assert time_map.to_original(1.0) == pytest.approx(1.0)
+    assert time_map.to_original(3.0) == pytest.approx(23.0, abs=0.02)
+    # A boundary maps forward for starts, backward for ends
+    boundary = time_map.compact_starts[1]
+    assert time_map.to_original(boundary) == pytest.approx(22.0, abs=0.02)
+    assert time_map.to_original(boundary, end=True) \
+        == pytest.approx(2.0, abs=0.02)
+
+
+def test_silent_audio_condenses_to_nothing():
+    condensed, time_map = condense_silence(np.zeros(SAMPLE_RATE * 10),
+                                           SAMPLE_RATE)
+    assert condensed.size == 0
+    assert time_map.removed_seconds == 10
+
+
+def test_flac_is_smaller_than_wav():
+    samples = speech_with_silence([(5, True), (5, False)]) * 0.1
+    assert len(encode_audio(samples, SAMPLE_RATE, "flac")) \
+        < len(encode_audio(samples, SAMPLE_RATE, "wav"))
+
+
+@pytest.mark.asyncio
+async def test_engine_reports_original_timestamps(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "transcription_chunk_seconds", 20)
+    monkeypatch.setattr(settings, "audio_silence_padding", 0.0)
+    samples = speech_with_silence([(10, True), (60, False), (10, True)])
+    engine = TranscriptionEngine(FakeTranscriptionBackend())
+
+    result = await engine.transcribe(samples, SAMPLE_RATE)
+
+    assert result["duration"] == pytest.approx(80.0)
+    assert result["speech_duration"] == pytest.approx(20.0, abs=0.05)
+    starts = [s["start"] for s in result["segments"]]
+    assert starts[:10] == [float(i) for i in range(10)]
+    assert starts[10] == pytest.approx(70.0, abs=0.02)
+    assert result["segments"][-1]["end"] == pytest.approx(80.0, abs=0.02)
@@ -0,0 +1,123 @@
+"""
+Tests for cross-request micro-batching
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app.services.batching import MicroBatcher, close_batchers
+from app.services.model_registry import LexiconClassifier, ModelRegistry
+from app.services.sentiment_service import SentimentService
+from app.utils.config import get_settings, validate_environment
+
+
+class RecordingBatch:
+    def __init__(self, delay=0.0, fail=False):
+        self.batches = []
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return [item * 10 for item in items]
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def reset_batchers():
+    yield
+    await close_batchers()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_a_batch():
+    run = RecordingBatch()
+    batcher = MicroBatcher("m", run, max_batch_size=32, max_wait_ms=20)
+
+    results = await asyncio.gather(
+        *(batcher.submit([i, i + 100]) for i in range(5))
+    )
+
+    assert results == [[i * 10, (i + 100) * 10] for i in range(5)]
+    assert len(run.batches) == 1
+    assert sorted(run.batches[0]) == sorted(
+        [i for n in range(5) for i in (n, n + 100)]
+    )
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_batches_are_capped_at_max_size():
+    run = RecordingBatch()
+    batcher = MicroBatcher("m", run, max_batch_size=4, max_wait_ms=50)
+
+    results = await batcher.submit(list(range(10)))
+
+    assert results == [i * 10 for i in range(10)]
+    assert [len(b) for b in run.batches] == [4, 4, 2]
+    assert batcher.stats()["batch_size_histogram"]["count"] == 3
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_lone_request_waits_at_most_max_wait():
+    run = RecordingBatch()
+    batcher = MicroBatcher("m", run, max_batch_size=64, max_wait_ms=10)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await batcher.submit([1])
+
+    assert loop.time() - start < 0.1
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_batch_errors_reach_every_waiter():
+    batcher = MicroBatcher(
+        "m", RecordingBatch(fail=True), max_batch_size=8, max_wait_ms=5
+    )
+
+    results = await asyncio.gather(
+        batcher.submit([1]), batcher.submit([2]), return_exceptions=True
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    await batcher.close()
+
+
+@pytest.mark.asyncio
+async def test_sentiment_requests_are_coalesced(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "batch_overrides", "lexicon=64:20")
+    model = LexiconClassifier()
+    registry = ModelRegistry(capacity=1, loader=lambda name: model)
+    service = SentimentService(registry, model_name="lexicon", batch_size=64)
+
+    texts = [f"Good update number {i}. Some risk remains." for i in range(8)]
+    results = await asyncio.gather(*(service.analyze(t) for t in texts))
+
+    assert len(results) == 8
+    assert model.batch_sizes == [16]
+
+
+@pytest.mark.parametrize("overrides", [
+    "lexicon=8", "lexicon=8:x", "lexicon", "lexicon=0:5",
+])
+def test_malformed_batch_overrides_fail_validation(monkeypatch, overrides):
+    monkeypatch.setattr(get_settings(), "batch_overrides", overrides)
+
+    assert "BATCH_OVERRIDES" in " ".join(validate_environment().errors)
+
+
+def test_batch_overrides_are_per_model(monkeypatch):
+    monkeypatch.setattr(get_settings(), "batch_overrides",
+                        "lexicon=8:2.5, other=4:0")
+
+    assert "BATCH_OVERRIDES" not in " ".join(validate_environment().errors)
+    assert get_settings().batch_limits("lexicon") == (8, 2.5)
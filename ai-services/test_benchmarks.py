@@ -0,0 +1,54 @@
+"""
+Tests for the mocked-upstream simulator and benchmark baseline checks
+"""
+
+import pytest
+
+from app.services.errors import RetryableError
+from app.services.simulation import UpstreamSimulator
+from benchmarks.baseline import compare
+
+
+def test_simulator_is_reproducible_with_a_seed():
+    first = UpstreamSimulator(0.05, sigma=0.5, seed=7)
+    second = UpstreamSimulator(0.05, sigma=0.5, seed=7)
+    samples = [first.sample_latency() for _ in range(200)]
+
+    assert samples == [second.sample_latency() for _ in range(200)]
+    assert min(samples) < 0.05 < max(samples)
+    assert UpstreamSimulator(0.05).sample_latency() == 0.05
+
+
+@pytest.mark.asyncio
+async def test_simulator_fails_a_share_of_calls():
+    simulator = UpstreamSimulator(error_rate=0.3, seed=1)
+    failures = 0
+    for _ in range(1000):
+        try:
+            await simulator()
+        except RetryableError:
+            failures += 1
+
+    assert 250 < failures < 350
+
+
+def test_compare_flags_only_meaningful_regressions():
+    baseline = {
+        "summary": {"rps": 20.0, "error_rate": 0.0, "p99_ms": 100.0},
+        "health": {"rps": 20.0, "error_rate": 0.0, "p99_ms": 2.0},
+    }
+    results = {
+        "summary": {"rps": 14.0, "error_rate": 0.02, "p99_ms": 130.0},
+        # Doubled, but by less than the minimum latency delta
+        "health": {"rps": 20.0, "error_rate": 0.005, "p99_ms": 4.0},
+        "new-endpoint": {"rps": 1.0, "p99_ms": 1000.0},
+    }
+
+    regressions = compare(results, baseline, threshold=0.25,
+                          min_delta_ms=5.0)
+
+    assert regressions == [
+        "summary rps: 20 -> 14",
+        "summary error_rate: 0 -> 0.02",
+        "summary p99_ms: 100 -> 130",
+    ]
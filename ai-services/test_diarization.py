@@ -0,0 +1,125 @@
+"""
+Tests for speaker diarization
+"""
+
+import numpy as np
+import pytest
+from scipy.signal import lfilter
+
+from app.services.diarization import (
+    DiarizationService,
+    cluster_embeddings,
+    speech_windows,
+)
+from app.utils.vad import SpeechIndex
+
+SAMPLE_RATE = 16000
+# Pitch and formants (Hz, bandwidth) of a few synthetic talkers
+VOICES = {
+    "low": (110, [(700, 80), (1220, 90), (2600, 120)]),
+    "high": (210, [(300, 60), (2300, 100), (3000, 150)]),
+    "mid": (160, [(450, 60), (1900, 90), (3200, 130)]),
+}
+
+
+def speak(voice, seconds, rng):
+    """Syllables of a pulse train through jittered formant resonators"""
+    pitch, formants = VOICES[voice]
+    out = np.zeros(int(seconds * SAMPLE_RATE))
+    position = 0
+    while position < len(out):
+        n = min(int(rng.uniform(0.15, 0.35) * SAMPLE_RATE),
+                len(out) - position)
+        t = np.arange(n) / SAMPLE_RATE
+        phase = 2 * np.pi * pitch * rng.uniform(0.9, 1.1) * t
+        syllable = np.sign(np.sin(phase)) + 0.05 * rng.normal(size=n)
+        for freq, bandwidth in formants:
+            r = np.exp(-np.pi * bandwidth / SAMPLE_RATE)
+            theta = 2 * np.pi * freq * rng.uniform(0.85, 1.15) / SAMPLE_RATE
+            syllable = lfilter([1 - r], [1, -2 * r * np.cos(theta), r * r],
+                               syllable)
+        out[position:position + n] = syllable * np.hanning(n)
+        position += n
+    return 0.5 * out / np.abs(out).max()
+
+
+def meeting(turns, seed=0, pause=0.4):
+    """Audio for (voice, seconds) turns and the segments they span"""
+    rng = np.random.default_rng(seed)
+    parts, segments, position = [], [], 0.0
+    for voice, seconds in turns:
+        parts.append(speak(voice, seconds, rng))
+        parts.append(np.zeros(int(pause * SAMPLE_RATE)))
+        segments.append({"start": position, "end": position + seconds,
+                         "voice": voice})
+        position += seconds + pause
+    samples = np.concatenate(parts)
+    samples += rng.normal(0, 1e-3, len(samples))
+    return samples.astype(np.float32), segments
+
+
+@pytest.mark.asyncio
+async def test_turns_are_labelled_by_speaker():
+    samples, segments = meeting([
+        ("low", 4), ("high", 3), ("low", 5), ("mid", 2.5),
+        ("high", 4), ("low", 2), ("mid", 3),
+    ])
+    speakers = await DiarizationService().label_segments(
+        samples, SAMPLE_RATE, segments
+    )
+
+    assert speakers == ["SPEAKER_1", "SPEAKER_2", "SPEAKER_3"]
+    by_voice = {}
+    for segment in segments:
+        by_voice.setdefault(segment["voice"], set()).add(segment["speaker"])
+    assert by_voice == {
+        "low": {"SPEAKER_1"}, "high": {"SPEAKER_2"}, "mid": {"SPEAKER_3"}
+    }
+
+
+@pytest.mark.asyncio
+async def test_single_speaker_is_not_split():
+    samples, segments = meeting([("high", 6), ("high", 8), ("high", 5)],
+                                seed=1)
+    diarization = await DiarizationService().diarize(
+        samples, SAMPLE_RATE
+    )
+    assert diarization.speakers == ["SPEAKER_1"]
+
+
+@pytest.mark.asyncio
+async def test_silence_has_no_speakers():
+    diarization = await DiarizationService().diarize(
+        np.zeros(SAMPLE_RATE * 5, dtype=np.float32), SAMPLE_RATE
+    )
+    segments = [{"start": 0.0, "end": 5.0}]
+    diarization.apply(segments)
+    assert diarization.speakers == []
+    assert segments[0]["speaker"] is None
+
+
+def test_speech_windows_tile_intervals():
+    index = SpeechIndex(np.array([0.0, 5.0, 9.0]),
+                        np.array([4.0, 5.3, 9.8]), 10.0)
+
+    starts, ends = speech_windows(index, window=1.5, hop=0.75)
+
+    # 4s interval: windows every 0.75s, the last one aligned to the end;
+    # the 0.3s blip is too short; the 0.8s one gets a single window
+    assert starts.tolist() == pytest.approx([0, 0.75, 1.5, 2.25, 2.5, 9.0])
+    assert ends.tolist() == pytest.approx([1.5, 2.25, 3.0, 3.75, 4.0, 9.8])
+
+
+def test_clustering_assigns_windows_beyond_the_sample():
+    rng = np.random.default_rng(0)
+    centres = rng.normal(size=(3, 38))
+    truth = rng.integers(0, 3, 5000)
+    embeddings = centres[truth] + 0.05 * rng.normal(size=(5000, 38))
+
+    labels = cluster_embeddings(embeddings, threshold=0.3, max_speakers=8,
+                                max_windows=200)
+
+    assert len(set(labels.tolist())) == 3
+    # Same partition as the truth, whatever the label numbering
+    pairs = set(zip(truth.tolist(), labels.tolist()))
+    assert len(pairs) == 3
@@ -0,0 +1,153 @@
+"""
+Tests for the shared pooled HTTP client
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.services import http_client
+from app.services.http_client import PooledTransport, build_transport
+from app.services.llm_backend import OpenAIChatBackend
+from app.utils.config import get_settings
+
+CHAT_REPLY = {
+    "id": "chatcmpl-1",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "stub",
+    "choices": [{
+        "index": 0,
+        "finish_reason": "stop",
+        "message": {"role": "assistant", "content": "{\"summary\": \"ok\"}"},
+    }],
+}
+
+
+class StubServer:
+    """Minimal keep-alive HTTP/1.1 server that answers every request"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.connections = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(
+            self.handle, "127.0.0.1", 0
+        )
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer) -> None:
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                await reader.readexactly(length)
+
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+                await asyncio.sleep(self.delay)
+                self.active -= 1
+
+                body = json.dumps(CHAT_REPLY).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(body)).encode()
+                    + b"\r\n\r\n" + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+@pytest_asyncio.fixture
+async def stub():
+    server = StubServer()
+    server.url = await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest_asyncio.fixture
+async def shared_client(monkeypatch):
+    monkeypatch.setattr(get_settings(), "max_concurrent_requests", 2)
+    await http_client.close_http_client()
+    yield http_client.get_http_client()
+    await http_client.close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_sequential_calls_reuse_one_connection(stub, shared_client):
+    for _ in range(5):
+        response = await shared_client.get(stub.url + "/ping")
+        assert response.status_code == 200
+
+    stats = http_client.http_client_stats()
+    assert stub.connections == 1
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 4
+    assert stats["pool"] == {"open": 1, "idle": 1, "active": 0}
+
+
+@pytest.mark.asyncio
+async def test_concurrency_per_host_is_capped(stub, shared_client):
+    stub.delay = 0.05
+
+    responses = await asyncio.gather(
+        *(shared_client.get(stub.url) for _ in range(6))
+    )
+
+    assert all(r.status_code == 200 for r in responses)
+    assert stub.max_active == 2
+    assert stub.connections == 2
+    stats = http_client.http_client_stats()
+    assert stats["in_flight"] == 0
+    assert stats["in_flight_per_host_histogram"]["buckets"]["2"] == 6
+
+
+@pytest.mark.asyncio
+async def test_openai_backend_uses_shared_pool(stub, shared_client,
+                                               monkeypatch):
+    monkeypatch.setenv("OPENAI_BASE_URL", stub.url + "/v1")
+    backend = OpenAIChatBackend("sk-test", "stub", 0.0, timeout=5)
+
+    for _ in range(3):
+        assert await backend.complete_json("system", "prompt", 10) \
+            == {"summary": "ok"}
+
+    assert stub.connections == 1
+    assert http_client.http_client_stats()["connections_reused"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_request_frees_host_slot():
+    async def refuse(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    transport = build_transport(httpx.MockTransport(refuse))
+    transport.per_host_limit = 1
+    async with httpx.AsyncClient(transport=transport) as client:
+        for _ in range(3):
+            with pytest.raises(httpx.ConnectError):
+                await client.get("http://upstream.invalid/")
+
+    assert isinstance(transport, PooledTransport)
+    assert transport.in_flight == 0
+    assert transport.requests == 3
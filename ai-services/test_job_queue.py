@@ -0,0 +1,167 @@
+"""
+Tests for the persistent job queue and transcription jobs
+"""
+
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from app.services import transcription_engine
+from app.services.job_queue import (
+    COMPLETED,
+    FAILED,
+    PENDING,
+    PROCESSING,
+    JobQueue,
+    JobStore,
+)
+from app.services.transcription_jobs import (
+    TRANSCRIPTION_JOB,
+    run_transcription_job,
+)
+from app.utils.audio import encode_wav
+from app.utils.config import get_settings
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    yield store
+    store.close()
+
+
+async def wait_for_status(queue, job_id, status, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        job = await queue.get(job_id)
+        if job.status == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} never reached {status}")
+
+
+@pytest.mark.asyncio
+async def test_submit_returns_immediately_and_worker_completes(store):
+    release = asyncio.Event()
+
+    async def handler(job, queue):
+        await release.wait()
+        return {"echo": job.payload["value"]}
+
+    queue = JobQueue(store, workers=2, poll_interval=0.05)
+    queue.register("echo", handler)
+    await queue.start()
+    try:
+        job = await queue.submit("echo", {"value": 42})
+        assert job.status == PENDING
+
+        await wait_for_status(queue, job.id, PROCESSING)
+        release.set()
+        done = await wait_for_status(queue, job.id, COMPLETED)
+        assert done.result == {"echo": 42}
+        assert done.progress == 100.0
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_jobs_retry_then_fail(store):
+    calls = []
+
+    async def handler(job, queue):
+        calls.append(job.attempts)
+        raise RuntimeError("upstream down")
+
+    queue = JobQueue(store, workers=1, max_attempts=2, poll_interval=0.05)
+    queue.register("flaky", handler)
+    await queue.start()
+    try:
+        job = await queue.submit("flaky", {})
+        failed = await wait_for_status(queue, job.id, FAILED)
+        assert calls == [1, 2]
+        assert failed.error == "upstream down"
+    finally:
+        await queue.stop()
+
+
+def test_idempotency_key_returns_existing_job(store):
+    first = store.create("echo", {"value": 1}, idempotency_key="abc")
+    second = store.create("echo", {"value": 2}, idempotency_key="abc")
+
+    assert first.id == second.id
+    assert second.payload == {"value": 1}
+
+
+def test_concurrent_submissions_share_one_job(tmp_path):
+    # One store per worker process, racing on the same keys
+    path = str(tmp_path / "jobs.db")
+    stores = [JobStore(path) for _ in range(4)]
+    barrier = threading.Barrier(len(stores))
+    created = {store: [] for store in stores}
+
+    def submit(store):
+        barrier.wait()
+        for key in range(50):
+            created[store].append(
+                store.create("echo", {}, idempotency_key=str(key)).id
+            )
+
+    threads = [threading.Thread(target=submit, args=(store,))
+               for store in stores]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for store in stores:
+        store.close()
+
+    assert len({tuple(ids) for ids in created.values()}) == 1
+    assert len(created[stores[0]]) == 50
+
+
+def test_interrupted_jobs_are_requeued(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = JobStore(path)
+    job = store.create("echo", {})
+    assert store.claim().id == job.id
+    store.save_chunk(job.id, 0, {"text": "w0"})
+    store.close()
+
+    # A fresh process sees the abandoned job and its checkpoints
+    restarted = JobStore(path)
+    assert restarted.requeue_interrupted(stale_after=0) == 1
+    assert restarted.get(job.id).status == PENDING
+    assert restarted.load_chunks(job.id) == {0: {"text": "w0"}}
+    restarted.close()
+
+
+@pytest.mark.asyncio
+async def test_transcription_job_resumes_from_checkpoints(
+    store, tmp_path, monkeypatch
+):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "job_spool_dir", str(tmp_path / "spool"))
+    monkeypatch.setattr(settings, "transcription_chunk_seconds", 10)
+    monkeypatch.setattr(settings, "mock_openai", True)
+    transcription_engine.get_transcription_engine.cache_clear()
+    engine = transcription_engine.get_transcription_engine()
+
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0, 0.3, 45 * settings.audio_sample_rate)
+    path = tmp_path / "meeting.wav"
+    path.write_bytes(encode_wav(samples, settings.audio_sample_rate))
+
+    queue = JobQueue(store, workers=1)
+    job = store.create(TRANSCRIPTION_JOB, {"audio_path": str(path)})
+    store.save_chunk(job.id, 0, {"segments": [], "language": "en"})
+    job = store.claim()
+
+    result = await run_transcription_job(job, queue)
+    progress = store.get(job.id)
+
+    assert progress.chunks_done == progress.chunks_total
+    assert engine.backend.calls == progress.chunks_total - 1
+    assert result["duration"] == pytest.approx(45.0)
+    transcription_engine.get_transcription_engine.cache_clear()
@@ -0,0 +1,141 @@
+"""
+Tests for the Prometheus metrics surface
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.middleware.metrics import (
+    REQUEST_SECONDS,
+    REQUESTS_IN_FLIGHT,
+    RequestMetricsMiddleware,
+)
+from app.services import monitoring
+from app.utils.config import get_settings
+from app.utils.metrics import STAGE_SECONDS, MetricsRegistry, time_stage
+
+
+def test_registry_renders_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("t_requests_total", "Requests", ("path",))
+    requests.labels('/a"b').inc(3)
+    registry.gauge("t_queue", "Queue depth").labels().set(2.5)
+    latency = registry.histogram("t_seconds", "Latency", (0.1, 1.0))
+    latency.labels().observe(0.05)
+    latency.labels().observe(0.5)
+    registry.register_collector(
+        lambda: [("t_ratio", "gauge", "Ratio", [({"tier": "x"}, 0.75)])]
+    )
+
+    text = registry.render()
+    assert "# TYPE t_requests_total counter" in text
+    assert 't_requests_total{path="/a\\"b"} 3' in text
+    assert "t_queue 2.5" in text
+    assert 't_seconds_bucket{le="0.1"} 1' in text
+    assert 't_seconds_bucket{le="1.0"} 2' in text
+    assert 't_seconds_bucket{le="+Inf"} 2' in text
+    assert "t_seconds_count 2" in text
+    assert 't_ratio{tier="x"} 0.75' in text
+    with pytest.raises(ValueError):
+        requests.labels()
+
+
+@pytest.mark.asyncio
+async def test_requests_are_labelled_by_route_template():
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware)
+    seen_in_flight = []
+
+    @app.get("/jobs/{job_id}")
+    async def job(job_id: str):
+        seen_in_flight.append(
+            REQUESTS_IN_FLIGHT.labels("/jobs/{job_id}").value
+        )
+        return {"id": job_id}
+
+    before = REQUEST_SECONDS.labels("/jobs/{job_id}", "GET", "200").count
+    missing = REQUEST_SECONDS.labels("unmatched", "GET", "404").count
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        for job_id in ("a", "b", "c"):
+            assert (await client.get(f"/jobs/{job_id}")).status_code == 200
+        assert (await client.get("/nope/x")).status_code == 404
+
+    assert REQUEST_SECONDS.labels("/jobs/{job_id}", "GET", "200").count \
+        == before + 3
+    assert REQUEST_SECONDS.labels("unmatched", "GET", "404").count \
+        == missing + 1
+    assert seen_in_flight == [1, 1, 1]
+    assert REQUESTS_IN_FLIGHT.labels("/jobs/{job_id}").value == 0
+
+
+@pytest.mark.asyncio
+async def test_stage_timer_covers_awaits():
+    histogram = STAGE_SECONDS.labels("test-stage")
+    with time_stage("test-stage"):
+        await asyncio.sleep(0.02)
+    assert histogram.count == 1
+    assert histogram.mean >= 0.02
+
+
+@pytest.mark.asyncio
+async def test_scrape_endpoint_reports_loop_lag(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "enable_metrics", True)
+    monkeypatch.setattr(settings, "metrics_host", "127.0.0.1")
+    monkeypatch.setattr(settings, "metrics_port", 0)
+    monkeypatch.setattr(settings, "metrics_lag_interval", 0.01)
+    lag = monitoring.EVENT_LOOP_LAG.labels()
+    before = lag.snapshot()
+
+    await monitoring.start_monitoring()
+    try:
+        await asyncio.sleep(0.02)
+        time.sleep(0.1)  # block the loop
+        await asyncio.sleep(0.03)
+        after = lag.snapshot()
+        assert after["count"] > before["count"]
+        assert after["sum"] - before["sum"] >= 0.08
+
+        port = monitoring._monitoring.server.sockets[0].getsockname()[1]
+        async with httpx.AsyncClient() as client:
+            scrape = await client.get(f"http://127.0.0.1:{port}/metrics")
+            missing = await client.get(f"http://127.0.0.1:{port}/other")
+    finally:
+        await monitoring.stop_monitoring()
+
+    assert scrape.status_code == 200
+    assert scrape.headers["content-type"].startswith("text/plain")
+    for name in ("echoscribe_event_loop_lag_seconds_bucket",
+                 "echoscribe_cache_hit_ratio",
+                 "echoscribe_models_resident"):
+        assert name in scrape.text
+    assert missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_each_worker_serves_metrics_on_its_own_port(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "metrics_host", "127.0.0.1")
+    monkeypatch.setattr(settings, "workers", 2)
+    # Another worker already holds the first port
+    taken = await asyncio.start_server(lambda r, w: None, "127.0.0.1", 0)
+    base = taken.sockets[0].getsockname()[1]
+    monkeypatch.setattr(settings, "metrics_port", base)
+
+    worker = monitoring.Monitoring()
+    try:
+        await worker.start()
+        assert worker.server is not None
+        port = worker.server.sockets[0].getsockname()[1]
+    finally:
+        await worker.stop()
+        taken.close()
+        await taken.wait_closed()
+    assert port == base + 1
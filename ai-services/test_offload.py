@@ -0,0 +1,148 @@
+"""
+Tests for offloading CPU-bound work to the process pool
+"""
+
+import asyncio
+import os
+import signal
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+
+from app.services import offload
+from app.services.diarization import (
+    DiarizationService,
+    cluster_embeddings,
+)
+from app.services.monitoring import collect_service_stats
+from app.services.offload import CpuPool
+from app.utils.config import get_settings
+
+PROBE_INTERVAL = 0.001
+
+
+def shared_blocks():
+    # The pool's own queues add sem.* entries
+    return {name for name in os.listdir("/dev/shm")
+            if not name.startswith("sem.")}
+
+
+@pytest.fixture
+def pool():
+    pool = CpuPool(2)
+    yield pool
+    pool.close()
+
+
+async def start_workers(pool: CpuPool) -> None:
+    """Spawn every worker, which the first calls would otherwise do"""
+    await asyncio.gather(*(pool.run(os.getpid)
+                           for _ in range(pool.workers)))
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_while_pool_is_saturated(pool):
+    await start_workers(pool)
+    # Clustering holds the GIL, so on a thread it would stall the loop
+    embeddings = np.random.default_rng(0).normal(size=(1500, 38))
+    jobs = [
+        asyncio.create_task(pool.run(cluster_embeddings, embeddings,
+                                     0.3, 8, 1500))
+        for _ in range(3 * pool.workers)
+    ]
+    await asyncio.sleep(0.05)
+    assert pool.pool_stats.queued == len(jobs) - pool.workers
+
+    lags = []
+    while not all(job.done() for job in jobs):
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+    labels = await asyncio.gather(*jobs)
+    assert all(len(found) == len(embeddings) for found in labels)
+    assert len(lags) > 100
+    assert np.percentile(lags, 99) < 0.005
+
+
+@pytest.mark.asyncio
+async def test_large_arrays_round_trip_through_shared_memory(
+    pool, monkeypatch
+):
+    blocks = shared_blocks()
+    runs = pool.pool_stats.run_seconds.count
+    shared = []
+    real_share = offload.share
+
+    def share(array):
+        shared.append(array.nbytes)
+        return real_share(array)
+
+    monkeypatch.setattr(offload, "share", share)
+    samples = np.random.default_rng(0).random(2 ** 20, dtype=np.float32)
+
+    doubled = await pool.run(np.multiply, samples, 2)
+    small = await pool.run(np.negative, samples[:100])
+    np.testing.assert_array_equal(doubled, samples * 2)
+    np.testing.assert_array_equal(small, -samples[:100])
+    assert shared == [samples.nbytes]  # the small array was pickled
+
+    with pytest.raises(ValueError):
+        await pool.run(np.reshape, samples, (3, 3))
+    assert shared_blocks() == blocks
+
+    stats = pool.pool_stats.stats()
+    assert (stats["submitted"], stats["failed"], stats["in_flight"]) \
+        == (3, 1, 0)
+    assert pool.pool_stats.run_seconds.count - runs == 2
+
+
+@pytest.mark.asyncio
+async def test_diarization_embeds_blocks_in_the_pool(pool, monkeypatch):
+    monkeypatch.setattr(offload, "_cpu_pool", pool)
+    monkeypatch.setattr(get_settings(), "diarization_block_seconds", 60.0)
+    shared = []
+    real_share = offload.share
+
+    def share(array):
+        shared.append(array.nbytes)
+        return real_share(array)
+
+    monkeypatch.setattr(offload, "share", share)
+    sample_rate = 16000
+    samples = np.random.default_rng(0).normal(
+        0, 0.1, 150 * sample_rate).astype(np.float32)
+    starts = np.arange(0.0, 148.5, 0.75)
+    ends = starts + 1.5
+
+    service = DiarizationService()
+
+    embeddings = await service.embed(samples, sample_rate, starts, ends)
+
+    # One pool call per block, each passed through shared memory
+    assert pool.pool_stats.submitted == 3
+    assert len(shared) == 3
+    monkeypatch.setattr(get_settings(), "enable_process_pool", False)
+    np.testing.assert_array_equal(
+        embeddings, await service.embed(samples, sample_rate, starts, ends)
+    )
+
+
+@pytest.mark.asyncio
+async def test_pool_restarts_after_a_worker_dies(pool, monkeypatch):
+    await start_workers(pool)
+    monkeypatch.setattr(offload, "_cpu_pool", pool)
+    pids = [process.pid for process in pool.executor()._processes.values()]
+
+    running = asyncio.create_task(pool.run(time.sleep, 5))
+    await asyncio.sleep(0.1)
+    os.kill(pids[0], signal.SIGKILL)
+    with pytest.raises(BrokenProcessPool):
+        await running
+
+    assert await pool.run(os.getpid) not in pids
+    metrics = {name: samples
+               for name, _, _, samples in collect_service_stats()}
+    assert ({"pool": "cpu"}, 1) in metrics["echoscribe_pool_failed_total"]
@@ -0,0 +1,77 @@
+"""
+Tests for the ONNX Runtime inference backend
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from app.services.model_registry import (
+    OnnxClassifier,
+    TransformersClassifier,
+    load_classifier,
+)
+from app.utils.config import get_settings, validate_environment
+from benchmarks.bench_onnx import load_fixtures
+from benchmarks.bench_prefork import save_model
+
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("model"))
+    save_model(path, layers=2, hidden=128)
+    return path
+
+
+@pytest.mark.parametrize("overrides, error", [
+    ("foo", "MODEL_BACKEND_OVERRIDES must be model=backend"),
+    ("foo=tensorrt", "must use torch, onnx or onnx-int8"),
+])
+def test_malformed_backend_overrides_fail_validation(
+    monkeypatch, overrides, error
+):
+    monkeypatch.setattr(get_settings(), "model_backend_overrides", overrides)
+
+    assert error in " ".join(validate_environment().errors)
+
+
+def test_onnx_export_matches_torch_and_int8_stays_close(model_dir, tmp_path):
+    texts, _ = load_fixtures()
+    cache_dir = str(tmp_path)
+    fp32 = TransformersClassifier(model_dir, cache_dir=cache_dir)
+    onnx = OnnxClassifier(model_dir, cache_dir=cache_dir, quantize=False)
+    int8 = OnnxClassifier(model_dir, cache_dir=cache_dir, quantize=True)
+
+    expected = fp32.predict(texts)
+    assert onnx.labels == fp32.labels
+    np.testing.assert_allclose(onnx.predict(texts), expected, atol=1e-4)
+    assert np.abs(int8.predict(texts) - expected).mean() < 0.02
+    assert os.path.getsize(int8.path) < os.path.getsize(onnx.path) / 2
+
+
+def test_backend_is_chosen_per_model_and_export_is_cached(
+    model_dir, tmp_path, monkeypatch
+):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "mock_huggingface", False)
+    monkeypatch.setattr(settings, "hf_use_auth_token", False)
+    monkeypatch.setattr(settings, "hf_cache_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "model_backend", "torch")
+    monkeypatch.setattr(settings, "model_backend_overrides",
+                        f"{model_dir}=onnx-int8")
+
+    first = load_classifier(model_dir)
+    assert isinstance(first, OnnxClassifier)
+    assert settings.model_backend_for("other/model") == "torch"
+
+    def export(*args, **kwargs):
+        raise AssertionError("exported again instead of using the cache")
+
+    monkeypatch.setattr("torch.onnx.export", export)
+    monkeypatch.setattr("onnxruntime.quantization.quantize_dynamic",
+                        export)
+    second = load_classifier(model_dir)
+    assert second.path == first.path
+    np.testing.assert_allclose(second.predict(["Great work."]),
+                               first.predict(["Great work."]))
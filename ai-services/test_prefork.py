@@ -0,0 +1,67 @@
+"""
+Tests for the pre-fork server's workers: shared memory, random state and
+restarts
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import time
+
+SCRIPT = """
+import os, sys, time
+import numpy as np
+from app.utils.prefork import PreforkServer, bind_socket
+
+weights = np.ones(64 * 2 ** 20 // 8)  # 64MB the workers only read
+np.random.seed(0)
+
+def serve(sock):
+    total = weights.sum()
+    with open("/proc/self/smaps_rollup") as f:
+        private = sum(int(line.split()[1]) for line in f
+                      if line.startswith("Private_"))
+    with open(sys.argv[1], "a") as out:
+        out.write(f"{os.getpid()} {np.random.randint(2 ** 31)} "
+                  f"{private} {total == len(weights)}\\n")
+    time.sleep(60)
+
+PreforkServer(bind_socket("127.0.0.1", 0), 2, serve).run()
+"""
+
+
+def lines(path: str, count: int):
+    for _ in range(200):
+        if os.path.exists(path):
+            with open(path) as f:
+                found = [line.split() for line in f]
+            if len(found) >= count:
+                return found
+        time.sleep(0.05)
+    raise AssertionError(f"expected {count} worker reports")
+
+
+def test_workers_share_memory_reseed_and_are_restarted(tmp_path):
+    report = str(tmp_path / "workers.txt")
+    parent = subprocess.Popen(
+        [sys.executable, "-c", SCRIPT, report],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    try:
+        first, second = lines(report, 2)
+        assert first[1] != second[1]  # each worker has its own RNG state
+        for worker in (first, second):
+            assert worker[3] == "True"
+            # Reading the parent's 64MB array copies none of it
+            assert int(worker[2]) < 32 * 1024
+
+        os.kill(int(first[0]), signal.SIGKILL)
+        replacement = lines(report, 3)[2]
+        assert replacement[0] not in (first[0], second[0])
+
+        parent.send_signal(signal.SIGTERM)
+        assert parent.wait(timeout=10) == 0
+    finally:
+        parent.kill()
+        parent.wait()
@@ -0,0 +1,128 @@
+"""
+Tests for per-request profiling and the admin stack sampler
+"""
+
+import asyncio
+import json
+import os
+import pstats
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.middleware.profiling import ProfilingMiddleware
+from app.routers import admin
+from app.utils.config import get_settings, validate_environment
+from app.utils.metrics import time_stage
+from app.utils.profiling import current_timeline
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+    app.include_router(admin.router, prefix="/api/admin")
+
+    @app.get("/work")
+    async def work():
+        with time_stage("test-inference"):
+            await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    return app
+
+
+@pytest.fixture
+def settings(monkeypatch, tmp_path):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "debug_output_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profiling_token", "secret")
+    monkeypatch.setattr(settings, "profiling_sample_rate", 0.0)
+    return settings
+
+
+@pytest.mark.asyncio
+async def test_requested_profile_writes_pstats_and_timeline(settings):
+    transport = httpx.ASGITransport(app=make_app())
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        plain = await client.get("/work")
+        wrong = await client.get("/work", headers={"X-Profile": "guess"})
+        profiled = await client.get("/work", headers={"X-Profile": "secret"})
+
+    assert "x-profile-id" not in plain.headers
+    assert "x-profile-id" not in wrong.headers
+    assert profiled.status_code == 200
+    base = os.path.join(settings.debug_output_dir, "profiles",
+                        profiled.headers["x-profile-id"])
+    stats = pstats.Stats(base + ".pstats")
+    assert stats.total_calls > 0
+    with open(base + ".trace.json") as f:
+        events = json.load(f)["traceEvents"]
+    spans = {e["name"]: e for e in events if e["ph"] == "X"}
+    assert spans["test-inference"]["dur"] >= 10000
+    assert spans["request"]["dur"] >= spans["test-inference"]["dur"]
+    assert current_timeline() is None
+
+
+@pytest.mark.asyncio
+async def test_admin_samples_process_stacks(settings, monkeypatch):
+    monkeypatch.setattr(settings, "save_debug_files", True)
+    transport = httpx.ASGITransport(app=make_app())
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        denied = await client.post("/api/admin/profile?seconds=0.1")
+
+        def spin(seconds):
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                sum(range(1000))
+
+        async def block_loop():
+            await asyncio.sleep(0.05)  # let the sampler start
+            spin(0.2)  # a handler hogging the event loop
+
+        response, _ = await asyncio.gather(
+            client.post(
+                "/api/admin/profile?seconds=0.3&interval=0.005",
+                headers={"X-Profile-Token": "secret"},
+            ),
+            block_loop(),
+        )
+        too_long = await client.post(
+            "/api/admin/profile?seconds=600",
+            headers={"X-Profile-Token": "secret"},
+        )
+
+    assert denied.status_code == 403
+    assert too_long.status_code == 400
+    body = response.json()
+    assert body["samples"] >= 10
+    assert body["top"] and abs(
+        sum(frame["share"] for frame in body["top"]) - 1
+    ) < 0.05
+    with open(body["file"]) as f:
+        assert "spin (test_profiling.py:" in f.read()
+
+
+@pytest.mark.asyncio
+async def test_profiling_is_closed_without_a_token_outside_development(
+    settings, monkeypatch
+):
+    monkeypatch.setattr(settings, "profiling_token", None)
+    monkeypatch.setattr(settings, "environment", "production")
+    monkeypatch.setattr(settings, "enable_profiling", True)
+    assert "PROFILING_TOKEN" in " ".join(validate_environment().errors)
+
+    transport = httpx.ASGITransport(app=make_app())
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        profiled = await client.get("/work", headers={"X-Profile": "1"})
+        sampled = await client.post("/api/admin/profile?seconds=0.1")
+
+    assert "x-profile-id" not in profiled.headers
+    assert sampled.status_code == 403
@@ -0,0 +1,201 @@
+"""
+Tests for the shared token-bucket rate limiter
+"""
+
+import asyncio
+import math
+import multiprocessing
+import time
+
+import pytest
+
+from app.services import rate_limiter
+from app.services.llm_backend import OpenAIChatBackend
+from app.services.rate_limiter import (
+    REQUESTS,
+    TOKENS,
+    Bucket,
+    FileBucketStore,
+    LocalBucketStore,
+    RateLimiter,
+    RedisBucketStore,
+    estimate_request_tokens,
+    reserve_levels,
+)
+
+
+class FakeRedis:
+    """In-memory stand-in for redis.asyncio.Redis scripts"""
+
+    def __init__(self):
+        self.hashes = {}
+
+    def register_script(self, script):
+        async def run(keys, args):
+            # Same arithmetic as the Lua script, bucket by bucket
+            buckets, levels, costs = [], [], {}
+            for i, key in enumerate(keys):
+                rate, capacity, cost = map(float, args[i * 3:i * 3 + 3])
+                buckets.append(Bucket(key, rate * 60, capacity / rate))
+                levels.append(self.hashes.get(key, (math.nan, 0.0)))
+                costs[key] = cost
+            wait = reserve_levels(buckets, levels, costs, time.time())
+            self.hashes.update(zip(keys, levels))
+            return str(wait).encode()
+        return run
+
+
+def reserve_in_process(path: str, count: int, results) -> None:
+    store = FileBucketStore([Bucket(REQUESTS, 600, 1.0)], path)
+    for _ in range(count):
+        results.put(asyncio.run(store.reserve({REQUESTS: 1})))
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_reservations_queue_behind_the_burst():
+    # 600/min = 10/s, holding one second's worth
+    store = LocalBucketStore([Bucket(REQUESTS, 600, 1.0)])
+    waits = [await store.reserve({REQUESTS: 1}) for _ in range(15)]
+
+    assert waits[:10] == [0.0] * 10
+    assert [round(w, 1) for w in waits[10:]] == [0.1, 0.2, 0.3, 0.4, 0.5]
+
+    # Handing quota back shortens the queue for later callers
+    await store.reserve({REQUESTS: -5})
+    assert await store.reserve({REQUESTS: 1}) == pytest.approx(0.1, abs=0.02)
+
+
+@pytest.mark.asyncio
+async def test_callers_are_admitted_in_arrival_order():
+    store = LocalBucketStore([
+        Bucket(REQUESTS, 6000, 1.0), Bucket(TOKENS, 60000, 0.1),
+    ])
+    limiter = RateLimiter("test", store)
+    order = []
+
+    async def call(name, tokens):
+        await limiter.acquire(requests=1, tokens=tokens)
+        order.append(name)
+
+    # A large call ahead of small ones is not starved by them
+    await asyncio.gather(
+        call("first", 100), call("large", 150), call("small-1", 10),
+        call("small-2", 10),
+    )
+    assert order == ["first", "large", "small-1", "small-2"]
+    assert limiter.stats()["admitted"] == {REQUESTS: 4, TOKENS: 270}
+    assert limiter.delayed == 3
+
+
+@pytest.mark.asyncio
+async def test_abandoned_waiter_returns_its_reservation():
+    store = LocalBucketStore([Bucket(REQUESTS, 60, 1.0)])
+    limiter = RateLimiter("test", store)
+    await limiter.acquire(requests=1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(limiter.acquire(requests=1), 0.05)
+
+    assert limiter.waiting == 0
+    # Only the refill since the first call is owed, not the abandoned one
+    assert await store.reserve({REQUESTS: 1}) < 1.0
+
+
+def test_file_store_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "openai.state")
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(
+            target=reserve_in_process, args=(path, 20, results)
+        )
+        for _ in range(3)
+    ]
+    for worker in workers:
+        worker.start()
+    waits = sorted(results.get(timeout=10) for _ in range(60))
+    for worker in workers:
+        worker.join()
+
+    # 60 requests against 10/s with a burst of 10 queue for 5 seconds
+    assert waits[:10] == [0.0] * 10
+    assert waits[-1] == pytest.approx(5.0, abs=0.5)
+
+
+@pytest.mark.asyncio
+async def test_redis_store_keys_per_limiter():
+    redis = FakeRedis()
+    store = RedisBucketStore(
+        [Bucket(REQUESTS, 60, 2.0)], redis, "ai_services:ratelimit:openai:"
+    )
+    waits = [await store.reserve({REQUESTS: 1}) for _ in range(3)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(1.0, abs=0.01)
+    assert list(redis.hashes) == ["ai_services:ratelimit:openai:requests"]
+
+
+@pytest.mark.asyncio
+async def test_bursty_load_stays_under_quota_near_the_ceiling():
+    """
+    Bursts of calls against an upstream that enforces the same token
+    quota: no call is rejected and throughput approaches the quota
+    """
+    tokens_per_second = 10000
+    bucket = Bucket(TOKENS, tokens_per_second * 60, 0.2)
+    limiter = RateLimiter("test", LocalBucketStore([bucket]))
+    upstream = LocalBucketStore([Bucket(TOKENS, tokens_per_second * 60,
+                                        0.2 * 1.05)])
+    rejected = 0
+    admitted = 0
+
+    async def call():
+        nonlocal rejected, admitted
+        await limiter.acquire(tokens=100)
+        if await upstream.reserve({TOKENS: 100}) > 0:
+            rejected += 1
+            await upstream.reserve({TOKENS: -100})
+        else:
+            admitted += 100
+
+    start = time.monotonic()
+    for _ in range(4):
+        await asyncio.gather(*(call() for _ in range(25)))
+    elapsed = time.monotonic() - start
+
+    assert rejected == 0
+    # 10000 tokens minus the initial burst of 2000 at 10000/s take 0.8s
+    assert elapsed == pytest.approx(0.8, abs=0.15)
+    assert admitted == 10000
+
+
+@pytest.mark.asyncio
+async def test_openai_backend_waits_for_quota(monkeypatch):
+    limiter = RateLimiter("test", LocalBucketStore([Bucket(TOKENS, 60000)]))
+    backend = OpenAIChatBackend("sk-test", "stub", 0.0, timeout=5,
+                                rate_limiter=limiter)
+
+    class Stop(Exception):
+        pass
+
+    def no_client(api_key, timeout):
+        raise Stop()
+
+    monkeypatch.setattr("app.services.llm_backend.openai_client", no_client)
+    with pytest.raises(Stop):
+        await backend.complete_json("s" * 40, "p" * 400, 100)
+    assert limiter.admitted[TOKENS] == estimate_request_tokens(
+        ("s" * 40, "p" * 400), 100
+    ) == 210
+
+
+def test_limiter_is_off_without_limits():
+    rate_limiter.reset_rate_limiters()
+    try:
+        assert rate_limiter.get_rate_limiter("openai", 0, 0) is None
+        limiter = rate_limiter.get_rate_limiter("whisper", 50)
+        assert limiter is rate_limiter.get_rate_limiter("whisper", 50)
+        assert limiter.stats()["limits_per_minute"] == {REQUESTS: 50}
+        assert set(rate_limiter.rate_limiter_stats()) == {"whisper"}
+    finally:
+        rate_limiter.reset_rate_limiters()
@@ -0,0 +1,73 @@
+"""
+Tests for liveness, readiness and warm-up
+"""
+
+import httpx
+import pytest
+
+from app.middleware import admission
+from app.services import readiness as readiness_module
+from app.services.model_registry import LexiconClassifier, ModelRegistry
+from app.services.readiness import Readiness, get_readiness
+from app.utils.config import get_settings
+
+
+def loader(name: str) -> LexiconClassifier:
+    if name == "broken":
+        raise OSError("weights not found")
+    return LexiconClassifier(name)
+
+
+@pytest.mark.asyncio
+async def test_ready_only_after_warm_up_and_failures_do_not_block(
+    monkeypatch
+):
+    registry = ModelRegistry(2, loader=loader)
+    monkeypatch.setattr(readiness_module, "get_model_registry",
+                        lambda: registry)
+    monkeypatch.setattr(get_settings(), "enable_diarization", False)
+    monkeypatch.setattr(get_settings(), "mock_openai", True)
+    readiness = Readiness(queue_fraction=0.5)
+    assert readiness.check() == {"ready": False, "reasons": ["warming up"]}
+
+    await readiness.start_warm_up(["lexicon", "broken"])
+
+    assert readiness.check()["ready"]
+    assert "lexicon" in registry
+    assert registry._models["lexicon"].batch_sizes == [3]
+    stats = readiness.stats()
+    assert set(stats["warmup_seconds"]) == {
+        "model:lexicon", "model:broken", "audio", "cpu_pool",
+    }
+    assert stats["warmup_failures"] == {"model:broken": "weights not found"}
+
+
+@pytest.mark.asyncio
+async def test_readiness_drops_while_a_route_class_is_saturated(
+    monkeypatch
+):
+    from main import app
+
+    monkeypatch.setattr(get_settings(), "admission_queue_size", 4)
+    admission.reset_admission()
+    get_readiness.cache_clear()
+    get_readiness().mark_warmed_up()
+    limiter = admission.get_route_limiter("analysis")
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            assert (await client.get("/health/ready")).status_code == 200
+
+            limiter._queue.extend([None, None])  # half of the queue
+            response = await client.get("/health/ready")
+            assert response.status_code == 503
+            assert response.json()["reasons"] == ["analysis saturated"]
+            assert (await client.get("/health/live")).status_code == 200
+
+            limiter._queue.pop()
+            assert (await client.get("/health/ready")).status_code == 200
+    finally:
+        admission.reset_admission()
+        get_readiness.cache_clear()
@@ -0,0 +1,151 @@
+"""
+Tests for the two-tier analysis result cache
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.services import cache as cache_module
+from app.services.cache import ResultCache, make_cache_key
+
+
+class FakeRedis:
+    """In-memory stand-in for redis.asyncio.Redis"""
+
+    def __init__(self):
+        self.data = {}
+        self.fail = False
+
+    async def get(self, key):
+        if self.fail:
+            raise ConnectionError("redis unavailable")
+        entry = self.data.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        return entry[0]
+
+    async def set(self, key, value, ex=None):
+        if self.fail:
+            raise ConnectionError("redis unavailable")
+        self.data[key] = (value, time.monotonic() + (ex or 1e9))
+
+
+def test_key_depends_on_text_type_model_and_prompt():
+    base = make_cache_key("p:", "hello", "summary", "gpt-4", "v1")
+
+    assert base == make_cache_key("p:", "hello", "summary", "gpt-4", "v1")
+    assert base.startswith("p:analysis:summary:")
+    assert base != make_cache_key("p:", "hello!", "summary", "gpt-4", "v1")
+    assert base != make_cache_key("p:", "hello", "sentiment", "gpt-4", "v1")
+    assert base != make_cache_key("p:", "hello", "summary", "gpt-3", "v1")
+    assert base != make_cache_key("p:", "hello", "summary", "gpt-4", "v2")
+
+
+@pytest.mark.asyncio
+async def test_lru_is_bounded():
+    cache = ResultCache(max_entries=2, ttl=60)
+    for key in ("a", "b", "c"):
+        await cache.set(key, {"key": key})
+
+    assert await cache.get("a") is None
+    assert await cache.get("c") == {"key": "c"}
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_entries_expire(monkeypatch):
+    cache = ResultCache(max_entries=10, ttl=5)
+    now = time.monotonic()
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now)
+    await cache.set("a", {"v": 1})
+
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now + 6)
+    assert await cache.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_remote_tier_refills_local():
+    redis = FakeRedis()
+    writer = ResultCache(max_entries=10, ttl=60, redis=redis)
+    reader = ResultCache(max_entries=10, ttl=60, redis=redis)
+
+    await writer.set("k", {"summary": "s"})
+    assert await reader.get("k") == {"summary": "s"}
+    assert await reader.get("k") == {"summary": "s"}
+
+    stats = reader.stats()
+    assert stats["remote_hits"] == 1
+    assert stats["local_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_degrades_to_miss():
+    redis = FakeRedis()
+    redis.fail = True
+    cache = ResultCache(max_entries=10, ttl=60, redis=redis)
+
+    assert await cache.get_or_compute("k", _value(1)) == 1
+    assert cache.stats()["remote_errors"] == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_computation():
+    cache = ResultCache(max_entries=10, ttl=60)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"v": calls}
+
+    results = await asyncio.gather(
+        *(cache.get_or_compute("k", compute) for _ in range(10))
+    )
+    assert calls == 1
+    assert all(result == {"v": 1} for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_fail_the_others():
+    cache = ResultCache(max_entries=10, ttl=60)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"v": calls}
+
+    first = asyncio.create_task(cache.get_or_compute("k", compute))
+    await asyncio.sleep(0)
+    others = [asyncio.create_task(cache.get_or_compute("k", compute))
+              for _ in range(3)]
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await asyncio.gather(*others) == [{"v": 1}] * 3
+    assert first.cancelled()
+    assert calls == 1
+    assert await cache.get("k") == {"v": 1}
+
+
+@pytest.mark.asyncio
+async def test_cached_lookup_is_sub_millisecond():
+    cache = ResultCache(max_entries=10, ttl=60)
+    await cache.set("k", {"summary": "s" * 1000})
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        await cache.get("k")
+    per_lookup = (time.perf_counter() - start) / 1000
+
+    assert per_lookup < 0.0005
+
+
+def _value(value):
+    async def compute():
+        return value
+    return compute
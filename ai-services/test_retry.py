@@ -0,0 +1,291 @@
+"""
+Tests for the retry engine: classification, backoff, budgets, circuit
+breaking and deadlines
+"""
+
+import asyncio
+import time
+
+import httpx
+import numpy as np
+import pytest
+
+from app.services import retry
+from app.services.errors import (
+    AIServiceError,
+    CircuitOpenError,
+    DeadlineExceeded,
+    RetryableError,
+)
+from app.services.retry import (
+    CircuitBreaker,
+    RetryBudget,
+    Upstream,
+    deadline,
+    full_jitter,
+    is_retryable,
+    retry_after,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def status_error(status: int, headers=None) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://upstream.invalid/")
+    response = httpx.Response(status, headers=headers, request=request)
+    return httpx.HTTPStatusError(
+        f"status {status}", request=request, response=response
+    )
+
+
+def make_upstream(threshold: int = 5, reset: float = 30.0,
+                  ratio: float = 0.2, per_second: float = 1.0) -> Upstream:
+    return Upstream(
+        "test",
+        RetryBudget(ratio, per_second),
+        CircuitBreaker(threshold, reset),
+    )
+
+
+def test_classification_and_retry_after():
+    assert is_retryable(status_error(503))
+    assert is_retryable(status_error(429))
+    assert not is_retryable(status_error(400))
+    assert not is_retryable(status_error(401))
+    assert is_retryable(httpx.ConnectError("refused"))
+    assert is_retryable(asyncio.TimeoutError())
+    assert not is_retryable(ValueError("bad reply"))
+
+    assert retry_after(status_error(429, {"retry-after": "2"})) == 2.0
+    assert retry_after(status_error(429, {"retry-after-ms": "150"})) == 0.15
+    assert retry_after(RetryableError("busy", retry_after=0.5)) == 0.5
+    assert retry_after(status_error(503)) is None
+
+    delays = [full_jitter(3, 1.0, 5.0) for _ in range(1000)]
+    assert 0 <= min(delays) and max(delays) <= 5.0
+    assert max(delays) > 4.0
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried():
+    upstream = make_upstream()
+    calls = 0
+
+    async def bad_request():
+        nonlocal calls
+        calls += 1
+        raise status_error(400)
+
+    with pytest.raises(AIServiceError) as info:
+        await upstream.call(bad_request, max_attempts=5, base_delay=0)
+    assert calls == 1
+    assert isinstance(info.value.__cause__, httpx.HTTPStatusError)
+    assert upstream.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_honored():
+    upstream = make_upstream()
+    started = []
+
+    async def throttled():
+        started.append(time.monotonic())
+        if len(started) == 1:
+            raise status_error(429, {"retry-after-ms": "80"})
+        return "ok"
+
+    assert await upstream.call(throttled, base_delay=10.0) == "ok"
+    assert 0.07 <= started[1] - started[0] < 1.0
+    assert upstream.retries == 1
+
+
+@pytest.mark.asyncio
+async def test_no_attempt_starts_after_the_deadline():
+    upstream = make_upstream()
+    calls = 0
+
+    async def hanging():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(1.0)
+
+    start = time.monotonic()
+    with deadline(0.1):
+        with pytest.raises(DeadlineExceeded):
+            await upstream.call(hanging, max_attempts=5, base_delay=0.01)
+    assert time.monotonic() - start < 0.3
+    assert calls == 1
+
+    async def unavailable():
+        raise RetryableError("busy", retry_after=5.0)
+
+    # A retry that could only start after the deadline is not waited for
+    start = time.monotonic()
+    with deadline(1.0):
+        with pytest.raises(DeadlineExceeded):
+            await upstream.call(unavailable, max_attempts=5)
+    assert time.monotonic() - start < 0.1
+
+
+def test_circuit_breaker_opens_probes_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(3, 10.0, clock)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    clock.now = 10.0
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # one probe at a time
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.retry_in() == 10.0
+
+    clock.now = 20.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+    assert breaker.times_opened == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_does_not_keep_the_circuit_open():
+    clock = FakeClock()
+    upstream = Upstream("test", RetryBudget(0.2, 1.0),
+                        CircuitBreaker(1, 10.0, clock))
+
+    async def unavailable():
+        raise RetryableError("busy")
+
+    with pytest.raises(AIServiceError):
+        await upstream.call(unavailable, max_attempts=1)
+    assert upstream.breaker.state == CircuitBreaker.OPEN
+
+    clock.now = 10.0
+    probe = asyncio.create_task(upstream.call(asyncio.sleep, 60))
+    await asyncio.sleep(0.01)
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    clock.now = 1000.0
+
+    async def healthy():
+        return "ok"
+
+    assert await upstream.call(healthy) == "ok"
+    assert upstream.breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_local_errors_do_not_close_a_half_open_circuit():
+    clock = FakeClock()
+    upstream = Upstream("test", RetryBudget(0.2, 1.0),
+                        CircuitBreaker(1, 10.0, clock))
+
+    async def unavailable():
+        raise RetryableError("busy")
+
+    async def bad_arguments():
+        raise TypeError("payload is not serializable")
+
+    async def bad_request():
+        raise status_error(400)
+
+    with pytest.raises(AIServiceError):
+        await upstream.call(unavailable, max_attempts=1)
+    clock.now = 10.0
+
+    with pytest.raises(AIServiceError):
+        await upstream.call(bad_arguments)
+    assert upstream.breaker.state == CircuitBreaker.HALF_OPEN
+
+    with pytest.raises(AIServiceError):
+        await upstream.call(bad_request)
+    assert upstream.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_retry_budget_limits_retries_to_a_share_of_calls():
+    clock = FakeClock()
+    budget = RetryBudget(0.125, 0.0, clock)
+    budget.balance = 0.0
+    spent = 0
+    for _ in range(100):
+        budget.record_call()
+        spent += budget.try_spend()
+    assert spent == 12
+
+    budget = RetryBudget(0.0, 2.0, clock)
+    budget.balance = 0.0
+    assert not budget.try_spend()
+    clock.now += 1.0
+    assert budget.try_spend() and budget.try_spend()
+    assert not budget.try_spend()
+
+
+@pytest.mark.asyncio
+async def test_outage_amplification_and_tail_latency():
+    """
+    200 callers hit an upstream that is down for its first 0.3s. The
+    breaker and budget must keep upstream load close to one attempt per
+    call and fail callers fast instead of letting them queue on retries.
+    """
+    upstream = make_upstream(threshold=5, reset=0.2, ratio=0.1,
+                             per_second=5.0)
+    upstream.budget.balance = 0.0
+    down_until = time.monotonic() + 0.3
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(0.005)
+        if time.monotonic() < down_until:
+            raise RetryableError("503 from upstream")
+        return "ok"
+
+    latencies = []
+    outcomes = []
+
+    async def caller(delay: float):
+        await asyncio.sleep(delay)
+        start = time.monotonic()
+        try:
+            await upstream.call(flaky, max_attempts=4, base_delay=0.05,
+                                max_delay=0.5)
+            outcomes.append("ok")
+        except CircuitOpenError:
+            outcomes.append("open")
+        except AIServiceError:
+            outcomes.append("failed")
+        latencies.append(time.monotonic() - start)
+
+    await asyncio.gather(*(caller(i * 0.003) for i in range(200)))
+
+    assert attempts / 200 < 1.3
+    assert outcomes.count("open") > 50
+    assert outcomes[-50:].count("ok") == 50  # recovered after the outage
+    assert np.percentile(latencies, 99) < 0.5
+    assert upstream.stats()["circuit"] == CircuitBreaker.CLOSED
+
+
+@pytest.mark.asyncio
+async def test_upstreams_are_shared_by_name():
+    retry.reset_upstreams()
+    try:
+        assert retry.get_upstream("openai") is retry.get_upstream("openai")
+        assert retry.get_upstream("whisper") is not \
+            retry.get_upstream("openai")
+        assert set(retry.upstream_stats()) == {"openai", "whisper"}
+    finally:
+        retry.reset_upstreams()
@@ -0,0 +1,97 @@
+"""
+Tests for the model registry and batched sentiment service
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from app.services.batching import close_batchers
+from app.services.model_registry import LexiconClassifier, ModelRegistry
+from app.services.sentiment_service import SentimentService, predict_batched
+from app.utils.text import split_sentences
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def reset_batchers():
+    yield
+    await close_batchers()
+
+
+def lexicon_loader(loaded):
+    def load(name):
+        loaded.append(name)
+        return LexiconClassifier(name)
+    return load
+
+
+@pytest.mark.asyncio
+async def test_registry_evicts_least_recently_used():
+    loaded = []
+    registry = ModelRegistry(capacity=2, loader=lexicon_loader(loaded))
+
+    await registry.get("a")
+    await registry.get("b")
+    await registry.get("a")
+    await registry.get("c")
+
+    assert "a" in registry and "c" in registry
+    assert "b" not in registry
+    assert registry.stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_gets_share_one_load():
+    loaded = []
+    registry = ModelRegistry(capacity=2, loader=lexicon_loader(loaded))
+
+    await asyncio.gather(*(registry.get("a") for _ in range(5)))
+
+    assert loaded == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_clear_frees_all_models():
+    registry = ModelRegistry(capacity=3, loader=lexicon_loader([]))
+    await registry.preload(["a", "b"])
+
+    registry.clear()
+
+    assert registry.stats()["resident"] == []
+
+
+def test_split_sentences():
+    text = "We are ahead. Is the demo blocked?\nGreat work!"
+    assert split_sentences(text) == [
+        "We are ahead.", "Is the demo blocked?", "Great work!"
+    ]
+
+
+def test_predict_batched_preserves_order():
+    model = LexiconClassifier()
+    texts = ["great " * n if n % 2 else "blocked" for n in range(1, 40)]
+
+    batched = predict_batched(model, texts, batch_size=8)
+    single = np.vstack([model.predict([t]) for t in texts])
+
+    assert np.allclose(batched, single)
+    assert model.batch_sizes[:5] == [8, 8, 8, 8, 7]
+
+
+@pytest.mark.asyncio
+async def test_analyze_aggregates_segments():
+    registry = ModelRegistry(capacity=1, loader=lexicon_loader([]))
+    service = SentimentService(registry, model_name="lexicon", batch_size=4)
+
+    result = await service.analyze(
+        "Great progress, thanks everyone. The launch is good. "
+        "One risk remains."
+    )
+
+    assert result["overall_sentiment"] == "positive"
+    assert 0.5 < result["sentiment_score"] <= 1.0
+    assert [s["sentiment"] for s in result["segments"]] == [
+        "positive", "positive", "negative"
+    ]
@@ -0,0 +1,56 @@
+"""
+Tests for lazy imports and the startup-time budget
+"""
+
+import os
+import subprocess
+import sys
+
+from benchmarks.bench_startup import (
+    HEAVY_MODULES, SERVICE_DIR, by_package, time_to_health,
+)
+
+# Seconds from spawning the server to its first /health. An eager torch or
+# transformers import alone takes longer than this.
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "3.0"))
+
+
+def test_importing_the_app_loads_no_heavy_modules():
+    probe = (
+        "import sys, main; "
+        "print('loaded:', "
+        f"[m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    )
+    result = subprocess.run([sys.executable, "-c", probe], cwd=SERVICE_DIR,
+                            capture_output=True, text=True, check=True)
+
+    assert "loaded: []" in result.stdout.splitlines()
+
+
+def test_importing_the_app_prints_no_warnings():
+    result = subprocess.run([sys.executable, "-c", "import main"],
+                            cwd=SERVICE_DIR, capture_output=True, text=True,
+                            check=True)
+
+    assert "Warning" not in result.stderr
+
+
+def test_package_totals_count_each_import_once():
+    # -X importtime order: children first, then the module importing them
+    rows = [
+        ("numpy.core", 2, 30, 30),
+        ("numpy", 1, 10, 40),
+        ("app.utils", 1, 5, 5),
+        ("app", 0, 20, 65),
+    ]
+
+    assert by_package(rows) == {"app": 65, "numpy": 40}
+
+
+def test_first_health_check_is_within_the_startup_budget():
+    elapsed = time_to_health(timeout=STARTUP_BUDGET_SECONDS * 4)
+
+    assert elapsed < STARTUP_BUDGET_SECONDS, (
+        f"first /health after {elapsed:.2f}s, budget is "
+        f"{STARTUP_BUDGET_SECONDS:.1f}s (STARTUP_BUDGET_SECONDS)"
+    )
@@ -0,0 +1,137 @@
+"""
+Tests for live streaming transcription
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import transcription
+from app.services.streaming import StreamingSession
+from app.services.transcription_engine import (
+    FakeTranscriptionBackend,
+    TranscriptionEngine,
+    get_transcription_engine,
+)
+from app.utils.config import get_settings
+
+SAMPLE_RATE = 16000
+
+
+def pcm(pattern):
+    """PCM16 bytes for a list of (seconds, is_speech) spans"""
+    parts = []
+    for seconds, speech in pattern:
+        n = int(seconds * SAMPLE_RATE)
+        if speech:
+            t = np.arange(n) / SAMPLE_RATE
+            parts.append(0.3 * np.sin(2 * np.pi * 220 * t))
+        else:
+            parts.append(np.zeros(n))
+    return (np.concatenate(parts) * 32767).astype("<i2").tobytes()
+
+
+def frames(data, seconds=0.1):
+    step = int(seconds * SAMPLE_RATE) * 2
+    return [data[i:i + step] for i in range(0, len(data), step)]
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "stream_silence_ms", 500)
+    monkeypatch.setattr(settings, "stream_partial_interval", 0.5)
+    monkeypatch.setattr(settings, "stream_max_pending", 4)
+    return settings
+
+
+@pytest.mark.asyncio
+async def test_utterances_are_endpointed_on_silence(settings):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    session = StreamingSession(
+        FakeTranscriptionBackend(), send, SAMPLE_RATE, settings=settings
+    )
+    session.start()
+    for frame in frames(pcm([(1.5, True), (0.8, False),
+                             (1.2, True), (0.8, False)])):
+        await session.feed(frame)
+        await asyncio.sleep(0)
+    await session.finish()
+
+    finals = [m for m in sent if m["type"] == "final"]
+    assert len(finals) == 2
+    assert finals[0]["start"] == 0.0
+    assert finals[1]["start"] == pytest.approx(2.3, abs=0.03)
+    assert finals[0]["text"] == "w0 w1"
+    assert finals[1]["text"].startswith("w2")
+    assert any(m["type"] == "partial" for m in sent)
+    assert session.first_segment_latency is not None
+    assert len(session.final_latencies) == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_transcription_applies_backpressure(settings, monkeypatch):
+    monkeypatch.setattr(settings, "stream_max_pending", 1)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    backend = FakeTranscriptionBackend(latency=0.05)
+    session = StreamingSession(backend, send, SAMPLE_RATE, settings=settings)
+    session.start()
+    loop = asyncio.get_running_loop()
+
+    start = loop.time()
+    # Six utterances delivered as fast as the client can send them
+    for frame in frames(pcm([(1.0, True), (0.6, False)] * 6), seconds=1.6):
+        await session.feed(frame)
+    fed = loop.time() - start
+    await session.finish()
+
+    assert fed >= 4 * 0.05
+    assert [m["utterance"] for m in sent if m["type"] == "final"] \
+        == list(range(6))
+    assert backend.max_in_flight == 1
+
+
+def test_websocket_stream_round_trip(settings):
+    app = FastAPI()
+    app.include_router(transcription.router, prefix="/api/transcription")
+    app.dependency_overrides[get_transcription_engine] = \
+        lambda: TranscriptionEngine(FakeTranscriptionBackend())
+
+    with TestClient(app) as client:
+        with client.websocket_connect("/api/transcription/stream") as ws:
+            assert ws.receive_json()["type"] == "ready"
+            for frame in frames(pcm([(1.2, True), (0.8, False)])):
+                ws.send_bytes(frame)
+            ws.send_json({"type": "end"})
+
+            messages = []
+            while not messages or messages[-1]["type"] != "done":
+                messages.append(ws.receive_json())
+
+    finals = [m for m in messages if m["type"] == "final"]
+    assert len(finals) == 1 and finals[0]["text"].startswith("w0")
+    assert messages[-1]["stats"]["utterances"] == 1
+
+
+def test_websocket_rejects_unknown_encoding():
+    app = FastAPI()
+    app.include_router(transcription.router, prefix="/api/transcription")
+    app.dependency_overrides[get_transcription_engine] = \
+        lambda: TranscriptionEngine(FakeTranscriptionBackend())
+
+    with TestClient(app) as client:
+        with client.websocket_connect(
+            "/api/transcription/stream?encoding=opus"
+        ) as ws:
+            assert ws.receive_json()["type"] == "error"
@@ -0,0 +1,118 @@
+"""
+Tests for the chunked transcription engine
+"""
+
+import numpy as np
+import pytest
+
+from app.services import retry
+from app.services.transcription_engine import (
+    FakeTranscriptionBackend,
+    TranscriptionEngine,
+    plan_chunks,
+    split_audio,
+)
+from app.utils.config import get_settings
+
+SAMPLE_RATE = 16000
+
+
+def speech_like(seconds: float, gaps=()) -> np.ndarray:
+    """Noise bursts with silent gaps at the given (start, end) seconds"""
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0, 0.3, int(seconds * SAMPLE_RATE))
+    for start, end in gaps:
+        samples[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)] = 0.0
+    return samples.astype(np.float32)
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "transcription_chunk_seconds", 20)
+    monkeypatch.setattr(settings, "transcription_chunk_overlap", 2.0)
+    monkeypatch.setattr(settings, "transcription_silence_search", 4.0)
+    monkeypatch.setattr(settings, "openai_retry_delay", 0)
+    return settings
+
+
+def test_short_audio_is_a_single_chunk():
+    samples = speech_like(10)
+    assert plan_chunks(samples, SAMPLE_RATE, 20, 2, 4) == [(0.0, 10.0)]
+
+
+def test_cuts_snap_to_silence():
+    samples = speech_like(60, gaps=[(22.0, 22.6), (41.0, 41.6)])
+    spans = plan_chunks(samples, SAMPLE_RATE, 20, 2, 4)
+
+    assert len(spans) == 3
+    assert 22.0 <= spans[0][1] <= 22.6
+    assert 41.0 <= spans[1][1] <= 41.6
+    assert spans[-1][1] == pytest.approx(60.0)
+
+
+def test_chunks_overlap_and_share_memory():
+    samples = speech_like(60)
+    chunks = split_audio(samples, SAMPLE_RATE, 20, 2, 4)
+
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.start < previous.end
+        assert current.keep_start == previous.keep_end
+    assert all(np.shares_memory(c.samples, samples) for c in chunks)
+
+
+@pytest.mark.asyncio
+async def test_stitched_transcript_has_global_offsets(settings):
+    backend = FakeTranscriptionBackend()
+    engine = TranscriptionEngine(backend, max_concurrency=4)
+
+    result = await engine.transcribe(speech_like(95), SAMPLE_RATE)
+
+    words = result["transcript"].split()
+    assert words == [f"w{i}" for i in range(95)]
+    starts = [segment["start"] for segment in result["segments"]]
+    assert starts == sorted(starts)
+    assert result["segments"][-1]["end"] == pytest.approx(95.0)
+    assert result["chunks"] == backend.calls > 1
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded(settings):
+    backend = FakeTranscriptionBackend(latency=0.01)
+    engine = TranscriptionEngine(backend, max_concurrency=2)
+
+    await engine.transcribe(speech_like(200), SAMPLE_RATE)
+
+    assert backend.calls >= 8
+    assert backend.max_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_backing_off_chunk_frees_its_slot(settings, monkeypatch):
+    monkeypatch.setattr(retry, "full_jitter", lambda *args: 0.05)
+    backend = FakeTranscriptionBackend(fail_first=1)
+    transcribed = []
+    transcribe = backend.transcribe
+
+    async def record(chunk, language):
+        transcribed.append(chunk.index)
+        return await transcribe(chunk, language)
+
+    backend.transcribe = record
+    engine = TranscriptionEngine(backend, max_concurrency=1)
+
+    result = await engine.transcribe(speech_like(95), SAMPLE_RATE)
+
+    # The other chunks ran while the first waited to retry
+    assert transcribed[0] == transcribed[-1] == 0
+    assert result["transcript"].split()[0] == "w0"
+
+
+@pytest.mark.asyncio
+async def test_failed_chunks_are_retried(settings):
+    backend = FakeTranscriptionBackend(fail_first=1)
+    engine = TranscriptionEngine(backend, max_concurrency=1)
+
+    result = await engine.transcribe(speech_like(30), SAMPLE_RATE)
+
+    assert result["transcript"].split()[0] == "w0"
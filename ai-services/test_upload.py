@@ -0,0 +1,207 @@
+"""
+Tests for streaming upload ingestion
+"""
+
+import os
+
+import httpx
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import transcription
+from app.services import transcription_jobs
+from app.services.job_queue import JobQueue, JobStore, get_job_queue
+from app.utils.audio import decode_audio_file, encode_wav
+from app.utils.config import get_settings
+from app.utils.upload import (
+    AudioSpool,
+    AudioUrlRejected,
+    UnsupportedAudioFormat,
+    UploadTooLarge,
+    check_audio_url,
+    sniff_audio_format,
+)
+
+FORMATS = ["mp3", "wav", "mp4", "webm", "ogg", "flac", "m4a"]
+
+
+def wav_bytes(seconds=1.0, sample_rate=16000):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return encode_wav(0.2 * np.sin(2 * np.pi * 440 * t), sample_rate)
+
+
+async def chunked(data, size, consumed):
+    for i in range(0, len(data), size):
+        consumed.append(i)
+        yield data[i:i + size]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "job_spool_dir", str(tmp_path / "spool"))
+    monkeypatch.setattr(settings, "max_audio_size", "1MB")
+    store = JobStore(str(tmp_path / "jobs.db"))
+    app = FastAPI()
+    app.include_router(transcription.router, prefix="/api/transcription")
+    app.dependency_overrides[get_job_queue] = \
+        lambda: JobQueue(store, workers=0)
+    with TestClient(app) as client:
+        yield client
+    store.close()
+
+
+def test_sniff_audio_format():
+    assert sniff_audio_format(wav_bytes()[:12]) == "wav"
+    assert sniff_audio_format(b"fLaC\0\0\0\x22" + b"\0" * 4) == "flac"
+    assert sniff_audio_format(b"ID3\x04" + b"\0" * 8) == "mp3"
+    assert sniff_audio_format(b"\0\0\0\x20ftypM4A ") == "m4a"
+    assert sniff_audio_format(b"<html><body>") is None
+
+
+@pytest.mark.asyncio
+async def test_oversized_body_is_rejected_while_streaming(tmp_path):
+    spool = AudioSpool(str(tmp_path), max_bytes=64 * 1024,
+                       allowed_formats=FORMATS)
+    consumed = []
+
+    with pytest.raises(UploadTooLarge):
+        await spool.consume(chunked(wav_bytes(60), 16 * 1024, consumed))
+
+    assert len(consumed) == 5
+    assert not os.path.exists(spool.path)
+
+
+@pytest.mark.asyncio
+async def test_disguised_body_is_rejected_on_first_chunk(tmp_path):
+    spool = AudioSpool(str(tmp_path), max_bytes=10 ** 6,
+                       allowed_formats=FORMATS)
+    consumed = []
+
+    with pytest.raises(UnsupportedAudioFormat):
+        await spool.consume(chunked(b"MZ" + b"\0" * 100000, 4096, consumed))
+
+    assert len(consumed) == 1
+
+
+def test_upload_is_spooled_and_queued(client):
+    audio = wav_bytes(2.0)
+
+    response = client.post(
+        "/api/transcription/transcribe-file",
+        files={"file": ("meeting.bin", audio, "application/octet-stream")},
+        data={"meeting_id": "m-1"},
+    )
+
+    assert response.status_code == 202
+    store = client.app.dependency_overrides[get_job_queue]().store
+    job = store.get(response.json()["job_id"])
+    assert job.payload["meeting_id"] == "m-1"
+    with open(job.payload["audio_path"], "rb") as f:
+        assert f.read() == audio
+    samples, _ = decode_audio_file(job.payload["audio_path"], 16000)
+    assert len(samples) == 32000
+
+
+def test_retried_upload_keeps_one_spool_file(client):
+    statuses = [
+        client.post(
+            "/api/transcription/transcribe-file",
+            files={"file": ("meeting.wav", wav_bytes(), "audio/wav")},
+            headers={"Idempotency-Key": "upload-1"},
+        )
+        for _ in range(3)
+    ]
+
+    assert {response.json()["job_id"] for response in statuses} == \
+        {statuses[0].json()["job_id"]}
+    assert len(os.listdir(get_settings().job_spool_dir)) == 1
+
+
+def test_upload_rejects_non_audio_and_oversized(client):
+    response = client.post(
+        "/api/transcription/transcribe-file",
+        files={"file": ("notes.wav", b"just some text, honest", "audio/wav")},
+    )
+    assert response.status_code == 415
+
+    response = client.post(
+        "/api/transcription/transcribe-file",
+        files={"file": ("long.wav", wav_bytes(60), "audio/wav")},
+    )
+    assert response.status_code == 413
+    spool_dir = get_settings().job_spool_dir
+    assert not os.listdir(spool_dir)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("url", [
+    "file:///etc/passwd",
+    "http://127.0.0.1:8001/api/admin/profile",
+    "http://localhost/meeting.wav",
+    "http://169.254.169.254/latest/meta-data/",
+    "https://10.0.0.5/meeting.wav",
+    "http://[::1]/meeting.wav",
+    "http://[::ffff:127.0.0.1]/meeting.wav",
+])
+async def test_internal_audio_urls_are_rejected(url):
+    with pytest.raises(AudioUrlRejected):
+        await check_audio_url(url, [])
+
+
+@pytest.mark.asyncio
+async def test_allowed_hosts_replace_the_public_address_check():
+    await check_audio_url("https://93.184.216.34/meeting.wav", [])
+    await check_audio_url("http://storage.internal/meeting.wav",
+                          ["storage.internal"])
+    with pytest.raises(AudioUrlRejected):
+        await check_audio_url("https://93.184.216.34/meeting.wav",
+                              ["storage.internal"])
+
+
+@pytest.mark.asyncio
+async def test_each_redirect_is_checked(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "job_spool_dir", str(tmp_path))
+    redirects = {
+        "http://93.184.216.34/meeting.wav": "https://93.184.216.35/m.wav",
+        "http://93.184.216.34/admin.wav": "http://127.0.0.1:8001/admin",
+    }
+    requested = []
+
+    def upstream(request):
+        requested.append(str(request.url))
+        if str(request.url) in redirects:
+            return httpx.Response(
+                302, headers={"location": redirects[str(request.url)]}
+            )
+        return httpx.Response(200, content=wav_bytes())
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(upstream))
+    monkeypatch.setattr(transcription_jobs, "get_http_client",
+                        lambda: client)
+
+    path = await transcription_jobs._download_audio(
+        "http://93.184.216.34/meeting.wav"
+    )
+    with open(path, "rb") as f:
+        assert f.read() == wav_bytes()
+    os.unlink(path)
+
+    with pytest.raises(AudioUrlRejected):
+        await transcription_jobs._download_audio(
+            "http://93.184.216.34/admin.wav"
+        )
+    assert "http://127.0.0.1:8001/admin" not in requested
+    assert not os.listdir(tmp_path)
+
+
+def test_url_submission_to_an_internal_host_is_a_400(client):
+    response = client.post(
+        "/api/transcription/transcribe",
+        json={"audio_url": "http://169.254.169.254/latest/meta-data/"},
+    )
+
+    assert response.status_code == 400
+    assert "not a public address" in response.json()["detail"]
@@ -0,0 +1,98 @@
+"""
+Tests for recording upstream exchanges and replaying them offline
+"""
+
+import json
+import time
+
+import httpx
+import openai
+import pytest
+
+from app.services import http_client
+from app.services.llm_backend import OpenAIChatBackend
+from app.services.upstream_replay import fingerprint
+from app.utils.config import get_settings
+from test_http_client import StubServer
+
+
+def request(body, boundary=None) -> httpx.Request:
+    if boundary:
+        return httpx.Request(
+            "POST", "https://api.test/v1/audio?b=2&a=1",
+            content=body.replace(b"B", boundary.encode()),
+            headers={"content-type":
+                     f"multipart/form-data; boundary={boundary}"},
+        )
+    return httpx.Request("POST", "https://api.test/v1/chat",
+                         content=body,
+                         headers={"content-type": "application/json",
+                                  "authorization": f"Bearer {body!r}"})
+
+
+def test_fingerprint_ignores_headers_key_order_and_boundaries():
+    assert fingerprint(request(b'{"a": 1, "b": [2]}')) \
+        == fingerprint(request(b'{"b":[2],"a":1}'))
+    assert fingerprint(request(b'{"a": 1}')) \
+        != fingerprint(request(b'{"a": 2}'))
+    assert fingerprint(request(b"--B\r\naudio\r\n--B--", "x1")) \
+        == fingerprint(request(b"--B\r\naudio\r\n--B--", "y2"))
+
+
+async def use_mode(monkeypatch, mode: str, path: str, scale: float = 1.0):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "upstream_replay_mode", mode)
+    monkeypatch.setattr(settings, "upstream_replay_path", path)
+    monkeypatch.setattr(settings, "upstream_replay_latency_scale", scale)
+    await http_client.close_http_client()
+    http_client.get_http_client()
+
+
+async def timed_calls(backend, prompts):
+    start = time.perf_counter()
+    results = [await backend.complete_json("system", p, 10)
+               for p in prompts]
+    return results, time.perf_counter() - start
+
+
+@pytest.mark.asyncio
+async def test_replay_serves_recorded_responses_with_their_timing(
+    monkeypatch, tmp_path
+):
+    path = str(tmp_path / "upstream.jsonl")
+    prompts = ["first", "second", "first"]
+    stub = StubServer(delay=0.05)
+    url = await stub.start()
+    monkeypatch.setenv("OPENAI_BASE_URL", url + "/v1")
+    backend = OpenAIChatBackend("sk-test", "stub", 0.0, timeout=5)
+    try:
+        await use_mode(monkeypatch, "record", path)
+        recorded, _ = await timed_calls(backend, prompts)
+        assert http_client.http_client_stats()["replay"]["recorded"] == 3
+    finally:
+        await stub.stop()
+
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    assert [line["status"] for line in lines] == [200, 200, 200]
+    assert all("sk-test" not in json.dumps(line) for line in lines)
+
+    try:
+        # The stub is gone, so every answer must come from the recording
+        await use_mode(monkeypatch, "replay", path)
+        replayed, elapsed = await timed_calls(backend, prompts)
+        assert replayed == recorded
+        assert elapsed >= 3 * 0.05
+
+        await use_mode(monkeypatch, "replay", path, scale=0.0)
+        _, instant = await timed_calls(backend, prompts)
+        assert instant < 0.05
+
+        with pytest.raises(openai.NotFoundError):
+            await backend.complete_json("system", "never recorded", 10)
+        stats = http_client.http_client_stats()
+        assert (stats["replay"]["hits"], stats["replay"]["misses"]) \
+            == (3, 1)
+        assert stats["in_flight"] == 0  # every host slot was released
+    finally:
+        await http_client.close_http_client()
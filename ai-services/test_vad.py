@@ -0,0 +1,111 @@
+"""
+Tests for the voice activity detector and speech index
+"""
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import transcription
+from app.utils.audio import encode_wav
+from app.utils.config import get_settings
+from app.utils.vad import SpeechIndex, VoiceActivityDetector, hysteresis
+
+SAMPLE_RATE = 16000
+
+
+def recording(pattern, noise_db=-70.0):
+    """Tone-plus-noise speech over a quiet noise floor, (seconds, speech)"""
+    rng = np.random.default_rng(0)
+    parts = []
+    for seconds, speech in pattern:
+        n = int(seconds * SAMPLE_RATE)
+        part = rng.normal(0, 10 ** (noise_db / 20), n)
+        if speech:
+            t = np.arange(n) / SAMPLE_RATE
+            part += 0.2 * np.sin(2 * np.pi * 220 * t) \
+                + rng.normal(0, 0.05, n)
+        parts.append(part)
+    return np.concatenate(parts).astype(np.float32)
+
+
+def test_hysteresis_holds_between_thresholds():
+    score = np.array([0.2, 0.7, 1.2, 0.7, 0.6, 0.3, 0.7, 1.1])
+    assert hysteresis(score, 1.0, 0.5).tolist() == [
+        False, False, True, True, True, False, False, True
+    ]
+
+
+def test_speech_index_queries():
+    index = SpeechIndex(np.array([1.0, 5.0, 9.0]),
+                        np.array([2.0, 6.0, 9.5]), 10.0)
+
+    assert index.contains([0.5, 1.5, 2.0, 5.5, 9.9]).tolist() == [
+        False, True, False, True, False
+    ]
+    window = index.between(1.5, 5.5)
+    assert window.starts.tolist() == [1.5, 5.0]
+    assert window.ends.tolist() == [2.0, 5.5]
+    assert index.speech_seconds == pytest.approx(2.5)
+    assert len(index.merged(2.0)) == 3
+    assert index.merged(3.5).to_list() == [{"start": 1.0, "end": 9.5}]
+    assert index.padded(1.6).to_list() == [{"start": 0.0, "end": 10.0}]
+
+
+def test_detects_speech_bursts():
+    samples = recording([(3, False), (4, True), (0.4, False), (2, True),
+                         (6, False), (5, True), (2, False)])
+    detector = VoiceActivityDetector(SAMPLE_RATE, frame_length=1024)
+
+    index = detector.detect(samples)
+
+    # The 0.4s pause is a real gap; the hangover only bridges 0.2s
+    assert len(index) == 3
+    expected = [(3.0, 7.0), (7.4, 9.4), (15.4, 20.4)]
+    for (start, end), got_start, got_end in zip(
+        expected, index.starts, index.ends
+    ):
+        assert got_start == pytest.approx(start, abs=0.035)
+        assert got_end == pytest.approx(end, abs=0.035)
+
+
+def test_steady_noise_and_silence_are_not_speech():
+    detector = VoiceActivityDetector(SAMPLE_RATE)
+    assert len(detector.detect(np.zeros(SAMPLE_RATE * 5))) == 0
+    assert len(detector.detect(recording([(5, False)], noise_db=-55))) == 0
+
+
+def test_speech_throughout_stays_speech():
+    index = VoiceActivityDetector(SAMPLE_RATE).detect(recording([(8, True)]))
+    assert index.to_list() == [{"start": 0.0, "end": 8.0}]
+
+
+def test_speech_regions_endpoint(tmp_path, monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "job_spool_dir", str(tmp_path))
+    app = FastAPI()
+    app.include_router(transcription.router, prefix="/api/transcription")
+    audio = encode_wav(recording([(2, False), (3, True), (5, False)]),
+                       SAMPLE_RATE)
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/transcription/speech-regions",
+            files={"file": ("a.wav", audio, "audio/wav")},
+        )
+        windowed = client.post(
+            "/api/transcription/speech-regions?start=4&end=8",
+            files={"file": ("a.wav", audio, "audio/wav")},
+        )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["duration"] == pytest.approx(10.0)
+    assert len(body["regions"]) == 1
+    assert body["regions"][0]["start"] == pytest.approx(2.0, abs=0.05)
+    assert body["speech_ratio"] == pytest.approx(0.3, abs=0.01)
+    assert windowed.json()["regions"] == [
+        {"start": 4.0, "end": pytest.approx(5.0, abs=0.05)}
+    ]
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,50 @@
+"""
+EchoScribe AI Services job worker
+Runs queued jobs without serving HTTP so workers scale independently
+"""
+
+import asyncio
+import logging
+import signal
+
+from app.services.http_client import close_http_client, get_http_client
+from app.services.job_queue import get_job_queue
+from app.services.monitoring import start_monitoring, stop_monitoring
+from app.services.offload import close_offload, install_io_pool
+from app.services.transcription_jobs import TRANSCRIPTION_JOB, run_transcription_job
+from app.utils.config import get_settings
+from app.utils.logger import setup_logging
+
+# Setup logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Run the job worker pool until interrupted"""
+    settings = get_settings()
+    install_io_pool(asyncio.get_running_loop())
+    get_http_client()
+    await start_monitoring()
+    job_queue = get_job_queue()
+    job_queue.register(TRANSCRIPTION_JOB, run_transcription_job)
+    
+    # A dedicated worker process always runs at least one worker
+    job_queue.workers = max(settings.job_workers, 1)
+    await job_queue.start()
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    
+    await stop.wait()
+    logger.info("Shutting down job worker")
+    await job_queue.stop()
+    close_offload()
+    await close_http_client()
+    await stop_monitoring()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())